@@ -3,9 +3,11 @@
 Agrega casos_sinan (semanal) em indicador_epi para uso no Mapa/Dashboard.
 
 - Agrupa por (codigo_ibge, ano, semana_epidemiologica)
-- Define doenca_tipo = 'DENGUE'
-- Preenche casos_confirmados com a soma de numero_casos
-- UPSERT na PK composta (municipio_codigo, ano, semana_epi, doenca_tipo)
+- Grava a série indicador = 'CASOS_DENGUE' (valor = soma de numero_casos,
+  competencia = domingo de início da semana epi)
+- UPSERT no índice único (competencia, dedup_key) do V7, mesma chave do
+  ETL SINAN (dedup_key = 'CASOS_DENGUE:<codigo_ibge>')
+- Atualiza o agregado semanal indicador_epi_semanal (refresh incremental)
 
 Execução:
   python backend/scripts/aggregate_sinan_to_indicador.py
@@ -30,20 +32,43 @@ def main() -> int:
         print("="*70)
         sql = """
         INSERT INTO indicador_epi (
-            competencia, municipio_cod_ibge, indicador, valor
+            competencia, municipio_cod_ibge, indicador, valor, dedup_key
         )
         SELECT
             calcular_data_semana_epi(cs.ano, cs.semana_epidemiologica) AS competencia,
             cs.codigo_ibge AS municipio_cod_ibge,
             'CASOS_DENGUE'::text AS indicador,
-            SUM(cs.numero_casos)::numeric AS valor
+            SUM(cs.numero_casos)::numeric AS valor,
+            'CASOS_DENGUE:' || cs.codigo_ibge AS dedup_key
         FROM casos_sinan cs
-        GROUP BY cs.codigo_ibge, cs.ano, cs.semana_epidemiologica;
+        GROUP BY cs.codigo_ibge, cs.ano, cs.semana_epidemiologica
+        ON CONFLICT (competencia, dedup_key) WHERE dedup_key IS NOT NULL
+        DO UPDATE SET valor = EXCLUDED.valor;
         """
         cur.execute(sql)
         affected = cur.rowcount
+
+        # Atualizar agregado semanal (V017) para as semanas carregadas
+        cur.execute("""
+        SELECT refresh_indicador_epi_semanal(
+            MIN(calcular_data_semana_epi(ano, semana_epidemiologica)),
+            MAX(calcular_data_semana_epi(ano, semana_epidemiologica)) + 7
+        )
+        FROM casos_sinan;
+        """)
+        semanais = cur.fetchone()[0] or 0
+
+        # Cubo do drill-down (V020) para as mesmas semanas epidemiológicas
+        cur.execute("""
+        SELECT refresh_cubo_epi(
+            MIN(calcular_data_semana_epi(ano, semana_epidemiologica)),
+            MAX(calcular_data_semana_epi(ano, semana_epidemiologica)) + 7
+        )
+        FROM casos_sinan;
+        """)
         conn.commit()
         print(f" ✅ Upsert concluído (linhas afetadas: {affected})")
+        print(f" ✅ indicador_epi_semanal atualizado ({semanais} linhas)")
         return 0
     except Exception as e:
         print(f"❌ Erro: {e}")
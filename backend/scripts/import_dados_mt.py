@@ -7,8 +7,8 @@ Execução:
 
 Pré-requisitos:
   - PostgreSQL/PostGIS rodando (docker-compose up)
-  - Migração V012 aplicada
-  - Bibliotecas: pandas, psycopg2, fuzzywuzzy
+  - Migrações V012, V019 e V020 aplicadas
+  - Bibliotecas: pandas, psycopg2, fuzzywuzzy, pyshp
 """
 
 import pandas as pd
@@ -394,12 +394,74 @@ def import_liraa(conn):
     
     execute_batch(cursor, sql, registros, page_size=100)
     conn.commit()
-    
+
+    # Índices pré-calculados (V019) servidos pelo mapa e por /liraa
+    for ano in sorted({r[2] for r in registros}):
+        cursor.execute("SELECT refresh_indice_entomologico(%s)", (ano,))
+        print(f"  📈 indice_entomologico {ano}: {cursor.fetchone()[0]} linhas")
+    conn.commit()
+
     print(f"  ✅ {matches_ok} municípios LIRAa importados")
     print(f"  ⚠️  {matches_fail} municípios não encontrados (fuzzy match < 85%)")
     
     return True
 
+# =========================================================================
+# 4. Regiões de saúde (drill-down do dashboard, V020)
+# =========================================================================
+
+def import_regioes_saude(conn):
+    """Preencher municipios_ibge.regiao_saude e reconstruir o cubo_epi
+    
+    Fonte: lista SES-MT em dados-mt/SES-MT/regioes_saude.csv (colunas
+    codigo_ibge, regiao_saude). Sem ela, usa a região geográfica imediata
+    do IBGE (NM_RGI do DBF da malha municipal) como aproximação.
+    """
+    print("\n" + "="*70)
+    print("🏥 IMPORTANDO REGIÕES DE SAÚDE")
+    print("="*70)
+    
+    csv_path = DADOS_DIR / 'SES-MT' / 'regioes_saude.csv'
+    dbf_path = DADOS_DIR / 'IBGE' / 'MT_Municipios_2024_shp_limites' / 'MT_Municipios_2024.dbf'
+    
+    if csv_path.exists():
+        df = pd.read_csv(csv_path, dtype=str, encoding='utf-8')
+        registros = [
+            (str(row['regiao_saude']).strip(), str(row['codigo_ibge']).strip())
+            for _, row in df.dropna(subset=['codigo_ibge', 'regiao_saude']).iterrows()
+        ]
+        print(f"  📁 Arquivo: {csv_path.name} (SES-MT)")
+    elif dbf_path.exists():
+        import shapefile  # pyshp
+        
+        with open(dbf_path, 'rb') as dbf:
+            leitor = shapefile.Reader(dbf=dbf, encoding='cp1252')
+            registros = [(r['NM_RGI'].strip(), r['CD_MUN'].strip()) for r in leitor.records()]
+        print(f"  ⚠️  {csv_path.name} ausente: usando região geográfica imediata (IBGE) de {dbf_path.name}")
+    else:
+        print(f"❌ Arquivo não encontrado: {csv_path} ou {dbf_path}")
+        return False
+    
+    cursor = conn.cursor()
+    execute_batch(
+        cursor,
+        "UPDATE municipios_ibge SET regiao_saude = %s, updated_at = NOW() WHERE codigo_ibge = %s",
+        registros,
+        page_size=100
+    )
+    
+    # O cubo guarda a região de cada nó: reconstrói todas as semanas carregadas
+    cursor.execute("""
+    SELECT refresh_cubo_epi(MIN(semana_inicio), MAX(semana_inicio) + 7)
+    FROM indicador_epi_semanal
+    HAVING COUNT(*) > 0
+    """)
+    conn.commit()
+    
+    print(f"  ✅ {len(registros)} municípios com região de saúde")
+    
+    return True
+
 # =========================================================================
 # Main
 # =========================================================================
@@ -433,6 +495,10 @@ def main():
             print("\n❌ Falha ao importar LIRAa")
             return 1
         
+        # 4. Regiões de saúde
+        if not import_regioes_saude(conn):
+            print("\n⚠️  Falha ao importar regiões de saúde (prosseguindo...)")
+        
         # Fechar conexão
         conn.close()
         
@@ -5,20 +5,28 @@ Importar geometrias dos municípios de MT a partir de shapefile (sem GDAL)
 - Lê o shapefile com pyshp (pure Python)
 - Constrói a geometria em GeoJSON e insere no PostGIS usando ST_GeomFromGeoJSON
 - Reprojeta de SIRGAS 2000 (EPSG:4674) para WGS84 (EPSG:4326)
+- Gera a pirâmide de simplificação (municipios_geometrias_niveis) tratando a
+  malha como cobertura: divisas simplificadas uma vez e compartilhadas pelos
+  dois municípios (ver simplificacao_cobertura.py)
 
 Execução:
   python backend/scripts/import_geometrias_mt.py
+  python backend/scripts/import_geometrias_mt.py --relatorio   # só o relatório, sem banco
 """
 
 import os
 import sys
 import json
+import time
+import argparse
 from pathlib import Path
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 import shapefile  # pyshp
 import psycopg2
 
+from simplificacao_cobertura import NIVEIS, Cobertura, relatorio_niveis
+
 DB_CONFIG = {
     'host': os.getenv('POSTGRES_HOST', 'localhost'),
     'port': int(os.getenv('POSTGRES_PORT', 5432)),
@@ -30,6 +38,13 @@ DB_CONFIG = {
 BASE_DIR = Path(__file__).parent.parent.parent
 SHP_PATH = BASE_DIR / 'dados-mt' / 'IBGE' / 'MT_Municipios_2024_shp_limites' / 'MT_Municipios_2024.shp'
 
+# Nível da pirâmide gravado também em municipios_geometrias.geom_simplificada
+NIVEL_GEOM_SIMPLIFICADA = 2
+
+# Geometria GeoJSON (SIRGAS 2000) → MultiPolygon válido em WGS84
+GEOM_SQL = "ST_Transform(ST_SetSRID(ST_GeomFromGeoJSON(%s), 4674), 4326)"
+GEOM_VALIDA_SQL = f"ST_Multi(ST_CollectionExtract(ST_MakeValid({GEOM_SQL}), 3))"
+
 
 def get_db_conn():
     return psycopg2.connect(**DB_CONFIG)
@@ -89,7 +104,44 @@ def shape_to_geojson_geometry(shape: shapefile.Shape) -> dict:
     return {'type': 'MultiPolygon', 'coordinates': multipolygon}
 
 
-def import_geometrias():
+def ler_geometrias(reader: shapefile.Reader, code_field: str) -> Dict[str, dict]:
+    """código IBGE → geometria GeoJSON (MultiPolygon, SIRGAS 2000)"""
+    geometrias = {}
+    for sr in reader.iterShapeRecords():
+        props = sr.record.as_dict()
+        codigo = str(props.get(code_field, '')).strip()
+        if not codigo or len(codigo) < 7:
+            continue
+        codigo = codigo[:7]
+        try:
+            geometrias[codigo] = shape_to_geojson_geometry(sr.shape)
+        except Exception as e:
+            print(f"  ⚠️  Falha para código {codigo}: {e}")
+    return geometrias
+
+
+def gerar_niveis(geometrias: Dict[str, dict]) -> Dict[int, Dict[str, dict]]:
+    """Pirâmide de simplificação: nível → (código → geometria)"""
+    inicio = time.perf_counter()
+    cobertura = Cobertura(geometrias)
+    niveis = {nivel: cobertura.simplificar(tolerancia) for nivel, tolerancia, _, _ in NIVEIS}
+    print(f"  🔺 {len(NIVEIS)} níveis gerados em {time.perf_counter() - inicio:.1f}s "
+          f"({len(cobertura.nos)} nós de divisa)")
+    return niveis
+
+
+def imprimir_relatorio(geometrias: Dict[str, dict], niveis: Dict[int, Dict[str, dict]]) -> None:
+    print("\n  📉 Redução por nível (GeoJSON com 6 casas decimais)")
+    print(f"  {'nível':>8} {'tolerância':>10} {'zoom':>6} {'vértices':>10} {'red.':>7} {'KB':>9} {'red.':>7}")
+    for linha in relatorio_niveis(geometrias, niveis):
+        print(
+            f"  {linha['nivel']:>8} {linha['tolerancia']:>10} {linha['zoom']:>6} "
+            f"{linha['vertices']:>10} {linha['reducao_vertices']:>6}% "
+            f"{linha['bytes'] / 1024:>9.1f} {linha['reducao_bytes']:>6}%"
+        )
+
+
+def import_geometrias(somente_relatorio: bool = False):
     print("\n" + "="*70)
     print("🗺️  IMPORTANDO GEOMETRIAS (shapefile → PostGIS)")
     print("="*70)
@@ -108,35 +160,36 @@ def import_geometrias():
 
     print(f"  🔎 Campo de código IBGE: {code_field}")
 
+    geometrias = ler_geometrias(reader, code_field)
+    niveis = gerar_niveis(geometrias)
+    imprimir_relatorio(geometrias, niveis)
+
+    if somente_relatorio:
+        return 0
+
     conn = get_db_conn()
     cur = conn.cursor()
 
     inserted = 0
     updated = 0
 
-    for sr in reader.iterShapeRecords():
-        props = sr.record.as_dict()
-        codigo = str(props.get(code_field, '')).strip()
-        if not codigo or len(codigo) < 7:
-            continue
-        codigo = codigo[:7]
-
+    for codigo, geom_geojson in geometrias.items():
         try:
-            geom_geojson = shape_to_geojson_geometry(sr.shape)
             geom_json_str = json.dumps(geom_geojson)
+            simplificada_str = json.dumps(niveis[NIVEL_GEOM_SIMPLIFICADA][codigo])
 
-            sql = """
+            sql = f"""
             INSERT INTO municipios_geometrias (
                 codigo_ibge, geom, geom_simplificada, centroide,
                 area_calculada_km2, perimetro_km
             )
             SELECT
                 %s,
-                ST_Transform(ST_SetSRID(ST_GeomFromGeoJSON(%s), 4674), 4326) AS geom,
-                ST_Simplify(ST_Transform(ST_SetSRID(ST_GeomFromGeoJSON(%s), 4674), 4326), 0.001) AS geom_simplificada,
-                ST_Centroid(ST_Transform(ST_SetSRID(ST_GeomFromGeoJSON(%s), 4674), 4326)) AS centroide,
-                (ST_Area(ST_Transform(ST_SetSRID(ST_GeomFromGeoJSON(%s), 4674), 4326)::geography) / 1000000)::numeric(10,3) AS area_calculada_km2,
-                (ST_Perimeter(ST_Transform(ST_SetSRID(ST_GeomFromGeoJSON(%s), 4674), 4326)::geography) / 1000)::numeric(10,2) AS perimetro_km
+                {GEOM_SQL} AS geom,
+                {GEOM_VALIDA_SQL} AS geom_simplificada,
+                ST_Centroid({GEOM_SQL}) AS centroide,
+                (ST_Area({GEOM_SQL}::geography) / 1000000)::numeric(10,3) AS area_calculada_km2,
+                (ST_Perimeter({GEOM_SQL}::geography) / 1000)::numeric(10,2) AS perimetro_km
             ON CONFLICT (codigo_ibge) DO UPDATE SET
                 geom = EXCLUDED.geom,
                 geom_simplificada = EXCLUDED.geom_simplificada,
@@ -146,13 +199,37 @@ def import_geometrias():
             """
             params = (
                 codigo,
-                geom_json_str, geom_json_str, geom_json_str, geom_json_str, geom_json_str
+                geom_json_str, simplificada_str, geom_json_str, geom_json_str, geom_json_str
             )
             cur.execute(sql, params)
             if cur.rowcount == 1:
                 inserted += 1
             else:
                 updated += 1
+
+            for nivel, tolerancia, zoom_min, zoom_max in NIVEIS:
+                geom_nivel = niveis[nivel].get(codigo)
+                if not geom_nivel or not geom_nivel['coordinates']:
+                    continue
+                cur.execute(
+                    f"""
+                    INSERT INTO municipios_geometrias_niveis (
+                        codigo_ibge, nivel, tolerancia, zoom_min, zoom_max, geom, n_vertices
+                    )
+                    SELECT %s, %s, %s, %s, %s, {GEOM_VALIDA_SQL}, %s
+                    ON CONFLICT (codigo_ibge, nivel) DO UPDATE SET
+                        tolerancia = EXCLUDED.tolerancia,
+                        zoom_min = EXCLUDED.zoom_min,
+                        zoom_max = EXCLUDED.zoom_max,
+                        geom = EXCLUDED.geom,
+                        n_vertices = EXCLUDED.n_vertices,
+                        updated_at = NOW();
+                    """,
+                    (
+                        codigo, nivel, tolerancia, zoom_min, zoom_max, json.dumps(geom_nivel),
+                        sum(len(anel) for pol in geom_nivel['coordinates'] for anel in pol)
+                    )
+                )
         except Exception as e:
             print(f"  ⚠️  Falha para código {codigo}: {e}")
             conn.rollback()
@@ -167,8 +244,12 @@ def import_geometrias():
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Importa geometrias dos municípios de MT")
+    parser.add_argument('--relatorio', action='store_true',
+                        help="Só gera a pirâmide e imprime o relatório de redução (sem banco)")
+    args = parser.parse_args()
     try:
-        return import_geometrias()
+        return import_geometrias(somente_relatorio=args.relatorio)
     except Exception as e:
         print(f"❌ Erro inesperado: {e}")
         return 1
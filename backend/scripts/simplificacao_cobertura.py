@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Simplificação multirresolução da malha de municípios (pure Python)
+
+ST_Simplify aplicado município a município simplifica cada lado de uma
+divisa de forma independente e abre frestas/sobreposições entre vizinhos.
+Aqui a malha é tratada como cobertura:
+
+- Cada anel é quebrado em arcos nos "nós" (vértices onde muda o conjunto de
+  municípios que compartilham a borda, ou onde três ou mais se tocam)
+- Cada arco é simplificado uma única vez (Douglas-Peucker, extremos fixos) e
+  o mesmo resultado é usado pelos dois municípios da divisa
+- Arcos de anéis com poucos nós mantêm o vértice mais distante, para que
+  nenhum anel colapse em uma linha
+
+Uso:
+  from simplificacao_cobertura import Cobertura, relatorio_niveis
+  cobertura = Cobertura({'5103403': geojson_multipolygon, ...})
+  nivel = cobertura.simplificar(0.001)
+"""
+
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+Ponto = Tuple[float, float]
+
+# (nível, tolerância em graus, zoom mínimo, zoom máximo)
+# Tolerância ≈ 1 pixel (256 px) no maior zoom do nível
+NIVEIS = [
+    (0, 0.02, 0, 6),      # estado
+    (1, 0.005, 7, 8),     # região
+    (2, 0.001, 9, 10),    # município (= geom_simplificada)
+    (3, 0.0002, 11, 22),  # cidade
+]
+
+
+def _poligonos(geometria: dict) -> List[List[List[Ponto]]]:
+    """MultiPolygon/Polygon GeoJSON → polígonos de anéis abertos (sem ponto repetido)"""
+    coords = geometria.get('coordinates') or []
+    if geometria.get('type') == 'Polygon':
+        coords = [coords]
+    poligonos = []
+    for poligono in coords:
+        aneis = []
+        for anel in poligono:
+            pontos: List[Ponto] = []
+            for p in anel:
+                t = (float(p[0]), float(p[1]))
+                if not pontos or t != pontos[-1]:
+                    pontos.append(t)
+            if len(pontos) > 1 and pontos[0] == pontos[-1]:
+                pontos.pop()
+            if len(pontos) >= 3:
+                aneis.append(pontos)
+        if aneis:
+            poligonos.append(aneis)
+    return poligonos
+
+
+def _segmento(a: Ponto, b: Ponto) -> Tuple[Ponto, Ponto]:
+    return (a, b) if a <= b else (b, a)
+
+
+def _canonico(arco: Sequence[Ponto]) -> Tuple[Tuple[Ponto, ...], bool]:
+    """Sentido canônico de um arco (igual para os dois municípios) e se foi invertido"""
+    direto = tuple(arco)
+    inverso = direto[::-1]
+    return (inverso, True) if inverso < direto else (direto, False)
+
+
+def _distancia2(p: Ponto, a: Ponto, b: Ponto) -> float:
+    """Distância² de p ao segmento ab"""
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    if dx == 0 and dy == 0:
+        return (p[0] - a[0]) ** 2 + (p[1] - a[1]) ** 2
+    t = ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / (dx * dx + dy * dy)
+    t = max(0.0, min(1.0, t))
+    px, py = a[0] + t * dx, a[1] + t * dy
+    return (p[0] - px) ** 2 + (p[1] - py) ** 2
+
+
+def douglas_peucker(pontos: Sequence[Ponto], tolerancia: float, manter_um: bool = False) -> List[Ponto]:
+    """
+    Douglas-Peucker iterativo com extremos fixos.
+
+    Args:
+        pontos: Polilinha (extremos preservados)
+        tolerancia: Distância máxima (unidades das coordenadas)
+        manter_um: Mantém o vértice interno mais distante mesmo abaixo da tolerância
+    """
+    n = len(pontos)
+    if n <= 2:
+        return list(pontos)
+
+    tol2 = tolerancia * tolerancia
+    manter = [False] * n
+    manter[0] = manter[-1] = True
+    pilha = [(0, n - 1, manter_um)]
+    while pilha:
+        ini, fim, forcar = pilha.pop()
+        if fim - ini < 2:
+            continue
+        d_max, i_max = -1.0, -1
+        a, b = pontos[ini], pontos[fim]
+        for i in range(ini + 1, fim):
+            d = _distancia2(pontos[i], a, b)
+            if d > d_max:
+                d_max, i_max = d, i
+        if d_max > tol2 or forcar:
+            manter[i_max] = True
+            pilha.append((ini, i_max, False))
+            pilha.append((i_max, fim, False))
+    return [p for p, m in zip(pontos, manter) if m]
+
+
+class Cobertura:
+    """Malha de municípios com arcos compartilhados para simplificação consistente"""
+
+    def __init__(self, geometrias: Dict[str, dict]):
+        # (código, polígonos de anéis)
+        self.municipios: Dict[str, List[List[List[Ponto]]]] = {
+            cod: _poligonos(geom) for cod, geom in geometrias.items()
+        }
+
+        aneis = [anel for pols in self.municipios.values() for pol in pols for anel in pol]
+
+        donos: Dict[Tuple[Ponto, Ponto], set] = {}
+        uso_vertice: Dict[Ponto, int] = {}
+        for rid, anel in enumerate(aneis):
+            for i, p in enumerate(anel):
+                uso_vertice[p] = uso_vertice.get(p, 0) + 1
+                donos.setdefault(_segmento(p, anel[(i + 1) % len(anel)]), set()).add(rid)
+
+        self.nos: set = set()
+        for anel in aneis:
+            n = len(anel)
+            for i, p in enumerate(anel):
+                antes = donos[_segmento(anel[i - 1], p)]
+                depois = donos[_segmento(p, anel[(i + 1) % n])]
+                if antes != depois or uso_vertice[p] > len(antes):
+                    self.nos.add(p)
+
+        # Arcos de algum anel com menos de 3 arcos mantêm um vértice interno
+        # (decidido por arco, não por anel, para valer dos dois lados da divisa)
+        self._arcos_protegidos: set = set()
+        for anel in aneis:
+            arcos = self._arcos(anel)
+            if 0 < len(arcos) < 3:
+                self._arcos_protegidos.update(_canonico(a)[0] for a in arcos)
+
+    def _arcos(self, anel: List[Ponto]) -> List[List[Ponto]]:
+        """Quebra o anel nos nós; cada arco inclui os dois extremos"""
+        indices = [i for i, p in enumerate(anel) if p in self.nos]
+        if not indices:
+            return []
+        inicio = indices[0]
+        rotacionado = anel[inicio:] + anel[:inicio] + [anel[inicio]]
+        arcos, atual = [], [rotacionado[0]]
+        for p in rotacionado[1:]:
+            atual.append(p)
+            if p in self.nos:
+                arcos.append(atual)
+                atual = [p]
+        return arcos
+
+    @staticmethod
+    def _canonico_fechado(anel: List[Ponto]) -> Tuple[Ponto, ...]:
+        """Anel sem nós em ordem canônica (mesma para os dois lados de um enclave)"""
+        i = anel.index(min(anel))
+        rot = anel[i:] + anel[:i]
+        inv = [rot[0]] + rot[1:][::-1]
+        return min(tuple(rot), tuple(inv))
+
+    def simplificar(self, tolerancia: float) -> Dict[str, dict]:
+        """
+        Simplifica a malha inteira com a tolerância dada.
+
+        Returns:
+            código → GeoJSON MultiPolygon (anéis fechados)
+        """
+        cache: Dict[Tuple[Ponto, ...], List[Ponto]] = {}
+
+        def arco_simplificado(arco: List[Ponto], manter_um: bool = False) -> List[Ponto]:
+            canon, reverso = _canonico(arco)
+            res = cache.get(canon)
+            if res is None:
+                res = douglas_peucker(
+                    canon, tolerancia, manter_um or canon in self._arcos_protegidos
+                )
+                cache[canon] = res
+            return list(reversed(res)) if reverso else list(res)
+
+        def anel_simplificado(anel: List[Ponto]) -> Optional[List[Ponto]]:
+            arcos = self._arcos(anel)
+            if not arcos:
+                canon = self._canonico_fechado(anel)
+                # Fecha no vértice mais distante do início: duas metades com extremos fixos
+                d = [_distancia2(p, canon[0], canon[0]) for p in canon]
+                k = d.index(max(d))
+                if k == 0:
+                    return None
+                metade_a = arco_simplificado(list(canon[:k + 1]), True)
+                metade_b = arco_simplificado(list(canon[k:]) + [canon[0]], True)
+                pontos = metade_a[:-1] + metade_b[:-1]
+                # Volta ao sentido original do anel
+                if _area(pontos) * _area(anel) < 0:
+                    pontos = [pontos[0]] + pontos[1:][::-1]
+            else:
+                pontos = []
+                for arco in arcos:
+                    pontos.extend(arco_simplificado(arco)[:-1])
+            if len(set(pontos)) < 3:
+                return None
+            return pontos + [pontos[0]]
+
+        resultado = {}
+        for cod, poligonos in self.municipios.items():
+            multi = []
+            for poligono in poligonos:
+                externo = anel_simplificado(poligono[0])
+                if externo is None:
+                    continue
+                buracos = [b for b in (anel_simplificado(a) for a in poligono[1:]) if b]
+                multi.append([[list(p) for p in anel] for anel in [externo] + buracos])
+            resultado[cod] = {'type': 'MultiPolygon', 'coordinates': multi}
+        return resultado
+
+
+def _area(anel: Sequence[Ponto]) -> float:
+    soma = 0.0
+    anterior = anel[-1]
+    for atual in anel:
+        soma += anterior[0] * atual[1] - atual[0] * anterior[1]
+        anterior = atual
+    return soma / 2.0
+
+
+def contar_vertices(geometrias: Dict[str, dict]) -> int:
+    total = 0
+    for geom in geometrias.values():
+        coords = geom.get('coordinates') or []
+        if geom.get('type') == 'Polygon':
+            coords = [coords]
+        total += sum(len(anel) for pol in coords for anel in pol)
+    return total
+
+
+def bytes_geojson(geometrias: Dict[str, dict], casas: int = 6) -> int:
+    """Tamanho do GeoJSON com a mesma precisão servida pela API (ST_AsGeoJSON(geom, 6))"""
+    def arredondar(c):
+        if isinstance(c, (int, float)):
+            return round(c, casas)
+        return [arredondar(x) for x in c]
+
+    return sum(
+        len(json.dumps({'type': g.get('type'), 'coordinates': arredondar(g.get('coordinates') or [])},
+                       separators=(',', ':')))
+        for g in geometrias.values()
+    )
+
+
+def relatorio_niveis(original: Dict[str, dict], niveis: Dict[int, Dict[str, dict]]) -> List[dict]:
+    """Vértices e bytes (GeoJSON) por nível, com a redução em relação ao original"""
+    v0 = contar_vertices(original) or 1
+    b0 = bytes_geojson(original) or 1
+    linhas = [{'nivel': 'original', 'tolerancia': 0.0, 'zoom': '-',
+               'vertices': v0, 'bytes': b0, 'reducao_vertices': 0.0, 'reducao_bytes': 0.0}]
+    config = {n: (tol, zmin, zmax) for n, tol, zmin, zmax in NIVEIS}
+    for nivel, geoms in sorted(niveis.items()):
+        tol, zmin, zmax = config.get(nivel, (None, None, None))
+        v, b = contar_vertices(geoms), bytes_geojson(geoms)
+        linhas.append({
+            'nivel': nivel,
+            'tolerancia': tol,
+            'zoom': f"{zmin}-{zmax}",
+            'vertices': v,
+            'bytes': b,
+            'reducao_vertices': round(100.0 * (1 - v / v0), 1),
+            'reducao_bytes': round(100.0 * (1 - b / b0), 1),
+        })
+    return linhas
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Testes da simplificação por cobertura (simplificacao_cobertura.py)
+
+Execução:
+  python -m pytest backend/scripts/test_simplificacao_cobertura.py
+"""
+
+import math
+
+import pytest
+
+from simplificacao_cobertura import NIVEIS, Cobertura, douglas_peucker, relatorio_niveis
+
+TOLERANCIAS = [tol for _, tol, _, _ in NIVEIS]
+
+
+def divisa(n: int = 200, amplitude: float = 0.03):
+    """Divisa sinuosa de (1, 0) a (1, 1), com detalhes em várias escalas"""
+    return [
+        (1 + amplitude * math.sin(7 * math.pi * i / n) + amplitude / 10 * math.sin(61 * math.pi * i / n),
+         i / n)
+        for i in range(n + 1)
+    ]
+
+
+def poligono(anel):
+    return {'type': 'Polygon', 'coordinates': [[list(p) for p in anel + [anel[0]]]]}
+
+
+def vizinhos():
+    """Dois municípios lado a lado; a divisa é o mesmo arco nos dois anéis"""
+    borda = divisa()
+    oeste = [(0.0, 0.0)] + borda + [(0.0, 1.0)]
+    leste = [(2.0, 0.0), (2.0, 1.0)] + borda[::-1]
+    return {'oeste': poligono(oeste), 'leste': poligono(leste)}
+
+
+def anel_externo(geometria):
+    """Primeiro anel externo (Polygon ou MultiPolygon), sem o ponto de fechamento"""
+    coords = geometria['coordinates']
+    if geometria['type'] == 'MultiPolygon':
+        coords = coords[0]
+    return [tuple(p) for p in coords[0][:-1]]
+
+
+def trecho_divisa(anel):
+    """Vértices do anel sobre a divisa (entre as colunas x=0 e x=2), de sul a norte"""
+    return sorted((p for p in anel if 0.5 < p[0] < 1.5), key=lambda p: p[1])
+
+
+def ilha(cx: float, cy: float, raio: float, lados: int = 12):
+    return [(cx + raio * math.cos(2 * math.pi * k / lados), cy + raio * math.sin(2 * math.pi * k / lados))
+            for k in range(lados)]
+
+
+# =========================================================================
+# Douglas-Peucker
+# =========================================================================
+
+def test_douglas_peucker_keeps_endpoints_and_drops_collinear():
+    pontos = [(0.0, 0.0), (1.0, 0.0001), (2.0, 0.0), (3.0, 1.0)]
+    assert douglas_peucker(pontos, 0.01) == [(0.0, 0.0), (2.0, 0.0), (3.0, 1.0)]
+
+
+def test_douglas_peucker_manter_um_keeps_farthest_vertex():
+    pontos = [(0.0, 0.0), (1.0, 0.001), (2.0, 0.002), (3.0, 0.0)]
+    assert douglas_peucker(pontos, 0.1) == [(0.0, 0.0), (3.0, 0.0)]
+    assert douglas_peucker(pontos, 0.1, manter_um=True) == [(0.0, 0.0), (2.0, 0.002), (3.0, 0.0)]
+
+
+# =========================================================================
+# Cobertura
+# =========================================================================
+
+@pytest.mark.parametrize("tolerancia", TOLERANCIAS)
+def test_shared_border_identical_on_both_sides(tolerancia):
+    """Nenhuma fresta ou sobreposição: a divisa simplificada é a mesma nos dois municípios"""
+    original = vizinhos()
+    nivel = Cobertura(original).simplificar(tolerancia)
+
+    oeste = trecho_divisa(anel_externo(nivel['oeste']))
+    leste = trecho_divisa(anel_externo(nivel['leste']))
+
+    assert oeste == leste
+    assert oeste[0] == (1.0, 0.0) and oeste[-1][1] == 1.0
+    assert len(oeste) < len(trecho_divisa(anel_externo(original['oeste'])))
+
+
+@pytest.mark.parametrize("tolerancia", TOLERANCIAS)
+def test_small_island_keeps_a_polygon(tolerancia):
+    """Ilha muito menor que a tolerância não colapsa em linha nem some"""
+    geometrias = vizinhos()
+    geometrias['ilha'] = poligono(ilha(5.0, 5.0, 0.0001))
+
+    nivel = Cobertura(geometrias).simplificar(tolerancia)
+
+    poligonos = nivel['ilha']['coordinates']
+    assert len(poligonos) == 1
+    anel = [tuple(p) for p in poligonos[0][0]]
+    assert anel[0] == anel[-1]
+    assert len(set(anel[:-1])) >= 3
+
+
+def test_enclave_hole_matches_island():
+    """O buraco do município envolvente e a ilha enclavada são simplificados iguais"""
+    contorno = [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)]
+    enclave = ilha(0.5, 0.5, 0.1, lados=64)
+    geometrias = {
+        'envolvente': {'type': 'Polygon',
+                       'coordinates': [[list(p) for p in contorno + [contorno[0]]],
+                                       [list(p) for p in enclave[::-1] + [enclave[-1]]]]},
+        'enclave': poligono(enclave),
+    }
+
+    nivel = Cobertura(geometrias).simplificar(0.005)
+
+    buraco = nivel['envolvente']['coordinates'][0][1]
+    externo = nivel['enclave']['coordinates'][0][0]
+    assert sorted(map(tuple, buraco[:-1])) == sorted(map(tuple, externo[:-1]))
+    assert 3 <= len(externo) - 1 < len(enclave)
+
+
+def test_relatorio_niveis_reduces_with_tolerance():
+    original = vizinhos()
+    cobertura = Cobertura(original)
+    niveis = {nivel: cobertura.simplificar(tol) for nivel, tol, _, _ in NIVEIS}
+
+    linhas = relatorio_niveis(original, niveis)
+
+    assert [l['nivel'] for l in linhas] == ['original'] + [n for n, _, _, _ in NIVEIS]
+    assert linhas[1]['zoom'] == f"{NIVEIS[0][2]}-{NIVEIS[0][3]}"
+    vertices = [l['vertices'] for l in linhas]
+    # NIVEIS vai da maior para a menor tolerância
+    assert vertices[0] > max(vertices[1:])
+    assert vertices[1:] == sorted(vertices[1:])
+    assert all(0 < l['reducao_vertices'] < 100 for l in linhas[1:])
+    assert all(l['reducao_bytes'] > 0 for l in linhas[1:])
@@ -0,0 +1,38 @@
+-- =========================================================================
+-- V016: Limites corretos de semana epidemiológica
+-- =========================================================================
+-- A versão da V012 iniciava a semana 1 no domingo anterior a 1º de janeiro.
+-- No calendário SINAN a semana 1 é a semana (domingo a sábado) que contém
+-- 4 de janeiro, ou seja, a primeira com pelo menos 4 dias no ano. Exemplos:
+--   2025 → 2024-12-29 (igual à versão anterior)
+--   2026 → 2026-01-04 (a versão anterior retornava 2025-12-28)
+--
+-- Os filtros da epi-api/relatorios-api (app/services/semana_epi.py) usam a
+-- mesma regra para gerar intervalos de competencia indexáveis.
+-- =========================================================================
+
+CREATE OR REPLACE FUNCTION inicio_ano_epi(p_ano INTEGER)
+RETURNS DATE AS $$
+    -- Domingo da semana que contém 4 de janeiro
+    SELECT make_date(p_ano, 1, 4) - CAST(EXTRACT(DOW FROM make_date(p_ano, 1, 4)) AS INTEGER);
+$$ LANGUAGE sql IMMUTABLE;
+
+COMMENT ON FUNCTION inicio_ano_epi IS 'Data (domingo) de início da semana epidemiológica 1 do ano';
+
+CREATE OR REPLACE FUNCTION calcular_data_semana_epi(p_ano INTEGER, p_semana INTEGER)
+RETURNS DATE AS $$
+    SELECT inicio_ano_epi(p_ano) + ((p_semana - 1) * 7);
+$$ LANGUAGE sql IMMUTABLE;
+
+COMMENT ON FUNCTION calcular_data_semana_epi IS 'Converte ano + semana epidemiológica em DATE (início da semana, calendário SINAN)';
+
+-- Exemplo de uso:
+-- SELECT calcular_data_semana_epi(2026, 1);  -- Retorna: 2026-01-04
+
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Migração V016 aplicada com sucesso!';
+    RAISE NOTICE '   - Função criada: inicio_ano_epi()';
+    RAISE NOTICE '   - Função atualizada: calcular_data_semana_epi()';
+    RAISE NOTICE '   - Dados agregados de anos com semana 1 após 1º/jan (ex.: 2026) devem ser reprocessados';
+END$$;
@@ -0,0 +1,159 @@
+-- =========================================================================
+-- V017: Agregado semanal materializado de indicador_epi
+-- =========================================================================
+-- Mapa, dashboard e relatórios reagregavam indicador_epi (casos individuais
+-- do ETL EPI01 + séries CASOS_/GRAVES_/OBITOS_* agregadas) a cada requisição. Esta tabela
+-- guarda o total por (município, semana epidemiológica, doença) e é
+-- atualizada incrementalmente após cada carga pela função
+-- refresh_indicador_epi_semanal(inicio, fim).
+--
+-- Origem das linhas:
+--   * séries agregadas (ETL SINAN, aggregate_sinan_to_indicador.py),
+--     semana = competencia:
+--       indicador = 'CASOS_<DOENCA>'  → casos e casos_confirmados
+--       indicador = 'GRAVES_<DOENCA>' → casos_graves
+--       indicador = 'OBITOS_<DOENCA>' → obitos
+--   * indicador IS NULL (casos individuais do EPIPersistence): um caso
+--     por linha confirmada ou provável (classificacao_final DENGUE*;
+--     DESCARTADO, INCONCLUSIVO e sem classificação ficam de fora, como na
+--     série CASOS_DENGUE), semana = dt_sintomas (ou competencia)
+-- =========================================================================
+
+CREATE TABLE IF NOT EXISTS indicador_epi_semanal (
+    municipio_cod_ibge VARCHAR(7) NOT NULL,
+    semana_inicio DATE NOT NULL,
+    ano_epi SMALLINT NOT NULL,
+    semana_epi SMALLINT NOT NULL CHECK (semana_epi BETWEEN 1 AND 53),
+    doenca_tipo VARCHAR(20) NOT NULL,
+    casos BIGINT NOT NULL DEFAULT 0,
+    casos_confirmados BIGINT NOT NULL DEFAULT 0,
+    casos_graves BIGINT NOT NULL DEFAULT 0,
+    casos_sinais_alarme BIGINT NOT NULL DEFAULT 0,
+    obitos BIGINT NOT NULL DEFAULT 0,
+    atualizado_em TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (municipio_cod_ibge, semana_inicio, doenca_tipo)
+);
+
+CREATE INDEX IF NOT EXISTS idx_indicador_epi_semanal_semana
+    ON indicador_epi_semanal (semana_inicio, doenca_tipo);
+CREATE INDEX IF NOT EXISTS idx_indicador_epi_semanal_ano
+    ON indicador_epi_semanal (ano_epi, semana_epi, doenca_tipo);
+
+COMMENT ON TABLE indicador_epi_semanal IS 'Agregado semanal de indicador_epi por município/semana epi/doença (refresh incremental pós-ETL)';
+COMMENT ON COLUMN indicador_epi_semanal.semana_inicio IS 'Domingo de início da semana epidemiológica';
+COMMENT ON COLUMN indicador_epi_semanal.casos IS 'Casos confirmados/prováveis (casos individuais) ou valor da série CASOS_*; casos_graves/obitos vêm das séries GRAVES_*/OBITOS_*';
+
+-- =========================================================================
+-- Semana epidemiológica de uma data (calendário SINAN, ver V016)
+-- =========================================================================
+
+CREATE OR REPLACE FUNCTION inicio_semana_epi_data(p_data DATE)
+RETURNS DATE AS $$
+    SELECT p_data - CAST(EXTRACT(DOW FROM p_data) AS INTEGER);
+$$ LANGUAGE sql IMMUTABLE;
+
+COMMENT ON FUNCTION inicio_semana_epi_data IS 'Domingo de início da semana epidemiológica que contém a data';
+
+-- =========================================================================
+-- Refresh incremental
+-- =========================================================================
+
+CREATE OR REPLACE FUNCTION refresh_indicador_epi_semanal(p_inicio DATE, p_fim DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    v_inicio DATE := inicio_semana_epi_data(p_inicio);
+    v_fim DATE := inicio_semana_epi_data(p_fim - 1) + 7;
+    v_linhas INTEGER;
+BEGIN
+    -- Refreshes concorrentes (ETLs em paralelo) se serializam até o fim da
+    -- transação: sem isso o INSERT de um pode colidir na PK com as linhas que
+    -- o outro acabou de inserir após o DELETE
+    PERFORM pg_advisory_xact_lock(hashtext('refresh_indicador_epi_semanal'));
+
+    -- Recalcula todas as semanas que tocam [p_inicio, p_fim)
+    DELETE FROM indicador_epi_semanal
+    WHERE semana_inicio >= v_inicio AND semana_inicio < v_fim;
+
+    INSERT INTO indicador_epi_semanal (
+        municipio_cod_ibge, semana_inicio, ano_epi, semana_epi, doenca_tipo,
+        casos, casos_confirmados, casos_graves, casos_sinais_alarme, obitos
+    )
+    SELECT
+        src.municipio_cod_ibge,
+        src.semana_inicio,
+        -- A semana pertence ao ano da sua quarta-feira (>= 4 dias no ano)
+        EXTRACT(YEAR FROM src.semana_inicio + 3)::smallint AS ano_epi,
+        ((src.semana_inicio - inicio_ano_epi(EXTRACT(YEAR FROM src.semana_inicio + 3)::int)) / 7 + 1)::smallint AS semana_epi,
+        src.doenca_tipo,
+        SUM(src.casos),
+        SUM(src.casos_confirmados),
+        SUM(src.casos_graves),
+        SUM(src.casos_sinais_alarme),
+        SUM(src.obitos)
+    FROM (
+        -- Séries agregadas <SERIE>_<DOENCA>: cada série alimenta suas colunas
+        SELECT
+            municipio_cod_ibge,
+            inicio_semana_epi_data(competencia) AS semana_inicio,
+            substring(indicador FROM position('_' IN indicador) + 1) AS doenca_tipo,
+            CASE WHEN indicador LIKE 'CASOS\_%' THEN COALESCE(valor, 0)::bigint ELSE 0 END AS casos,
+            CASE WHEN indicador LIKE 'CASOS\_%' THEN COALESCE(valor, 0)::bigint ELSE 0 END AS casos_confirmados,
+            CASE WHEN indicador LIKE 'GRAVES\_%' THEN COALESCE(valor, 0)::bigint ELSE 0 END AS casos_graves,
+            0 AS casos_sinais_alarme,
+            CASE WHEN indicador LIKE 'OBITOS\_%' THEN COALESCE(valor, 0)::bigint ELSE 0 END AS obitos
+        FROM indicador_epi
+        WHERE (indicador LIKE 'CASOS\_%' OR indicador LIKE 'GRAVES\_%' OR indicador LIKE 'OBITOS\_%')
+          AND municipio_cod_ibge IS NOT NULL
+          AND competencia >= v_inicio AND competencia < v_fim
+
+        UNION ALL
+
+        -- Casos individuais (ETL EPI01): só confirmados/prováveis
+        SELECT
+            municipio_cod_ibge,
+            inicio_semana_epi_data(COALESCE(dt_sintomas, competencia)) AS semana_inicio,
+            'DENGUE' AS doenca_tipo,
+            1 AS casos,
+            1 AS casos_confirmados,
+            (classificacao_final = 'DENGUE_GRAVE')::int AS casos_graves,
+            (classificacao_final = 'DENGUE_SINAIS_ALARME')::int AS casos_sinais_alarme,
+            COALESCE(evolucao = 'OBITO', FALSE)::int AS obitos
+        FROM indicador_epi
+        WHERE indicador IS NULL
+          AND classificacao_final LIKE 'DENGUE%'
+          AND municipio_cod_ibge IS NOT NULL
+          AND (
+              (dt_sintomas >= v_inicio AND dt_sintomas < v_fim)
+              OR (dt_sintomas IS NULL AND competencia >= v_inicio AND competencia < v_fim)
+          )
+    ) src
+    GROUP BY src.municipio_cod_ibge, src.semana_inicio, src.doenca_tipo;
+
+    GET DIAGNOSTICS v_linhas = ROW_COUNT;
+    RETURN v_linhas;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION refresh_indicador_epi_semanal IS 'Recalcula indicador_epi_semanal para as semanas que tocam [inicio, fim)';
+
+-- Carga inicial
+DO $$
+DECLARE
+    v_min DATE;
+    v_max DATE;
+    v_linhas INTEGER := 0;
+BEGIN
+    SELECT
+        LEAST(MIN(competencia), MIN(dt_sintomas)),
+        GREATEST(MAX(competencia), MAX(dt_sintomas))
+    INTO v_min, v_max
+    FROM indicador_epi;
+
+    IF v_min IS NOT NULL THEN
+        v_linhas := refresh_indicador_epi_semanal(v_min, v_max + 1);
+    END IF;
+
+    RAISE NOTICE '✅ Migração V017 aplicada com sucesso!';
+    RAISE NOTICE '   - Tabela criada: indicador_epi_semanal (% linhas)', v_linhas;
+    RAISE NOTICE '   - Função criada: refresh_indicador_epi_semanal(inicio, fim)';
+END$$;
@@ -0,0 +1,44 @@
+-- =========================================================================
+-- V018: Pirâmide de simplificação das geometrias de município
+-- =========================================================================
+-- municipios_geometrias guarda só a geometria original e uma simplificada
+-- (tolerância fixa de 0.001°): pesada demais para o estado inteiro e grossa
+-- demais no zoom de cidade. Esta tabela guarda vários níveis, cada um com a
+-- faixa de zoom em que deve ser servido.
+--
+-- Os níveis são gerados por backend/scripts/import_geometrias_mt.py tratando a
+-- malha como cobertura (divisas simplificadas uma vez e compartilhadas pelos
+-- vizinhos, sem frestas). O nível 2 (0.001°) também é gravado em
+-- municipios_geometrias.geom_simplificada.
+--
+-- A epi-api escolhe o nível pela faixa [zoom_min, zoom_max] do zoom pedido.
+-- =========================================================================
+
+CREATE TABLE IF NOT EXISTS municipios_geometrias_niveis (
+    codigo_ibge VARCHAR(7) NOT NULL REFERENCES municipios_ibge(codigo_ibge),
+    nivel SMALLINT NOT NULL,
+    tolerancia NUMERIC(10,6) NOT NULL,  -- Graus (WGS84)
+    zoom_min SMALLINT NOT NULL,
+    zoom_max SMALLINT NOT NULL,
+    geom GEOMETRY(MULTIPOLYGON, 4326) NOT NULL,
+    n_vertices INTEGER,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (codigo_ibge, nivel),
+    CHECK (zoom_min <= zoom_max)
+);
+
+CREATE INDEX IF NOT EXISTS idx_municipios_geometrias_niveis_nivel
+    ON municipios_geometrias_niveis (nivel);
+CREATE INDEX IF NOT EXISTS idx_municipios_geometrias_niveis_geom
+    ON municipios_geometrias_niveis USING GIST(geom);
+
+COMMENT ON TABLE municipios_geometrias_niveis IS 'Geometrias simplificadas por nível de zoom (cobertura com divisas consistentes)';
+COMMENT ON COLUMN municipios_geometrias_niveis.tolerancia IS 'Tolerância Douglas-Peucker em graus (≈ 1 pixel no zoom_max)';
+
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Migração V018 aplicada com sucesso!';
+    RAISE NOTICE '   - Tabela criada: municipios_geometrias_niveis';
+    RAISE NOTICE '   - Popular com: python backend/scripts/import_geometrias_mt.py';
+END$$;
@@ -0,0 +1,143 @@
+-- =========================================================================
+-- V019: Índices entomológicos pré-calculados por município/ano/ciclo
+-- =========================================================================
+-- As camadas IPO/IDO/IVO/IMO do mapa e os endpoints /liraa precisam do
+-- levantamento de cada município por ciclo. Esta tabela guarda uma linha por
+-- (município, ano, ciclo) com os índices já calculados e as classes de risco,
+-- de modo que cada endpoint responda com uma única consulta indexada.
+--
+-- Índices (mesma nomenclatura do router /liraa):
+--   * IPO - Pendências: % de imóveis fechados/recusados
+--   * IDO - Depósitos: % de depósitos inspecionados com larvas (IDC)
+--   * IVO - Vetores: % de imóveis com larvas (IIP)
+--   * IMO - Mosquitos adultos: sem fonte no LIRAa larvário (NULL por ora)
+-- Classe de cada índice: < 1 satisfatório, < 4 alerta, >= 4 risco.
+--
+-- Origem das linhas:
+--   * ETL LIRAa da epi-api (LIRaaETLService): contagens somadas por
+--     município e índices calculados; classificacao vem do IVO (IIP) e
+--     fica NULL (indeterminada) quando o levantamento não informa IIP
+--   * liraa_classificacao (SES-MT, import_dados_mt.py): só a classificação,
+--     via refresh_indice_entomologico(ano); não sobrescreve linhas do ETL
+--
+-- Ciclo: 1-6 (bimestral). O ciclo "Jan/2025" da SES-MT vira ciclo 1.
+-- =========================================================================
+
+CREATE TABLE IF NOT EXISTS indice_entomologico (
+    municipio_cod_ibge VARCHAR(7) NOT NULL,
+    ano SMALLINT NOT NULL,
+    ciclo SMALLINT NOT NULL CHECK (ciclo BETWEEN 1 AND 6),
+    data_levantamento DATE NOT NULL,
+    semana_epi SMALLINT NOT NULL CHECK (semana_epi BETWEEN 1 AND 53),
+    ipo NUMERIC(6,2),
+    ido NUMERIC(6,2),
+    ivo NUMERIC(6,2),
+    imo NUMERIC(6,2),
+    ib NUMERIC(8,2),
+    imoveis_inspecionados INTEGER NOT NULL DEFAULT 0,
+    imoveis_positivos INTEGER NOT NULL DEFAULT 0,
+    classificacao VARCHAR(12) CHECK (classificacao IN ('SATISFATORIO', 'ALERTA', 'RISCO')),
+    classe_ipo VARCHAR(12) GENERATED ALWAYS AS (
+        CASE WHEN ipo IS NULL THEN NULL WHEN ipo < 1 THEN 'SATISFATORIO' WHEN ipo < 4 THEN 'ALERTA' ELSE 'RISCO' END
+    ) STORED,
+    classe_ido VARCHAR(12) GENERATED ALWAYS AS (
+        CASE WHEN ido IS NULL THEN NULL WHEN ido < 1 THEN 'SATISFATORIO' WHEN ido < 4 THEN 'ALERTA' ELSE 'RISCO' END
+    ) STORED,
+    classe_ivo VARCHAR(12) GENERATED ALWAYS AS (
+        CASE WHEN ivo IS NULL THEN NULL WHEN ivo < 1 THEN 'SATISFATORIO' WHEN ivo < 4 THEN 'ALERTA' ELSE 'RISCO' END
+    ) STORED,
+    classe_imo VARCHAR(12) GENERATED ALWAYS AS (
+        CASE WHEN imo IS NULL THEN NULL WHEN imo < 1 THEN 'SATISFATORIO' WHEN imo < 4 THEN 'ALERTA' ELSE 'RISCO' END
+    ) STORED,
+    fonte VARCHAR(200),
+    atualizado_em TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (municipio_cod_ibge, ano, ciclo)
+);
+
+-- Mapa/ranking/estatísticas de um ciclo
+CREATE INDEX IF NOT EXISTS idx_indice_entomologico_ano_ciclo
+    ON indice_entomologico (ano, ciclo);
+-- Comparativo por semana e camadas do mapa por período
+CREATE INDEX IF NOT EXISTS idx_indice_entomologico_ano_semana
+    ON indice_entomologico (ano, semana_epi, municipio_cod_ibge);
+CREATE INDEX IF NOT EXISTS idx_indice_entomologico_data
+    ON indice_entomologico (data_levantamento);
+
+COMMENT ON TABLE indice_entomologico IS 'Índices entomológicos (IPO/IDO/IVO/IMO) e classes de risco por município/ano/ciclo LIRAa';
+COMMENT ON COLUMN indice_entomologico.ciclo IS 'Ciclo LIRAa 1-6 (bimestral)';
+COMMENT ON COLUMN indice_entomologico.classificacao IS 'Classificação geral: classe do IVO (IIP) ou, sem contagens, a da SES-MT; NULL = indeterminada (sem IIP)';
+
+-- =========================================================================
+-- Carga a partir de liraa_classificacao (SES-MT)
+-- =========================================================================
+
+CREATE OR REPLACE FUNCTION refresh_indice_entomologico(p_ano INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    v_linhas INTEGER;
+BEGIN
+    INSERT INTO indice_entomologico (
+        municipio_cod_ibge, ano, ciclo, data_levantamento, semana_epi,
+        classificacao, fonte
+    )
+    SELECT
+        src.codigo_ibge,
+        src.ano,
+        ((src.mes + 1) / 2)::smallint AS ciclo,
+        make_date(src.ano, src.mes, 1) AS data_levantamento,
+        GREATEST(1, LEAST(53,
+            (make_date(src.ano, src.mes, 1) - inicio_ano_epi(src.ano)) / 7 + 1
+        ))::smallint AS semana_epi,
+        src.classificacao,
+        src.fonte
+    FROM (
+        SELECT DISTINCT ON (lc.codigo_ibge, (m.mes + 1) / 2)
+            lc.codigo_ibge,
+            lc.ano,
+            m.mes,
+            CASE lc.classificacao
+                WHEN 'Satisfatório' THEN 'SATISFATORIO'
+                WHEN 'Alerta' THEN 'ALERTA'
+                ELSE 'RISCO'
+            END AS classificacao,
+            lc.fonte
+        FROM liraa_classificacao lc
+        CROSS JOIN LATERAL (
+            -- "Jan/2025" → 1; ciclo sem mês reconhecível vira janeiro
+            SELECT COALESCE(array_position(
+                ARRAY['jan','fev','mar','abr','mai','jun','jul','ago','set','out','nov','dez'],
+                lower(left(trim(lc.ciclo), 3))
+            ), 1) AS mes
+        ) m
+        WHERE lc.ano = p_ano
+          AND lc.codigo_ibge IS NOT NULL
+        ORDER BY lc.codigo_ibge, (m.mes + 1) / 2, m.mes DESC
+    ) src
+    ON CONFLICT (municipio_cod_ibge, ano, ciclo) DO UPDATE SET
+        classificacao = EXCLUDED.classificacao,
+        fonte = EXCLUDED.fonte,
+        atualizado_em = NOW()
+    -- Linhas com contagens do ETL já têm classificação própria
+    WHERE indice_entomologico.ivo IS NULL;
+
+    GET DIAGNOSTICS v_linhas = ROW_COUNT;
+    RETURN v_linhas;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION refresh_indice_entomologico IS 'Carrega em indice_entomologico a classificação SES-MT (liraa_classificacao) do ano';
+
+-- Carga inicial
+DO $$
+DECLARE
+    v_ano INTEGER;
+    v_linhas INTEGER := 0;
+BEGIN
+    FOR v_ano IN SELECT DISTINCT ano FROM liraa_classificacao LOOP
+        v_linhas := v_linhas + refresh_indice_entomologico(v_ano);
+    END LOOP;
+
+    RAISE NOTICE '✅ Migração V019 aplicada com sucesso!';
+    RAISE NOTICE '   - Tabela criada: indice_entomologico (% linhas)', v_linhas;
+    RAISE NOTICE '   - Função criada: refresh_indice_entomologico(ano)';
+END$$;
@@ -0,0 +1,195 @@
+-- =========================================================================
+-- V020: Cubo epidemiológico para drill-down (estado → região → município → semana)
+-- =========================================================================
+-- O drill-down do dashboard navega estado → região de saúde → município →
+-- semana epidemiológica. Em vez de reagregar indicador_epi_semanal a cada
+-- clique, esta tabela guarda todos os nós já somados (GROUP BY com ROLLUP
+-- na geografia e CUBE em doença × semana), de modo que cada passo do
+-- drill-down seja uma busca indexada:
+--   * o nó e sua série semanal: PK (nivel, chave, ano_epi, doenca_tipo, semana_epi)
+--   * os filhos do nó numa fatia: idx_cubo_epi_filhos (nivel, pai, ano_epi, doenca_tipo, semana_epi)
+--
+-- Convenções:
+--   * nivel: 'estado' (chave 'MT'), 'regiao' (chave = nome da região de
+--     saúde), 'municipio' (chave = código IBGE)
+--   * pai: chave do nó do nível acima (NULL no estado)
+--   * semana_epi = 0: ano epidemiológico inteiro
+--   * doenca_tipo = 'TODAS': soma de todas as doenças
+--   * populacao: soma da população de TODOS os municípios do nó (com ou sem
+--     casos), denominador da incidência
+--
+-- Região de saúde: municipios_ibge.regiao_saude, preenchida por
+-- backend/scripts/import_dados_mt.py (lista SES-MT em
+-- dados-mt/SES-MT/regioes_saude.csv; sem ela, região geográfica imediata do
+-- IBGE); até lá, e para municípios fora da lista, 'Não informada'.
+--
+-- Atualização: refresh_cubo_epi(inicio, fim), chamada pela epi-api logo após
+-- refresh_indicador_epi_semanal, reconstrói só as semanas que tocam
+-- [inicio, fim) e, a partir das linhas semanais do próprio cubo, os totais
+-- anuais (semana_epi = 0) dos anos dessas semanas. Cada ano epi é protegido
+-- por pg_advisory_xact_lock: ETLs concorrentes do mesmo ano se serializam,
+-- anos distintos seguem em paralelo.
+-- =========================================================================
+
+ALTER TABLE municipios_ibge ADD COLUMN IF NOT EXISTS regiao_saude VARCHAR(60);
+
+COMMENT ON COLUMN municipios_ibge.regiao_saude IS 'Região de saúde (SES-MT) usada no drill-down do dashboard';
+
+CREATE TABLE IF NOT EXISTS cubo_epi (
+    nivel VARCHAR(10) NOT NULL CHECK (nivel IN ('estado', 'regiao', 'municipio')),
+    chave VARCHAR(60) NOT NULL,
+    pai VARCHAR(60),
+    nome VARCHAR(100) NOT NULL,
+    ano_epi SMALLINT NOT NULL,
+    semana_epi SMALLINT NOT NULL CHECK (semana_epi BETWEEN 0 AND 53),
+    doenca_tipo VARCHAR(20) NOT NULL,
+    casos_confirmados BIGINT NOT NULL DEFAULT 0,
+    obitos BIGINT NOT NULL DEFAULT 0,
+    casos_graves BIGINT NOT NULL DEFAULT 0,
+    populacao BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (nivel, chave, ano_epi, doenca_tipo, semana_epi)
+);
+
+CREATE INDEX IF NOT EXISTS idx_cubo_epi_filhos
+    ON cubo_epi (nivel, pai, ano_epi, doenca_tipo, semana_epi);
+
+COMMENT ON TABLE cubo_epi IS 'Cubo estado/região/município × doença × semana epi pré-agregado de indicador_epi_semanal (drill-down do dashboard)';
+COMMENT ON COLUMN cubo_epi.semana_epi IS '0 = ano epidemiológico inteiro';
+COMMENT ON COLUMN cubo_epi.doenca_tipo IS 'TODAS = soma das doenças';
+
+-- =========================================================================
+-- Refresh incremental por semana epidemiológica
+-- =========================================================================
+
+CREATE OR REPLACE FUNCTION refresh_cubo_epi(p_inicio DATE, p_fim DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    -- Semanas epi que tocam [p_inicio, p_fim) e seus anos (ano da quarta-feira)
+    v_inicio DATE := inicio_semana_epi_data(p_inicio);
+    v_fim DATE := inicio_semana_epi_data(p_fim - 1) + 7;
+    v_ano_inicio SMALLINT := EXTRACT(YEAR FROM v_inicio + 3);
+    v_ano_fim SMALLINT := EXTRACT(YEAR FROM v_fim - 7 + 3);
+    v_linhas INTEGER;
+    v_totais INTEGER;
+BEGIN
+    -- Um lock por ano, em ordem crescente (sem deadlock entre ETLs)
+    FOR v_ano IN v_ano_inicio..v_ano_fim LOOP
+        PERFORM pg_advisory_xact_lock(hashtext('refresh_cubo_epi'), v_ano);
+    END LOOP;
+
+    WITH semanas AS (
+        SELECT
+            EXTRACT(YEAR FROM g.d + 3)::smallint AS ano_epi,
+            ((g.d - inicio_ano_epi(EXTRACT(YEAR FROM g.d + 3)::int)) / 7 + 1)::smallint AS semana_epi
+        FROM (
+            SELECT t::date AS d FROM generate_series(v_inicio, v_fim - 7, INTERVAL '7 days') AS t
+        ) g
+    )
+    DELETE FROM cubo_epi c
+    USING semanas w
+    WHERE c.ano_epi = w.ano_epi AND c.semana_epi = w.semana_epi;
+
+    INSERT INTO cubo_epi (
+        nivel, chave, pai, nome, ano_epi, semana_epi, doenca_tipo,
+        casos_confirmados, obitos, casos_graves, populacao
+    )
+    WITH ref AS (
+        SELECT
+            codigo_ibge,
+            nome,
+            COALESCE(regiao_saude, 'Não informada') AS regiao,
+            populacao_estimada_2025 AS pop
+        FROM municipios_ibge
+    ),
+    populacao_nos AS (
+        SELECT
+            CASE
+                WHEN GROUPING(regiao) = 1 THEN 'estado'
+                WHEN GROUPING(codigo_ibge) = 1 THEN 'regiao'
+                ELSE 'municipio'
+            END AS nivel,
+            COALESCE(codigo_ibge, regiao, 'MT') AS chave,
+            SUM(pop) AS populacao
+        FROM ref
+        GROUP BY ROLLUP (regiao, codigo_ibge)
+    ),
+    cubo AS (
+        SELECT
+            CASE
+                WHEN GROUPING(r.regiao) = 1 THEN 'estado'
+                WHEN GROUPING(s.municipio_cod_ibge) = 1 THEN 'regiao'
+                ELSE 'municipio'
+            END AS nivel,
+            COALESCE(s.municipio_cod_ibge, r.regiao, 'MT') AS chave,
+            CASE
+                WHEN GROUPING(r.regiao) = 1 THEN NULL
+                WHEN GROUPING(s.municipio_cod_ibge) = 1 THEN 'MT'
+                ELSE r.regiao
+            END AS pai,
+            COALESCE(r.nome, r.regiao, 'Mato Grosso') AS nome,
+            s.ano_epi,
+            s.semana_epi,
+            COALESCE(s.doenca_tipo, 'TODAS') AS doenca_tipo,
+            SUM(s.casos_confirmados) AS casos_confirmados,
+            SUM(s.obitos) AS obitos,
+            SUM(s.casos_graves) AS casos_graves
+        FROM indicador_epi_semanal s
+        JOIN ref r ON r.codigo_ibge = s.municipio_cod_ibge
+        WHERE s.semana_inicio >= v_inicio AND s.semana_inicio < v_fim
+        GROUP BY
+            s.ano_epi,
+            s.semana_epi,
+            ROLLUP (r.regiao, (s.municipio_cod_ibge, r.nome)),
+            CUBE (s.doenca_tipo)
+    )
+    SELECT
+        c.nivel, c.chave, c.pai, c.nome, c.ano_epi, c.semana_epi, c.doenca_tipo,
+        c.casos_confirmados, c.obitos, c.casos_graves, p.populacao
+    FROM cubo c
+    JOIN populacao_nos p ON p.nivel = c.nivel AND p.chave = c.chave;
+
+    GET DIAGNOSTICS v_linhas = ROW_COUNT;
+
+    -- Totais anuais (semana_epi = 0) somando as linhas semanais do cubo: no
+    -- máximo ~160 nós × 53 semanas × doenças por ano, sem reler o agregado
+    DELETE FROM cubo_epi
+    WHERE semana_epi = 0 AND ano_epi BETWEEN v_ano_inicio AND v_ano_fim;
+
+    INSERT INTO cubo_epi (
+        nivel, chave, pai, nome, ano_epi, semana_epi, doenca_tipo,
+        casos_confirmados, obitos, casos_graves, populacao
+    )
+    SELECT
+        nivel, chave, MAX(pai), MAX(nome), ano_epi, 0, doenca_tipo,
+        SUM(casos_confirmados), SUM(obitos), SUM(casos_graves), MAX(populacao)
+    FROM cubo_epi
+    WHERE semana_epi > 0 AND ano_epi BETWEEN v_ano_inicio AND v_ano_fim
+    GROUP BY nivel, chave, ano_epi, doenca_tipo;
+
+    GET DIAGNOSTICS v_totais = ROW_COUNT;
+    RETURN v_linhas + v_totais;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION refresh_cubo_epi IS 'Reconstrói em cubo_epi as semanas epidemiológicas que tocam [inicio, fim) e os totais anuais dos seus anos (lock por ano)';
+
+-- Carga inicial
+DO $$
+DECLARE
+    v_min DATE;
+    v_max DATE;
+    v_linhas INTEGER := 0;
+BEGIN
+    SELECT MIN(semana_inicio), MAX(semana_inicio)
+    INTO v_min, v_max
+    FROM indicador_epi_semanal;
+
+    IF v_min IS NOT NULL THEN
+        v_linhas := refresh_cubo_epi(v_min, v_max + 7);
+    END IF;
+
+    RAISE NOTICE '✅ Migração V020 aplicada com sucesso!';
+    RAISE NOTICE '   - Coluna criada: municipios_ibge.regiao_saude';
+    RAISE NOTICE '   - Tabela criada: cubo_epi (% linhas)', v_linhas;
+    RAISE NOTICE '   - Função criada: refresh_cubo_epi(inicio, fim)';
+END$$;
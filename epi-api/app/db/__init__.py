@@ -0,0 +1,22 @@
+from .pool import (
+    DatabasePool,
+    PooledConnection,
+    PoolTimeoutError,
+    init_pool,
+    get_pool,
+    close_pool,
+    get_connection,
+)
+from .threads import iterate_in_db_thread, run_in_db_thread
+
+__all__ = [
+    'DatabasePool',
+    'PooledConnection',
+    'PoolTimeoutError',
+    'init_pool',
+    'get_pool',
+    'close_pool',
+    'get_connection',
+    'run_in_db_thread',
+    'iterate_in_db_thread',
+]
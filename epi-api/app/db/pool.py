@@ -0,0 +1,329 @@
+"""
+Pool de conexões PostgreSQL compartilhado pelo processo
+
+Todos os services da epi-api (Mapa, Dashboard, ETL, Denúncias) obtêm conexões
+daqui em vez de chamar ``psycopg2.connect()`` a cada método. O pool é criado
+no startup do FastAPI (``init_pool``) e, em processos sem FastAPI (workers
+Celery, scripts), de forma preguiçosa no primeiro ``get_connection()``.
+
+As conexões emprestadas são ``PooledConnection``: um proxy que delega tudo à
+conexão psycopg2 real, mas cujo ``close()`` devolve a conexão ao pool. Assim o
+padrão ``conn = ...; try: ... finally: conn.close()`` dos services continua
+válido sem alterações.
+
+Configuração (variáveis de ambiente):
+    DATABASE_URL                   DSN (postgresql+asyncpg:// é normalizado)
+    DB_POOL_MIN_SIZE               conexões mantidas abertas (default 1)
+    DB_POOL_MAX_SIZE               máximo de conexões simultâneas (default 10)
+    DB_POOL_TIMEOUT                segundos aguardando uma conexão livre (default 5)
+    DB_POOL_HEALTHCHECK_INTERVAL   idade ociosa (s) a partir da qual a conexão
+                                   é validada com SELECT 1 antes do uso (default 30)
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_DSN = "postgresql://techdengue:techdengue@db:5432/techdengue"
+
+
+# Prometheus metrics
+POOL_BORROW_LATENCY = Histogram(
+    'db_pool_borrow_seconds',
+    'Time spent waiting to borrow a connection from the pool',
+    buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0]
+)
+
+POOL_BORROW_TIMEOUTS = Counter(
+    'db_pool_borrow_timeouts_total',
+    'Connection borrows that timed out waiting for a free connection'
+)
+
+POOL_HEALTHCHECK_FAILURES = Counter(
+    'db_pool_healthcheck_failures_total',
+    'Pooled connections discarded after a failed health check'
+)
+
+POOL_CONNECTIONS_IN_USE = Gauge(
+    'db_pool_connections_in_use',
+    'Connections currently borrowed from the pool'
+)
+
+POOL_MAX_SIZE = Gauge(
+    'db_pool_max_size',
+    'Configured maximum number of pooled connections'
+)
+
+
+class PoolTimeoutError(PoolError):
+    """Nenhuma conexão livre dentro de ``DB_POOL_TIMEOUT`` segundos"""
+
+
+def _normalize_dsn(dsn: str) -> str:
+    """Converte URLs SQLAlchemy/asyncpg para o formato aceito pelo psycopg2"""
+    return dsn.replace("postgresql+asyncpg://", "postgresql://")
+
+
+def _env_dsn() -> str:
+    return _normalize_dsn(os.getenv("DATABASE_URL", DEFAULT_DSN))
+
+
+class PooledConnection:
+    """
+    Proxy para uma conexão emprestada do pool.
+
+    ``close()`` devolve a conexão ao pool (idempotente); os demais atributos
+    são delegados à conexão psycopg2 subjacente.
+    """
+
+    def __init__(self, pool: "DatabasePool", conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name: str) -> Any:
+        conn = self.__dict__.get('_conn')
+        if conn is None:
+            raise psycopg2.InterfaceError("connection already returned to pool")
+        return getattr(conn, name)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._conn.__exit__(exc_type, exc, tb)
+
+    @property
+    def closed(self) -> int:
+        conn = self.__dict__.get('_conn')
+        return 1 if conn is None else conn.closed
+
+    def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.putconn(conn)
+
+
+class DatabasePool:
+    """
+    ``ThreadedConnectionPool`` com espera limitada, health check e métricas.
+
+    O ``ThreadedConnectionPool`` do psycopg2 falha imediatamente quando
+    esgotado; aqui um semáforo faz o chamador aguardar até ``timeout``
+    segundos por uma conexão livre.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 5.0,
+        healthcheck_interval: float = 30.0
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Tamanho de pool inválido: min={min_size}, max={max_size}")
+
+        self.dsn = _normalize_dsn(dsn)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+
+        self._pool = ThreadedConnectionPool(min_size, max_size, self.dsn)
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._last_used: Dict[int, float] = {}
+        self._in_use = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+        POOL_MAX_SIZE.set(max_size)
+
+    def getconn(self) -> PooledConnection:
+        """
+        Empresta uma conexão saudável do pool.
+
+        Raises:
+            PoolTimeoutError: Se nenhuma conexão ficar livre a tempo
+            PoolError: Se o pool já foi fechado
+        """
+        if self._closed:
+            raise PoolError("connection pool is closed")
+
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            POOL_BORROW_TIMEOUTS.inc()
+            raise PoolTimeoutError(
+                f"Nenhuma conexão livre no pool após {self.timeout}s "
+                f"(max_size={self.max_size})"
+            )
+
+        try:
+            conn = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+
+        POOL_BORROW_LATENCY.observe(time.perf_counter() - start)
+        with self._lock:
+            self._in_use += 1
+            POOL_CONNECTIONS_IN_USE.set(self._in_use)
+        return PooledConnection(self, conn)
+
+    def _checkout(self):
+        """Retira uma conexão do pool, descartando as que falham no health check"""
+        # Uma tentativa por conexão possivelmente ociosa + uma conexão nova
+        for _ in range(self.max_size + 1):
+            conn = self._pool.getconn()
+            if self._is_healthy(conn):
+                return conn
+            POOL_HEALTHCHECK_FAILURES.inc()
+            logger.warning("Conexão do pool descartada após falha no health check")
+            self._discard(conn)
+        raise PoolError("não foi possível obter uma conexão saudável do pool")
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+
+        last_used = self._last_used.get(id(conn))
+        if last_used is not None and time.monotonic() - last_used < self.healthcheck_interval:
+            return True
+
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn) -> None:
+        self._last_used.pop(id(conn), None)
+        try:
+            self._pool.putconn(conn, close=True)
+        except Exception:  # pragma: no cover - conexão já inválida
+            pass
+
+    def putconn(self, conn) -> None:
+        """Devolve a conexão ao pool, desfazendo qualquer transação pendente"""
+        try:
+            if self._closed:
+                conn.close()
+                return
+
+            status = conn.info.transaction_status if not conn.closed else None
+            if status == psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                self._last_used[id(conn)] = time.monotonic()
+                self._pool.putconn(conn)
+            elif status in (
+                psycopg2.extensions.TRANSACTION_STATUS_INTRANS,
+                psycopg2.extensions.TRANSACTION_STATUS_INERROR,
+            ):
+                try:
+                    conn.rollback()
+                    self._last_used[id(conn)] = time.monotonic()
+                    self._pool.putconn(conn)
+                except psycopg2.Error:
+                    self._discard(conn)
+            else:
+                # Fechada, em uso por outra query ou estado desconhecido
+                self._discard(conn)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                POOL_CONNECTIONS_IN_USE.set(self._in_use)
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Resumo do pool para health checks"""
+        return {
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "in_use": self._in_use,
+            "closed": self._closed,
+        }
+
+    def close(self) -> None:
+        """Fecha todas as conexões do pool"""
+        if self._closed:
+            return
+        self._closed = True
+        self._pool.closeall()
+        self._last_used.clear()
+
+
+# =============================================================================
+# POOL DO PROCESSO
+# =============================================================================
+
+_pool: Optional[DatabasePool] = None
+_pool_lock = threading.Lock()
+
+
+def init_pool(dsn: Optional[str] = None) -> DatabasePool:
+    """
+    Cria o pool do processo (idempotente).
+
+    Args:
+        dsn: DSN do banco; default ``DATABASE_URL``
+
+    Returns:
+        Pool compartilhado
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._closed:
+            _pool = DatabasePool(
+                dsn or _env_dsn(),
+                min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+                max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+                healthcheck_interval=float(os.getenv("DB_POOL_HEALTHCHECK_INTERVAL", "30")),
+            )
+            logger.info(
+                "Pool de conexões criado (min=%s, max=%s)",
+                _pool.min_size, _pool.max_size
+            )
+        return _pool
+
+
+def get_pool() -> Optional[DatabasePool]:
+    """Retorna o pool do processo, se já criado"""
+    return _pool
+
+
+def close_pool() -> None:
+    """Fecha o pool do processo (shutdown do FastAPI)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_connection(dsn: Optional[str] = None) -> PooledConnection:
+    """
+    Empresta uma conexão do pool do processo.
+
+    ``conn.close()`` devolve a conexão ao pool.
+
+    Args:
+        dsn: DSN usado apenas se o pool ainda não existir (workers/scripts)
+
+    Returns:
+        Conexão emprestada
+    """
+    pool = _pool
+    if pool is None or pool._closed:
+        pool = init_pool(dsn)
+    return pool.getconn()
@@ -0,0 +1,91 @@
+"""
+Execução de código bloqueante (psycopg2, leitura de CSV) fora do event loop
+
+Os services da epi-api são síncronos (psycopg2). Chamá-los diretamente em um
+handler ``async def`` bloqueia o event loop do uvicorn: uma query lenta
+congela todas as requisições concorrentes. Os routers despacham essas chamadas
+com ``run_in_db_thread``, que usa um pool de threads limitado.
+
+O limite padrão é ``DB_POOL_MAX_SIZE``: mais threads do que conexões só
+deixaria threads paradas esperando o pool. Pode ser ajustado com
+``DB_THREAD_LIMIT``.
+
+Respostas em streaming (geradores síncronos que leem de um cursor) usam
+``iterate_in_db_thread``: cada ``next()`` roda em uma thread do mesmo pool.
+"""
+import asyncio
+import functools
+import os
+import threading
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, Tuple, TypeVar
+
+import anyio
+import anyio.to_thread
+
+T = TypeVar('T')
+
+
+def _thread_limit() -> int:
+    return int(os.getenv("DB_THREAD_LIMIT", os.getenv("DB_POOL_MAX_SIZE", "10")))
+
+
+# O CapacityLimiter do anyio pertence a um event loop; guardamos o loop
+# junto para recriá-lo quando o loop muda (TestClient, reload).
+_limiter: Optional[Tuple[asyncio.AbstractEventLoop, anyio.CapacityLimiter]] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> anyio.CapacityLimiter:
+    """Limiter das threads de banco do event loop corrente"""
+    global _limiter
+    loop = asyncio.get_running_loop()
+    with _limiter_lock:
+        if _limiter is None or _limiter[0] is not loop:
+            _limiter = (loop, anyio.CapacityLimiter(_thread_limit()))
+        return _limiter[1]
+
+
+async def run_in_db_thread(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Executa ``func(*args, **kwargs)`` em uma thread do pool limitado.
+
+    Exceções levantadas por ``func`` (inclusive ``HTTPException``) são
+    propagadas ao chamador.
+
+    Args:
+        func: Função síncrona (normalmente um método de service)
+
+    Returns:
+        Retorno de ``func``
+    """
+    call = functools.partial(func, *args, **kwargs)
+    return await anyio.to_thread.run_sync(call, limiter=get_limiter())
+
+
+_FIM = object()
+
+
+async def iterate_in_db_thread(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """
+    Consome um iterador síncrono fora do event loop.
+
+    Cada item é obtido com ``run_in_db_thread``. Se o consumidor parar antes
+    do fim (ex.: cliente desconectou), o gerador é fechado na mesma thread
+    pool para liberar cursor e conexão.
+
+    Args:
+        iterator: Iterador/gerador bloqueante
+
+    Yields:
+        Itens do iterador
+    """
+    try:
+        while True:
+            item = await run_in_db_thread(next, iterator, _FIM)
+            if item is _FIM:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await run_in_db_thread(close)
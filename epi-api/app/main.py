@@ -2,8 +2,9 @@ from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
+from app.db import init_pool, close_pool, get_pool
 from app.middleware import RequestIDMiddleware, LoggingMiddleware, MetricsMiddleware, JSONFormatter
-from app.routers import etl, mapa, denuncias, upload
+from app.routers import etl, mapa, liraa, dashboard, denuncias, upload
 import logging
 
 # Configure JSON logging
@@ -24,6 +25,8 @@ app = FastAPI(
 # Include routers
 app.include_router(etl.router, prefix="/api")
 app.include_router(mapa.router, prefix="/api")
+app.include_router(liraa.router, prefix="/api")
+app.include_router(dashboard.router, prefix="/api")
 app.include_router(denuncias.router)
 app.include_router(upload.router)
 
@@ -42,13 +45,31 @@ app.add_middleware(LoggingMiddleware)
 app.add_middleware(RequestIDMiddleware)
 
 
+@app.on_event("startup")
+def startup_db_pool():
+    """Cria o pool de conexões compartilhado pelos services"""
+    try:
+        init_pool()
+    except Exception as e:
+        # Banco indisponível no boot: o pool é criado no primeiro uso
+        logger.warning(f"Pool de conexões não inicializado no startup: {e}")
+
+
+@app.on_event("shutdown")
+def shutdown_db_pool():
+    """Fecha as conexões do pool"""
+    close_pool()
+
+
 @app.get("/api/health")
 async def health():
     """Health check endpoint"""
+    pool = get_pool()
     return {
         "status": "ok",
         "service": "epi-api",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "db_pool": pool.stats() if pool else None
     }
 
 
@@ -2,17 +2,23 @@
 Dashboard Router - Endpoints for KPIs, charts and analytics
 """
 import os
-from typing import Optional
-from fastapi import APIRouter, Query, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Header, Query, HTTPException, Response
 
 from app.schemas.dashboard import (
     DashboardKPIs,
     SeriesTemporaisResponse,
     TopNResponse,
+    DrillDownDados,
+    NivelDrillDown,
     PeriodoAgregacao,
     DoencaTipo
 )
+from app.db import run_in_db_thread
+from app.services.arrow_ipc import ARROW_MEDIA_TYPE, quer_arrow
 from app.services.dashboard_service import DashboardService
+from app.services.response_cache import etag_corresponde, get_response_cache, meses_periodo
+from app.services.semana_epi import intervalo_semanas_epi
 
 router = APIRouter(prefix="/indicadores", tags=["Dashboard"])
 
@@ -23,13 +29,43 @@ DB_CONN_STR = os.getenv(
 ).replace("postgresql+asyncpg://", "postgresql://")
 
 
+def _meses(
+    ano: int,
+    semana_epi_inicio: Optional[int] = None,
+    semana_epi_fim: Optional[int] = None
+) -> List[str]:
+    """Competências cobertas por ano/semanas epidemiológicas"""
+    return meses_periodo(*intervalo_semanas_epi(ano, semana_epi_inicio, semana_epi_fim))
+
+
+async def _etag(
+    endpoint: str,
+    filtro: dict,
+    meses: List[str],
+    response: Response,
+    if_none_match: Optional[str]
+) -> Optional[Response]:
+    """
+    GET condicional: define ETag/Cache-Control na resposta e devolve um 304
+    pronto quando If-None-Match bate, antes de qualquer query.
+    """
+    etag = await run_in_db_thread(get_response_cache().etag, endpoint, filtro, meses)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_corresponde(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
 @router.get("/kpis", response_model=DashboardKPIs)
 async def obter_kpis(
+    response: Response,
     ano: int = Query(..., ge=2000, le=2100, description="Ano de referência"),
     semana_epi_inicio: Optional[int] = Query(None, ge=1, le=53, description="Semana epidemiológica início"),
     semana_epi_fim: Optional[int] = Query(None, ge=1, le=53, description="Semana epidemiológica fim"),
     doenca_tipo: Optional[DoencaTipo] = Query(None, description="Tipo de doença"),
-    comparar_periodo_anterior: bool = Query(True, description="Calcular variações vs período anterior")
+    comparar_periodo_anterior: bool = Query(True, description="Calcular variações vs período anterior"),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Retorna KPIs principais do dashboard epidemiológico
@@ -95,10 +131,30 @@ async def obter_kpis(
     - Aplicar cores nos cards
     - Mostrar setas de tendência (↑ ↓ →)
     """
+    meses = _meses(ano, semana_epi_inicio, semana_epi_fim)
+    if comparar_periodo_anterior:
+        meses += _meses(ano - 1, semana_epi_inicio, semana_epi_fim)
+    nao_modificado = await _etag(
+        "indicadores_kpis",
+        {
+            "ano": ano,
+            "semana_epi_inicio": semana_epi_inicio,
+            "semana_epi_fim": semana_epi_fim,
+            "doenca_tipo": doenca_tipo,
+            "comparar_periodo_anterior": comparar_periodo_anterior,
+        },
+        meses,
+        response,
+        if_none_match
+    )
+    if nao_modificado:
+        return nao_modificado
+    
     service = DashboardService(DB_CONN_STR)
     
     try:
-        return service.get_kpis(
+        return await run_in_db_thread(
+            service.get_kpis,
             ano=ano,
             semana_epi_inicio=semana_epi_inicio,
             semana_epi_fim=semana_epi_fim,
@@ -114,6 +170,7 @@ async def obter_kpis(
 
 @router.get("/series-temporais", response_model=SeriesTemporaisResponse)
 async def obter_series_temporais(
+    response: Response,
     ano: int = Query(..., ge=2000, le=2100, description="Ano de referência"),
     periodo_agregacao: PeriodoAgregacao = Query(
         PeriodoAgregacao.SEMANAL,
@@ -125,7 +182,8 @@ async def obter_series_temporais(
         min_length=7,
         max_length=7,
         description="Filtro por município (código IBGE)"
-    )
+    ),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Retorna séries temporais de indicadores epidemiológicos
@@ -198,10 +256,26 @@ async def obter_series_temporais(
     - Tooltip com detalhes ao passar mouse
     - Zoom/pan para explorar períodos
     """
+    nao_modificado = await _etag(
+        "indicadores_series",
+        {
+            "ano": ano,
+            "periodo_agregacao": periodo_agregacao,
+            "doenca_tipo": doenca_tipo,
+            "codigo_ibge": codigo_ibge,
+        },
+        _meses(ano),
+        response,
+        if_none_match
+    )
+    if nao_modificado:
+        return nao_modificado
+    
     service = DashboardService(DB_CONN_STR)
     
     try:
-        return service.get_series_temporais(
+        return await run_in_db_thread(
+            service.get_series_temporais,
             ano=ano,
             periodo_agregacao=periodo_agregacao,
             doenca_tipo=doenca_tipo.value if doenca_tipo else None,
@@ -216,6 +290,7 @@ async def obter_series_temporais(
 
 @router.get("/top", response_model=TopNResponse)
 async def obter_top_n(
+    response: Response,
     ano: int = Query(..., ge=2000, le=2100, description="Ano de referência"),
     limite: int = Query(10, ge=1, le=50, description="Top N (1 a 50)"),
     tipo_indicador: str = Query(
@@ -225,7 +300,12 @@ async def obter_top_n(
     ),
     semana_epi_inicio: Optional[int] = Query(None, ge=1, le=53),
     semana_epi_fim: Optional[int] = Query(None, ge=1, le=53),
-    doenca_tipo: Optional[DoencaTipo] = Query(None, description="Filtro por doença")
+    doenca_tipo: Optional[DoencaTipo] = Query(None, description="Filtro por doença"),
+    formato: Optional[str] = Query(
+        None, pattern=r"^(json|arrow)$", description="json (default) ou arrow (Arrow IPC stream)"
+    ),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Retorna Top N municípios por indicador (ranking)
@@ -247,6 +327,9 @@ async def obter_top_n(
     - `tipo_indicador`: casos | incidencia | obitos (default: casos)
     - `semana_epi_inicio` / `semana_epi_fim`: Intervalo de semanas (opcional)
     - `doenca_tipo`: DENGUE, ZIKA, CHIKUNGUNYA, FEBRE_AMARELA (opcional)
+    - `formato=arrow` ou `Accept: application/vnd.apache.arrow.stream`: ranking
+      como tabela Arrow IPC (posicao, codigo_ibge, nome, valor, casos,
+      populacao, percentual, nivel_risco)
     
     **Exemplos:**
     ```bash
@@ -302,10 +385,46 @@ async def obter_top_n(
     - Click para drill-down no município
     - Export para CSV/Excel
     """
+    arrow = quer_arrow(accept, formato)
+    response.headers["Vary"] = "Accept"
+    nao_modificado = await _etag(
+        "indicadores_top_arrow" if arrow else "indicadores_top",
+        {
+            "ano": ano,
+            "limite": limite,
+            "tipo_indicador": tipo_indicador,
+            "semana_epi_inicio": semana_epi_inicio,
+            "semana_epi_fim": semana_epi_fim,
+            "doenca_tipo": doenca_tipo,
+        },
+        _meses(ano, semana_epi_inicio, semana_epi_fim),
+        response,
+        if_none_match
+    )
+    if nao_modificado:
+        return nao_modificado
+    
     service = DashboardService(DB_CONN_STR)
     
     try:
-        return service.get_top_n(
+        if arrow:
+            payload = await run_in_db_thread(
+                service.get_top_n_arrow,
+                ano=ano,
+                limite=limite,
+                tipo_indicador=tipo_indicador,
+                semana_epi_inicio=semana_epi_inicio,
+                semana_epi_fim=semana_epi_fim,
+                doenca_tipo=doenca_tipo.value if doenca_tipo else None
+            )
+            # Resposta própria: repassa ETag/Cache-Control/Vary já definidos
+            return Response(
+                content=payload,
+                media_type=ARROW_MEDIA_TYPE,
+                headers={k: response.headers[k] for k in ("etag", "cache-control", "vary")}
+            )
+        return await run_in_db_thread(
+            service.get_top_n,
             ano=ano,
             limite=limite,
             tipo_indicador=tipo_indicador,
@@ -318,3 +437,83 @@ async def obter_top_n(
             status_code=500,
             detail=f"Erro ao gerar ranking: {str(e)}"
         )
+
+
+@router.get("/drill-down", response_model=DrillDownDados)
+async def obter_drill_down(
+    response: Response,
+    ano: int = Query(..., ge=2000, le=2100, description="Ano epidemiológico"),
+    nivel: NivelDrillDown = Query(NivelDrillDown.ESTADO, description="Nível: estado, regiao, municipio"),
+    codigo: Optional[str] = Query(
+        None,
+        max_length=60,
+        description="Nó consultado: nome da região ou código IBGE (ignorado no estado)"
+    ),
+    doenca_tipo: Optional[DoencaTipo] = Query(None, description="Filtro por doença"),
+    semana_epi: Optional[int] = Query(None, ge=1, le=53, description="Fatia semanal (default: ano inteiro)"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Drill-down estado → região de saúde → município → semana epidemiológica
+    
+    Cada passo é uma busca indexada no cubo pré-agregado (`cubo_epi`):
+    totais e série semanal do nó, mais os filhos do próximo nível na fatia
+    pedida, com incidência e classe de risco.
+    
+    **Parâmetros:**
+    - `nivel`: estado (default) | regiao | municipio
+    - `codigo`: nome da região (nivel=regiao) ou código IBGE (nivel=municipio)
+    - `doenca_tipo`: DENGUE, ZIKA, CHIKUNGUNYA, FEBRE_AMARELA (opcional)
+    - `semana_epi`: totais e filhos de uma semana só (opcional)
+    
+    **Exemplos:**
+    ```bash
+    # Estado: regiões de saúde ordenadas por casos
+    curl "http://localhost:8000/api/indicadores/drill-down?ano=2024"
+    
+    # Municípios de uma região na semana 10
+    curl "http://localhost:8000/api/indicadores/drill-down?ano=2024&nivel=regiao&codigo=Baixada%20Cuiabana&semana_epi=10"
+    
+    # Município: totais e série semanal de dengue
+    curl "http://localhost:8000/api/indicadores/drill-down?ano=2024&nivel=municipio&codigo=5103403&doenca_tipo=DENGUE"
+    ```
+    """
+    if nivel != NivelDrillDown.ESTADO and not codigo:
+        raise HTTPException(status_code=400, detail=f"Informe o código do nó para nivel={nivel.value}")
+    if nivel == NivelDrillDown.MUNICIPIO and not (codigo.isdigit() and len(codigo) == 7):
+        raise HTTPException(status_code=400, detail=f"Código IBGE inválido: {codigo}")
+    
+    nao_modificado = await _etag(
+        "indicadores_drill_down",
+        {
+            "ano": ano,
+            "nivel": nivel,
+            "codigo": codigo if nivel != NivelDrillDown.ESTADO else None,
+            "doenca_tipo": doenca_tipo,
+            "semana_epi": semana_epi,
+        },
+        _meses(ano),
+        response,
+        if_none_match
+    )
+    if nao_modificado:
+        return nao_modificado
+    
+    service = DashboardService(DB_CONN_STR)
+    
+    try:
+        return await run_in_db_thread(
+            service.get_drill_down,
+            ano=ano,
+            nivel=nivel,
+            codigo=codigo,
+            doenca_tipo=doenca_tipo.value if doenca_tipo else None,
+            semana_epi=semana_epi
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro no drill-down: {str(e)}"
+        )
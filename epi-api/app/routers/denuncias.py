@@ -8,9 +8,9 @@ from datetime import datetime
 from collections import defaultdict, deque
 import logging
 import os
-import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from app.db import get_connection, run_in_db_thread
 from app.models.denuncia import (
     DenunciaCreate,
     DenunciaResponse,
@@ -40,8 +40,8 @@ router = APIRouter(
 # =============================================================================
 
 def get_db_connection():
-    """Cria nova conexão com banco de dados"""
-    return psycopg2.connect(DB_CONN_STR)
+    """Empresta conexão do pool compartilhado (conn.close() devolve ao pool)"""
+    return get_connection(DB_CONN_STR)
 
 
 # Rate limiting simples: 5 requisições/minuto por IP (configurável via env)
@@ -83,7 +83,7 @@ def lookup_municipio_nome(municipio_codigo: str) -> Optional[str]:
                 pass
 
 
-async def criar_atividade_from_denuncia(denuncia_id: str):
+def criar_atividade_from_denuncia(denuncia_id: str):
     """
     Cria uma Atividade de campo a partir de uma denúncia
     Background task executada após criação da denúncia com prioridade ALTA
@@ -193,6 +193,14 @@ async def criar_denuncia(
     
     **Autenticação**: NÃO REQUERIDA (acesso público)
     """
+    return await run_in_db_thread(_criar_denuncia, denuncia, background_tasks, request)
+
+
+def _criar_denuncia(
+    denuncia: DenunciaCreate,
+    background_tasks: BackgroundTasks,
+    request: Request
+) -> DenunciaResponse:
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
@@ -316,6 +324,10 @@ async def consultar_denuncia(
     
     **Autenticação**: NÃO REQUERIDA (cidadão pode consultar com protocolo)
     """
+    return await run_in_db_thread(_consultar_denuncia, protocolo)
+
+
+def _consultar_denuncia(protocolo: str) -> DenunciaResponse:
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
@@ -395,6 +407,18 @@ async def listar_denuncias(
     
     **Autenticação**: REQUERIDA (apenas admin/gestor)
     """
+    return await run_in_db_thread(
+        _listar_denuncias, page, per_page, municipio_codigo, status, prioridade
+    )
+
+
+def _listar_denuncias(
+    page: int,
+    per_page: int,
+    municipio_codigo: Optional[str],
+    status: Optional[DenunciaStatus],
+    prioridade: Optional[DenunciaPrioridade]
+) -> DenunciaListResponse:
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
@@ -498,6 +522,10 @@ async def estatisticas_denuncias(
     
     **Autenticação**: REQUERIDA
     """
+    return await run_in_db_thread(_estatisticas_denuncias, municipio_codigo)
+
+
+def _estatisticas_denuncias(municipio_codigo: Optional[str]) -> DenunciaStatsResponse:
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
@@ -18,6 +18,7 @@ from app.schemas.etl import (
     ETLSource,
     ETLStatus
 )
+from app.db import run_in_db_thread
 from app.services.sinan_etl_service import SINANETLService
 from app.services.liraa_etl_service import LIRaaETLService
 
@@ -87,7 +88,7 @@ async def import_sinan(
         service = SINANETLService(DB_CONFIG)
         
         # Validar CSV antes de processar
-        validation = service.validate_sinan_csv(request.file_path)
+        validation = await run_in_db_thread(service.validate_sinan_csv, request.file_path)
         
         if not validation.is_valid:
             raise HTTPException(
@@ -99,7 +100,8 @@ async def import_sinan(
             )
         
         # Criar job ETL
-        job_id = service.create_job(
+        job_id = await run_in_db_thread(
+            service.create_job,
             source=ETLSource.SINAN,
             file_path=request.file_path,
             metadata={
@@ -195,7 +197,7 @@ async def import_liraa(
         service = LIRaaETLService(DB_CONFIG)
         
         # Validar CSV
-        validation = service.validate_liraa_csv(request.file_path)
+        validation = await run_in_db_thread(service.validate_liraa_csv, request.file_path)
         
         if not validation.is_valid:
             raise HTTPException(
@@ -207,7 +209,8 @@ async def import_liraa(
             )
         
         # Criar job ETL
-        job_id = service.create_job(
+        job_id = await run_in_db_thread(
+            service.create_job,
             source=ETLSource.LIRAA,
             file_path=request.file_path,
             metadata={
@@ -286,7 +289,7 @@ async def get_job_status(job_id: str):
     # Tentar ambos services (SINAN e LIRAa)
     for ServiceClass in [SINANETLService, LIRaaETLService]:
         service = ServiceClass(DB_CONFIG)
-        job = service.get_job_status(job_id)
+        job = await run_in_db_thread(service.get_job_status, job_id)
         if job:
             return job
     
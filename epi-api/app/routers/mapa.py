@@ -2,8 +2,9 @@
 Mapa Router - Endpoints for map visualization layers
 """
 import os
-from typing import Optional, List
-from fastapi import APIRouter, Query, HTTPException
+from typing import Callable, Optional, List
+from fastapi import APIRouter, Header, Query, HTTPException
+from fastapi.responses import Response, StreamingResponse
 
 from app.schemas.mapa import (
     TipoCamada,
@@ -11,12 +12,27 @@ from app.schemas.mapa import (
     HeatmapData,
     EstatisticasMapa,
     FiltroMapa,
-    SerieTemporalMunicipio
+    SerieTemporalMunicipio,
+    SeriesTemporaisMunicipios
 )
+from app.db import iterate_in_db_thread, run_in_db_thread
+from app.services.arrow_ipc import ARROW_MEDIA_TYPE, quer_arrow
 from app.services.mapa_service import MapaService
+from app.services.municipio_index import get_municipio_index
+from app.services.response_cache import (
+    etag_corresponde,
+    get_response_cache,
+    meses_competencia,
+    meses_periodo
+)
+from app.services.semana_epi import intervalo_semanas_epi
+from app.services.vector_tiles import MVT_MEDIA_TYPE, get_tile_cache, tile_valido
 
 router = APIRouter(prefix="/mapa", tags=["Mapa"])
 
+# Máximo de municípios por requisição em /series-temporais (MT tem 142)
+MAX_SERIES_MUNICIPIOS = 200
+
 # Database connection
 DB_CONN_STR = os.getenv(
     "DATABASE_URL",
@@ -24,6 +40,44 @@ DB_CONN_STR = os.getenv(
 ).replace("postgresql+asyncpg://", "postgresql://")
 
 
+def _meses_filtro(filtro: FiltroMapa) -> List[str]:
+    """Competências cobertas por um filtro de ano/semanas epidemiológicas"""
+    inicio, fim = intervalo_semanas_epi(
+        filtro.ano, filtro.semana_epi_inicio, filtro.semana_epi_fim
+    )
+    return meses_periodo(inicio, fim)
+
+
+def _cache_headers(etag: str) -> dict:
+    # no-cache: o cliente pode guardar, mas revalida com If-None-Match;
+    # Vary: a mesma URL pode ser JSON ou Arrow conforme o Accept
+    return {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+
+
+async def _resposta_cacheada(
+    endpoint: str,
+    filtro: dict,
+    meses: List[str],
+    gerar: Callable[[], bytes],
+    if_none_match: Optional[str],
+    media_type: str = "application/json"
+) -> Response:
+    """
+    GET condicional + cache de respostas.
+
+    Se o If-None-Match bate com o ETag atual responde 304 sem consultar o
+    banco; senão devolve o JSON do cache (ou gerado por ``gerar``) sem passar
+    pelo response_model.
+    """
+    cache = get_response_cache()
+    etag = await run_in_db_thread(cache.etag, endpoint, filtro, meses)
+    if etag_corresponde(if_none_match, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+
+    payload = await run_in_db_thread(cache.get_or_compute, endpoint, filtro, meses, gerar)
+    return Response(content=payload, media_type=media_type, headers=_cache_headers(etag))
+
+
 @router.get("/camadas", response_model=MapaCamadasResponse)
 async def obter_camadas_mapa(
     tipo_camada: TipoCamada = Query(..., description="Tipo de camada: incidencia, ipo, ido, ivo, imo"),
@@ -31,17 +85,37 @@ async def obter_camadas_mapa(
     competencia_fim: str = Query(..., pattern=r"^\d{6}$", description="Período fim YYYYMM"),
     municipios: Optional[str] = Query(None, description="Códigos IBGE separados por vírgula (ex: 5103403,5105606)"),
     cluster: bool = Query(False, description="Aplicar clustering para reduzir features"),
-    max_features: int = Query(10000, ge=1, le=50000, description="Máximo de features retornadas")
+    max_features: int = Query(10000, ge=1, le=50000, description="Máximo de features retornadas"),
+    zoom: Optional[int] = Query(None, ge=0, le=22, description="Zoom do mapa (clustering)"),
+    bbox: Optional[str] = Query(
+        None,
+        description="Viewport minLng,minLat,maxLng,maxLat (clustering)"
+    ),
+    stream: bool = Query(
+        False,
+        description="Incidência sem clustering: envia o GeoJSON em streaming (sem cache)"
+    ),
+    formato: Optional[str] = Query(
+        None,
+        pattern=r"^(json|arrow)$",
+        description="Incidência sem clustering: json (default) ou arrow (Arrow IPC stream)"
+    ),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Retorna camadas do mapa em formato GeoJSON para visualização.
     
     **Tipos de Camada:**
     - `incidencia`: Incidência de dengue por 100k habitantes
-    - `ipo`: Índice de Positividade de Ovos (LIRAa)
-    - `ido`: Índice de Densidade de Ovos (LIRAa)
-    - `ivo`: Índice de Vigilância de Ovos
-    - `imo`: Índice de Mosquitos por Ovitrampa
+    - `ipo`, `ido`, `ivo`, `imo`: Índices entomológicos LIRAa (ver `/liraa`)
+    
+    **Camadas entomológicas:**
+    - Um ponto por município com o levantamento LIRAa mais recente do período,
+      lido da tabela pré-calculada `indice_entomologico`
+    - `classe_risco`: satisfatorio (<1), alerta (1-3.9), risco (>=4); sem
+      valor do índice no ciclo, vale a classificação geral (SES-MT)
+    - `cluster`, `zoom` e `bbox` se aplicam só à incidência
     
     **Período:**
     - Define o intervalo de competências para agregação dos dados
@@ -51,6 +125,16 @@ async def obter_camadas_mapa(
     - `municipios`: Lista de códigos IBGE para filtrar municípios específicos
     - `cluster`: Reduz o número de features através de clustering espacial
     - `max_features`: Limite de features retornadas (performance)
+    - `zoom` / `bbox`: Com `cluster=true`, retorna os clusters do zoom dentro do
+      viewport (sem `zoom`, usa o maior zoom que cabe em `max_features`)
+    
+    **Clustering:**
+    - Índice hierárquico (estilo supercluster) construído uma vez por período e
+      versão dos dados; cada consulta zoom/bbox leva menos de 1 ms
+    - Municípios isolados vêm como features de município; grupos vêm como
+      `ClusterFeature` (`cluster_id`, `point_count`, `casos_total`,
+      `obitos_total`, `incidencia_media`, `nivel_risco_predominante`,
+      `expansion_zoom`)
     
     **Classificação de Risco (Incidência):**
     - **Baixo** (<100 casos/100k): Verde
@@ -85,7 +169,19 @@ async def obter_camadas_mapa(
     **Performance:**
     - Objetivo: p95 ≤ 4s para ≤10k features
     - Recomendado: Usar `cluster=true` para grandes volumes
-    - Cache: Considere cache em produção para períodos fixos
+    - Cache: respostas ficam em cache por filtro (períodos fechados por mais
+      tempo) e são invalidadas quando um ETL conclui para as competências
+    - ETag: reenvie o ETag em `If-None-Match` para receber `304 Not Modified`
+      enquanto os dados das competências não mudarem
+    - `stream=true` (incidência sem `cluster`): as features são lidas de um
+      cursor no servidor e escritas incrementalmente, sem montar o documento
+      em memória; memória constante e primeiro byte imediato mesmo com 50k
+      features. Os totais vêm depois de `data` e a resposta não entra no cache
+      (o ETag continua valendo)
+    - `formato=arrow` ou `Accept: application/vnd.apache.arrow.stream`
+      (incidência sem `cluster`): tabela Arrow IPC com uma linha por município
+      (código, nome, longitude, latitude, população, casos, óbitos,
+      incidência, letalidade, classe de risco), sem GeoJSON
     """
     
     # Parse municipalities filter
@@ -100,6 +196,23 @@ async def obter_camadas_mapa(
                     detail=f"Código IBGE inválido: {cod}. Deve ter 7 dígitos numéricos."
                 )
     
+    # Parse viewport
+    bbox_list = None
+    if bbox:
+        try:
+            bbox_list = [float(v) for v in bbox.split(',')]
+        except ValueError:
+            bbox_list = []
+        if (
+            len(bbox_list) != 4
+            or not (-180 <= bbox_list[0] < bbox_list[2] <= 180)
+            or not (-90 <= bbox_list[1] < bbox_list[3] <= 90)
+        ):
+            raise HTTPException(
+                status_code=400,
+                detail="bbox inválido. Use minLng,minLat,maxLng,maxLat"
+            )
+    
     # Validate period
     if competencia_inicio > competencia_fim:
         raise HTTPException(
@@ -107,22 +220,108 @@ async def obter_camadas_mapa(
             detail="competencia_inicio deve ser menor ou igual a competencia_fim"
         )
     
+    arrow = tipo_camada == TipoCamada.INCIDENCIA and not cluster and quer_arrow(accept, formato)
+
     service = MapaService(DB_CONN_STR)
     
     try:
-        if tipo_camada == TipoCamada.INCIDENCIA:
-            return service.get_camada_incidencia(
-                competencia_inicio=competencia_inicio,
-                competencia_fim=competencia_fim,
-                municipios=municipios_list,
-                cluster=cluster,
-                max_features=max_features
+        if arrow:
+            def gerar() -> bytes:
+                return service.get_camada_incidencia_arrow(
+                    competencia_inicio=competencia_inicio,
+                    competencia_fim=competencia_fim,
+                    municipios=municipios_list,
+                    max_features=max_features
+                )
+
+            return await _resposta_cacheada(
+                "mapa_camadas_arrow",
+                {
+                    "competencia_inicio": competencia_inicio,
+                    "competencia_fim": competencia_fim,
+                    "municipios": municipios_list,
+                    "max_features": max_features,
+                },
+                meses_competencia(competencia_inicio, competencia_fim),
+                gerar,
+                if_none_match,
+                media_type=ARROW_MEDIA_TYPE
+            )
+        elif tipo_camada == TipoCamada.INCIDENCIA and stream and not cluster:
+            etag = await run_in_db_thread(
+                get_response_cache().etag,
+                "mapa_camadas_stream",
+                {
+                    "competencia_inicio": competencia_inicio,
+                    "competencia_fim": competencia_fim,
+                    "municipios": municipios_list,
+                    "max_features": max_features,
+                },
+                meses_competencia(competencia_inicio, competencia_fim)
+            )
+            if etag_corresponde(if_none_match, etag):
+                return Response(status_code=304, headers=_cache_headers(etag))
+            
+            return StreamingResponse(
+                iterate_in_db_thread(service.stream_camada_incidencia(
+                    competencia_inicio=competencia_inicio,
+                    competencia_fim=competencia_fim,
+                    municipios=municipios_list,
+                    max_features=max_features
+                )),
+                media_type="application/json",
+                headers=_cache_headers(etag)
+            )
+        elif tipo_camada == TipoCamada.INCIDENCIA:
+            def gerar() -> bytes:
+                return service.get_camada_incidencia(
+                    competencia_inicio=competencia_inicio,
+                    competencia_fim=competencia_fim,
+                    municipios=municipios_list,
+                    cluster=cluster,
+                    max_features=max_features,
+                    zoom=zoom,
+                    bbox=bbox_list
+                ).model_dump_json().encode("utf-8")
+
+            return await _resposta_cacheada(
+                "mapa_camadas",
+                {
+                    "tipo_camada": tipo_camada,
+                    "competencia_inicio": competencia_inicio,
+                    "competencia_fim": competencia_fim,
+                    "municipios": municipios_list,
+                    "cluster": cluster,
+                    "max_features": max_features,
+                    "zoom": zoom if cluster else None,
+                    "bbox": bbox_list if cluster else None,
+                },
+                meses_competencia(competencia_inicio, competencia_fim),
+                gerar,
+                if_none_match
             )
         else:
-            # TODO: Implement other layer types (IPO, IDO, IVO, IMO)
-            raise HTTPException(
-                status_code=501,
-                detail=f"Tipo de camada '{tipo_camada}' ainda não implementado. Disponível: incidencia"
+            def gerar() -> bytes:
+                return service.get_camada_entomologica(
+                    tipo_camada=tipo_camada,
+                    competencia_inicio=competencia_inicio,
+                    competencia_fim=competencia_fim,
+                    municipios=municipios_list,
+                    max_features=max_features
+                ).model_dump_json().encode("utf-8")
+
+            return await _resposta_cacheada(
+                "mapa_camadas",
+                {
+                    "tipo_camada": tipo_camada,
+                    "competencia_inicio": competencia_inicio,
+                    "competencia_fim": competencia_fim,
+                    "municipios": municipios_list,
+                    "max_features": max_features,
+                },
+                meses_competencia(competencia_inicio, competencia_fim),
+                gerar,
+                if_none_match
             )
     except Exception as e:
         raise HTTPException(
@@ -131,6 +330,89 @@ async def obter_camadas_mapa(
         )
 
 
+@router.get(
+    "/tiles/{z}/{x}/{y}.mvt",
+    response_class=Response,
+    responses={200: {"content": {MVT_MEDIA_TYPE: {}}}, 204: {"description": "Tile vazio"}}
+)
+async def obter_tile_incidencia(
+    z: int,
+    x: int,
+    y: int,
+    competencia_inicio: str = Query(..., pattern=r"^\d{6}$", description="Período início YYYYMM"),
+    competencia_fim: str = Query(..., pattern=r"^\d{6}$", description="Período fim YYYYMM"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Retorna um vector tile (Mapbox Vector Tile) do choropleth de incidência.
+    
+    Cada tile traz, na camada `incidencia`, os polígonos dos municípios que o
+    interceptam — no nível da pirâmide de simplificação da faixa de zoom do
+    tile (`municipios_geometrias_niveis`) — com as propriedades `codigo_ibge`, `nome`,
+    `populacao`, `casos`, `obitos`, `incidencia`, `nivel_risco` e `cor_hex`.
+    Municípios sem casos no período vêm com incidência zero.
+    
+    **Uso (MapLibre / Mapbox GL):**
+    ```js
+    map.addSource("incidencia", {
+      type: "vector",
+      tiles: ["http://localhost:8000/api/mapa/tiles/{z}/{x}/{y}.mvt?competencia_inicio=202401&competencia_fim=202403"]
+    });
+    ```
+    
+    **Respostas:**
+    - `200`: tile (`application/vnd.mapbox-vector-tile`)
+    - `204`: nenhum município no tile
+    - `304`: ETag em `If-None-Match` ainda válido
+    
+    **Cache:** tiles ficam em memória por filtro, z/x/y e versão dos dados
+    (e das geometrias); um ETL concluído nas competências gera tiles novos.
+    """
+    if not tile_valido(z, x, y):
+        raise HTTPException(status_code=400, detail=f"Tile inválido: {z}/{x}/{y}")
+    if competencia_inicio > competencia_fim:
+        raise HTTPException(
+            status_code=400,
+            detail="competencia_inicio deve ser menor ou igual a competencia_fim"
+        )
+    
+    service = MapaService(DB_CONN_STR)
+    cache = get_response_cache()
+    meses = meses_competencia(competencia_inicio, competencia_fim)
+    
+    try:
+        def calcular_etag() -> str:
+            return cache.etag(
+                "mapa_tiles",
+                {
+                    "z": z, "x": x, "y": y,
+                    "competencia_inicio": competencia_inicio,
+                    "competencia_fim": competencia_fim,
+                    "geometrias": service.municipios.versao,
+                },
+                meses
+            )
+        
+        etag = await run_in_db_thread(calcular_etag)
+        if etag_corresponde(if_none_match, etag):
+            return Response(status_code=304, headers=_cache_headers(etag))
+        
+        tile = await run_in_db_thread(
+            get_tile_cache().get_or_compute,
+            etag,
+            lambda: service.get_tile_incidencia(z, x, y, competencia_inicio, competencia_fim)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao gerar tile: {str(e)}"
+        )
+    
+    if not tile:
+        return Response(status_code=204, headers=_cache_headers(etag))
+    return Response(content=tile, media_type=MVT_MEDIA_TYPE, headers=_cache_headers(etag))
+
+
 @router.get("/municipios", response_model=dict)
 async def listar_municipios():
     """
@@ -147,12 +429,13 @@ async def listar_municipios():
           "centroid": {"lat": -15.6014, "lon": -56.0967}
         }
       ],
-      "total": 10
+      "total": 141
     }
     ```
     """
-    # In production, load from database
-    from app.services.mapa_service import MT_MUNICIPIOS
+    indice = get_municipio_index(DB_CONN_STR)
+    # items() recarrega o índice do banco quando a versão muda
+    itens = await run_in_db_thread(lambda: list(indice.items()))
     
     municipios = [
         {
@@ -161,7 +444,7 @@ async def listar_municipios():
             "populacao": info['pop'],
             "centroid": {"lat": info['lat'], "lon": info['lon']}
         }
-        for cod, info in MT_MUNICIPIOS.items()
+        for cod, info in itens
     ]
     
     return {
@@ -176,7 +459,8 @@ async def obter_heatmap(
     semana_epi_inicio: Optional[int] = Query(None, ge=1, le=53, description="Semana epidemiológica início"),
     semana_epi_fim: Optional[int] = Query(None, ge=1, le=53, description="Semana epidemiológica fim"),
     doenca_tipo: Optional[str] = Query(None, description="DENGUE, ZIKA, CHIKUNGUNYA, FEBRE_AMARELA"),
-    max_points: int = Query(5000, ge=1, le=10000, description="Máximo de pontos")
+    max_points: int = Query(5000, ge=1, le=10000, description="Máximo de pontos"),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Retorna dados para camada heatmap (densidade de casos)
@@ -211,7 +495,16 @@ async def obter_heatmap(
             doenca_tipo=doenca_tipo
         )
         
-        return service.get_heatmap_data(filtro, max_points)
+        def gerar() -> bytes:
+            return service.get_heatmap_data(filtro, max_points).model_dump_json().encode("utf-8")
+
+        return await _resposta_cacheada(
+            "mapa_heatmap",
+            {**filtro.model_dump(), "max_points": max_points},
+            _meses_filtro(filtro),
+            gerar,
+            if_none_match
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -226,7 +519,8 @@ async def obter_estatisticas(
     semana_epi_fim: Optional[int] = Query(None, ge=1, le=53),
     doenca_tipo: Optional[str] = Query(None, description="DENGUE, ZIKA, CHIKUNGUNYA"),
     data_inicio: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
-    data_fim: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$")
+    data_fim: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Retorna estatísticas agregadas para exibição no dashboard do mapa
@@ -256,7 +550,8 @@ async def obter_estatisticas(
         "MUITO_ALTO": 6
       },
       "periodo_inicio": "2024-01-01",
-      "periodo_fim": "2024-10-31"
+      "periodo_fim": "2024-10-31",
+      "tempo_processamento_ms": 12.4
     }
     ```
     """
@@ -272,7 +567,16 @@ async def obter_estatisticas(
             data_fim=data_fim
         )
         
-        return service.get_estatisticas_agregadas(filtro)
+        def gerar() -> bytes:
+            return service.get_estatisticas_agregadas(filtro).model_dump_json().encode("utf-8")
+
+        return await _resposta_cacheada(
+            "mapa_estatisticas",
+            filtro.model_dump(),
+            _meses_filtro(filtro),
+            gerar,
+            if_none_match
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -280,11 +584,104 @@ async def obter_estatisticas(
         )
 
 
+@router.get("/series-temporais", response_model=SeriesTemporaisMunicipios)
+async def obter_series_temporais(
+    codigos: str = Query(..., description="Códigos IBGE separados por vírgula"),
+    ano: int = Query(..., ge=2000, le=2100, description="Ano da série"),
+    doenca_tipo: Optional[str] = Query(None, description="DENGUE, ZIKA, CHIKUNGUNYA"),
+    formato: Optional[str] = Query(
+        None, pattern=r"^(json|arrow)$", description="json (default) ou arrow (Arrow IPC stream)"
+    ),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Retorna séries temporais semanais de vários municípios em uma requisição
+
+    Uma única consulta agrupada no agregado semanal; cada série é um vetor
+    denso com uma posição por semana epidemiológica do ano (zero quando não
+    houve notificação), alinhado com `semanas`.
+
+    **Parâmetros:**
+    - `codigos`: Códigos IBGE de 7 dígitos separados por vírgula (até 200)
+    - `ano`: Ano da série temporal
+    - `doenca_tipo`: Filtro por tipo de doença (opcional)
+    - `formato=arrow` ou `Accept: application/vnd.apache.arrow.stream`: Arrow IPC
+      em formato longo (municipio_cod_ibge, semana_epi, casos, incidencia)
+
+    **Exemplo:**
+    ```bash
+    curl "http://localhost:8000/api/mapa/series-temporais?codigos=5103403,5108402&ano=2024"
+    ```
+
+    **Response:**
+    ```json
+    {
+      "ano": 2024,
+      "doenca_tipo": null,
+      "semanas": ["2024-W01", "2024-W02", "..."],
+      "codigos_ibge": ["5103403", "5108402"],
+      "nomes": ["Cuiabá", "Várzea Grande"],
+      "populacao": [650912, 300078],
+      "casos": [[12, 0, "..."], [4, 7, "..."]],
+      "incidencia": [[1.84, 0.0, "..."], [1.33, 2.33, "..."]]
+    }
+    ```
+    """
+    # Códigos na ordem pedida, sem repetição
+    lista = list(dict.fromkeys(c.strip() for c in codigos.split(",") if c.strip()))
+    if not lista:
+        raise HTTPException(status_code=400, detail="Informe ao menos um código IBGE")
+    if len(lista) > MAX_SERIES_MUNICIPIOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo de {MAX_SERIES_MUNICIPIOS} municípios por requisição"
+        )
+    invalidos = [c for c in lista if len(c) != 7 or not c.isdigit()]
+    if invalidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Código IBGE deve ter 7 dígitos numéricos: {', '.join(invalidos)}"
+        )
+
+    arrow = quer_arrow(accept, formato)
+    service = MapaService(DB_CONN_STR)
+
+    try:
+        def gerar() -> bytes:
+            if arrow:
+                return service.get_series_temporais_arrow(
+                    codigos_ibge=lista,
+                    ano=ano,
+                    doenca_tipo=doenca_tipo
+                )
+            return service.get_series_temporais(
+                codigos_ibge=lista,
+                ano=ano,
+                doenca_tipo=doenca_tipo
+            ).model_dump_json().encode("utf-8")
+
+        return await _resposta_cacheada(
+            "mapa_series_temporais_arrow" if arrow else "mapa_series_temporais",
+            {"codigos_ibge": lista, "ano": ano, "doenca_tipo": doenca_tipo},
+            meses_periodo(*intervalo_semanas_epi(ano)),
+            gerar,
+            if_none_match,
+            media_type=ARROW_MEDIA_TYPE if arrow else "application/json"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao obter séries temporais: {str(e)}"
+        )
+
+
 @router.get("/series-temporais/{codigo_ibge}", response_model=SerieTemporalMunicipio)
 async def obter_serie_temporal(
     codigo_ibge: str,
     ano: int = Query(..., ge=2000, le=2100, description="Ano da série"),
-    doenca_tipo: Optional[str] = Query(None, description="DENGUE, ZIKA, CHIKUNGUNYA")
+    doenca_tipo: Optional[str] = Query(None, description="DENGUE, ZIKA, CHIKUNGUNYA"),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Retorna série temporal de incidência para um município específico
@@ -325,10 +722,19 @@ async def obter_serie_temporal(
     service = MapaService(DB_CONN_STR)
     
     try:
-        return service.get_serie_temporal_municipio(
-            codigo_ibge=codigo_ibge,
-            ano=ano,
-            doenca_tipo=doenca_tipo
+        def gerar() -> bytes:
+            return service.get_serie_temporal_municipio(
+                codigo_ibge=codigo_ibge,
+                ano=ano,
+                doenca_tipo=doenca_tipo
+            ).model_dump_json().encode("utf-8")
+
+        return await _resposta_cacheada(
+            "mapa_serie_temporal",
+            {"codigo_ibge": codigo_ibge, "ano": ano, "doenca_tipo": doenca_tipo},
+            meses_periodo(*intervalo_semanas_epi(ano)),
+            gerar,
+            if_none_match
         )
     except Exception as e:
         raise HTTPException(
@@ -27,6 +27,13 @@ class PeriodoAgregacao(str, Enum):
     ANUAL = "anual"
 
 
+class NivelDrillDown(str, Enum):
+    """Nível geográfico do drill-down"""
+    ESTADO = "estado"
+    REGIAO = "regiao"
+    MUNICIPIO = "municipio"
+
+
 class TendenciaDirecao(str, Enum):
     """Direção da tendência"""
     ALTA = "alta"
@@ -297,11 +304,31 @@ class DrillDownFiltro(BaseModel):
     classificacao: Optional[str] = Field(None, description="confirmado, suspeito, descartado")
 
 
+class ItemDrillDown(BaseModel):
+    """Nó filho no drill-down (região de um estado, município de uma região)"""
+    nivel: NivelDrillDown
+    codigo: str = Field(..., description="MT, nome da região ou código IBGE")
+    nome: str
+    total_casos: int
+    total_obitos: int
+    casos_graves: int
+    populacao: int
+    incidencia: float
+    taxa_letalidade: float
+    nivel_risco: str = Field(..., description="BAIXO, MEDIO, ALTO, MUITO_ALTO")
+    cor_hex: str = Field(..., pattern=r"^#[0-9A-Fa-f]{6}$")
+
+
 class DrillDownDados(BaseModel):
     """Dados detalhados para drill-down"""
     titulo: str
     descricao: Optional[str] = None
     
+    # Nó consultado (estado → região → município → semana epi)
+    nivel: Optional[NivelDrillDown] = None
+    codigo: Optional[str] = None
+    semana_epi: Optional[int] = Field(None, ge=1, le=53, description="Fatia semanal (None = ano inteiro)")
+    
     # Dados agregados
     total_casos: int
     total_obitos: int
@@ -316,10 +343,16 @@ class DrillDownDados(BaseModel):
     # Série temporal
     serie_temporal: Optional[SerieTemporal] = None
     
+    # Próximo nível (vazio no município: o detalhe é a série semanal)
+    nivel_filhos: Optional[NivelDrillDown] = None
+    filhos: List[ItemDrillDown] = Field(default_factory=list)
+    
     class Config:
         json_schema_extra = {
             "example": {
                 "titulo": "Cuiabá - Dengue 2024",
+                "nivel": "municipio",
+                "codigo": "5103403",
                 "total_casos": 3845,
                 "total_obitos": 12,
                 "incidencia": 622.04,
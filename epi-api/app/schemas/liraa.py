@@ -70,7 +70,7 @@ class IndiceTemporal(BaseModel):
     valor_ivo: Optional[float] = Field(None, description="Índice de Vetores (%)")
     valor_imo: Optional[float] = Field(None, description="Índice de Mosquitos (%)")
     imoveis_inspecionados: int
-    classificacao_geral: ClassificacaoRisco
+    classificacao_geral: Optional[ClassificacaoRisco] = Field(None, description="None: sem IIP")
 
 
 class SerieLiraa(BaseModel):
@@ -160,9 +160,13 @@ class MunicipioLiraaProperties(BaseModel):
     valor_ido: Optional[float]
     valor_ivo: Optional[float]
     valor_imo: Optional[float]
-    classificacao_geral: ClassificacaoRisco
+    classificacao_geral: Optional[ClassificacaoRisco] = Field(None, description="None: sem IIP")
     imoveis_inspecionados: int
     data_levantamento: date
+    ciclo: int = Field(..., ge=1, le=6, description="Ciclo LIRAa do levantamento")
+    valor_indice: Optional[float] = Field(None, description="Valor do índice selecionado")
+    classificacao_indice: Optional[ClassificacaoRisco] = Field(None, description="Classe do índice selecionado")
+    cor_hex: str = Field(..., pattern=r"^#[0-9A-Fa-f]{6}$", description="Cor da classe (índice selecionado ou geral)")
 
 
 class MapaLiraaResponse(BaseModel):
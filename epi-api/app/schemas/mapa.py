@@ -1,7 +1,8 @@
 """
 Mapa - Schemas for map layers and indicators
 """
-from typing import List, Optional, Dict, Any
+from datetime import date
+from typing import List, Optional, Dict, Any, Union
 from pydantic import BaseModel, Field
 from enum import Enum
 
@@ -42,10 +43,62 @@ class GeoJSONFeature(BaseModel):
     properties: MunicipioProperties
 
 
+# ============================================================================
+# CLUSTERING
+# ============================================================================
+
+class ClusterProperties(BaseModel):
+    """Properties de um cluster de municípios"""
+    cluster_id: int
+    point_count: int = Field(..., ge=1, description="Número de municípios no cluster")
+    casos_total: int = Field(..., ge=0)
+    obitos_total: int = Field(0, ge=0)
+    incidencia_media: float = Field(..., ge=0)
+    nivel_risco_predominante: str
+    cor_hex: str = Field(..., pattern=r"^#[0-9A-Fa-f]{6}$")
+    expansion_zoom: Optional[int] = Field(None, ge=0, description="Zoom em que o cluster se divide")
+
+
+class ClusterFeature(BaseModel):
+    """Feature GeoJSON para cluster"""
+    type: str = Field(default="Feature")
+    geometry: GeoJSONGeometry
+    properties: ClusterProperties
+
+
+class IndiceEntomologico(BaseModel):
+    """Índices entomológicos (IPO, IDO, IVO, IMO)"""
+    municipio_cod_ibge: str
+    municipio_nome: str
+    ipo: Optional[float] = Field(None, ge=0.0, le=100.0, description="Índice de Positividade de Ovos (%)")
+    ido: Optional[float] = Field(None, ge=0.0, description="Índice de Densidade de Ovos")
+    ivo: Optional[float] = Field(None, ge=0.0, description="Índice de Vigilância de Ovos")
+    imo: Optional[float] = Field(None, ge=0.0, description="Índice de Mosquitos por Ovitrampa")
+    # Risk classification based on indices
+    classe_risco_ipo: Optional[str] = Field(None, description="satisfatorio, alerta, risco")
+    cor_hex: str = Field(..., pattern=r"^#[0-9A-Fa-f]{6}$")
+    # Layer index (tipo_camada) and survey
+    valor: Optional[float] = Field(None, ge=0.0, description="Valor do índice da camada")
+    classe_risco: str = Field(
+        ...,
+        description="Classe do índice da camada ou, sem valor, a geral; indeterminado sem nenhuma"
+    )
+    ano: int
+    ciclo: int = Field(..., ge=1, le=6, description="Ciclo LIRAa")
+    data_levantamento: date
+
+
+class IndiceEntomologicoFeature(BaseModel):
+    """Feature GeoJSON para camadas entomológicas (IPO, IDO, IVO, IMO)"""
+    type: str = Field(default="Feature")
+    geometry: GeoJSONGeometry
+    properties: IndiceEntomologico
+
+
 class GeoJSONFeatureCollection(BaseModel):
-    """GeoJSON FeatureCollection"""
+    """GeoJSON FeatureCollection (municípios, clusters ou índices entomológicos)"""
     type: str = Field(default="FeatureCollection")
-    features: List[GeoJSONFeature]
+    features: List[Union[GeoJSONFeature, ClusterFeature, IndiceEntomologicoFeature]]
     
     class Config:
         json_schema_extra = {
@@ -72,19 +125,6 @@ class GeoJSONFeatureCollection(BaseModel):
         }
 
 
-class IndiceEntomologico(BaseModel):
-    """Índices entomológicos (IPO, IDO, IVO, IMO)"""
-    municipio_cod_ibge: str
-    municipio_nome: str
-    ipo: Optional[float] = Field(None, ge=0.0, le=100.0, description="Índice de Positividade de Ovos (%)")
-    ido: Optional[float] = Field(None, ge=0.0, description="Índice de Densidade de Ovos")
-    ivo: Optional[float] = Field(None, ge=0.0, description="Índice de Vigilância de Ovos")
-    imo: Optional[float] = Field(None, ge=0.0, description="Índice de Mosquitos por Ovitrampa")
-    # Risk classification based on indices
-    classe_risco_ipo: Optional[str] = Field(None, description="satisfatorio, alerta, risco")
-    cor_hex: str = Field(..., pattern=r"^#[0-9A-Fa-f]{6}$")
-
-
 class MapaCamadasRequest(BaseModel):
     """Request parameters for map layers"""
     tipo_camada: TipoCamada
@@ -227,28 +267,6 @@ class FiltroMapa(BaseModel):
     incidencia_max: Optional[float] = Field(None, ge=0)
 
 
-# ============================================================================
-# CLUSTERING
-# ============================================================================
-
-class ClusterProperties(BaseModel):
-    """Properties de um cluster de municípios"""
-    cluster_id: int
-    point_count: int = Field(..., ge=1, description="Número de municípios no cluster")
-    casos_total: int = Field(..., ge=0)
-    obitos_total: int = Field(0, ge=0)
-    incidencia_media: float = Field(..., ge=0)
-    nivel_risco_predominante: str
-    cor_hex: str = Field(..., pattern=r"^#[0-9A-Fa-f]{6}$")
-
-
-class ClusterFeature(BaseModel):
-    """Feature GeoJSON para cluster"""
-    type: str = Field(default="Feature")
-    geometry: GeoJSONGeometry
-    properties: ClusterProperties
-
-
 # ============================================================================
 # ESTATÍSTICAS AGREGADAS
 # ============================================================================
@@ -273,6 +291,9 @@ class EstatisticasMapa(BaseModel):
     periodo_inicio: str
     periodo_fim: str
     
+    # Desempenho
+    tempo_processamento_ms: Optional[float] = Field(None, ge=0, description="Tempo de cálculo em ms")
+    
     class Config:
         json_schema_extra = {
             "example": {
@@ -290,7 +311,8 @@ class EstatisticasMapa(BaseModel):
                     "MUITO_ALTO": 6
                 },
                 "periodo_inicio": "2024-01-01",
-                "periodo_fim": "2024-10-31"
+                "periodo_fim": "2024-10-31",
+                "tempo_processamento_ms": 12.4
             }
         }
 
@@ -322,3 +344,36 @@ class SerieTemporalMunicipio(BaseModel):
                 ]
             }
         }
+
+
+class SeriesTemporaisMunicipios(BaseModel):
+    """
+    Séries temporais de vários municípios em layout colunar
+
+    Um vetor denso por município (uma posição por semana epidemiológica do
+    ano, semanas sem notificação com zero), alinhado com ``semanas``. As
+    listas ``codigos_ibge``, ``nomes``, ``populacao``, ``casos`` e
+    ``incidencia`` seguem a ordem dos códigos pedidos.
+    """
+    ano: int
+    doenca_tipo: Optional[str] = None
+    semanas: List[str] = Field(..., description="Semanas epi (YYYY-Www)")
+    codigos_ibge: List[str]
+    nomes: List[str]
+    populacao: List[int]
+    casos: List[List[int]] = Field(..., description="Casos por município × semana")
+    incidencia: List[List[float]] = Field(..., description="Incidência por 100 mil hab. por município × semana")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "ano": 2024,
+                "doenca_tipo": "DENGUE",
+                "semanas": ["2024-W01", "2024-W02", "2024-W03"],
+                "codigos_ibge": ["5103403", "5108402"],
+                "nomes": ["Cuiabá", "Várzea Grande"],
+                "populacao": [650912, 300078],
+                "casos": [[12, 0, 30], [4, 7, 0]],
+                "incidencia": [[1.84, 0.0, 4.61], [1.33, 2.33, 0.0]]
+            }
+        }
@@ -0,0 +1,101 @@
+"""
+Saída colunar em Apache Arrow (formato IPC stream) para endpoints analíticos
+
+Os clientes do dashboard e do mapa fazem contas sobre vetores de
+(município, semana, casos, incidência). Em JSON cada linha vira um objeto
+Pydantic e depois um objeto JS; em Arrow cada coluna é um buffer contíguo
+montado direto das linhas da consulta, lido no cliente sem parse
+(``apache-arrow`` no browser, ``pyarrow``/``polars`` em Python).
+
+Negociação: ``?formato=arrow`` ou ``Accept: application/vnd.apache.arrow.stream``.
+``pyarrow`` é opcional; sem ele os endpoints respondem 406 ao pedido de Arrow
+e continuam servindo JSON normalmente.
+
+Os services não importam pyarrow: devolvem colunas (listas) e os tipos por
+nome (``"string"``, ``"int32"``, ``"float64"``...), convertidos aqui.
+``"dictionary"`` é texto com dictionary encoding (códigos IBGE repetidos
+em formato longo, classes de risco): cada valor distinto vai uma vez só.
+"""
+from typing import Dict, Optional, Sequence
+
+from fastapi import HTTPException
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - dependência opcional
+    pa = None
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+class ArrowIndisponivel(RuntimeError):
+    """Arrow pedido, mas pyarrow não está instalado"""
+
+
+def arrow_disponivel() -> bool:
+    return pa is not None
+
+
+def pede_arrow(accept: Optional[str], formato: Optional[str] = None) -> bool:
+    """
+    True se o cliente pediu Arrow.
+
+    ``formato`` (query string) tem precedência sobre o cabeçalho Accept.
+    """
+    if formato:
+        return formato.lower() == "arrow"
+    return bool(accept) and ARROW_MEDIA_TYPE in accept.lower()
+
+
+def quer_arrow(accept: Optional[str], formato: Optional[str] = None) -> bool:
+    """True se o cliente pediu Arrow; 406 se pyarrow não estiver instalado"""
+    if not pede_arrow(accept, formato):
+        return False
+    if not arrow_disponivel():
+        raise HTTPException(
+            status_code=406,
+            detail="Formato Arrow indisponível neste servidor (pyarrow não instalado)"
+        )
+    return True
+
+
+def tabela_ipc(
+    colunas: Dict[str, Sequence],
+    tipos: Dict[str, str],
+    metadata: Optional[Dict[str, str]] = None
+) -> bytes:
+    """
+    Serializa colunas como um record batch em Arrow IPC (stream).
+
+    Args:
+        colunas: Nome → valores (todas com o mesmo comprimento), na ordem do schema
+        tipos: Nome → tipo Arrow (nome de fábrica do pyarrow: "int32", "string"...,
+            ou "dictionary" para texto com dictionary encoding)
+        metadata: Metadados do schema (ex: ano, doença); valores convertidos em str
+
+    Returns:
+        Bytes no formato Arrow IPC stream (um único record batch)
+
+    Raises:
+        ArrowIndisponivel: pyarrow não instalado
+    """
+    if pa is None:
+        raise ArrowIndisponivel("pyarrow não instalado")
+
+    arrays = []
+    for nome, valores in colunas.items():
+        if tipos[nome] == "dictionary":
+            arrays.append(pa.array(valores, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(valores, type=getattr(pa, tipos[nome])()))
+
+    schema = pa.schema(
+        [pa.field(nome, array.type) for nome, array in zip(colunas, arrays)],
+        metadata={k: str(v) for k, v in (metadata or {}).items() if v is not None} or None
+    )
+    batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
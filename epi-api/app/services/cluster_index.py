@@ -0,0 +1,282 @@
+"""
+Índice hierárquico de clusters para a camada de incidência
+
+Implementação no estilo supercluster (Mapbox): os municípios são projetados em
+Web Mercator normalizado ([0, 1] x [0, 1]) e agrupados de ``max_zoom`` até
+``min_zoom``; em cada zoom os nós do zoom seguinte a menos de
+``radius / (extent * 2^z)`` são fundidos em um cluster com centroide
+ponderado e casos/óbitos/população somados.
+
+O índice é construído uma vez por conjunto de dados (filtro + versão dos
+dados) e guardado em memória (``get_cluster_index``). Cada zoom mantém os nós
+ordenados por x, de modo que uma consulta por zoom + bbox custa uma busca
+binária mais a filtragem dos nós da faixa: bem abaixo de 1 ms para os 141
+municípios de MT.
+"""
+import bisect
+import math
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from app.schemas.mapa import ClusterFeature, ClusterProperties, GeoJSONGeometry
+from app.services.incidencia import CLASSES_RISCO, CORES_RISCO as _CORES_CLASSES
+
+# Classe de risco (minúscula, como nas features do mapa) → cor, em ordem de gravidade
+CORES_RISCO = {
+    classe.lower(): cor for classe, cor in zip(CLASSES_RISCO, _CORES_CLASSES)
+}
+
+
+def _lng_x(lng: float) -> float:
+    return lng / 360.0 + 0.5
+
+
+def _lat_y(lat: float) -> float:
+    sen = min(max(math.sin(math.radians(lat)), -0.9999), 0.9999)
+    y = 0.5 - 0.25 * math.log((1 + sen) / (1 - sen)) / math.pi
+    return min(max(y, 0.0), 1.0)
+
+
+def _x_lng(x: float) -> float:
+    return (x - 0.5) * 360.0
+
+
+def _y_lat(y: float) -> float:
+    y2 = (180 - y * 360) * math.pi / 180
+    return 360 * math.atan(math.exp(y2)) / math.pi - 90
+
+
+class _Node:
+    """Ponto (município) ou cluster em um nível de zoom"""
+
+    __slots__ = (
+        'x', 'y', 'point_count', 'casos', 'obitos', 'populacao', 'riscos',
+        'cluster_id', 'expansion_zoom', 'feature', 'zoom'
+    )
+
+    def __init__(self, x, y, point_count, casos, obitos, populacao, riscos,
+                 cluster_id=None, expansion_zoom=None, feature=None):
+        self.x = x
+        self.y = y
+        self.point_count = point_count
+        self.casos = casos
+        self.obitos = obitos
+        self.populacao = populacao
+        self.riscos = riscos
+        self.cluster_id = cluster_id
+        self.expansion_zoom = expansion_zoom
+        self.feature = feature
+        self.zoom = math.inf
+
+
+class ClusterIndex:
+    """
+    Hierarquia de clusters por zoom sobre features de município.
+
+    As features de entrada são ``GeoJSONFeature`` (ponto + ``MunicipioProperties``);
+    a saída de ``get_clusters`` mistura essas mesmas features (pontos isolados)
+    com ``ClusterFeature``.
+    """
+
+    def __init__(
+        self,
+        features: Sequence[Any],
+        radius: float = 60.0,
+        extent: float = 512.0,
+        min_zoom: int = 0,
+        max_zoom: int = 14
+    ):
+        self.radius = radius
+        self.extent = extent
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.pontos = list(features)
+        self.total_pontos = len(self.pontos)
+        self._next_id = 0
+
+        leaves = []
+        for feature in self.pontos:
+            lng, lat = feature.geometry.coordinates
+            props = feature.properties
+            leaves.append(_Node(
+                _lng_x(lng), _lat_y(lat),
+                point_count=1,
+                casos=props.casos,
+                obitos=props.obitos,
+                populacao=props.populacao,
+                riscos=Counter({props.classe_risco: 1}),
+                feature=feature
+            ))
+
+        # _levels[z] = (xs ordenados, nós na mesma ordem)
+        self._levels: Dict[int, Tuple[List[float], List[_Node]]] = {}
+        nodes = leaves
+        self._levels[max_zoom + 1] = self._sorted_level(nodes)
+        for z in range(max_zoom, min_zoom - 1, -1):
+            nodes = self._cluster(nodes, z)
+            self._levels[z] = self._sorted_level(nodes)
+
+        # Features dos clusters montadas uma vez; as consultas só filtram
+        for _, level_nodes in self._levels.values():
+            for node in level_nodes:
+                if node.feature is None:
+                    node.feature = self._cluster_feature(node)
+
+    @staticmethod
+    def _sorted_level(nodes: List[_Node]) -> Tuple[List[float], List[_Node]]:
+        ordered = sorted(nodes, key=lambda n: n.x)
+        return [n.x for n in ordered], ordered
+
+    def _cluster(self, nodes: List[_Node], zoom: int) -> List[_Node]:
+        """Agrupa os nós do zoom ``zoom + 1`` no raio do zoom ``zoom``"""
+        r = self.radius / (self.extent * (2 ** zoom))
+        r2 = r * r
+
+        grid: Dict[Tuple[int, int], List[_Node]] = {}
+        for node in nodes:
+            grid.setdefault((int(node.x / r), int(node.y / r)), []).append(node)
+
+        clusters = []
+        for node in nodes:
+            if node.zoom <= zoom:
+                continue
+            node.zoom = zoom
+
+            cx, cy = int(node.x / r), int(node.y / r)
+            vizinhos = []
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for other in grid.get((cx + dx, cy + dy), ()):
+                        if other.zoom <= zoom:
+                            continue
+                        if (other.x - node.x) ** 2 + (other.y - node.y) ** 2 <= r2:
+                            vizinhos.append(other)
+
+            if not vizinhos:
+                clusters.append(node)
+                continue
+
+            membros = [node] + vizinhos
+            count = 0
+            wx = wy = 0.0
+            casos = obitos = populacao = 0
+            riscos: Counter = Counter()
+            for m in membros:
+                m.zoom = zoom
+                count += m.point_count
+                wx += m.x * m.point_count
+                wy += m.y * m.point_count
+                casos += m.casos
+                obitos += m.obitos
+                populacao += m.populacao
+                riscos.update(m.riscos)
+
+            self._next_id += 1
+            clusters.append(_Node(
+                wx / count, wy / count,
+                point_count=count,
+                casos=casos,
+                obitos=obitos,
+                populacao=populacao,
+                riscos=riscos,
+                cluster_id=self._next_id,
+                expansion_zoom=min(zoom + 1, self.max_zoom + 1)
+            ))
+        return clusters
+
+    def _level(self, zoom: int) -> Tuple[List[float], List[_Node]]:
+        z = max(self.min_zoom, min(int(zoom), self.max_zoom + 1))
+        return self._levels[z]
+
+    def count(self, zoom: int) -> int:
+        """Número de features (clusters + pontos) no zoom"""
+        return len(self._level(zoom)[1])
+
+    def zoom_para_limite(self, max_features: int) -> int:
+        """Maior zoom cujo número de features não passa de ``max_features``"""
+        for z in range(self.max_zoom + 1, self.min_zoom - 1, -1):
+            if self.count(z) <= max_features:
+                return z
+        return self.min_zoom
+
+    def get_clusters(
+        self,
+        zoom: int,
+        bbox: Optional[Sequence[float]] = None
+    ) -> List[Any]:
+        """
+        Features visíveis no zoom dentro do bbox.
+
+        Args:
+            zoom: Nível de zoom (limitado a [min_zoom, max_zoom + 1])
+            bbox: [minLng, minLat, maxLng, maxLat]; None = mundo todo
+
+        Returns:
+            Lista de ``GeoJSONFeature`` (pontos) e ``ClusterFeature``
+        """
+        xs, nodes = self._level(zoom)
+        if bbox is None:
+            selecionados = nodes
+        else:
+            min_lng, min_lat, max_lng, max_lat = bbox
+            min_x, max_x = _lng_x(min_lng), _lng_x(max_lng)
+            # y cresce para o sul
+            min_y, max_y = _lat_y(max_lat), _lat_y(min_lat)
+            ini = bisect.bisect_left(xs, min_x)
+            fim = bisect.bisect_right(xs, max_x)
+            selecionados = [n for n in nodes[ini:fim] if min_y <= n.y <= max_y]
+        return [n.feature for n in selecionados]
+
+    @staticmethod
+    def _cluster_feature(node: _Node) -> ClusterFeature:
+        incidencia = node.casos / node.populacao * 100000.0 if node.populacao > 0 else 0.0
+        # Empate: classe mais grave
+        ordem = list(CORES_RISCO)
+        risco = max(node.riscos.items(), key=lambda kv: (kv[1], ordem.index(kv[0])))[0]
+        return ClusterFeature(
+            geometry=GeoJSONGeometry(
+                type="Point",
+                coordinates=[round(_x_lng(node.x), 6), round(_y_lat(node.y), 6)]
+            ),
+            properties=ClusterProperties(
+                cluster_id=node.cluster_id,
+                point_count=node.point_count,
+                casos_total=node.casos,
+                obitos_total=node.obitos,
+                incidencia_media=round(incidencia, 2),
+                nivel_risco_predominante=risco,
+                cor_hex=CORES_RISCO.get(risco, "#9E9E9E"),
+                expansion_zoom=node.expansion_zoom
+            )
+        )
+
+
+# =============================================================================
+# ÍNDICES DO PROCESSO
+# =============================================================================
+
+_MAX_INDICES = 32
+_indices: "OrderedDict[Hashable, ClusterIndex]" = OrderedDict()
+_indices_lock = threading.Lock()
+
+
+def get_cluster_index(chave: Hashable, construir: Callable[[], ClusterIndex]) -> ClusterIndex:
+    """
+    Índice para o conjunto de dados identificado por ``chave`` (LRU em memória).
+
+    A chave deve incluir a versão dos dados; ``construir`` só roda em miss.
+    """
+    with _indices_lock:
+        index = _indices.get(chave)
+        if index is not None:
+            _indices.move_to_end(chave)
+            return index
+
+    index = construir()
+    with _indices_lock:
+        _indices[chave] = index
+        _indices.move_to_end(chave)
+        while len(_indices) > _MAX_INDICES:
+            _indices.popitem(last=False)
+    return index
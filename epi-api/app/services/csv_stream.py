@@ -0,0 +1,117 @@
+"""
+Leitura de CSV em uma única passada, com memória limitada ao lote
+
+O ETL lia cada arquivo várias vezes com ``pd.read_csv`` (estrutura, contagem
+de linhas, amostra de validação, importação) e mantinha o arquivo inteiro
+em memória duas vezes (DataFrame + lista de dicts). Um export SINAN do
+estado inteiro era lido 3–4 vezes.
+
+``LeitorCSV`` percorre o arquivo com o módulo ``csv`` uma vez só: entrega
+lotes de dicts (``lotes()``) e, no mesmo percurso, conta as linhas e
+registra as checagens estruturais (colunas do cabeçalho, linhas com mais
+campos que o cabeçalho). ``finalizar()`` consome o que faltar sem montar
+dicts, para quem só precisa da contagem ou de uma amostra.
+
+Linhas com mais campos que o cabeçalho são contadas em ``total_linhas`` e
+``total_malformadas``, mas ficam fora dos lotes: truncá-las importaria campos
+deslocados. ``linhas_malformadas`` guarda o número da linha física no arquivo
+(cabeçalho = 1, linhas em branco contam; registro com quebra de linha entre
+aspas = linha em que começa), não a posição do registro.
+
+Valores ``''``, ``NA``, ``N/A``, ``null`` e ``NULL`` viram ``None`` (os
+mesmos marcadores de ausência usados antes com pandas); linhas com menos
+campos completam com ``None`` e linhas em branco são ignoradas.
+"""
+import csv
+from itertools import zip_longest
+from typing import Any, Dict, Iterator, List, Optional
+
+VALORES_AUSENTES = frozenset({'', 'NA', 'N/A', 'null', 'NULL'})
+
+# Linhas malformadas guardadas para o relatório (a contagem é sempre completa)
+MAX_LINHAS_MALFORMADAS = 100
+
+
+class LeitorCSV:
+    """Uma passada sobre o CSV: lotes, contagem e checagem estrutural"""
+
+    def __init__(self, file_path: str, batch_size: int = 500, encoding: str = 'utf-8-sig'):
+        """
+        Args:
+            file_path: Caminho do arquivo local
+            batch_size: Linhas por lote
+            encoding: Encoding do arquivo (utf-8-sig aceita BOM)
+        """
+        self.file_path = file_path
+        self.batch_size = batch_size
+        self.encoding = encoding
+        self.colunas: List[str] = []
+        self.total_linhas = 0
+        self.total_malformadas = 0
+        self.linhas_malformadas: List[int] = []
+        self.concluido = False
+        self._linhas: Optional[Iterator[List[str]]] = None
+
+    def colunas_faltando(self, obrigatorias: List[str]) -> List[str]:
+        """Colunas obrigatórias ausentes do cabeçalho (lê só o cabeçalho se preciso)"""
+        self._abrir()
+        return [c for c in obrigatorias if c not in self.colunas]
+
+    @property
+    def malformadas_omitidas(self) -> int:
+        """Linhas malformadas além de MAX_LINHAS_MALFORMADAS (sem número guardado)"""
+        return self.total_malformadas - len(self.linhas_malformadas)
+
+    def lotes(self) -> Iterator[List[Dict[str, Any]]]:
+        """Lotes de até ``batch_size`` linhas (sem as malformadas) como dicts coluna → valor"""
+        linhas = self._abrir()
+        colunas = self.colunas
+        lote: List[Dict[str, Any]] = []
+        for linha in linhas:
+            lote.append({
+                coluna: (None if valor is None or valor in VALORES_AUSENTES else valor)
+                for coluna, valor in zip_longest(colunas, linha)
+            })
+            if len(lote) >= self.batch_size:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+    def finalizar(self) -> 'LeitorCSV':
+        """Consome o restante do arquivo (só contagem/checagens) e fecha"""
+        for _ in self._abrir():
+            pass
+        return self
+
+    def _abrir(self) -> Iterator[List[str]]:
+        if self._linhas is None:
+            self._linhas = self._percorrer()
+            # Lê o cabeçalho já na abertura (colunas disponíveis antes do 1º lote)
+            next(self._linhas)
+        return self._linhas
+
+    def _percorrer(self) -> Iterator[List[str]]:
+        with open(self.file_path, newline='', encoding=self.encoding) as f:
+            reader = csv.reader(f)
+            cabecalho = next(reader, None)
+            if not cabecalho:
+                raise ValueError("Arquivo CSV vazio (sem cabeçalho)")
+            self.colunas = cabecalho
+            yield []
+
+            n_colunas = len(cabecalho)
+            fim_anterior = reader.line_num
+            for linha in reader:
+                # line_num: última linha física lida; o registro começa logo após a anterior
+                numero_linha, fim_anterior = fim_anterior + 1, reader.line_num
+                if not linha or (len(linha) == 1 and not linha[0]):
+                    continue
+                self.total_linhas += 1
+                if len(linha) > n_colunas:
+                    self.total_malformadas += 1
+                    if len(self.linhas_malformadas) < MAX_LINHAS_MALFORMADAS:
+                        self.linhas_malformadas.append(numero_linha)
+                    continue
+                yield linha
+        self.concluido = True
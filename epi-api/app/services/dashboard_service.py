@@ -3,9 +3,19 @@ Dashboard Service - Calculate KPIs, series and rankings for dashboard
 """
 from typing import List, Optional, Dict, Tuple
 from datetime import date, datetime, timedelta
-import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from app.db import get_connection
+from app.services.arrow_ipc import tabela_ipc
+from app.services.incidencia import (
+    CLASSES_RISCO,
+    CORES_RISCO,
+    LIMIARES_INCIDENCIA,
+    calcular_incidencia,
+    calcular_indicadores,
+    codigos_risco
+)
+from app.services.municipio_index import MunicipioIndex, get_municipio_index
 from app.schemas.dashboard import (
     DashboardKPIs,
     KPICard,
@@ -18,29 +28,30 @@ from app.schemas.dashboard import (
     ItemRanking,
     PeriodoAgregacao,
     DrillDownDados,
+    ItemDrillDown,
+    NivelDrillDown,
     DoencaTipo
 )
 
-# MT municipalities reference (usar tabela de municípios em produção)
-MT_MUNICIPIOS = {
-    "5103403": {"nome": "Cuiabá", "pop": 618124},
-    "5105606": {"nome": "Várzea Grande", "pop": 290215},
-    "5103900": {"nome": "Rondonópolis", "pop": 238400},
-    "5107909": {"nome": "Sinop", "pop": 142291},
-    "5106505": {"nome": "Tangará da Serra", "pop": 103750},
-    "5100201": {"nome": "Alta Floresta", "pop": 55347},
-    "5103379": {"nome": "Cáceres", "pop": 94861},
-    "5101001": {"nome": "Barra do Garças", "pop": 59727},
-    "5107602": {"nome": "Sorriso", "pop": 91382},
-    "5104104": {"nome": "Pontes e Lacerda", "pop": 46822},
+# Coluna de ordenação do Top N por tipo de indicador (default: incidência)
+COLUNAS_RANKING = {"casos": "casos", "obitos": "obitos", "incidencia": "incidencia"}
+
+# Drill-down (cubo_epi, V020): nível abaixo de cada nó e chave da raiz
+NIVEL_FILHO = {
+    NivelDrillDown.ESTADO: NivelDrillDown.REGIAO,
+    NivelDrillDown.REGIAO: NivelDrillDown.MUNICIPIO,
+    NivelDrillDown.MUNICIPIO: None,
 }
+CHAVE_ESTADO = "MT"
+DOENCA_TODAS = "TODAS"
 
 
 class DashboardService:
     """Service para cálculos de indicadores do dashboard"""
     
-    def __init__(self, db_connection_string: str):
+    def __init__(self, db_connection_string: str, municipios: Optional[MunicipioIndex] = None):
         self.conn_str = db_connection_string
+        self.municipios = municipios or get_municipio_index(db_connection_string)
     
     def get_kpis(
         self,
@@ -63,12 +74,18 @@ class DashboardService:
         Returns:
             DashboardKPIs com todos os cards
         """
-        conn = psycopg2.connect(self.conn_str)
+        # Período anterior: mesmas semanas do ano anterior (só com intervalo de semanas)
+        comparar = bool(comparar_com_periodo_anterior and semana_epi_inicio and semana_epi_fim)
+        ano_anterior = ano - 1
+        
+        conn = get_connection(self.conn_str)
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                # Montar filtros
-                where_clauses = ["ano = %s"]
-                params = [ano]
+                # Montar filtros: os dois anos saem da mesma faixa do índice
+                # (ano_epi, semana_epi, doenca_tipo), separados por FILTER
+                where_clauses = ["ano_epi BETWEEN %s AND %s"]
+                params = [ano, ano, ano, ano_anterior, ano_anterior,
+                          ano_anterior if comparar else ano, ano]
                 
                 if semana_epi_inicio and semana_epi_fim:
                     where_clauses.append("semana_epi BETWEEN %s AND %s")
@@ -80,50 +97,38 @@ class DashboardService:
                 
                 where_sql = " AND ".join(where_clauses)
                 
-                # Query principal - período atual
-                query_atual = f"""
+                # Query única - período atual e anterior por município.
+                # Soma NULL = município sem linhas naquele período.
+                query = f"""
                     SELECT 
-                        COUNT(DISTINCT municipio_codigo) as total_municipios,
-                        SUM(casos_confirmados) as total_casos,
-                        SUM(obitos) as total_obitos,
-                        SUM(casos_graves) as casos_graves,
-                        municipio_codigo,
-                        SUM(casos_confirmados) as casos_mun
-                    FROM indicador_epi
+                        municipio_cod_ibge as municipio_codigo,
+                        SUM(casos_confirmados) FILTER (WHERE ano_epi = %s) as casos_mun,
+                        SUM(obitos) FILTER (WHERE ano_epi = %s) as total_obitos,
+                        SUM(casos_graves) FILTER (WHERE ano_epi = %s) as casos_graves,
+                        SUM(casos_confirmados) FILTER (WHERE ano_epi = %s) as casos_mun_anterior,
+                        SUM(obitos) FILTER (WHERE ano_epi = %s) as total_obitos_anterior
+                    FROM indicador_epi_semanal
                     WHERE {where_sql}
-                    GROUP BY municipio_codigo
+                    GROUP BY municipio_cod_ibge
                 """
                 
-                cur.execute(query_atual, params)
-                rows_atual = cur.fetchall()
+                cur.execute(query, params)
+                rows = cur.fetchall()
                 
                 # Calcular totais do período atual
+                rows_atual = [r for r in rows if r['casos_mun'] is not None]
                 total_casos = sum(r['casos_mun'] for r in rows_atual)
-                total_obitos = sum(r.get('total_obitos', 0) or 0 for r in rows_atual)
-                casos_graves = sum(r.get('casos_graves', 0) or 0 for r in rows_atual)
+                total_obitos = sum(r['total_obitos'] or 0 for r in rows_atual)
+                casos_graves = sum(r['casos_graves'] or 0 for r in rows_atual)
                 
                 taxa_letalidade = (total_obitos / total_casos * 100) if total_casos > 0 else 0.0
                 
                 # Calcular incidência média
-                incidencias = []
-                municipios_risco_alto = 0
+                incidencias = self._incidencias(rows_atual)
+                incidencia_media = float(incidencias.mean()) if len(incidencias) else 0.0
                 
-                for row in rows_atual:
-                    cod_ibge = row['municipio_codigo']
-                    casos = row['casos_mun']
-                    
-                    mun_info = MT_MUNICIPIOS.get(cod_ibge)
-                    if not mun_info:
-                        continue
-                    
-                    incidencia = (casos / mun_info['pop'] * 100000) if mun_info['pop'] > 0 else 0
-                    incidencias.append(incidencia)
-                    
-                    # Contar municípios em risco alto/muito alto
-                    if incidencia >= 300:  # Alto ou Muito Alto
-                        municipios_risco_alto += 1
-                
-                incidencia_media = sum(incidencias) / len(incidencias) if incidencias else 0.0
+                # Contar municípios em risco alto/muito alto (classes 2 e 3)
+                municipios_risco_alto = int((codigos_risco(incidencias) >= 2).sum())
                 
                 # Variações (comparar com período anterior se solicitado)
                 variacao_casos = None
@@ -131,43 +136,23 @@ class DashboardService:
                 variacao_letalidade = None
                 variacao_incidencia = None
                 
-                if comparar_com_periodo_anterior:
-                    # Calcular período anterior (mesmo intervalo, ano/semanas anteriores)
-                    if semana_epi_inicio and semana_epi_fim:
-                        # Período anterior: mesmas semanas, ano anterior
-                        ano_anterior = ano - 1
-                        params_anterior = [ano_anterior]
-                        
-                        if semana_epi_inicio and semana_epi_fim:
-                            params_anterior.extend([semana_epi_inicio, semana_epi_fim])
-                        
-                        if doenca_tipo:
-                            params_anterior.append(doenca_tipo)
-                        
-                        cur.execute(query_atual, params_anterior)
-                        rows_anterior = cur.fetchall()
-                        
-                        total_casos_anterior = sum(r['casos_mun'] for r in rows_anterior)
-                        total_obitos_anterior = sum(r.get('total_obitos', 0) or 0 for r in rows_anterior)
-                        
-                        taxa_letalidade_anterior = (total_obitos_anterior / total_casos_anterior * 100) if total_casos_anterior > 0 else 0.0
-                        
-                        incidencias_anterior = []
-                        for row in rows_anterior:
-                            cod_ibge = row['municipio_codigo']
-                            casos = row['casos_mun']
-                            mun_info = MT_MUNICIPIOS.get(cod_ibge)
-                            if mun_info:
-                                inc = (casos / mun_info['pop'] * 100000) if mun_info['pop'] > 0 else 0
-                                incidencias_anterior.append(inc)
-                        
-                        incidencia_media_anterior = sum(incidencias_anterior) / len(incidencias_anterior) if incidencias_anterior else 0.0
-                        
-                        # Calcular variações
-                        variacao_casos = self._calc_variacao(total_casos, total_casos_anterior)
-                        variacao_obitos = self._calc_variacao(total_obitos, total_obitos_anterior)
-                        variacao_letalidade = self._calc_variacao(taxa_letalidade, taxa_letalidade_anterior)
-                        variacao_incidencia = self._calc_variacao(incidencia_media, incidencia_media_anterior)
+                if comparar:
+                    rows_anterior = [r for r in rows if r['casos_mun_anterior'] is not None]
+                    total_casos_anterior = sum(r['casos_mun_anterior'] for r in rows_anterior)
+                    total_obitos_anterior = sum(r['total_obitos_anterior'] or 0 for r in rows_anterior)
+                    
+                    taxa_letalidade_anterior = (total_obitos_anterior / total_casos_anterior * 100) if total_casos_anterior > 0 else 0.0
+                    
+                    incidencias_anterior = self._incidencias(rows_anterior, coluna='casos_mun_anterior')
+                    incidencia_media_anterior = (
+                        float(incidencias_anterior.mean()) if len(incidencias_anterior) else 0.0
+                    )
+                    
+                    # Calcular variações
+                    variacao_casos = self._calc_variacao(total_casos, total_casos_anterior)
+                    variacao_obitos = self._calc_variacao(total_obitos, total_obitos_anterior)
+                    variacao_letalidade = self._calc_variacao(taxa_letalidade, taxa_letalidade_anterior)
+                    variacao_incidencia = self._calc_variacao(incidencia_media, incidencia_media_anterior)
                 
                 # Construir KPI Cards
                 periodo_inicio = f"{ano}-01-01" if not semana_epi_inicio else f"{ano}-W{semana_epi_inicio:02d}"
@@ -233,6 +218,16 @@ class DashboardService:
         finally:
             conn.close()
     
+    def _incidencias(self, rows: List[Dict], coluna: str = 'casos_mun'):
+        """Incidência por município (só municípios do índice), em lote"""
+        casos, populacao = [], []
+        for row in rows:
+            mun_info = self.municipios.get(row['municipio_codigo'])
+            if mun_info:
+                casos.append(row[coluna] or 0)
+                populacao.append(mun_info['pop'])
+        return calcular_incidencia(casos, populacao)
+    
     def _calc_variacao(self, valor_atual: float, valor_anterior: float) -> Optional[KPIVariacao]:
         """Calcula variação entre períodos"""
         if valor_anterior == 0:
@@ -276,11 +271,11 @@ class DashboardService:
         Returns:
             SeriesTemporaisResponse com séries
         """
-        conn = psycopg2.connect(self.conn_str)
+        conn = get_connection(self.conn_str)
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
                 # Montar filtros
-                where_clauses = ["ano = %s"]
+                where_clauses = ["ano_epi = %s"]
                 params = [ano]
                 
                 if doenca_tipo:
@@ -288,7 +283,7 @@ class DashboardService:
                     params.append(doenca_tipo)
                 
                 if codigo_ibge:
-                    where_clauses.append("municipio_codigo = %s")
+                    where_clauses.append("municipio_cod_ibge = %s")
                     params.append(codigo_ibge)
                 
                 where_sql = " AND ".join(where_clauses)
@@ -298,10 +293,10 @@ class DashboardService:
                     group_field = "semana_epi"
                     date_format = f"{ano}-W%02d"
                 elif periodo_agregacao == PeriodoAgregacao.MENSAL:
-                    group_field = "EXTRACT(MONTH FROM data_notificacao)"
+                    group_field = "EXTRACT(MONTH FROM semana_inicio)"
                     date_format = f"{ano}-%02d"
                 else:  # ANUAL
-                    group_field = "ano"
+                    group_field = "ano_epi"
                     date_format = "%d"
                 
                 # Query de série temporal
@@ -311,19 +306,19 @@ class DashboardService:
                             semana_epi,
                             SUM(casos_confirmados) as casos,
                             SUM(obitos) as obitos
-                        FROM indicador_epi
+                        FROM indicador_epi_semanal
                         WHERE {where_sql}
                         GROUP BY semana_epi
                         ORDER BY semana_epi
                     """
                 else:
-                    # Mensal ou anual (ajustar conforme schema real)
+                    # Mensal (mês do início da semana epi) ou anual
                     query = f"""
                         SELECT 
                             {group_field} as periodo,
                             SUM(casos_confirmados) as casos,
                             SUM(obitos) as obitos
-                        FROM indicador_epi
+                        FROM indicador_epi_semanal
                         WHERE {where_sql}
                         GROUP BY {group_field}
                         ORDER BY {group_field}
@@ -413,119 +408,303 @@ class DashboardService:
         Returns:
             TopNResponse com ranking
         """
-        conn = psycopg2.connect(self.conn_str)
+        ranking_data, total_items = self._ranking(
+            ano, tipo_indicador, semana_epi_inicio, semana_epi_fim, doenca_tipo, limite
+        )
+        
+        # Construir itens do ranking (top N)
+        ranking_items = [
+            ItemRanking(
+                posicao=item['posicao'],
+                codigo_ibge=item['codigo_ibge'],
+                nome=item['nome'],
+                valor=round(item['valor'], 2),
+                valor_secundario=float(item['populacao']) if item['populacao'] is not None else None,
+                percentual=round(item['percentual'], 2),
+                nivel_risco=item['nivel_risco'],
+                cor_hex=item['cor_hex']
+            )
+            for item in ranking_data
+        ]
+        
+        # Unidade
+        unidade = "casos" if tipo_indicador == "casos" else "óbitos" if tipo_indicador == "obitos" else "/100k hab"
+        
+        periodo_inicio = f"{ano}-01-01" if not semana_epi_inicio else f"{ano}-W{semana_epi_inicio:02d}"
+        periodo_fim = f"{ano}-12-31" if not semana_epi_fim else f"{ano}-W{semana_epi_fim:02d}"
+        
+        return TopNResponse(
+            ranking=ranking_items,
+            tipo_indicador=tipo_indicador,
+            unidade=unidade,
+            total_items=total_items,
+            limite=limite,
+            periodo_inicio=periodo_inicio,
+            periodo_fim=periodo_fim,
+            agregacao="municipio"
+        )
+    
+    def get_top_n_arrow(
+        self,
+        ano: int,
+        limite: int = 10,
+        tipo_indicador: str = "casos",
+        semana_epi_inicio: Optional[int] = None,
+        semana_epi_fim: Optional[int] = None,
+        doenca_tipo: Optional[str] = None
+    ) -> bytes:
+        """
+        Top N em Arrow IPC stream (uma linha por posição do ranking)
+        
+        Mesmos valores de get_top_n, sem arredondamento: posicao,
+        codigo_ibge, nome, valor, casos, populacao, percentual, nivel_risco.
+        Tipo do indicador e total de municípios vão nos metadados do schema.
+        """
+        top, total_items = self._ranking(
+            ano, tipo_indicador, semana_epi_inicio, semana_epi_fim, doenca_tipo, limite
+        )
+        
+        return tabela_ipc(
+            {
+                "posicao": [item['posicao'] for item in top],
+                "codigo_ibge": [item['codigo_ibge'] for item in top],
+                "nome": [item['nome'] for item in top],
+                "valor": [float(item['valor']) for item in top],
+                "casos": [int(item['casos']) for item in top],
+                "populacao": [item['populacao'] for item in top],
+                "percentual": [item['percentual'] for item in top],
+                "nivel_risco": [item['nivel_risco'] for item in top],
+            },
+            {
+                "posicao": "int16", "codigo_ibge": "string", "nome": "string",
+                "valor": "float64", "casos": "int64", "populacao": "int64",
+                "percentual": "float64", "nivel_risco": "dictionary",
+            },
+            metadata={
+                "tipo_indicador": tipo_indicador,
+                "ano": ano,
+                "total_items": total_items,
+            }
+        )
+    
+    def _ranking(
+        self,
+        ano: int,
+        tipo_indicador: str,
+        semana_epi_inicio: Optional[int],
+        semana_epi_fim: Optional[int],
+        doenca_tipo: Optional[str],
+        limite: int
+    ) -> Tuple[List[Dict], int]:
+        """
+        Top N já ranqueado no banco e total de municípios com dados
+        
+        Posição (RANK), percentual do total de casos (SUM() OVER ()) e classe
+        de risco (width_bucket nos mesmos limiares de app.services.incidencia)
+        saem da consulta; só as ``limite`` primeiras linhas são transferidas.
+        
+        Município sem população (NULL ou 0) fica sem incidência nem classe de
+        risco e não entra no ranking por incidência.
+        """
+        coluna = COLUNAS_RANKING.get(tipo_indicador, "incidencia")
+        
+        # Montar filtros
+        where_clauses = ["s.ano_epi = %s"]
+        params: List = [ano]
+        
+        if semana_epi_inicio and semana_epi_fim:
+            where_clauses.append("s.semana_epi BETWEEN %s AND %s")
+            params.extend([semana_epi_inicio, semana_epi_fim])
+        
+        if doenca_tipo:
+            where_clauses.append("s.doenca_tipo = %s")
+            params.append(doenca_tipo)
+        
+        where_sql = " AND ".join(where_clauses)
+        params.extend([list(LIMIARES_INCIDENCIA), limite])
+        
+        query = f"""
+            WITH agregado AS (
+                SELECT 
+                    s.municipio_cod_ibge as codigo_ibge,
+                    mi.nome,
+                    NULLIF(mi.populacao_estimada_2025, 0) as populacao,
+                    SUM(s.casos_confirmados)::bigint as casos,
+                    SUM(s.obitos)::bigint as obitos
+                FROM indicador_epi_semanal s
+                JOIN municipios_ibge mi ON mi.codigo_ibge = s.municipio_cod_ibge
+                WHERE {where_sql}
+                GROUP BY s.municipio_cod_ibge, mi.nome, mi.populacao_estimada_2025
+            ),
+            indicadores AS (
+                SELECT 
+                    *,
+                    casos * 100000.0 / populacao as incidencia
+                FROM agregado
+            )
+            SELECT 
+                codigo_ibge,
+                nome,
+                populacao,
+                casos,
+                {coluna}::float8 as valor,
+                RANK() OVER (ORDER BY {coluna} DESC) as posicao,
+                COALESCE(casos * 100.0 / NULLIF(SUM(casos) OVER (), 0), 0)::float8 as percentual,
+                width_bucket(incidencia, %s::numeric[]) as risco,
+                COUNT(*) OVER () as total
+            FROM indicadores
+            {"WHERE incidencia IS NOT NULL" if coluna == "incidencia" else ""}
+            ORDER BY {coluna} DESC, codigo_ibge
+            LIMIT %s
+        """
+        
+        conn = get_connection(self.conn_str)
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                # Montar filtros
-                where_clauses = ["ano = %s"]
-                params = [ano]
-                
-                if semana_epi_inicio and semana_epi_fim:
-                    where_clauses.append("semana_epi BETWEEN %s AND %s")
-                    params.extend([semana_epi_inicio, semana_epi_fim])
-                
-                if doenca_tipo:
-                    where_clauses.append("doenca_tipo = %s")
-                    params.append(doenca_tipo)
-                
-                where_sql = " AND ".join(where_clauses)
-                
-                # Query
-                query = f"""
-                    SELECT 
-                        municipio_codigo,
-                        SUM(casos_confirmados) as casos,
-                        SUM(obitos) as obitos
-                    FROM indicador_epi
-                    WHERE {where_sql}
-                    GROUP BY municipio_codigo
-                """
-                
                 cur.execute(query, params)
                 rows = cur.fetchall()
-                
-                # Calcular ranking
-                ranking_data = []
-                total_geral = 0
-                
-                for row in rows:
-                    cod_ibge = row['municipio_codigo']
-                    casos = row['casos'] or 0
-                    obitos = row['obitos'] or 0
-                    
-                    mun_info = MT_MUNICIPIOS.get(cod_ibge)
-                    if not mun_info:
-                        continue
-                    
-                    # Calcular valor conforme indicador
-                    if tipo_indicador == "casos":
-                        valor = casos
-                    elif tipo_indicador == "obitos":
-                        valor = obitos
-                    else:  # incidencia
-                        valor = (casos / mun_info['pop'] * 100000) if mun_info['pop'] > 0 else 0
-                    
-                    total_geral += casos  # Para calcular %
-                    
-                    # Classificar risco
-                    incidencia = (casos / mun_info['pop'] * 100000) if mun_info['pop'] > 0 else 0
-                    nivel_risco, cor = self._classificar_risco_incidencia(incidencia)
-                    
-                    ranking_data.append({
-                        'codigo_ibge': cod_ibge,
-                        'nome': mun_info['nome'],
-                        'valor': valor,
-                        'casos': casos,
-                        'populacao': mun_info['pop'],
-                        'nivel_risco': nivel_risco,
-                        'cor_hex': cor
-                    })
-                
-                # Ordenar por valor (desc)
-                ranking_data.sort(key=lambda x: x['valor'], reverse=True)
-                
-                # Construir itens do ranking (top N)
-                ranking_items = []
-                for i, item in enumerate(ranking_data[:limite], start=1):
-                    percentual = (item['casos'] / total_geral * 100) if total_geral > 0 else 0
-                    
-                    ranking_items.append(ItemRanking(
-                        posicao=i,
-                        codigo_ibge=item['codigo_ibge'],
-                        nome=item['nome'],
-                        valor=round(item['valor'], 2),
-                        valor_secundario=float(item['populacao']),
-                        percentual=round(percentual, 2),
-                        nivel_risco=item['nivel_risco'],
-                        cor_hex=item['cor_hex']
-                    ))
-                
-                # Unidade
-                unidade = "casos" if tipo_indicador == "casos" else "óbitos" if tipo_indicador == "obitos" else "/100k hab"
-                
-                periodo_inicio = f"{ano}-01-01" if not semana_epi_inicio else f"{ano}-W{semana_epi_inicio:02d}"
-                periodo_fim = f"{ano}-12-31" if not semana_epi_fim else f"{ano}-W{semana_epi_fim:02d}"
-                
-                return TopNResponse(
-                    ranking=ranking_items,
-                    tipo_indicador=tipo_indicador,
-                    unidade=unidade,
-                    total_items=len(ranking_data),
-                    limite=limite,
-                    periodo_inicio=periodo_inicio,
-                    periodo_fim=periodo_fim,
-                    agregacao="municipio"
-                )
         finally:
             conn.close()
+        
+        ranking_data = [
+            dict(
+                row,
+                nivel_risco=CLASSES_RISCO[row['risco']] if row['risco'] is not None else None,
+                cor_hex=CORES_RISCO[row['risco']] if row['risco'] is not None else None
+            )
+            for row in rows
+        ]
+        total_items = int(rows[0]['total']) if rows else 0
+        
+        return ranking_data, total_items
     
-    def _classificar_risco_incidencia(self, incidencia: float) -> Tuple[str, str]:
-        """Classifica risco baseado na incidência"""
-        if incidencia < 100:
-            return "BAIXO", "#4CAF50"
-        elif incidencia < 300:
-            return "MEDIO", "#FFC107"
-        elif incidencia < 500:
-            return "ALTO", "#FF9800"
-        else:
-            return "MUITO_ALTO", "#F44336"
+    def get_drill_down(
+        self,
+        ano: int,
+        nivel: NivelDrillDown = NivelDrillDown.ESTADO,
+        codigo: Optional[str] = None,
+        doenca_tipo: Optional[str] = None,
+        semana_epi: Optional[int] = None
+    ) -> DrillDownDados:
+        """
+        Um passo do drill-down estado → região → município → semana epi
+        
+        Lê do cubo pré-agregado (cubo_epi, V020) numa única consulta: as
+        linhas do nó (total do ano e série semanal, pela PK) e as dos filhos
+        na fatia pedida (pelo índice de filhos). No município não há filhos;
+        o detalhe é a série semanal.
+        
+        Args:
+            ano: Ano epidemiológico
+            nivel: estado, regiao ou municipio
+            codigo: Chave do nó (MT, nome da região ou código IBGE); no
+                estado é sempre MT
+            doenca_tipo: Filtro por doença (opcional; sem ele, todas)
+            semana_epi: Fatia semanal dos totais e dos filhos (opcional;
+                sem ela, o ano inteiro)
+            
+        Returns:
+            DrillDownDados do nó, com filhos ordenados por casos (desc)
+            
+        Raises:
+            LookupError: Nó sem dados no cubo para o ano/doença
+        """
+        chave = CHAVE_ESTADO if nivel == NivelDrillDown.ESTADO else codigo
+        doenca = doenca_tipo or DOENCA_TODAS
+        fatia = semana_epi or 0
+        nivel_filhos = NIVEL_FILHO[nivel]
+        
+        condicoes = ["(nivel = %s AND chave = %s)"]
+        params: List = [ano, doenca, nivel.value, chave]
+        if nivel_filhos:
+            condicoes.append("(nivel = %s AND pai = %s AND semana_epi = %s)")
+            params.extend([nivel_filhos.value, chave, fatia])
+        
+        query = f"""
+            SELECT 
+                nivel, chave, nome, semana_epi,
+                casos_confirmados, obitos, casos_graves, populacao
+            FROM cubo_epi
+            WHERE ano_epi = %s
+              AND doenca_tipo = %s
+              AND ({" OR ".join(condicoes)})
+            ORDER BY nivel, semana_epi
+        """
+        
+        conn = get_connection(self.conn_str)
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(query, params)
+                rows = cur.fetchall()
+        finally:
+            conn.close()
+        
+        linhas_no = [r for r in rows if r['nivel'] == nivel.value and r['chave'] == chave]
+        por_semana = {r['semana_epi']: r for r in linhas_no}
+        if 0 not in por_semana:
+            raise LookupError(f"Sem dados para {nivel.value} {chave} em {ano}")
+        # Semana sem casos no nó: totais zerados, mesmo nome/população
+        no = por_semana.get(fatia) or dict(
+            por_semana[0], semana_epi=fatia, casos_confirmados=0, obitos=0, casos_graves=0
+        )
+        
+        filhos = sorted(
+            (r for r in rows if nivel_filhos and r['nivel'] == nivel_filhos.value),
+            key=lambda r: (-r['casos_confirmados'], r['chave'])
+        )
+        
+        # Indicadores do nó e dos filhos em lote (nó na posição 0)
+        linhas = [no] + filhos
+        indicadores = calcular_indicadores(
+            [r['casos_confirmados'] for r in linhas],
+            [r['populacao'] for r in linhas],
+            [r['obitos'] for r in linhas]
+        )
+        incidencia = indicadores.incidencia.tolist()
+        letalidade = indicadores.letalidade.tolist()
+        classes = indicadores.classes()
+        cores = indicadores.cores()
+        
+        serie = SerieTemporal(
+            nome=f"Casos {no['nome']} {ano}",
+            tipo="casos",
+            unidade="casos",
+            dados=[
+                PontoSerie(data=f"{ano}-W{r['semana_epi']:02d}", valor=float(r['casos_confirmados']))
+                for r in linhas_no if r['semana_epi'] > 0
+            ],
+            cor="#FF6B6B"
+        )
+        
+        titulo = f"{no['nome']} - {doenca_tipo or 'Todas'} {ano}"
+        if semana_epi:
+            titulo += f" (semana {semana_epi:02d})"
+        
+        return DrillDownDados(
+            titulo=titulo,
+            nivel=nivel,
+            codigo=chave,
+            semana_epi=semana_epi,
+            total_casos=int(no['casos_confirmados']),
+            total_obitos=int(no['obitos']),
+            incidencia=round(incidencia[0], 2),
+            taxa_letalidade=round(letalidade[0], 2),
+            serie_temporal=serie,
+            nivel_filhos=nivel_filhos,
+            filhos=[
+                ItemDrillDown(
+                    nivel=nivel_filhos,
+                    codigo=r['chave'],
+                    nome=r['nome'],
+                    total_casos=int(r['casos_confirmados']),
+                    total_obitos=int(r['obitos']),
+                    casos_graves=int(r['casos_graves']),
+                    populacao=int(r['populacao']),
+                    incidencia=round(incidencia[i], 2),
+                    taxa_letalidade=round(letalidade[i], 2),
+                    nivel_risco=classes[i],
+                    cor_hex=cores[i]
+                )
+                for i, r in enumerate(filhos, start=1)
+            ]
+        )
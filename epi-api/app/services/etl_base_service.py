@@ -4,13 +4,14 @@ Base Service para ETL - Funcionalidades comuns
 import csv
 import io
 import uuid
-from typing import List, Dict, Any, Optional, Generator
+from typing import List, Dict, Any, Optional, Generator, Tuple
 from datetime import datetime
 from decimal import Decimal
 import psycopg2
 from psycopg2.extras import execute_batch
-import pandas as pd
 
+from app.db import get_connection
+from app.services.csv_stream import LeitorCSV
 from app.schemas.etl import (
     ETLValidationError,
     ETLValidationReport,
@@ -33,8 +34,8 @@ class ETLBaseService:
         self.db_config = db_config
     
     def _get_connection(self):
-        """Cria conexão com banco de dados"""
-        return psycopg2.connect(**self.db_config)
+        """Empresta conexão do pool compartilhado (conn.close() devolve ao pool)"""
+        return get_connection(psycopg2.extensions.make_dsn(**self.db_config))
     
     def create_job(
         self,
@@ -180,87 +181,56 @@ class ETLBaseService:
     def read_csv_file(
         self,
         file_path: str,
-        batch_size: int = 500
+        batch_size: int = 500,
+        leitor: Optional[LeitorCSV] = None
     ) -> Generator[List[Dict[str, Any]], None, None]:
         """
-        Lê arquivo CSV em batches
+        Lê arquivo CSV em batches (streaming, memória limitada ao batch)
         
         Args:
             file_path: Caminho do arquivo (local ou S3)
             batch_size: Tamanho do batch
+            leitor: LeitorCSV já criado, para consultar contagem/checagens
+                depois da leitura (opcional)
             
         Yields:
             List de dicts representando linhas do CSV
         """
         # Se for S3, baixar para temp (implementar depois)
         # Por enquanto, assumir arquivo local
+        leitor = leitor or LeitorCSV(file_path, batch_size)
         
         try:
-            # Usar pandas para leitura robusta
-            df = pd.read_csv(
-                file_path,
-                encoding='utf-8',
-                dtype=str,  # Ler tudo como string inicialmente
-                na_values=['', 'NA', 'N/A', 'null', 'NULL'],
-                keep_default_na=False
-            )
-            
-            # Converter para list of dicts
-            records = df.to_dict('records')
-            
-            # Yield em batches
-            for i in range(0, len(records), batch_size):
-                batch = records[i:i + batch_size]
-                yield batch
-                
-        except Exception as e:
+            yield from leitor.lotes()
+        except (OSError, UnicodeDecodeError, csv.Error, ValueError) as e:
             raise ValueError(f"Erro ao ler CSV: {str(e)}")
     
-    def validate_csv_structure(
+    def scan_csv(
         self,
         file_path: str,
-        required_columns: List[str]
-    ) -> ETLValidationReport:
+        required_columns: List[str],
+        sample_size: int = 0
+    ) -> Tuple[ETLValidationReport, List[Dict[str, Any]]]:
         """
-        Valida estrutura básica do CSV
+        Valida estrutura, conta linhas e separa uma amostra numa única leitura
         
         Args:
             file_path: Caminho do arquivo
             required_columns: Colunas obrigatórias
+            sample_size: Linhas iniciais devolvidas para validação de dados
             
         Returns:
-            ETLValidationReport
+            (ETLValidationReport estrutural, amostra das primeiras linhas)
         """
         errors = []
+        sample: List[Dict[str, Any]] = []
+        leitor = LeitorCSV(file_path, batch_size=max(sample_size, 1))
         
         try:
-            df = pd.read_csv(file_path, nrows=1)
-            columns = df.columns.tolist()
-            
-            # Verificar colunas obrigatórias
-            missing_columns = set(required_columns) - set(columns)
-            if missing_columns:
-                errors.append(ETLValidationError(
-                    row_number=0,
-                    field="columns",
-                    value=list(missing_columns),
-                    error_type="missing_columns",
-                    error_message=f"Colunas obrigatórias faltando: {missing_columns}",
-                    severity="ERROR"
-                ))
-            
-            # Contar linhas
-            df_full = pd.read_csv(file_path)
-            total_rows = len(df_full)
-            
-            return ETLValidationReport(
-                total_rows=total_rows,
-                valid_rows=total_rows if not errors else 0,
-                invalid_rows=total_rows if errors else 0,
-                errors=errors
-            )
-            
-        except Exception as e:
+            if sample_size > 0:
+                sample = next(leitor.lotes(), [])
+            leitor.finalizar()
+        except (OSError, UnicodeDecodeError, csv.Error, ValueError) as e:
             errors.append(ETLValidationError(
                 row_number=0,
                 field="file",
@@ -275,7 +245,160 @@ class ETLBaseService:
                 valid_rows=0,
                 invalid_rows=0,
                 errors=errors
-            )
+            ), []
+        
+        # Verificar colunas obrigatórias
+        missing_columns = leitor.colunas_faltando(required_columns)
+        if missing_columns:
+            errors.append(ETLValidationError(
+                row_number=0,
+                field="columns",
+                value=missing_columns,
+                error_type="missing_columns",
+                error_message=f"Colunas obrigatórias faltando: {set(missing_columns)}",
+                severity="ERROR"
+            ))
+        
+        # Linhas com mais campos que o cabeçalho (row_number = linha física)
+        for row_number in leitor.linhas_malformadas:
+            errors.append(ETLValidationError(
+                row_number=row_number,
+                field="row",
+                value=None,
+                error_type="malformed_row",
+                error_message=f"Linha com mais campos que o cabeçalho ({len(leitor.colunas)})",
+                severity="ERROR"
+            ))
+        
+        total_rows = leitor.total_linhas
+        invalid_rows = total_rows if missing_columns else leitor.total_malformadas
+        
+        return ETLValidationReport(
+            total_rows=total_rows,
+            valid_rows=total_rows - invalid_rows,
+            invalid_rows=invalid_rows,
+            errors=errors
+        ), sample
+    
+    def erros_linhas_malformadas(self, leitor: LeitorCSV) -> List[Dict[str, Any]]:
+        """
+        Erros de linha para as linhas com mais campos que o cabeçalho
+        
+        Essas linhas ficam fora dos lotes do LeitorCSV (não são importadas);
+        cada erro traz o número da linha física no arquivo.
+        
+        Args:
+            leitor: LeitorCSV já percorrido
+            
+        Returns:
+            Lista de erros no formato dos batches ({'row', 'error'})
+        """
+        return [
+            {
+                'row': {'linha': numero},
+                'error': f"Linha {numero}: mais campos que o cabeçalho "
+                         f"({len(leitor.colunas)}); linha ignorada"
+            }
+            for numero in leitor.linhas_malformadas
+        ]
+    
+    def validate_csv_structure(
+        self,
+        file_path: str,
+        required_columns: List[str]
+    ) -> ETLValidationReport:
+        """
+        Valida estrutura básica do CSV (cabeçalho, linhas malformadas, contagem)
+        
+        Args:
+            file_path: Caminho do arquivo
+            required_columns: Colunas obrigatórias
+            
+        Returns:
+            ETLValidationReport
+        """
+        report, _ = self.scan_csv(file_path, required_columns)
+        return report
+    
+    def copy_upsert(
+        self,
+        conn,
+        tabela: str,
+        colunas: List[str],
+        linhas: List[Tuple],
+        chave: List[str],
+        atualizar: Optional[List[str]] = None,
+        condicao: Optional[str] = None,
+        predicado_chave: Optional[str] = None
+    ) -> Dict[str, int]:
+        """
+        Carga em lote: COPY para tabela de staging + um único INSERT ... ON CONFLICT
+        
+        A staging é temporária (não gera WAL, visível só na sessão) e
+        descartada no commit. As linhas precisam ter chave única entre si
+        (o ON CONFLICT não atualiza a mesma linha duas vezes num comando).
+        Não faz commit: roda na transação de quem chama.
+        
+        Args:
+            conn: Conexão DB
+            tabela: Tabela de destino
+            colunas: Colunas carregadas, na ordem das tuplas
+            linhas: Tuplas de valores (None vira NULL)
+            chave: Colunas do ON CONFLICT
+            atualizar: Colunas sobrescritas no conflito (None/vazio = DO NOTHING)
+            condicao: WHERE opcional do DO UPDATE; o destino é referenciado
+                como ``t`` (ex: ``t.ivo IS NULL``)
+            predicado_chave: Predicado do índice único parcial da chave
+                (ex: ``dedup_key IS NOT NULL``), necessário para o ON CONFLICT
+                inferir o índice
+            
+        Returns:
+            Dict com 'inseridos' e 'atualizados' (linhas efetivamente gravadas)
+        """
+        if not linhas:
+            return {'inseridos': 0, 'atualizados': 0}
+        
+        lista = ", ".join(colunas)
+        staging = f"_stg_{tabela}"
+        alvo = f"({', '.join(chave)})"
+        if predicado_chave:
+            alvo += f" WHERE {predicado_chave}"
+        
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(linhas)
+        buffer.seek(0)
+        
+        if atualizar:
+            conflito = "DO UPDATE SET " + ", ".join(f"{c} = EXCLUDED.{c}" for c in atualizar)
+            if condicao:
+                conflito += f" WHERE {condicao}"
+        else:
+            conflito = "DO NOTHING"
+        
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                CREATE TEMP TABLE {staging} ON COMMIT DROP AS
+                SELECT {lista} FROM {tabela} WITH NO DATA
+            """)
+            cur.copy_expert(f"COPY {staging} ({lista}) FROM STDIN WITH (FORMAT csv)", buffer)
+            # xmax = 0 na linha retornada: inserida agora; senão, atualizada
+            cur.execute(f"""
+                WITH gravadas AS (
+                    INSERT INTO {tabela} AS t ({lista})
+                    SELECT {lista} FROM {staging}
+                    ON CONFLICT {alvo} {conflito}
+                    RETURNING (t.xmax = 0) AS inserida
+                )
+                SELECT
+                    COUNT(*) FILTER (WHERE inserida),
+                    COUNT(*) FILTER (WHERE NOT inserida)
+                FROM gravadas
+            """)
+            inseridos, atualizados = cur.fetchone()
+            # Mais de uma carga na mesma transação: recria a staging
+            cur.execute(f"DROP TABLE {staging}")
+        
+        return {'inseridos': inseridos, 'atualizados': atualizados}
     
     def calculate_liraa_indices(
         self,
@@ -342,7 +465,7 @@ class ETLBaseService:
     
     def count_total_rows(self, file_path: str) -> int:
         """
-        Conta total de linhas no CSV (excluindo header)
+        Conta total de linhas no CSV (excluindo header), em streaming
         
         Args:
             file_path: Caminho do arquivo
@@ -351,7 +474,6 @@ class ETLBaseService:
             Total de linhas
         """
         try:
-            df = pd.read_csv(file_path)
-            return len(df)
+            return LeitorCSV(file_path).finalizar().total_linhas
         except Exception:
             return 0
@@ -3,12 +3,16 @@ ETL EPI Validator Service
 Validates CSV-EPI01 files and generates quality reports
 """
 from datetime import datetime, date
-from typing import List, Dict, Tuple, Optional
+from typing import Any, List, Dict, Tuple, Optional
+import numpy as np
 import pandas as pd
 from pydantic import ValidationError as PydanticValidationError
 
 from app.schemas.etl_epi import (
+    ClassificacaoFinal,
+    CriterioConfirmacao,
     EPIRecordCSV,
+    Evolucao,
     ValidationError,
     ValidationWarning,
     ETLQualityReport,
@@ -16,6 +20,11 @@ from app.schemas.etl_epi import (
 )
 
 
+def _fullmatch(coluna: pd.Series, padrao: str) -> np.ndarray:
+    """Boolean mask of cells fully matching ``padrao`` (missing cells are False)"""
+    return coluna.str.fullmatch(padrao).fillna(False).to_numpy(dtype=bool)
+
+
 class EPIValidator:
     """Validates EPI CSV files and generates quality reports"""
     
@@ -31,15 +40,47 @@ class EPIValidator:
         "evolucao", "dt_obito", "dt_encerramento"
     ]
     
+    # Column groups for the column-wise checks
+    DATE_COLUMNS = ["dt_notificacao", "dt_sintomas", "dt_obito", "dt_encerramento"]
+    FLAG_COLUMNS = REQUIRED_COLUMNS[8:23]
+    OPTIONAL_COLUMNS = {"gestante", "dt_obito", "dt_encerramento"}
+    DOMAINS = {
+        "sexo": ["M", "F", "I"],
+        "classificacao_final": [c.value for c in ClassificacaoFinal],
+        "criterio_confirmacao": [c.value for c in CriterioConfirmacao],
+        "evolucao": [e.value for e in Evolucao],
+    }
+    GESTANTE_CODES = list("123489N")
+    
     def __init__(self):
         self.erros: List[ValidationError] = []
         self.avisos: List[ValidationWarning] = []
-        self.valid_records: List[EPIRecordCSV] = []
+        self._validos: Optional[Dict[str, np.ndarray]] = None
+        self._recuperados: Dict[int, EPIRecordCSV] = {}
+        self._valid_records: Optional[List[EPIRecordCSV]] = None
+    
+    @property
+    def valid_records(self) -> List[EPIRecordCSV]:
+        """Valid rows as EPIRecordCSV, built on first access (the report doesn't need them)"""
+        if self._valid_records is None:
+            self._valid_records = (
+                self._build_records(self._validos, self._recuperados)
+                if self._validos is not None else []
+            )
+        return self._valid_records
         
     def validate_csv(self, filepath: str, filename: str) -> ETLQualityReport:
         """
         Validate a CSV-EPI01 file and return quality report.
         
+        Field rules are evaluated as boolean masks over the whole DataFrame
+        and only accept canonical values (ISO dates, plain digits, exact
+        codes). Rows rejected by the masks are re-validated one by one with
+        EPIRecordCSV, which stays authoritative: it produces the error
+        messages and still accepts values the masks are too strict for
+        (e.g. surrounding whitespace). Cross-field rules then run as masks
+        over all valid rows, so objects are built only for failing cells.
+        
         Args:
             filepath: Path to the CSV file
             filename: Original filename (for reporting)
@@ -49,7 +90,9 @@ class EPIValidator:
         """
         self.erros = []
         self.avisos = []
-        self.valid_records = []
+        self._validos = None
+        self._recuperados = {}
+        self._valid_records = None
         
         try:
             # Read CSV with pandas
@@ -68,27 +111,37 @@ class EPIValidator:
                 f"Colunas obrigatórias ausentes: {', '.join(missing_cols)}"
             )
         
-        # Validate each row
-        for idx, row in df.iterrows():
-            linha_num = idx + 2  # +2 because: 0-indexed + 1 (skip header line)
-            self._validate_row(linha_num, row)
+        # Column-wise field checks
+        colunas, aprovadas = self._parse_columns(df)
+        
+        # Rows rejected by the masks: per-row Pydantic validation
+        rejeitadas = np.flatnonzero(~aprovadas)
+        recuperados: Dict[int, EPIRecordCSV] = {}
+        for idx, row in zip(rejeitadas.tolist(), df.iloc[rejeitadas].astype(object).to_dict("records")):
+            record = self._validate_row(idx + 2, row)  # +2: 0-indexed + header line
+            if record is not None:
+                recuperados[idx] = record
+        
+        validos = self._valid_columns(colunas, aprovadas, recuperados)
+        self._validate_cross_fields(validos)
+        self._validos, self._recuperados = validos, recuperados
+        
+        # Row order, as if validated sequentially (a row has either field
+        # errors or the date-order error, never both)
+        self.erros.sort(key=lambda e: e.linha)
         
         # Build quality report
-        linhas_validas = len(self.valid_records)
+        linhas_validas = len(validos["linha"])
         linhas_com_erro = len({e.linha for e in self.erros})
         linhas_com_aviso = len({a.linha for a in self.avisos})
         
         # Calculate statistics from valid records
-        periodo_inicio, periodo_fim = self._calc_periodo(self.valid_records)
-        municipios_unicos = len({r.municipio_cod_ibge for r in self.valid_records})
-        total_confirmados = sum(
-            1 for r in self.valid_records
-            if r.classificacao_final.startswith("DENGUE")
-        )
-        total_obitos = sum(
-            1 for r in self.valid_records
-            if r.evolucao == "OBITO"
-        )
+        periodo_inicio, periodo_fim = self._calc_periodo(validos["dt_sintomas"])
+        municipios_unicos = len(set(validos["municipio_cod_ibge"].tolist()))
+        total_confirmados = int(np.char.startswith(
+            validos["classificacao_final"].astype(str), "DENGUE"
+        ).sum())
+        total_obitos = int((validos["evolucao"] == "OBITO").sum())
         
         taxa_qualidade = (linhas_validas / total_linhas * 100) if total_linhas > 0 else 0.0
         
@@ -113,20 +166,63 @@ class EPIValidator:
             aprovado_para_carga=aprovado
         )
     
-    def _validate_row(self, linha: int, row: pd.Series) -> None:
-        """Validate a single CSV row"""
+    def _parse_columns(self, df: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """
+        Parse and check every field rule column-wise.
+        
+        Returns the typed columns (dates as datetime64[D], integers as
+        int64) and a mask of rows whose cells are all canonical and valid.
+        Anything else is left for the per-row path.
+        """
+        hoje = np.datetime64(date.today(), "D")
+        presente = df.notna()
+        aprovadas = np.ones(len(df), dtype=bool)
+        colunas: Dict[str, np.ndarray] = {}
+        
+        for col in self.DATE_COLUMNS:
+            canonica = _fullmatch(df[col], r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+            datas = pd.to_datetime(df[col].where(canonica), format="%Y-%m-%d", errors="coerce")
+            colunas[col] = datas.to_numpy(dtype="datetime64[D]")
+            ok = ~np.isnat(colunas[col])
+            if col in self.OPTIONAL_COLUMNS:
+                ok |= ~presente[col].to_numpy()
+            aprovadas &= ok
+        # Future dates (field validators); NaT compares False
+        aprovadas &= colunas["dt_sintomas"] <= hoje
+        aprovadas &= np.isnat(colunas["dt_obito"]) | (colunas["dt_obito"] <= hoje)
+        
+        # IBGE code: 7 digits, MT state prefix
+        aprovadas &= _fullmatch(df["municipio_cod_ibge"], r"51[0-9]{5}")
+        
+        # Code domains
+        for col, valores in self.DOMAINS.items():
+            aprovadas &= df[col].isin(valores).to_numpy()
+        aprovadas &= (~presente["gestante"] | df["gestante"].isin(self.GESTANTE_CODES)).to_numpy()
+        
+        # Integers: plain digits within range
+        idade = pd.to_numeric(df["idade"].where(_fullmatch(df["idade"], r"[0-9]{1,3}")), errors="coerce")
+        aprovadas &= (idade <= 120).to_numpy()
+        colunas["idade"] = idade.fillna(-1).to_numpy(dtype=np.int64)
+        
+        flags = df[self.FLAG_COLUMNS]
+        aprovadas &= flags.isin(["0", "1"]).all(axis=1).to_numpy()
+        for col in self.FLAG_COLUMNS:
+            colunas[col] = (flags[col] == "1").to_numpy(dtype=np.int64)
+        
+        for col in ["municipio_cod_ibge", "gestante", *self.DOMAINS]:
+            colunas[col] = df[col].to_numpy(dtype=object)
+        colunas["gestante"] = np.where(presente["gestante"].to_numpy(), colunas["gestante"], None)
+        
+        return colunas, aprovadas
+    
+    def _validate_row(self, linha: int, row: Dict[str, Any]) -> Optional[EPIRecordCSV]:
+        """Validate a single CSV row with Pydantic; returns the record if valid"""
         try:
-            # Convert pandas row to dict, handle NaN/None
-            row_dict = row.where(pd.notna(row), None).to_dict()
+            # Handle NaN/None
+            row_dict = {campo: (None if pd.isna(valor) else valor) for campo, valor in row.items()}
             
             # Try to parse with Pydantic
-            record = EPIRecordCSV(**row_dict)
-            
-            # Additional cross-field validations
-            self._validate_cross_fields(linha, record)
-            
-            # If all OK, add to valid records
-            self.valid_records.append(record)
+            return EPIRecordCSV(**row_dict)
             
         except PydanticValidationError as e:
             # Pydantic validation failed
@@ -148,71 +244,123 @@ class EPIValidator:
                 erro=f"Erro inesperado: {str(e)}",
                 severidade="ERRO"
             ))
+        return None
     
-    def _validate_cross_fields(self, linha: int, record: EPIRecordCSV) -> None:
-        """Validate relationships between fields"""
+    def _valid_columns(
+        self,
+        colunas: Dict[str, np.ndarray],
+        aprovadas: np.ndarray,
+        recuperados: Dict[int, EPIRecordCSV]
+    ) -> Dict[str, np.ndarray]:
+        """Typed columns of all valid rows (mask-approved + recovered), in file order"""
+        indices = np.flatnonzero(aprovadas)
+        validos = {col: valores[aprovadas] for col, valores in colunas.items()}
+        validos["linha"] = indices + 2
+        if recuperados:
+            extra = {
+                col: np.array(
+                    [getattr(r, col) for r in recuperados.values()],
+                    dtype=valores.dtype if valores.dtype.kind == "M" else object
+                )
+                for col, valores in validos.items() if col != "linha"
+            }
+            extra["linha"] = np.fromiter(recuperados, dtype=np.int64) + 2
+            ordem = np.argsort(np.concatenate([validos["linha"], extra["linha"]]), kind="stable")
+            validos = {
+                col: np.concatenate([validos[col], extra[col]])[ordem]
+                for col in validos
+            }
+        return validos
+    
+    def _validate_cross_fields(self, validos: Dict[str, np.ndarray]) -> None:
+        """Validate relationships between fields (masks over all valid rows)"""
+        linhas = validos["linha"]
+        evolucao = validos["evolucao"]
+        gestante = validos["gestante"]
+        tem_obito = ~np.isnat(validos["dt_obito"])
         
         # dt_sintomas must be <= dt_notificacao
-        if record.dt_sintomas > record.dt_notificacao:
+        for i in np.flatnonzero(validos["dt_sintomas"] > validos["dt_notificacao"]).tolist():
             self.erros.append(ValidationError(
-                linha=linha,
+                linha=int(linhas[i]),
                 campo="dt_sintomas",
-                valor=str(record.dt_sintomas),
+                valor=str(validos["dt_sintomas"][i]),
                 erro="Data de sintomas posterior à data de notificação",
                 severidade="ERRO"
             ))
         
-        # If evolucao = OBITO, dt_obito should be present
-        if record.evolucao == "OBITO" and record.dt_obito is None:
-            self.avisos.append(ValidationWarning(
-                linha=linha,
-                campo="dt_obito",
-                valor="null",
-                aviso="Evolução = OBITO mas dt_obito não informada"
-            ))
-        
-        # If dt_obito present, evolucao should be OBITO
-        if record.dt_obito is not None and record.evolucao != "OBITO":
-            self.avisos.append(ValidationWarning(
-                linha=linha,
-                campo="evolucao",
-                valor=record.evolucao,
-                aviso=f"dt_obito informada mas evolucao = {record.evolucao}"
-            ))
-        
         # Gestante only for females aged 10-49
-        if record.gestante and record.gestante not in ["N", "9"]:
-            if record.sexo != "F":
-                self.avisos.append(ValidationWarning(
-                    linha=linha,
-                    campo="gestante",
-                    valor=record.gestante,
-                    aviso="Campo gestante preenchido para sexo != F"
-                ))
-            if record.idade < 10 or record.idade > 49:
-                self.avisos.append(ValidationWarning(
-                    linha=linha,
-                    campo="gestante",
-                    valor=record.gestante,
-                    aviso="Gestante informada para idade fora da faixa 10-49"
-                ))
+        gestante_informada = pd.notna(gestante) & ~np.isin(gestante, ["N", "9"])
+        idade = validos["idade"]
         
-        # Classification consistency
-        if record.classificacao_final == "DESCARTADO":
-            if record.criterio_confirmacao == "LABORATORIAL":
-                self.avisos.append(ValidationWarning(
-                    linha=linha,
-                    campo="classificacao_final",
-                    valor=record.classificacao_final,
-                    aviso="Caso DESCARTADO com critério LABORATORIAL (incomum)"
-                ))
+        # Warning rules in per-row order: (mask, campo, valor, aviso)
+        regras = [
+            # If evolucao = OBITO, dt_obito should be present
+            (evolucao == "OBITO") & ~tem_obito,
+            # If dt_obito present, evolucao should be OBITO
+            tem_obito & (evolucao != "OBITO"),
+            gestante_informada & (validos["sexo"] != "F"),
+            gestante_informada & ((idade < 10) | (idade > 49)),
+            # Classification consistency
+            (validos["classificacao_final"] == "DESCARTADO")
+            & (validos["criterio_confirmacao"] == "LABORATORIAL"),
+        ]
+        avisos = []
+        for ordem, mascara in enumerate(regras):
+            for i in np.flatnonzero(mascara).tolist():
+                avisos.append((int(linhas[i]), ordem, self._build_warning(ordem, validos, i)))
+        avisos.sort(key=lambda a: a[:2])
+        self.avisos = [a for _, _, a in avisos]
+    
+    def _build_warning(self, regra: int, validos: Dict[str, np.ndarray], i: int) -> ValidationWarning:
+        """Warning for cross-field rule ``regra`` at valid row ``i``"""
+        linha = int(validos["linha"][i])
+        if regra == 0:
+            return ValidationWarning(
+                linha=linha, campo="dt_obito", valor="null",
+                aviso="Evolução = OBITO mas dt_obito não informada"
+            )
+        if regra == 1:
+            evolucao = validos["evolucao"][i]
+            return ValidationWarning(
+                linha=linha, campo="evolucao", valor=evolucao,
+                aviso=f"dt_obito informada mas evolucao = {evolucao}"
+            )
+        if regra == 2:
+            return ValidationWarning(
+                linha=linha, campo="gestante", valor=validos["gestante"][i],
+                aviso="Campo gestante preenchido para sexo != F"
+            )
+        if regra == 3:
+            return ValidationWarning(
+                linha=linha, campo="gestante", valor=validos["gestante"][i],
+                aviso="Gestante informada para idade fora da faixa 10-49"
+            )
+        return ValidationWarning(
+            linha=linha, campo="classificacao_final", valor=validos["classificacao_final"][i],
+            aviso="Caso DESCARTADO com critério LABORATORIAL (incomum)"
+        )
+    
+    def _build_records(
+        self,
+        validos: Dict[str, np.ndarray],
+        recuperados: Dict[int, EPIRecordCSV]
+    ) -> List[EPIRecordCSV]:
+        """EPIRecordCSV per valid row; mask-approved rows skip re-validation"""
+        valores = [validos[col].tolist() for col in self.REQUIRED_COLUMNS]
+        records = []
+        for linha, campos in zip(validos["linha"].tolist(), zip(*valores)):
+            record = recuperados.get(linha - 2)
+            if record is None:
+                record = EPIRecordCSV.model_construct(**dict(zip(self.REQUIRED_COLUMNS, campos)))
+            records.append(record)
+        return records
     
-    def _calc_periodo(self, records: List[EPIRecordCSV]) -> Tuple[Optional[date], Optional[date]]:
+    def _calc_periodo(self, datas: np.ndarray) -> Tuple[Optional[date], Optional[date]]:
         """Calculate min and max symptom dates"""
-        if not records:
+        if not len(datas):
             return None, None
-        dates = [r.dt_sintomas for r in records]
-        return min(dates), max(dates)
+        return datas.min().tolist(), datas.max().tolist()
     
     def _build_fatal_error_report(self, filename: str, error_msg: str) -> ETLQualityReport:
         """Build error report for fatal validation errors"""
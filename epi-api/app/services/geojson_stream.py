@@ -0,0 +1,88 @@
+"""
+Serialização incremental de FeatureCollections GeoJSON
+
+No modo normal a camada de incidência monta até ``max_features`` objetos
+Pydantic, o FastAPI valida o modelo de resposta e serializa o documento
+inteiro de uma vez: memória de pico e tempo até o primeiro byte crescem
+linearmente com o número de features.
+
+No modo streaming as features são dicts simples (sem Pydantic) escritos um a
+um, agrupados em blocos de ``GEOJSON_STREAM_CHUNK_KB`` (default 64), com
+``orjson`` quando instalado (fallback: ``json`` da biblioteca padrão). O
+envelope segue o formato de ``MapaCamadasResponse``; os totais, conhecidos
+só no fim, são escritos depois de ``data`` (a ordem das chaves não importa
+em JSON).
+
+Configuração (variáveis de ambiente):
+    GEOJSON_STREAM_CHUNK_KB   tamanho aproximado de cada bloco enviado
+"""
+import json
+import os
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """JSON compacto em bytes (orjson quando disponível)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def _chunk_bytes() -> int:
+    return int(os.getenv("GEOJSON_STREAM_CHUNK_KB", "64")) * 1024
+
+
+def stream_feature_collection(
+    cabecalho: Dict[str, Any],
+    features: Iterable[Dict[str, Any]],
+    resumo: Callable[[], Dict[str, Any]],
+    chunk_bytes: Optional[int] = None
+) -> Iterator[bytes]:
+    """
+    Gera o documento ``{**cabecalho, "data": FeatureCollection, **resumo()}``
+    em blocos.
+
+    Args:
+        cabecalho: Campos escritos antes das features
+        features: Features GeoJSON (dicts), consumidas uma vez
+        resumo: Chamado depois da última feature; campos finais (totais, metadata)
+        chunk_bytes: Tamanho aproximado de cada bloco (default: env)
+
+    Yields:
+        Blocos de bytes cuja concatenação é um JSON válido
+    """
+    limite = chunk_bytes or _chunk_bytes()
+
+    inicio = dumps(cabecalho)
+    # '{"a":1}' → '{"a":1,' ; cabeçalho vazio '{}' → '{'
+    buffer = bytearray(inicio[:-1] + (b"," if len(inicio) > 2 else b""))
+    buffer += b'"data":{"type":"FeatureCollection","features":['
+
+    primeira = True
+    try:
+        for feature in features:
+            if not primeira:
+                buffer += b","
+            buffer += dumps(feature)
+            primeira = False
+            if len(buffer) >= limite:
+                yield bytes(buffer)
+                buffer.clear()
+    finally:
+        # Consumidor parou antes do fim: libera o cursor da origem já
+        close = getattr(features, "close", None)
+        if close is not None:
+            close()
+
+    buffer += b"]}"
+    final = dumps(resumo())
+    if len(final) > 2:
+        buffer += b"," + final[1:]
+    else:
+        buffer += b"}"
+    yield bytes(buffer)
@@ -0,0 +1,131 @@
+"""
+Incidência, letalidade e classe de risco em lote (NumPy)
+
+Fonte única das regras que antes estavam repetidas em cada service (mapa,
+dashboard, relatórios), cada uma com seu laço por linha e sua cópia dos
+limiares:
+
+- incidência = casos / população × 100 mil (0 quando população ≤ 0)
+- letalidade = óbitos / casos × 100 (0 quando não há casos)
+- risco por incidência: BAIXO < 100 ≤ MEDIO < 300 ≤ ALTO < 500 ≤ MUITO_ALTO
+
+Os services passam vetores alinhados (um elemento por município) e recebem
+vetores; a classe é um código 0..3 (``np.digitize`` sobre os limiares), com
+nomes e cores obtidos por indexação. ``classificar_risco`` classifica um
+valor isolado com a mesma regra.
+
+Configuração (variáveis de ambiente):
+    LIMIARES_RISCO_INCIDENCIA   três limiares crescentes por 100 mil hab.
+                                (default "100,300,500")
+"""
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+CLASSES_RISCO = ("BAIXO", "MEDIO", "ALTO", "MUITO_ALTO")
+CORES_RISCO = ("#4CAF50", "#FFC107", "#FF9800", "#F44336")
+
+
+def _limiares_env() -> Tuple[float, ...]:
+    valor = os.getenv("LIMIARES_RISCO_INCIDENCIA", "100,300,500")
+    limiares = tuple(float(v) for v in valor.split(","))
+    if len(limiares) != len(CLASSES_RISCO) - 1 or list(limiares) != sorted(limiares):
+        raise ValueError(
+            f"LIMIARES_RISCO_INCIDENCIA deve ter {len(CLASSES_RISCO) - 1} valores crescentes: {valor!r}"
+        )
+    return limiares
+
+
+LIMIARES_INCIDENCIA = _limiares_env()
+
+_CLASSES = np.array(CLASSES_RISCO)
+_CORES = np.array(CORES_RISCO)
+
+
+def calcular_incidencia(casos: Sequence, populacao: Sequence) -> np.ndarray:
+    """Casos por 100 mil habitantes; 0 onde a população é ≤ 0"""
+    casos = np.asarray(casos, dtype=np.float64)
+    populacao = np.asarray(populacao, dtype=np.float64)
+    incidencia = np.zeros(np.broadcast(casos, populacao).shape)
+    np.divide(casos * 100000.0, populacao, out=incidencia, where=populacao > 0)
+    return incidencia
+
+
+def calcular_letalidade(obitos: Sequence, casos: Sequence) -> np.ndarray:
+    """Óbitos por 100 casos; 0 onde não há casos"""
+    obitos = np.asarray(obitos, dtype=np.float64)
+    casos = np.asarray(casos, dtype=np.float64)
+    letalidade = np.zeros(np.broadcast(obitos, casos).shape)
+    np.divide(obitos * 100.0, casos, out=letalidade, where=casos > 0)
+    return letalidade
+
+
+def codigos_risco(
+    incidencia: Sequence,
+    limiares: Optional[Sequence[float]] = None
+) -> np.ndarray:
+    """Código da classe de risco (0 = BAIXO ... 3 = MUITO_ALTO) por elemento"""
+    return np.digitize(
+        np.asarray(incidencia, dtype=np.float64),
+        LIMIARES_INCIDENCIA if limiares is None else limiares
+    ).astype(np.int8)
+
+
+def classificar_risco(
+    incidencia: float,
+    limiares: Optional[Sequence[float]] = None
+) -> Tuple[str, str]:
+    """(classe, cor) de um valor de incidência"""
+    codigo = int(codigos_risco([incidencia], limiares)[0])
+    return CLASSES_RISCO[codigo], CORES_RISCO[codigo]
+
+
+@dataclass(frozen=True)
+class IndicadoresMunicipios:
+    """Indicadores alinhados com os vetores de entrada"""
+    incidencia: np.ndarray
+    letalidade: np.ndarray
+    risco: np.ndarray
+
+    def classes(self) -> List[str]:
+        return _CLASSES[self.risco].tolist()
+
+    def cores(self) -> List[str]:
+        return _CORES[self.risco].tolist()
+
+    def distribuicao(self) -> dict:
+        """Municípios por classe de risco (todas as classes, mesmo zeradas)"""
+        contagem = np.bincount(self.risco, minlength=len(CLASSES_RISCO))
+        return dict(zip(CLASSES_RISCO, contagem.tolist()))
+
+
+def calcular_indicadores(
+    casos: Sequence,
+    populacao: Sequence,
+    obitos: Optional[Sequence] = None,
+    limiares: Optional[Sequence[float]] = None
+) -> IndicadoresMunicipios:
+    """
+    Incidência, letalidade e risco de vários municípios de uma vez.
+
+    Args:
+        casos: Casos por município
+        populacao: População por município (mesma ordem)
+        obitos: Óbitos por município (opcional; letalidade zero sem ele)
+        limiares: Limiares de risco (default: LIMIARES_INCIDENCIA)
+
+    Returns:
+        IndicadoresMunicipios com vetores do mesmo comprimento da entrada
+    """
+    incidencia = calcular_incidencia(casos, populacao)
+    if obitos is None:
+        letalidade = np.zeros_like(incidencia)
+    else:
+        letalidade = calcular_letalidade(obitos, casos)
+    return IndicadoresMunicipios(
+        incidencia=incidencia,
+        letalidade=letalidade,
+        risco=codigos_risco(incidencia, limiares)
+    )
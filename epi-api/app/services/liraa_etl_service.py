@@ -1,12 +1,15 @@
 """
 Service ETL para importação LIRAa
 """
-from typing import List, Dict, Any
-from datetime import datetime
+from typing import List, Dict, Any, Optional
+from datetime import datetime, date, timezone
 from decimal import Decimal
-import psycopg2
 
+from app.services.csv_stream import LeitorCSV
 from app.services.etl_base_service import ETLBaseService
+from app.services.response_cache import invalidar_periodo
+from app.services.semana_epi import semana_epi as calcular_semana_epi
+from app.schemas.liraa import classificar_risco
 from app.schemas.etl import (
     LIRaaRecordRaw,
     LIRaaImportRequest,
@@ -41,46 +44,32 @@ class LIRaaETLService(ETLBaseService):
         Returns:
             ETLValidationReport
         """
-        # Validação estrutural
-        report = self.validate_csv_structure(file_path, self.REQUIRED_COLUMNS)
+        # Validação estrutural, contagem e amostra numa única leitura
+        report, amostra = self.scan_csv(file_path, self.REQUIRED_COLUMNS, sample_size=100)
         
         if not report.is_valid:
             return report
         
-        # Validação de dados (sample)
+        # Validação de dados (amostra das primeiras 100 linhas)
         errors = []
         valid_count = 0
         
-        try:
-            # Ler primeiras 100 linhas
-            batches = self.read_csv_file(file_path, batch_size=100)
-            for batch in batches:
-                for idx, row in enumerate(batch, start=1):
-                    try:
-                        # Tentar criar objeto Pydantic
-                        LIRaaRecordRaw(**self._normalize_liraa_row(row))
-                        valid_count += 1
-                    except Exception as e:
-                        errors.append(ETLValidationError(
-                            row_number=idx,
-                            field="record",
-                            value=str(row),
-                            error_type="validation_error",
-                            error_message=str(e),
-                            severity="ERROR"
-                        ))
-                break  # Apenas primeiro batch
-        except Exception as e:
-            errors.append(ETLValidationError(
-                row_number=0,
-                field="file",
-                value=str(e),
-                error_type="read_error",
-                error_message=f"Erro ao ler arquivo: {str(e)}",
-                severity="ERROR"
-            ))
+        for idx, row in enumerate(amostra, start=1):
+            try:
+                # Tentar criar objeto Pydantic
+                LIRaaRecordRaw(**self._normalize_liraa_row(row))
+                valid_count += 1
+            except Exception as e:
+                errors.append(ETLValidationError(
+                    row_number=idx,
+                    field="record",
+                    value=str(row),
+                    error_type="validation_error",
+                    error_message=str(e),
+                    severity="ERROR"
+                ))
         
-        total_rows = self.count_total_rows(file_path)
+        total_rows = report.total_rows
         
         return ETLValidationReport(
             total_rows=total_rows,
@@ -176,25 +165,19 @@ class LIRaaETLService(ETLBaseService):
         # Atualizar job para PROCESSING
         self.update_job_status(job_id, ETLStatus.PROCESSING)
         
-        # Contar total de linhas
-        total_rows = self.count_total_rows(request.file_path)
-        
         conn = self._get_connection()
         try:
-            # Atualizar total_rows
-            with conn.cursor() as cur:
-                cur.execute(
-                    "UPDATE etl_jobs SET total_rows = %s WHERE job_id = %s",
-                    (total_rows, job_id)
-                )
-            conn.commit()
-            
             # Processar em batches
             processed = 0
             success = 0
             errors = []
+            # Estratos do mesmo município podem cair em batches diferentes:
+            # acumula o ciclo inteiro e grava uma linha por município no fim
+            acumulado: Dict[str, List[Dict[str, Any]]] = {}
             
-            batches = self.read_csv_file(request.file_path, request.batch_size)
+            # Leitura única: o total de linhas sai do mesmo percurso
+            leitor = LeitorCSV(request.file_path, request.batch_size)
+            batches = self.read_csv_file(request.file_path, request.batch_size, leitor=leitor)
             
             for batch in batches:
                 batch_result = self._process_liraa_batch(
@@ -202,8 +185,7 @@ class LIRaaETLService(ETLBaseService):
                     request.ano,
                     request.ciclo,
                     request.calcular_indices,
-                    request.overwrite,
-                    conn
+                    acumulado
                 )
                 
                 processed += batch_result['processed']
@@ -219,6 +201,27 @@ class LIRaaETLService(ETLBaseService):
                     error_rows=len(errors)
                 )
             
+            gravados = {'inseridos': 0, 'atualizados': 0}
+            if acumulado:
+                gravados = self._upsert_liraa_data(
+                    [self._agregar_municipio(registros) for registros in acumulado.values()],
+                    request.overwrite,
+                    conn
+                )
+            
+            # Linhas com mais campos que o cabeçalho: fora dos lotes, erro de linha
+            processed += leitor.total_malformadas
+            errors.extend(self.erros_linhas_malformadas(leitor))
+            error_rows = len(errors) + leitor.malformadas_omitidas
+            
+            # Total de linhas conhecido ao fim da mesma leitura
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE etl_jobs SET total_rows = %s WHERE job_id = %s",
+                    (leitor.total_linhas, job_id)
+                )
+            conn.commit()
+            
             # Finalizar
             final_status = ETLStatus.COMPLETED if len(errors) == 0 else ETLStatus.PARTIAL
             
@@ -227,14 +230,16 @@ class LIRaaETLService(ETLBaseService):
                 final_status,
                 processed_rows=processed,
                 success_rows=success,
-                error_rows=len(errors),
+                error_rows=error_rows,
                 error_details=errors[:100] if errors else None
             )
             
             return {
                 'processed': processed,
                 'success': success,
-                'errors': len(errors),
+                'errors': error_rows,
+                'inserted': gravados['inseridos'],
+                'updated': gravados['atualizados'],
                 'status': final_status.value
             }
             
@@ -247,6 +252,8 @@ class LIRaaETLService(ETLBaseService):
             raise
         finally:
             conn.close()
+            # O upsert pode ter sido commitado mesmo se o job falhar depois
+            invalidar_periodo(date(request.ano, 1, 1), date(request.ano + 1, 1, 1))
     
     def _process_liraa_batch(
         self,
@@ -254,8 +261,7 @@ class LIRaaETLService(ETLBaseService):
         ano: int,
         ciclo: int,
         calcular_indices: bool,
-        overwrite: bool,
-        conn
+        acumulado: Dict[str, List[Dict[str, Any]]]
     ) -> Dict[str, Any]:
         """
         Processa um batch de registros LIRAa
@@ -265,8 +271,7 @@ class LIRaaETLService(ETLBaseService):
             ano: Ano do levantamento
             ciclo: Ciclo LIRAa
             calcular_indices: Calcular índices se não fornecidos
-            overwrite: Sobrescrever existentes
-            conn: Conexão DB
+            acumulado: Registros válidos por município (atualizado in-place)
             
         Returns:
             Dict com estatísticas
@@ -275,8 +280,6 @@ class LIRaaETLService(ETLBaseService):
         success = 0
         errors = []
         
-        records_to_insert = []
-        
         for row in batch:
             processed += 1
             
@@ -306,23 +309,21 @@ class LIRaaETLService(ETLBaseService):
                     ib = record.ib
                     idc = record.idc
                 
-                # Classificar nível de risco
-                nivel_risco = self.classify_risk_level(iip) if iip else None
-                
-                # Preparar para inserção
-                records_to_insert.append({
+                acumulado.setdefault(record.municipio_codigo, []).append({
                     'municipio_codigo': record.municipio_codigo,
                     'ano': ano,
                     'ciclo': ciclo,
                     'estrato': record.estrato,
                     'imoveis_pesquisados': record.imoveis_pesquisados,
                     'imoveis_positivos': record.imoveis_positivos or 0,
+                    'imoveis_fechados': record.imoveis_fechados or 0,
+                    'imoveis_recusados': record.imoveis_recusados or 0,
                     'depositos_inspecionados': record.depositos_inspecionados,
                     'depositos_positivos': record.depositos_positivos or 0,
                     'iip': iip,
                     'ib': ib,
                     'idc': idc,
-                    'nivel_risco': nivel_risco
+                    'data_levantamento': record.data_levantamento
                 })
                 
                 success += 1
@@ -333,97 +334,114 @@ class LIRaaETLService(ETLBaseService):
                     'error': str(e)
                 })
         
-        # Inserir registros no banco
-        if records_to_insert:
-            self._upsert_liraa_data(records_to_insert, overwrite, conn)
-        
         return {
             'processed': processed,
             'success': success,
             'errors': errors
         }
     
+    @staticmethod
+    def _media_ponderada(
+        registros: List[Dict[str, Any]],
+        campo: str,
+        peso: str
+    ) -> Optional[float]:
+        """Média de um índice entre estratos, ponderada pela base do índice"""
+        pares = [(float(r[campo]), r[peso]) for r in registros if r[campo] is not None]
+        if not pares:
+            return None
+        total = sum(p for _, p in pares)
+        if total <= 0:
+            return 0.0
+        return round(sum(v * p for v, p in pares) / total, 2)
+    
+    def _agregar_municipio(self, registros: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Consolida os estratos de um município em uma linha de indice_entomologico
+        
+        IIP, IB e IDC calculados por estrato voltam exatamente aos índices das
+        contagens somadas quando ponderados por imóveis/depósitos inspecionados.
+        
+        Args:
+            registros: Registros normalizados do mesmo município/ano/ciclo
+            
+        Returns:
+            Dict com contagens e índices IPO/IDO/IVO/IMO; ``classificacao``
+            None quando nenhum estrato informa IIP
+        """
+        primeiro = registros[0]
+        pesquisados = sum(r['imoveis_pesquisados'] for r in registros)
+        pendentes = sum(r['imoveis_fechados'] + r['imoveis_recusados'] for r in registros)
+        
+        datas = [r['data_levantamento'] for r in registros if r['data_levantamento']]
+        # Sem data no CSV: início do bimestre do ciclo
+        data_levantamento = (
+            min(datas) if datas else date(primeiro['ano'], 2 * primeiro['ciclo'] - 1, 1)
+        )
+        ano_epi, semana = calcular_semana_epi(data_levantamento)
+        if ano_epi != primeiro['ano']:
+            semana = 1 if ano_epi < primeiro['ano'] else 53
+        
+        ivo = self._media_ponderada(registros, 'iip', 'imoveis_pesquisados')
+        
+        return {
+            'municipio_codigo': primeiro['municipio_codigo'],
+            'ano': primeiro['ano'],
+            'ciclo': primeiro['ciclo'],
+            'data_levantamento': data_levantamento,
+            'semana_epi': semana,
+            # IPO: pendências (fechados + recusados) sobre os imóveis visitados
+            'ipo': (
+                round(pendentes / (pesquisados + pendentes) * 100, 2)
+                if pesquisados + pendentes else 0.0
+            ),
+            'ido': self._media_ponderada(registros, 'idc', 'depositos_inspecionados'),
+            'ivo': ivo,
+            # LIRAa larvário não conta mosquitos adultos
+            'imo': None,
+            'ib': self._media_ponderada(registros, 'ib', 'imoveis_pesquisados'),
+            'imoveis_inspecionados': pesquisados,
+            'imoveis_positivos': sum(r['imoveis_positivos'] for r in registros),
+            # Sem IIP em nenhum estrato a classe é indeterminada (NULL), não satisfatória
+            'classificacao': classificar_risco(ivo).value if ivo is not None else None,
+        }
+    
     def _upsert_liraa_data(
         self,
         records: List[Dict[str, Any]],
         overwrite: bool,
         conn
-    ) -> None:
+    ) -> Dict[str, int]:
         """
-        Insere ou atualiza dados LIRAa no banco
+        Insere ou atualiza o levantamento por município em indice_entomologico
         
         Args:
-            records: Lista de registros
+            records: Linhas consolidadas por município (_agregar_municipio)
             overwrite: Sobrescrever existentes
             conn: Conexão DB
+            
+        Returns:
+            Dict com 'inseridos' e 'atualizados'
         """
-        with conn.cursor() as cur:
-            for record in records:
-                # Calcular semana epidemiológica média do ciclo
-                # Ciclo 1: ~semana 1-9, Ciclo 2: ~semana 10-17, etc
-                semana_epi = (record['ciclo'] - 1) * 9 + 5  # Semana média do ciclo
-                
-                if overwrite:
-                    # UPSERT em indicador_epi
-                    cur.execute("""
-                        INSERT INTO indicador_epi (
-                            municipio_codigo, ano, semana_epi, doenca_tipo,
-                            iip, ib, idc, nivel_risco,
-                            fonte, data_atualizacao, metadata
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (municipio_codigo, ano, semana_epi, doenca_tipo)
-                        DO UPDATE SET
-                            iip = EXCLUDED.iip,
-                            ib = EXCLUDED.ib,
-                            idc = EXCLUDED.idc,
-                            nivel_risco = EXCLUDED.nivel_risco,
-                            fonte = EXCLUDED.fonte,
-                            data_atualizacao = EXCLUDED.data_atualizacao,
-                            metadata = EXCLUDED.metadata
-                    """, (
-                        record['municipio_codigo'],
-                        record['ano'],
-                        semana_epi,
-                        'DENGUE',  # LIRAa é específico para Dengue
-                        record['iip'],
-                        record['ib'],
-                        record['idc'],
-                        record['nivel_risco'],
-                        ETLSource.LIRAA.value,
-                        datetime.utcnow(),
-                        psycopg2.extras.Json({
-                            'ciclo': record['ciclo'],
-                            'estrato': record['estrato'],
-                            'imoveis_pesquisados': record['imoveis_pesquisados'],
-                            'imoveis_positivos': record['imoveis_positivos']
-                        })
-                    ))
-                else:
-                    # INSERT apenas se não existir
-                    cur.execute("""
-                        INSERT INTO indicador_epi (
-                            municipio_codigo, ano, semana_epi, doenca_tipo,
-                            iip, ib, idc, nivel_risco,
-                            fonte, data_atualizacao, metadata
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (municipio_codigo, ano, semana_epi, doenca_tipo) DO NOTHING
-                    """, (
-                        record['municipio_codigo'],
-                        record['ano'],
-                        semana_epi,
-                        'DENGUE',
-                        record['iip'],
-                        record['ib'],
-                        record['idc'],
-                        record['nivel_risco'],
-                        ETLSource.LIRAA.value,
-                        datetime.utcnow(),
-                        psycopg2.extras.Json({
-                            'ciclo': record['ciclo'],
-                            'estrato': record['estrato'],
-                            'imoveis_pesquisados': record['imoveis_pesquisados'],
-                            'imoveis_positivos': record['imoveis_positivos']
-                        })
-                    ))
+        colunas = [
+            'municipio_codigo', 'ano', 'ciclo', 'data_levantamento', 'semana_epi',
+            'ipo', 'ido', 'ivo', 'imo', 'ib',
+            'imoveis_inspecionados', 'imoveis_positivos', 'classificacao'
+        ]
+        
+        resultado = self.copy_upsert(
+            conn,
+            'indice_entomologico',
+            ['municipio_cod_ibge'] + colunas[1:] + ['fonte', 'atualizado_em'],
+            [
+                tuple(r[c] for c in colunas) + (ETLSource.LIRAA.value, datetime.now(timezone.utc))
+                for r in records
+            ],
+            chave=['municipio_cod_ibge', 'ano', 'ciclo'],
+            atualizar=colunas[3:] + ['fonte', 'atualizado_em'],
+            # Sem overwrite só completa linhas que têm apenas a classificação SES-MT
+            condicao=None if overwrite else "t.ivo IS NULL"
+        )
         
         conn.commit()
+        return resultado
@@ -0,0 +1,485 @@
+"""
+Índices entomológicos LIRAa (IPO, IDO, IVO, IMO) por município
+
+Consulta a tabela pré-calculada ``indice_entomologico`` (V019): uma linha por
+(município, ano, ciclo) com os índices e as classes de risco já gravados pelo
+ETL LIRAa e pela carga da classificação SES-MT. Cada método responde com uma
+única consulta indexada; nome, população e geometria vêm do índice de
+municípios em memória.
+
+Quando um período tem mais de um ciclo, vale o levantamento mais recente de
+cada município (``DISTINCT ON`` pela PK).
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from psycopg2.extras import RealDictCursor
+
+from app.db import get_connection
+from app.services.municipio_index import MunicipioIndex, get_municipio_index
+from app.services.semana_epi import inicio_semana_epi
+from app.schemas.liraa import (
+    TipoIndice,
+    ClassificacaoRisco,
+    IndiceLiraa,
+    LiraaResponse,
+    IndiceTemporal,
+    SerieLiraa,
+    SerieTemporalLiraaResponse,
+    RankingLiraa,
+    RankingLiraaResponse,
+    ComparativoLiraa,
+    ComparativoLiraaResponse,
+    MunicipioLiraaProperties,
+    MapaLiraaResponse,
+)
+
+# Coluna do índice em indice_entomologico (classe em classe_<coluna>)
+COLUNAS_INDICE = {
+    TipoIndice.IPO: "ipo",
+    TipoIndice.IDO: "ido",
+    TipoIndice.IVO: "ivo",
+    TipoIndice.IMO: "imo",
+}
+
+COR_CLASSIFICACAO = {
+    ClassificacaoRisco.SATISFATORIO: "#4CAF50",  # Verde
+    ClassificacaoRisco.ALERTA: "#FFC107",        # Amarelo
+    ClassificacaoRisco.RISCO: "#F44336",         # Vermelho
+}
+# Sem classe do índice nem classificação geral (levantamento sem IIP)
+COR_INDETERMINADO = "#9E9E9E"  # Cinza
+
+# Variação (pontos percentuais) abaixo da qual o comparativo é ESTAVEL
+LIMIAR_ESTAVEL = 0.1
+
+_COLUNAS = """
+    municipio_cod_ibge, ano, ciclo, data_levantamento, semana_epi,
+    ipo, ido, ivo, imo, imoveis_inspecionados, imoveis_positivos,
+    classificacao, classe_ipo, classe_ido, classe_ivo, classe_imo
+"""
+
+
+def _float(valor) -> Optional[float]:
+    return float(valor) if valor is not None else None
+
+
+class LiraaService:
+    """Consultas sobre indice_entomologico"""
+
+    def __init__(self, db_connection_string: str, municipios: Optional[MunicipioIndex] = None):
+        self.conn_str = db_connection_string
+        self.municipios = municipios or get_municipio_index(db_connection_string)
+
+    def _query(self, sql: str, params: List[Any]) -> List[Dict[str, Any]]:
+        conn = get_connection(self.conn_str)
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(sql, params)
+                return cur.fetchall()
+        finally:
+            conn.close()
+
+    def _nome(self, codigo_ibge: str) -> str:
+        return self.municipios.nome(codigo_ibge, codigo_ibge)
+
+    # ------------------------------------------------------------------
+    # Levantamentos
+    # ------------------------------------------------------------------
+
+    def ultimos_levantamentos(
+        self,
+        inicio: date,
+        fim: date,
+        municipios: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Levantamento mais recente de cada município com data em [inicio, fim)
+
+        Args:
+            inicio: Primeiro dia do período
+            fim: Dia seguinte ao último dia do período
+            municipios: Filtrar por códigos IBGE (opcional)
+        """
+        params: List[Any] = [inicio, fim]
+        filtro = ""
+        if municipios:
+            filtro = "AND municipio_cod_ibge = ANY(%s)"
+            params.append(municipios)
+        return self._query(f"""
+            SELECT DISTINCT ON (municipio_cod_ibge) {_COLUNAS}
+            FROM indice_entomologico
+            WHERE data_levantamento >= %s AND data_levantamento < %s
+              {filtro}
+            ORDER BY municipio_cod_ibge, data_levantamento DESC, ciclo DESC
+        """, params)
+
+    # ------------------------------------------------------------------
+    # Endpoints /liraa
+    # ------------------------------------------------------------------
+
+    def get_indices(
+        self,
+        ano: int,
+        tipo_indice: Optional[TipoIndice] = None,
+        codigo_ibge: Optional[str] = None,
+        semana_epi_inicio: Optional[int] = None,
+        semana_epi_fim: Optional[int] = None
+    ) -> LiraaResponse:
+        """
+        Índices de cada levantamento do ano (um item por município, ciclo e índice)
+
+        Índices sem valor (ex.: ciclo com apenas a classificação SES-MT) são omitidos.
+        """
+        params: List[Any] = [ano]
+        filtros = []
+        if semana_epi_inicio is not None:
+            filtros.append("AND semana_epi >= %s")
+            params.append(semana_epi_inicio)
+        if semana_epi_fim is not None:
+            filtros.append("AND semana_epi <= %s")
+            params.append(semana_epi_fim)
+        if codigo_ibge:
+            filtros.append("AND municipio_cod_ibge = %s")
+            params.append(codigo_ibge)
+
+        rows = self._query(f"""
+            SELECT {_COLUNAS}
+            FROM indice_entomologico
+            WHERE ano = %s
+              {' '.join(filtros)}
+            ORDER BY municipio_cod_ibge, ciclo
+        """, params)
+
+        tipos = [tipo_indice] if tipo_indice else list(COLUNAS_INDICE)
+        indices = []
+        for row in rows:
+            for tipo in tipos:
+                coluna = COLUNAS_INDICE[tipo]
+                if row[coluna] is None:
+                    continue
+                indices.append(IndiceLiraa(
+                    codigo_ibge=row['municipio_cod_ibge'],
+                    municipio=self._nome(row['municipio_cod_ibge']),
+                    tipo_indice=tipo,
+                    valor=float(row[coluna]),
+                    classificacao=row[f'classe_{coluna}'],
+                    imoveis_inspecionados=row['imoveis_inspecionados'],
+                    imoveis_positivos=row['imoveis_positivos'],
+                    data_levantamento=row['data_levantamento'],
+                    semana_epi=row['semana_epi']
+                ))
+
+        return LiraaResponse(
+            ano=ano,
+            total_municipios=len({i.codigo_ibge for i in indices}),
+            indices=indices
+        )
+
+    def get_series(
+        self,
+        ano: int,
+        tipo_indice: TipoIndice,
+        codigo_ibge: Optional[str] = None
+    ) -> SerieTemporalLiraaResponse:
+        """Ciclos do ano por município (pontos com valor do índice pedido)"""
+        coluna = COLUNAS_INDICE[tipo_indice]
+        params: List[Any] = [ano]
+        filtro = ""
+        if codigo_ibge:
+            filtro = "AND municipio_cod_ibge = %s"
+            params.append(codigo_ibge)
+
+        rows = self._query(f"""
+            SELECT {_COLUNAS}
+            FROM indice_entomologico
+            WHERE ano = %s AND {coluna} IS NOT NULL
+              {filtro}
+            ORDER BY municipio_cod_ibge, ciclo
+        """, params)
+
+        series: Dict[str, SerieLiraa] = {}
+        for row in rows:
+            cod = row['municipio_cod_ibge']
+            serie = series.get(cod)
+            if serie is None:
+                serie = series[cod] = SerieLiraa(codigo_ibge=cod, municipio=self._nome(cod), pontos=[])
+            semana_inicio = inicio_semana_epi(row['ano'], row['semana_epi'])
+            serie.pontos.append(IndiceTemporal(
+                ano=row['ano'],
+                semana_epi=row['semana_epi'],
+                data_inicio=semana_inicio,
+                data_fim=semana_inicio + timedelta(days=6),
+                valor_ipo=_float(row['ipo']),
+                valor_ido=_float(row['ido']),
+                valor_ivo=_float(row['ivo']),
+                valor_imo=_float(row['imo']),
+                imoveis_inspecionados=row['imoveis_inspecionados'],
+                classificacao_geral=row['classificacao']
+            ))
+
+        return SerieTemporalLiraaResponse(ano=ano, tipo_indice=tipo_indice, series=list(series.values()))
+
+    def get_ranking(
+        self,
+        ano: int,
+        tipo_indice: TipoIndice,
+        limite: int = 20,
+        ordem: str = "desc"
+    ) -> RankingLiraaResponse:
+        """Municípios ordenados pelo índice do último ciclo do ano com valor"""
+        coluna = COLUNAS_INDICE[tipo_indice]
+        direcao = "ASC" if ordem == "asc" else "DESC"
+
+        rows = self._query(f"""
+            SELECT u.*, COUNT(*) OVER () AS total
+            FROM (
+                SELECT DISTINCT ON (municipio_cod_ibge) {_COLUNAS}
+                FROM indice_entomologico
+                WHERE ano = %s AND {coluna} IS NOT NULL
+                ORDER BY municipio_cod_ibge, ciclo DESC
+            ) u
+            ORDER BY u.{coluna} {direcao}, u.municipio_cod_ibge
+            LIMIT %s
+        """, [ano, limite])
+
+        ranking = [
+            RankingLiraa(
+                posicao=posicao,
+                codigo_ibge=row['municipio_cod_ibge'],
+                municipio=self._nome(row['municipio_cod_ibge']),
+                populacao=self.municipios.populacao(row['municipio_cod_ibge'], 0),
+                valor_indice=float(row[coluna]),
+                classificacao=row[f'classe_{coluna}'],
+                imoveis_inspecionados=row['imoveis_inspecionados'],
+                imoveis_positivos=row['imoveis_positivos'],
+                data_levantamento=row['data_levantamento']
+            )
+            for posicao, row in enumerate(rows, start=1)
+        ]
+
+        return RankingLiraaResponse(
+            ano=ano,
+            tipo_indice=tipo_indice,
+            total_municipios=int(rows[0]['total']) if rows else 0,
+            ranking=ranking
+        )
+
+    def get_comparativo(
+        self,
+        tipo_indice: TipoIndice,
+        ano1: int,
+        semana1: int,
+        ano2: int,
+        semana2: int,
+        codigo_ibge: Optional[str] = None
+    ) -> ComparativoLiraaResponse:
+        """
+        Compara o índice entre dois momentos
+
+        Em cada momento vale o último ciclo do ano levantado até a semana
+        informada. Municípios sem valor em algum dos momentos ficam de fora.
+        """
+        coluna = COLUNAS_INDICE[tipo_indice]
+        params: List[Any] = [ano1, semana1, ano2, semana2]
+        filtro = ""
+        if codigo_ibge:
+            filtro = "AND e.municipio_cod_ibge = %s"
+            params.append(codigo_ibge)
+
+        rows = self._query(f"""
+            SELECT DISTINCT ON (p.periodo, e.municipio_cod_ibge)
+                p.periodo, e.municipio_cod_ibge, e.{coluna} AS valor, e.classe_{coluna} AS classe
+            FROM (VALUES (1, %s, %s), (2, %s, %s)) AS p(periodo, ano, semana)
+            JOIN indice_entomologico e
+              ON e.ano = p.ano AND e.semana_epi <= p.semana
+            WHERE e.{coluna} IS NOT NULL
+              {filtro}
+            ORDER BY p.periodo, e.municipio_cod_ibge, e.semana_epi DESC, e.ciclo DESC
+        """, params)
+
+        periodos: Dict[int, Dict[str, Dict[str, Any]]] = {1: {}, 2: {}}
+        for row in rows:
+            periodos[row['periodo']][row['municipio_cod_ibge']] = row
+
+        comparativos = []
+        for cod in sorted(periodos[1].keys() & periodos[2].keys()):
+            p1, p2 = periodos[1][cod], periodos[2][cod]
+            v1, v2 = float(p1['valor']), float(p2['valor'])
+            variacao = v2 - v1
+            if v1 > 0:
+                variacao_pct = variacao / v1 * 100.0
+            else:
+                variacao_pct = 100.0 if v2 > 0 else 0.0
+            # Índice menor é melhor
+            if abs(variacao) < LIMIAR_ESTAVEL:
+                tendencia = "ESTAVEL"
+            else:
+                tendencia = "MELHORA" if variacao < 0 else "PIORA"
+            comparativos.append(ComparativoLiraa(
+                codigo_ibge=cod,
+                municipio=self._nome(cod),
+                tipo_indice=tipo_indice,
+                periodo1_ano=ano1,
+                periodo1_semana=semana1,
+                periodo1_valor=v1,
+                periodo1_classificacao=p1['classe'],
+                periodo2_ano=ano2,
+                periodo2_semana=semana2,
+                periodo2_valor=v2,
+                periodo2_classificacao=p2['classe'],
+                variacao_absoluta=round(variacao, 2),
+                variacao_percentual=round(variacao_pct, 2),
+                tendencia=tendencia
+            ))
+
+        return ComparativoLiraaResponse(
+            tipo_indice=tipo_indice,
+            total_municipios=len(comparativos),
+            comparativos=comparativos
+        )
+
+    def get_mapa(
+        self,
+        ano: int,
+        tipo_indice: TipoIndice,
+        semana_epi: Optional[int] = None
+    ) -> MapaLiraaResponse:
+        """
+        Polígonos dos municípios com o último levantamento do ano (até a semana)
+
+        Municípios sem polígono no índice vêm como ponto no centroide.
+        """
+        coluna = COLUNAS_INDICE[tipo_indice]
+        params: List[Any] = [ano]
+        filtro = ""
+        if semana_epi is not None:
+            filtro = "AND semana_epi <= %s"
+            params.append(semana_epi)
+
+        rows = self._query(f"""
+            SELECT DISTINCT ON (municipio_cod_ibge) {_COLUNAS}
+            FROM indice_entomologico
+            WHERE ano = %s
+              {filtro}
+            ORDER BY municipio_cod_ibge, ciclo DESC
+        """, params)
+
+        _, geometrias = self.municipios.geometrias()
+        features = []
+        for row in rows:
+            cod = row['municipio_cod_ibge']
+            info = self.municipios.get(cod)
+            if not info:
+                continue
+            classe_indice = row[f'classe_{coluna}']
+            classe = classe_indice or row['classificacao']
+            geometria = geometrias.get(cod) or {"type": "Point", "coordinates": [info['lon'], info['lat']]}
+            propriedades = MunicipioLiraaProperties(
+                codigo_ibge=cod,
+                nome=info['nome'],
+                populacao=info['pop'],
+                valor_ipo=_float(row['ipo']),
+                valor_ido=_float(row['ido']),
+                valor_ivo=_float(row['ivo']),
+                valor_imo=_float(row['imo']),
+                classificacao_geral=row['classificacao'],
+                imoveis_inspecionados=row['imoveis_inspecionados'],
+                data_levantamento=row['data_levantamento'],
+                ciclo=row['ciclo'],
+                valor_indice=_float(row[coluna]),
+                classificacao_indice=classe_indice,
+                cor_hex=(
+                    COR_CLASSIFICACAO[ClassificacaoRisco(classe)] if classe else COR_INDETERMINADO
+                )
+            )
+            features.append({
+                "type": "Feature",
+                "id": cod,
+                "geometry": geometria,
+                "properties": propriedades.model_dump(mode="json")
+            })
+
+        return MapaLiraaResponse(ano=ano, tipo_indice=tipo_indice, features=features)
+
+    def get_estatisticas(
+        self,
+        ano: int,
+        tipo_indice: Optional[TipoIndice] = None
+    ) -> Dict[str, Any]:
+        """
+        Estatísticas descritivas do último ciclo de cada município no ano
+
+        Returns:
+            Dict com total de municípios/imóveis, distribuição da classificação
+            geral e, por índice, média, desvio, extremos, percentis e
+            distribuição por classe
+        """
+        tipos = [tipo_indice] if tipo_indice else list(COLUNAS_INDICE)
+        agregados = []
+        for tipo in tipos:
+            c = COLUNAS_INDICE[tipo]
+            agregados.append(f"""
+                COUNT({c}) AS {c}_n,
+                AVG({c}) AS {c}_media,
+                STDDEV_SAMP({c}) AS {c}_desvio,
+                MIN({c}) AS {c}_min,
+                MAX({c}) AS {c}_max,
+                PERCENTILE_CONT(ARRAY[0.25, 0.5, 0.75, 0.95]) WITHIN GROUP (ORDER BY {c}) AS {c}_percentis,
+                COUNT(*) FILTER (WHERE classe_{c} = 'SATISFATORIO') AS {c}_satisfatorio,
+                COUNT(*) FILTER (WHERE classe_{c} = 'ALERTA') AS {c}_alerta,
+                COUNT(*) FILTER (WHERE classe_{c} = 'RISCO') AS {c}_risco""")
+
+        rows = self._query(f"""
+            SELECT
+                COUNT(*) AS total_municipios,
+                COALESCE(SUM(imoveis_inspecionados), 0) AS imoveis_inspecionados,
+                COUNT(*) FILTER (WHERE classificacao = 'SATISFATORIO') AS satisfatorio,
+                COUNT(*) FILTER (WHERE classificacao = 'ALERTA') AS alerta,
+                COUNT(*) FILTER (WHERE classificacao = 'RISCO') AS risco,
+                {','.join(agregados)}
+            FROM (
+                SELECT DISTINCT ON (municipio_cod_ibge) {_COLUNAS}
+                FROM indice_entomologico
+                WHERE ano = %s
+                ORDER BY municipio_cod_ibge, ciclo DESC
+            ) u
+        """, [ano])
+        row = rows[0] if rows else {}
+
+        def arredondar(valor) -> Optional[float]:
+            return round(float(valor), 2) if valor is not None else None
+
+        indices = {}
+        for tipo in tipos:
+            c = COLUNAS_INDICE[tipo]
+            percentis = row.get(f'{c}_percentis') or [None] * 4
+            indices[tipo.value] = {
+                "municipios_com_valor": int(row.get(f'{c}_n') or 0),
+                "media": arredondar(row.get(f'{c}_media')),
+                "mediana": arredondar(percentis[1]),
+                "desvio_padrao": arredondar(row.get(f'{c}_desvio')),
+                "minimo": arredondar(row.get(f'{c}_min')),
+                "maximo": arredondar(row.get(f'{c}_max')),
+                "percentis": {
+                    nome: arredondar(v) for nome, v in zip(("p25", "p50", "p75", "p95"), percentis)
+                },
+                "distribuicao_risco": {
+                    "SATISFATORIO": int(row.get(f'{c}_satisfatorio') or 0),
+                    "ALERTA": int(row.get(f'{c}_alerta') or 0),
+                    "RISCO": int(row.get(f'{c}_risco') or 0),
+                },
+            }
+
+        return {
+            "ano": ano,
+            "tipo_indice": tipo_indice.value if tipo_indice else None,
+            "total_municipios": int(row.get('total_municipios') or 0),
+            "total_imoveis_inspecionados": int(row.get('imoveis_inspecionados') or 0),
+            "distribuicao_classificacao": {
+                "SATISFATORIO": int(row.get('satisfatorio') or 0),
+                "ALERTA": int(row.get('alerta') or 0),
+                "RISCO": int(row.get('risco') or 0),
+            },
+            "indices": indices,
+        }
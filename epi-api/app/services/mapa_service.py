@@ -1,17 +1,36 @@
 """
 Mapa Service - Calculate epidemiological indicators for map visualization
 """
-from typing import List, Dict, Tuple, Optional
-from datetime import date
-import psycopg2
+import time
+from itertools import islice
+from typing import Iterator, List, Dict, Tuple, Optional
+from datetime import date, timedelta
 from psycopg2.extras import RealDictCursor
 
+from app.db import get_connection
+from app.services.arrow_ipc import tabela_ipc
+from app.services.cluster_index import ClusterIndex, get_cluster_index
+from app.services.geojson_stream import stream_feature_collection
+from app.services.incidencia import (
+    LIMIARES_INCIDENCIA,
+    calcular_incidencia,
+    calcular_indicadores,
+    classificar_risco
+)
+from app.services.liraa_service import COR_CLASSIFICACAO, COR_INDETERMINADO, LiraaService
+from app.services.municipio_index import MunicipioIndex, get_municipio_index
+from app.services.response_cache import get_response_cache, meses_competencia
+from app.services.semana_epi import filtro_competencia, semanas_no_ano
+from app.services.vector_tiles import encode_tile, geometrias_do_indice
+from app.schemas.liraa import ClassificacaoRisco
 from app.schemas.mapa import (
     TipoCamada,
     GeoJSONFeature,
     GeoJSONFeatureCollection,
     GeoJSONGeometry,
     MunicipioProperties,
+    IndiceEntomologico,
+    IndiceEntomologicoFeature,
     MapaCamadasResponse,
     HeatmapPoint,
     HeatmapData,
@@ -22,31 +41,17 @@ from app.schemas.mapa import (
     EstatisticasMapa,
     FiltroMapa,
     SerieTemporal,
+    SeriesTemporaisMunicipios,
     SerieTemporalMunicipio
 )
 
 
-# MT municipalities with approximate centroids and population (sample data)
-# In production, this would be loaded from a municipalities reference table
-MT_MUNICIPIOS = {
-    "5103403": {"nome": "Cuiabá", "lat": -15.6014, "lon": -56.0967, "pop": 618124},
-    "5105606": {"nome": "Várzea Grande", "lat": -15.6467, "lon": -56.1326, "pop": 290215},
-    "5103900": {"nome": "Rondonópolis", "lat": -16.4708, "lon": -54.6351, "pop": 238400},
-    "5107909": {"nome": "Sinop", "lat": -11.8608, "lon": -55.5047, "pop": 142291},
-    "5106505": {"nome": "Tangará da Serra", "lat": -14.6233, "lon": -57.4936, "pop": 103750},
-    "5100201": {"nome": "Alta Floresta", "lat": -9.8757, "lon": -56.0875, "pop": 55347},
-    "5103379": {"nome": "Cáceres", "lat": -16.0728, "lon": -57.6823, "pop": 94861},
-    "5101001": {"nome": "Barra do Garças", "lat": -15.8897, "lon": -52.2564, "pop": 59727},
-    "5107602": {"nome": "Sorriso", "lat": -12.5436, "lon": -55.7147, "pop": 91382},
-    "5104104": {"nome": "Pontes e Lacerda", "lat": -15.2261, "lon": -59.3356, "pop": 46822},
-}
-
-
 class MapaService:
     """Service for calculating map indicators and generating GeoJSON layers"""
     
-    def __init__(self, db_connection_string: str):
+    def __init__(self, db_connection_string: str, municipios: Optional[MunicipioIndex] = None):
         self.conn_str = db_connection_string
+        self.municipios = municipios or get_municipio_index(db_connection_string)
     
     def get_camada_incidencia(
         self,
@@ -54,7 +59,9 @@ class MapaService:
         competencia_fim: str,
         municipios: Optional[List[str]] = None,
         cluster: bool = False,
-        max_features: int = 10000
+        max_features: int = 10000,
+        zoom: Optional[int] = None,
+        bbox: Optional[List[float]] = None
     ) -> MapaCamadasResponse:
         """
         Generate incidence map layer (casos / 100k habitantes).
@@ -65,181 +72,518 @@ class MapaService:
             municipios: Filter by specific IBGE codes (optional)
             cluster: Apply clustering to reduce features
             max_features: Maximum features to return
+            zoom: Map zoom level for clustering (default: highest zoom whose
+                cluster count fits in max_features)
+            bbox: [minLng, minLat, maxLng, maxLat] viewport for clustering
             
         Returns:
             MapaCamadasResponse with GeoJSON features
         """
-        # Convert competencias to dates
+        if cluster:
+            return self._get_camada_incidencia_clusters(
+                competencia_inicio, competencia_fim, municipios, max_features, zoom, bbox
+            )
+        
+        features = self._features_incidencia(
+            competencia_inicio, competencia_fim, municipios, max_features
+        )
+        total_casos, total_obitos, incidencia_media = self._resumo_features(features)
+        
+        return MapaCamadasResponse(
+            tipo_camada=TipoCamada.INCIDENCIA,
+            competencia_inicio=competencia_inicio,
+            competencia_fim=competencia_fim,
+            total_municipios=len(features),
+            total_casos=total_casos,
+            total_obitos=total_obitos,
+            incidencia_media=round(incidencia_media, 2),
+            data=GeoJSONFeatureCollection(features=features),
+            metadata={}
+        )
+    
+    def get_camada_entomologica(
+        self,
+        tipo_camada: TipoCamada,
+        competencia_inicio: str,
+        competencia_fim: str,
+        municipios: Optional[List[str]] = None,
+        max_features: int = 10000
+    ) -> MapaCamadasResponse:
+        """
+        Generate an entomological index layer (IPO, IDO, IVO, IMO).
+        
+        One point per municipality with its latest LIRAa survey in the
+        period, read from the precomputed indice_entomologico table.
+        Municipalities whose survey has no value for the index (SES-MT
+        classification only) keep the overall classification.
+        
+        Args:
+            tipo_camada: IPO, IDO, IVO or IMO
+            competencia_inicio: Start period YYYYMM
+            competencia_fim: End period YYYYMM
+            municipios: Filter by specific IBGE codes (optional)
+            max_features: Maximum features to return
+            
+        Returns:
+            MapaCamadasResponse with GeoJSON features
+        """
+        coluna = tipo_camada.value
         dt_inicio = self._competencia_to_date(competencia_inicio)
         dt_fim = self._competencia_to_date(competencia_fim)
+        dt_fim = (dt_fim.replace(day=28) + timedelta(days=4)).replace(day=1)
         
-        # Query aggregated data by municipality (using aggregated indicador_epi)
-        conn = psycopg2.connect(self.conn_str)
-        try:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                municipio_filter = ""
-                params = [dt_inicio, dt_fim]
-                
-                if municipios:
-                    municipio_filter = "AND ie.municipio_cod_ibge = ANY(%s)"
-                    params.append(municipios)
-                
-                query = f"""
-                    SELECT 
-                        ie.municipio_cod_ibge,
-                        SUM(ie.valor) as total_casos
-                    FROM indicador_epi ie
-                    WHERE ie.indicador = 'CASOS_DENGUE'
-                      AND ie.competencia >= %s AND ie.competencia <= %s
-                      {municipio_filter}
-                    GROUP BY ie.municipio_cod_ibge
-                    ORDER BY total_casos DESC
-                    LIMIT %s
-                """
-                params.append(max_features)
-                
-                cur.execute(query, params)
-                rows = cur.fetchall()
-                
-                # Preload municipio info (nome, pop) and centroid coords for returned codes
-                cods = [r['municipio_cod_ibge'] for r in rows]
-                info = {}
-                coords = {}
-                if cods:
-                    cur.execute(
-                        "SELECT codigo_ibge, nome, COALESCE(populacao_estimada_2025, 1) AS pop FROM municipios_ibge WHERE codigo_ibge = ANY(%s)",
-                        (cods,)
-                    )
-                    for r in cur.fetchall():
-                        info[r['codigo_ibge']] = {
-                            'nome': r['nome'],
-                            'pop': int(r['pop']) if r['pop'] else 1
-                        }
-                    # Coordenadas a partir do centroide
-                    cur.execute(
-                        "SELECT codigo_ibge, ST_Y(centroide) AS lat, ST_X(centroide) AS lon FROM municipios_geometrias WHERE codigo_ibge = ANY(%s)",
-                        (cods,)
-                    )
-                    for r in cur.fetchall():
-                        coords[r['codigo_ibge']] = {'lat': float(r['lat'] or 0.0), 'lon': float(r['lon'] or 0.0)}
-        finally:
-            conn.close()
+        rows = LiraaService(self.conn_str, self.municipios).ultimos_levantamentos(
+            dt_inicio, dt_fim, municipios
+        )
         
-        # Build GeoJSON features
         features = []
-        total_casos = 0
-        incidencias = []
-        
+        distribuicao = {c.value: 0 for c in ClassificacaoRisco}
+        valores = []
         for row in rows:
             cod_ibge = row['municipio_cod_ibge']
-            casos = int(row['total_casos'] or 0)
-            mun_info = info.get(cod_ibge)
+            mun_info = self.municipios.get(cod_ibge)
             if not mun_info:
                 continue
-            pop = mun_info['pop'] or 1
-            incidencia = (casos / pop * 100000.0) if pop > 0 else 0.0
-            letalidade = 0.0
-            
-            # Risk classification based on incidence
-            classe_risco, cor_hex = self._classify_risk_incidencia(incidencia)
-            
-            # Coordenadas do centroide
-            c = coords.get(cod_ibge, {'lat': 0.0, 'lon': 0.0})
-            feature = GeoJSONFeature(
+            valor = float(row[coluna]) if row[coluna] is not None else None
+            classe = row[f'classe_{coluna}'] or row['classificacao']
+            classe = ClassificacaoRisco(classe) if classe else None
+            if classe:
+                distribuicao[classe.value] += 1
+            if valor is not None:
+                valores.append(valor)
+            features.append(IndiceEntomologicoFeature(
                 geometry=GeoJSONGeometry(
                     type="Point",
-                    coordinates=[c['lon'], c['lat']]
+                    coordinates=[mun_info['lon'], mun_info['lat']]
                 ),
-                properties=MunicipioProperties(
+                properties=IndiceEntomologico(
                     municipio_cod_ibge=cod_ibge,
                     municipio_nome=mun_info['nome'],
-                    populacao=pop,
-                    casos=casos,
-                    incidencia=round(incidencia, 2),
-                    obitos=0,
-                    letalidade=round(letalidade, 2),
-                    classe_risco=classe_risco,
-                    cor_hex=cor_hex
+                    ipo=float(row['ipo']) if row['ipo'] is not None else None,
+                    ido=float(row['ido']) if row['ido'] is not None else None,
+                    ivo=float(row['ivo']) if row['ivo'] is not None else None,
+                    imo=float(row['imo']) if row['imo'] is not None else None,
+                    classe_risco_ipo=row['classe_ipo'].lower() if row['classe_ipo'] else None,
+                    cor_hex=COR_CLASSIFICACAO[classe] if classe else COR_INDETERMINADO,
+                    valor=valor,
+                    classe_risco=classe.value.lower() if classe else "indeterminado",
+                    ano=row['ano'],
+                    ciclo=row['ciclo'],
+                    data_levantamento=row['data_levantamento']
                 )
-            )
-            features.append(feature)
-            
-            total_casos += casos
-            incidencias.append(incidencia)
+            ))
+            if len(features) >= max_features:
+                break
         
-        incidencia_media = sum(incidencias) / len(incidencias) if incidencias else 0.0
+        return MapaCamadasResponse(
+            tipo_camada=tipo_camada,
+            competencia_inicio=competencia_inicio,
+            competencia_fim=competencia_fim,
+            total_municipios=len(features),
+            total_casos=0,
+            total_obitos=0,
+            incidencia_media=0.0,
+            data=GeoJSONFeatureCollection(features=features),
+            metadata={
+                "indice": tipo_camada.value.upper(),
+                "fonte": "indice_entomologico",
+                "municipios_com_valor": len(valores),
+                "valor_medio": round(sum(valores) / len(valores), 2) if valores else None,
+                "distribuicao_risco": distribuicao
+            }
+        )
+    
+    def _get_camada_incidencia_clusters(
+        self,
+        competencia_inicio: str,
+        competencia_fim: str,
+        municipios: Optional[List[str]],
+        max_features: int,
+        zoom: Optional[int],
+        bbox: Optional[List[float]]
+    ) -> MapaCamadasResponse:
+        """Incidence layer clustered by zoom/bbox from a per-data-version index"""
+        index, construido = self._indice_incidencia(competencia_inicio, competencia_fim, municipios)
+        
+        if zoom is None:
+            zoom = index.zoom_para_limite(max_features)
+        inicio = time.perf_counter()
+        features = index.get_clusters(zoom, bbox)
+        consulta_ms = (time.perf_counter() - inicio) * 1000.0
         
-        # Apply clustering if requested
-        metadata = {}
-        if cluster and len(features) > 100:
-            features, metadata = self._apply_clustering(features, max_features)
+        total_casos, total_obitos, incidencia_media = self._resumo_features(index.pontos)
+        
+        metadata = {
+            "clustering_applied": True,
+            "algorithm": "supercluster",
+            "zoom": zoom,
+            "bbox": bbox,
+            "original_count": index.total_pontos,
+            "clustered_count": len(features),
+            "index_cached": not construido,
+            "index_build_ms": round(construido[0], 3) if construido else None,
+            "query_ms": round(consulta_ms, 3)
+        }
         
         return MapaCamadasResponse(
             tipo_camada=TipoCamada.INCIDENCIA,
             competencia_inicio=competencia_inicio,
             competencia_fim=competencia_fim,
-            total_municipios=len(features),
+            total_municipios=index.total_pontos,
             total_casos=total_casos,
-            total_obitos=0,
+            total_obitos=total_obitos,
             incidencia_media=round(incidencia_media, 2),
             data=GeoJSONFeatureCollection(features=features),
             metadata=metadata
         )
     
-    def _classify_risk_incidencia(self, incidencia: float) -> Tuple[str, str]:
+    def _indice_incidencia(
+        self,
+        competencia_inicio: str,
+        competencia_fim: str,
+        municipios: Optional[List[str]]
+    ) -> Tuple[ClusterIndex, List[float]]:
         """
-        Classify risk level based on incidence rate.
+        Cluster index of the period's municipality features (per data version).
         
-        Thresholds (WHO/PAHO recommendations):
-        - < 100: baixo (green)
-        - 100-300: medio (yellow)
-        - 300-500: alto (orange)
-        - > 500: muito_alto (red)
+        Returns the index and the build time in ms ([] when it came from cache).
         """
-        if incidencia < 100:
-            return "baixo", "#4CAF50"  # Green
-        elif incidencia < 300:
-            return "medio", "#FFC107"  # Yellow
-        elif incidencia < 500:
-            return "alto", "#FF9800"  # Orange
-        else:
-            return "muito_alto", "#F44336"  # Red
+        versao = get_response_cache().versao_dados(
+            meses_competencia(competencia_inicio, competencia_fim)
+        )
+        chave = (
+            TipoCamada.INCIDENCIA.value, competencia_inicio, competencia_fim,
+            tuple(sorted(municipios or ())), versao
+        )
+        
+        construido = []
+        
+        def construir() -> ClusterIndex:
+            inicio = time.perf_counter()
+            index = ClusterIndex(self._features_incidencia(
+                competencia_inicio, competencia_fim, municipios, limite=None
+            ))
+            construido.append((time.perf_counter() - inicio) * 1000.0)
+            return index
+        
+        return get_cluster_index(chave, construir), construido
     
-    def _competencia_to_date(self, competencia: str) -> date:
-        """Convert YYYYMM to first day of month"""
-        year = int(competencia[:4])
-        month = int(competencia[4:6])
-        return date(year, month, 1)
+    def get_tile_incidencia(
+        self,
+        z: int,
+        x: int,
+        y: int,
+        competencia_inicio: str,
+        competencia_fim: str
+    ) -> bytes:
+        """
+        Incidence choropleth as a Mapbox Vector Tile.
+        
+        Polygons come from the municipality index, at the simplification
+        level whose zoom range contains ``z`` (no per-tile geometry query);
+        incidence comes from the same
+        per-data-version index used by the clustered layer. Municipalities
+        without cases in the period are included with zero incidence.
+        
+        Args:
+            z, x, y: XYZ tile
+            competencia_inicio: Start period YYYYMM
+            competencia_fim: End period YYYYMM
+            
+        Returns:
+            Encoded tile (layer "incidencia"); b"" when no polygon touches it
+        """
+        index, _ = self._indice_incidencia(competencia_inicio, competencia_fim, None)
+        dados = {f.properties.municipio_cod_ibge: f.properties for f in index.pontos}
+        classe_zero, cor_zero = self._classify_risk_incidencia(0.0)
+        
+        def features():
+            for cod, geometria in geometrias_do_indice(self.municipios, z).items():
+                info = self.municipios.get(cod)
+                if not info:
+                    continue
+                p = dados.get(cod)
+                yield int(cod), geometria, {
+                    "codigo_ibge": cod,
+                    "nome": info['nome'],
+                    "populacao": info['pop'],
+                    "casos": p.casos if p else 0,
+                    "obitos": p.obitos if p else 0,
+                    "incidencia": float(p.incidencia) if p else 0.0,
+                    "nivel_risco": (p.classe_risco if p else classe_zero).upper(),
+                    "cor_hex": p.cor_hex if p else cor_zero,
+                }
+        
+        return encode_tile(TipoCamada.INCIDENCIA.value, features(), z, x, y)
     
-    def _apply_clustering(
+    def _query_incidencia(
         self,
-        features: List[GeoJSONFeature],
-        max_features: int
-    ) -> Tuple[List[GeoJSONFeature], Dict]:
+        competencia_inicio: str,
+        competencia_fim: str,
+        municipios: Optional[List[str]],
+        limite: Optional[int]
+    ) -> Tuple[str, list]:
+        """SQL + params of the per-municipality case totals for the period"""
+        # Convert competencias to dates
+        dt_inicio = self._competencia_to_date(competencia_inicio)
+        dt_fim = self._competencia_to_date(competencia_fim)
+        
+        # Semanas que se sobrepõem ao período: terminam (semana_inicio + 6) a
+        # partir do 1º dia de competencia_inicio e começam até o fim do mês de
+        # competencia_fim
+        dt_fim = (dt_fim.replace(day=28) + timedelta(days=4)).replace(day=1)
+        
+        municipio_filter = ""
+        params = [dt_inicio - timedelta(days=6), dt_fim]
+        
+        if municipios:
+            municipio_filter = "AND s.municipio_cod_ibge = ANY(%s)"
+            params.append(municipios)
+        
+        limit_clause = ""
+        if limite is not None:
+            limit_clause = "LIMIT %s"
+            params.append(limite)
+        
+        query = f"""
+            SELECT 
+                s.municipio_cod_ibge,
+                SUM(s.casos) as total_casos,
+                SUM(s.obitos) as total_obitos
+            FROM indicador_epi_semanal s
+            WHERE s.doenca_tipo = 'DENGUE'
+              AND s.semana_inicio >= %s AND s.semana_inicio < %s
+              {municipio_filter}
+            GROUP BY s.municipio_cod_ibge
+            ORDER BY total_casos DESC
+            {limit_clause}
         """
-        Apply simple grid-based clustering to reduce feature count.
+        return query, params
+    
+    def _features_de_linhas(self, rows: List[Dict]) -> List[Dict]:
+        """Plain GeoJSON feature dicts for aggregated rows (unknown municipalities skipped)"""
+        conhecidos = []
+        for row in rows:
+            mun_info = self.municipios.get(row['municipio_cod_ibge'])
+            if mun_info:
+                conhecidos.append((row, mun_info))
+        if not conhecidos:
+            return []
         
-        In production, use algorithms like K-means or DBSCAN.
-        For now, implements a simple spatial grid aggregation.
+        casos = [int(row['total_casos'] or 0) for row, _ in conhecidos]
+        obitos = [int(row.get('total_obitos') or 0) for row, _ in conhecidos]
+        indicadores = calcular_indicadores(casos, [info['pop'] for _, info in conhecidos], obitos)
+        
+        features = []
+        for (row, mun_info), n_casos, n_obitos, incidencia, letalidade, classe, cor_hex in zip(
+            conhecidos, casos, obitos,
+            indicadores.incidencia.round(2).tolist(),
+            indicadores.letalidade.round(2).tolist(),
+            indicadores.classes(),
+            indicadores.cores()
+        ):
+            features.append({
+                "type": "Feature",
+                # Coordenadas do centroide
+                "geometry": {"type": "Point", "coordinates": [mun_info['lon'], mun_info['lat']]},
+                "properties": {
+                    "municipio_cod_ibge": row['municipio_cod_ibge'],
+                    "municipio_nome": mun_info['nome'],
+                    "populacao": mun_info['pop'],
+                    "casos": n_casos,
+                    "incidencia": incidencia,
+                    "obitos": n_obitos,
+                    "letalidade": letalidade,
+                    "classe_risco": classe.lower(),
+                    "cor_hex": cor_hex
+                }
+            })
+        return features
+    
+    def _features_incidencia(
+        self,
+        competencia_inicio: str,
+        competencia_fim: str,
+        municipios: Optional[List[str]],
+        limite: Optional[int]
+    ) -> List[GeoJSONFeature]:
+        """Municipality point features with incidence for the period"""
+        query, params = self._query_incidencia(competencia_inicio, competencia_fim, municipios, limite)
+        
+        # Query aggregated data by municipality (weekly aggregate table)
+        conn = get_connection(self.conn_str)
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(query, params)
+                rows = cur.fetchall()
+        finally:
+            conn.close()
+        
+        # Build GeoJSON features
+        return [
+            GeoJSONFeature(
+                geometry=GeoJSONGeometry(**feature["geometry"]),
+                properties=MunicipioProperties(**feature["properties"])
+            )
+            for feature in self._features_de_linhas(rows)
+        ]
+    
+    def stream_camada_incidencia(
+        self,
+        competencia_inicio: str,
+        competencia_fim: str,
+        municipios: Optional[List[str]] = None,
+        max_features: int = 10000,
+        itersize: int = 2000
+    ) -> Iterator[bytes]:
         """
-        # Simple implementation: keep top N features by case count
-        # In production, implement proper clustering (e.g., supercluster algorithm)
-        features_sorted = sorted(
-            features,
-            key=lambda f: f.properties.casos,
-            reverse=True
+        Incidence layer serialized incrementally (same JSON as get_camada_incidencia).
+        
+        Rows are read from a server-side (named) cursor ``itersize`` at a
+        time and written as plain dicts, without building or re-validating
+        Pydantic models, so memory stays flat and the first bytes go out
+        before the last row is read. Totals are written after the features.
+        
+        Args:
+            competencia_inicio: Start period YYYYMM
+            competencia_fim: End period YYYYMM
+            municipios: Filter by specific IBGE codes (optional)
+            max_features: Maximum features to return
+            itersize: Rows fetched per round trip
+            
+        Yields:
+            JSON chunks (MapaCamadasResponse layout)
+        """
+        query, params = self._query_incidencia(
+            competencia_inicio, competencia_fim, municipios, max_features
         )
+        totais = {"municipios": 0, "casos": 0, "obitos": 0, "incidencia": 0.0}
         
-        clustered = features_sorted[:max_features]
+        def features() -> Iterator[Dict]:
+            conn = get_connection(self.conn_str)
+            try:
+                with conn.cursor(name="mapa_camada_incidencia", cursor_factory=RealDictCursor) as cur:
+                    cur.itersize = itersize
+                    cur.execute(query, params)
+                    linhas = iter(cur)
+                    # Indicadores calculados em lote a cada itersize linhas
+                    while True:
+                        lote = list(islice(linhas, itersize))
+                        if not lote:
+                            break
+                        for feature in self._features_de_linhas(lote):
+                            props = feature["properties"]
+                            totais["municipios"] += 1
+                            totais["casos"] += props["casos"]
+                            totais["obitos"] += props["obitos"]
+                            totais["incidencia"] += props["incidencia"]
+                            yield feature
+            finally:
+                conn.close()
         
-        metadata = {
-            "clustering_applied": True,
-            "original_count": len(features),
-            "clustered_count": len(clustered),
-            "algorithm": "top_n_by_cases"
+        def resumo() -> Dict:
+            n = totais["municipios"]
+            return {
+                "total_municipios": n,
+                "total_casos": totais["casos"],
+                "total_obitos": totais["obitos"],
+                "incidencia_media": round(totais["incidencia"] / n, 2) if n else 0.0,
+                "metadata": {"streaming": True}
+            }
+        
+        return stream_feature_collection(
+            {
+                "tipo_camada": TipoCamada.INCIDENCIA.value,
+                "competencia_inicio": competencia_inicio,
+                "competencia_fim": competencia_fim,
+            },
+            features(),
+            resumo
+        )
+
+    def get_camada_incidencia_arrow(
+        self,
+        competencia_inicio: str,
+        competencia_fim: str,
+        municipios: Optional[List[str]] = None,
+        max_features: int = 10000
+    ) -> bytes:
+        """
+        Incidence layer as an Arrow IPC stream (one row per municipality).
+
+        Columns are filled straight from the aggregated rows, with the same
+        values as the GeoJSON properties plus the centroid as
+        ``longitude``/``latitude``; no features or Pydantic models are built.
+        """
+        query, params = self._query_incidencia(competencia_inicio, competencia_fim, municipios, max_features)
+
+        conn = get_connection(self.conn_str)
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(query, params)
+                rows = cur.fetchall()
+        finally:
+            conn.close()
+
+        conhecidos = []
+        for row in rows:
+            mun_info = self.municipios.get(row['municipio_cod_ibge'])
+            if mun_info:
+                conhecidos.append((row, mun_info))
+        
+        casos = [int(row['total_casos'] or 0) for row, _ in conhecidos]
+        obitos = [int(row.get('total_obitos') or 0) for row, _ in conhecidos]
+        populacao = [info['pop'] for _, info in conhecidos]
+        indicadores = calcular_indicadores(casos, populacao, obitos)
+        
+        colunas = {
+            "municipio_cod_ibge": [row['municipio_cod_ibge'] for row, _ in conhecidos],
+            "municipio_nome": [info['nome'] for _, info in conhecidos],
+            "longitude": [info['lon'] for _, info in conhecidos],
+            "latitude": [info['lat'] for _, info in conhecidos],
+            "populacao": populacao,
+            "casos": casos,
+            "obitos": obitos,
+            "incidencia": indicadores.incidencia,
+            "letalidade": indicadores.letalidade,
+            "classe_risco": [classe.lower() for classe in indicadores.classes()],
         }
         
-        return clustered, metadata
+        return tabela_ipc(
+            colunas,
+            {
+                "municipio_cod_ibge": "string", "municipio_nome": "string",
+                "longitude": "float64", "latitude": "float64", "populacao": "int64",
+                "casos": "int64", "obitos": "int64", "incidencia": "float64",
+                "letalidade": "float64", "classe_risco": "dictionary",
+            },
+            metadata={
+                "tipo_camada": TipoCamada.INCIDENCIA.value,
+                "competencia_inicio": competencia_inicio,
+                "competencia_fim": competencia_fim,
+            }
+        )
+
+    @staticmethod
+    def _resumo_features(features: List[GeoJSONFeature]) -> Tuple[int, int, float]:
+        """(total_casos, total_obitos, incidência média) of municipality features"""
+        total_casos = sum(f.properties.casos for f in features)
+        total_obitos = sum(f.properties.obitos for f in features)
+        incidencia_media = (
+            sum(f.properties.incidencia for f in features) / len(features) if features else 0.0
+        )
+        return total_casos, total_obitos, incidencia_media
+    
+    def _classify_risk_incidencia(self, incidencia: float) -> Tuple[str, str]:
+        """Risk class (lowercase) and color for an incidence rate (app.services.incidencia)"""
+        classe, cor = classificar_risco(incidencia)
+        return classe.lower(), cor
+    
+    def _competencia_to_date(self, competencia: str) -> date:
+        """Convert YYYYMM to first day of month"""
+        year = int(competencia[:4])
+        month = int(competencia[4:6])
+        return date(year, month, 1)
     
     def get_heatmap_data(
         self,
@@ -256,33 +600,31 @@ class MapaService:
         Returns:
             HeatmapData com pontos e intensidades
         """
-        conn = psycopg2.connect(self.conn_str)
+        conn = get_connection(self.conn_str)
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                where_clauses = []
-                params = []
-                
-                if filtro.ano:
-                    where_clauses.append("EXTRACT(YEAR FROM competencia) = %s")
-                    params.append(filtro.ano)
-                
-                if filtro.semana_epi_inicio and filtro.semana_epi_fim:
-                    where_clauses.append("EXTRACT(WEEK FROM competencia) BETWEEN %s AND %s")
-                    params.extend([filtro.semana_epi_inicio, filtro.semana_epi_fim])
+                # Intervalo de datas (indexável) para ano/semanas epidemiológicas
+                where_clauses, params = filtro_competencia(
+                    filtro.ano, filtro.semana_epi_inicio, filtro.semana_epi_fim,
+                    coluna="semana_inicio"
+                )
                 
                 if filtro.municipios:
                     where_clauses.append("municipio_cod_ibge = ANY(%s)")
                     params.append(filtro.municipios)
                 
-                where_clauses.append("indicador = 'CASOS_DENGUE'")
+                where_clauses.append("doenca_tipo = %s")
+                params.append(filtro.doenca_tipo or 'DENGUE')
                 
                 where_sql = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
                 
+                # Agregação em uma única consulta sobre o agregado semanal;
+                # população e centroide vêm do índice de municípios em memória
                 query = f"""
                     SELECT 
                         municipio_cod_ibge,
-                        SUM(valor) as casos
-                    FROM indicador_epi
+                        SUM(casos) as casos
+                    FROM indicador_epi_semanal
                     {where_sql}
                     GROUP BY municipio_cod_ibge
                     ORDER BY casos DESC
@@ -295,45 +637,23 @@ class MapaService:
         finally:
             conn.close()
         
-        # Converter para pontos de heatmap
+        # Converter para pontos de heatmap (intensidade = incidência)
+        intensidades = calcular_incidencia(
+            [int(row['casos'] or 0) for row in rows],
+            [self.municipios.populacao(row['municipio_cod_ibge']) for row in rows]
+        )
         points = []
-        max_intensity = 0.0
-        
-        for row in rows:
-            cod_ibge = row['municipio_cod_ibge']
-            casos = int(row['casos'] or 0)
-            
-            # Carregar população e coordenadas
-            pop = 1
-            lat = lon = 0.0
-            try:
-                conn = psycopg2.connect(self.conn_str)
-                with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute("SELECT COALESCE(populacao_estimada_2025,1) AS pop FROM municipios_ibge WHERE codigo_ibge=%s", (cod_ibge,))
-                    r = cur.fetchone()
-                    if r:
-                        pop = int(r['pop'] or 1)
-                    cur.execute("SELECT ST_Y(centroide) AS lat, ST_X(centroide) AS lon FROM municipios_geometrias WHERE codigo_ibge=%s", (cod_ibge,))
-                    r2 = cur.fetchone()
-                    if r2:
-                        lat = float(r2['lat'] or 0.0)
-                        lon = float(r2['lon'] or 0.0)
-            finally:
-                conn.close()
-            
-            intensity = (casos / pop * 100000) if pop > 0 else 0
-            
+        for row, intensity in zip(rows, intensidades.round(2).tolist()):
+            lat, lon = self.municipios.centroide(row['municipio_cod_ibge'])
             points.append(HeatmapPoint(
                 lat=lat,
                 lng=lon,
-                intensity=round(intensity, 2)
+                intensity=intensity
             ))
-            
-            max_intensity = max(max_intensity, intensity)
         
         return HeatmapData(
             points=points,
-            max_intensity=round(max_intensity, 2),
+            max_intensity=round(float(intensidades.max()), 2) if len(rows) else 0.0,
             total_points=len(points),
             metadata={"filtro_aplicado": filtro.model_dump(exclude_none=True)}
         )
@@ -351,118 +671,117 @@ class MapaService:
         Returns:
             EstatisticasMapa com totalizadores e distribuições
         """
-        conn = psycopg2.connect(self.conn_str)
+        inicio = time.perf_counter()
+        conn = get_connection(self.conn_str)
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                # Montar filtros
-                where_clauses = []
-                params = []
-                
-                if filtro.ano:
-                    where_clauses.append("EXTRACT(YEAR FROM competencia) = %s")
-                    params.append(filtro.ano)
-                
-                if filtro.semana_epi_inicio and filtro.semana_epi_fim:
-                    where_clauses.append("EXTRACT(WEEK FROM competencia) BETWEEN %s AND %s")
-                    params.extend([filtro.semana_epi_inicio, filtro.semana_epi_fim])
+                # Intervalo de datas (indexável) para ano/semanas epidemiológicas
+                where_clauses, params = filtro_competencia(
+                    filtro.ano, filtro.semana_epi_inicio, filtro.semana_epi_fim,
+                    coluna="semana_inicio"
+                )
                 
-                where_clauses.append("indicador = 'CASOS_DENGUE'")
+                where_clauses.append("doenca_tipo = %s")
+                params.append(filtro.doenca_tipo or 'DENGUE')
                 
                 where_sql = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
                 
-                # Query principal (agregado)
+                # Totais, distribuição de risco, máximos e município com mais
+                # casos calculados em uma única consulta. A população vem do
+                # índice em memória, enviada como arrays (sem consultar
+                # municipios_ibge); sem população informada vai 0 e o
+                # município fica sem incidência (NULL, fora das médias e da
+                # distribuição de risco)
+                codigos, populacoes = [], []
+                for cod, info in self.municipios.items():
+                    codigos.append(cod)
+                    populacoes.append(info['pop'] if info['pop_informada'] else 0)
+                
                 query = f"""
+                    WITH por_municipio AS (
+                        SELECT 
+                            municipio_cod_ibge,
+                            COALESCE(SUM(casos), 0) as casos,
+                            COALESCE(SUM(obitos), 0) as obitos
+                        FROM indicador_epi_semanal
+                        {where_sql}
+                        GROUP BY municipio_cod_ibge
+                    ),
+                    com_incidencia AS (
+                        SELECT 
+                            pm.municipio_cod_ibge,
+                            pm.casos,
+                            pm.obitos,
+                            pm.casos::numeric / NULLIF(ref.pop, 0) * 100000 AS incidencia
+                        FROM por_municipio pm
+                        LEFT JOIN unnest(%s::varchar[], %s::bigint[]) AS ref(codigo_ibge, pop)
+                            ON ref.codigo_ibge = pm.municipio_cod_ibge
+                    ),
+                    com_risco AS (
+                        -- Classe 0..3 pelos mesmos limiares de app.services.incidencia
+                        SELECT *, width_bucket(incidencia, %s::numeric[]) AS risco
+                        FROM com_incidencia
+                    )
                     SELECT 
-                        COUNT(DISTINCT municipio_cod_ibge) as total_municipios,
-                        SUM(valor) as total_casos,
-                        0 as total_obitos,
-                        municipio_cod_ibge,
-                        SUM(valor) as casos_mun
-                    FROM indicador_epi
-                    {where_sql}
-                    GROUP BY municipio_cod_ibge
+                        COUNT(*) as total_municipios,
+                        COALESCE(SUM(casos), 0) as total_casos,
+                        COALESCE(SUM(obitos), 0) as total_obitos,
+                        COALESCE(AVG(incidencia), 0) as incidencia_media,
+                        COALESCE(MAX(incidencia), 0) as incidencia_maxima,
+                        (ARRAY_AGG(municipio_cod_ibge ORDER BY casos DESC) FILTER (WHERE casos > 0))[1]
+                            as municipio_max_casos,
+                        COUNT(*) FILTER (WHERE risco = 0) as risco_baixo,
+                        COUNT(*) FILTER (WHERE risco = 1) as risco_medio,
+                        COUNT(*) FILTER (WHERE risco = 2) as risco_alto,
+                        COUNT(*) FILTER (WHERE risco = 3) as risco_muito_alto
+                    FROM com_risco
                 """
+                params.extend([codigos, populacoes, list(LIMIARES_INCIDENCIA)])
                 
                 cur.execute(query, params)
-                rows = cur.fetchall()
-                
-                if not rows:
-                    # Retornar estatísticas vazias
-                    return EstatisticasMapa(
-                        total_municipios=0,
-                        total_casos=0,
-                        total_obitos=0,
-                        taxa_letalidade=0.0,
-                        incidencia_media=0.0,
-                        incidencia_maxima=0.0,
-                        distribuicao_risco={},
-                        periodo_inicio=filtro.data_inicio or "",
-                        periodo_fim=filtro.data_fim or ""
-                    )
-                
-                # Calcular totais
-                total_municipios = len(rows)
-                total_casos = sum(int(r['casos_mun'] or 0) for r in rows)
-                total_obitos = 0
-                
-                taxa_letalidade = (total_obitos / total_casos * 100) if total_casos > 0 else 0.0
-                
-                # Calcular incidências
-                incidencias = []
-                max_incidencia = 0.0
-                municipio_max_casos = None
-                max_casos_valor = 0
-                distribuicao_risco = {"BAIXO": 0, "MEDIO": 0, "ALTO": 0, "MUITO_ALTO": 0}
-                
-                for row in rows:
-                    cod_ibge = row['municipio_cod_ibge']
-                    casos = int(row['casos_mun'] or 0)
-                    
-                    # Buscar população
-                    pop = 1
-                    cur.execute("SELECT COALESCE(populacao_estimada_2025,1) AS pop FROM municipios_ibge WHERE codigo_ibge=%s", (cod_ibge,))
-                    r = cur.fetchone()
-                    if r:
-                        pop = int(r['pop'] or 1)
-                    incidencia = (casos / pop * 100000) if pop > 0 else 0
-                    incidencias.append(incidencia)
-                    
-                    if incidencia > max_incidencia:
-                        max_incidencia = incidencia
-                    
-                    if casos > max_casos_valor:
-                        max_casos_valor = casos
-                        # nome do município
-                        cur.execute("SELECT nome FROM municipios_ibge WHERE codigo_ibge=%s", (cod_ibge,))
-                        r2 = cur.fetchone()
-                        municipio_max_casos = r2['nome'] if r2 and r2.get('nome') else None
-                    
-                    # Classificar risco
-                    if incidencia < 100:
-                        distribuicao_risco["BAIXO"] += 1
-                    elif incidencia < 300:
-                        distribuicao_risco["MEDIO"] += 1
-                    elif incidencia < 500:
-                        distribuicao_risco["ALTO"] += 1
-                    else:
-                        distribuicao_risco["MUITO_ALTO"] += 1
-                
-                incidencia_media = sum(incidencias) / len(incidencias) if incidencias else 0.0
-                
-                return EstatisticasMapa(
-                    total_municipios=total_municipios,
-                    total_casos=total_casos,
-                    total_obitos=total_obitos,
-                    taxa_letalidade=round(taxa_letalidade, 2),
-                    incidencia_media=round(incidencia_media, 2),
-                    incidencia_maxima=round(max_incidencia, 2),
-                    municipio_max_casos=municipio_max_casos,
-                    distribuicao_risco=distribuicao_risco,
-                    periodo_inicio=filtro.data_inicio or f"{filtro.ano}-01-01" if filtro.ano else "",
-                    periodo_fim=filtro.data_fim or f"{filtro.ano}-12-31" if filtro.ano else ""
-                )
+                row = cur.fetchone()
         finally:
             conn.close()
+        
+        tempo_ms = round((time.perf_counter() - inicio) * 1000, 2)
+        
+        if not row or not row['total_municipios']:
+            # Retornar estatísticas vazias
+            return EstatisticasMapa(
+                total_municipios=0,
+                total_casos=0,
+                total_obitos=0,
+                taxa_letalidade=0.0,
+                incidencia_media=0.0,
+                incidencia_maxima=0.0,
+                distribuicao_risco={},
+                periodo_inicio=filtro.data_inicio or "",
+                periodo_fim=filtro.data_fim or "",
+                tempo_processamento_ms=tempo_ms
+            )
+        
+        total_casos = int(row['total_casos'])
+        total_obitos = int(row.get('total_obitos') or 0)
+        taxa_letalidade = (total_obitos / total_casos * 100) if total_casos > 0 else 0.0
+        
+        return EstatisticasMapa(
+            total_municipios=int(row['total_municipios']),
+            total_casos=total_casos,
+            total_obitos=total_obitos,
+            taxa_letalidade=round(taxa_letalidade, 2),
+            incidencia_media=round(float(row['incidencia_media']), 2),
+            incidencia_maxima=round(float(row['incidencia_maxima']), 2),
+            municipio_max_casos=self.municipios.nome(row['municipio_max_casos']),
+            distribuicao_risco={
+                "BAIXO": int(row['risco_baixo']),
+                "MEDIO": int(row['risco_medio']),
+                "ALTO": int(row['risco_alto']),
+                "MUITO_ALTO": int(row['risco_muito_alto'])
+            },
+            periodo_inicio=filtro.data_inicio or f"{filtro.ano}-01-01" if filtro.ano else "",
+            periodo_fim=filtro.data_fim or f"{filtro.ano}-12-31" if filtro.ano else "",
+            tempo_processamento_ms=tempo_ms
+        )
     
     def get_serie_temporal_municipio(
         self,
@@ -481,28 +800,26 @@ class MapaService:
         Returns:
             SerieTemporalMunicipio com série semanal
         """
-        conn = psycopg2.connect(self.conn_str)
+        conn = get_connection(self.conn_str)
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                where_clauses = [
-                    "municipio_cod_ibge = %s",
-                    "EXTRACT(YEAR FROM competencia) = %s"
-                ]
+                where_clauses = ["municipio_cod_ibge = %s", "ano_epi = %s"]
                 params = [codigo_ibge, ano]
                 
                 if doenca_tipo:
-                    where_clauses.append("indicador = 'CASOS_DENGUE'")
+                    where_clauses.append("doenca_tipo = %s")
+                    params.append(doenca_tipo)
                 
                 where_sql = " AND ".join(where_clauses)
                 
                 query = f"""
                     SELECT 
-                        EXTRACT(WEEK FROM competencia) as semana_epi,
-                        SUM(valor) as casos
-                    FROM indicador_epi
+                        semana_epi,
+                        SUM(casos) as casos
+                    FROM indicador_epi_semanal
                     WHERE {where_sql}
-                    GROUP BY EXTRACT(WEEK FROM competencia)
-                    ORDER BY EXTRACT(WEEK FROM competencia)
+                    GROUP BY semana_epi
+                    ORDER BY semana_epi
                 """
                 
                 cur.execute(query, params)
@@ -510,33 +827,18 @@ class MapaService:
         finally:
             conn.close()
         
-        # Obter info do município
-        # Nome e população reais
-        nom = "Desconhecido"
-        pop = 1
-        try:
-            conn = psycopg2.connect(self.conn_str)
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute("SELECT nome, COALESCE(populacao_estimada_2025,1) AS pop FROM municipios_ibge WHERE codigo_ibge=%s", (codigo_ibge,))
-                r = cur.fetchone()
-                if r:
-                    nom = r['nome'] or nom
-                    pop = int(r['pop'] or 1)
-        finally:
-            conn.close()
+        # Nome e população do índice de municípios
+        nom = self.municipios.nome(codigo_ibge, "Desconhecido")
+        pop = self.municipios.populacao(codigo_ibge)
         
         # Construir série
+        incidencias = calcular_incidencia([int(row['casos'] or 0) for row in rows], pop)
         serie = []
-        for row in rows:
+        for row, incidencia in zip(rows, incidencias.round(2).tolist()):
             semana = int(row['semana_epi']) if row['semana_epi'] else 0
-            casos = int(row['casos']) if row['casos'] else 0
-            
-            # Calcular incidência
-            incidencia = (casos / pop * 100000) if pop > 0 else 0
-            
             serie.append(SerieTemporal(
                 data=f"{ano}-W{semana:02d}",
-                valor=round(incidencia, 2)
+                valor=incidencia
             ))
         
         return SerieTemporalMunicipio(
@@ -544,3 +846,120 @@ class MapaService:
             nome=nom,
             serie=serie
         )
+
+    def get_series_temporais(
+        self,
+        codigos_ibge: List[str],
+        ano: int,
+        doenca_tipo: Optional[str] = None
+    ) -> SeriesTemporaisMunicipios:
+        """
+        Return weekly incidence series for several municipalities at once
+
+        One grouped query over the weekly aggregate (``= ANY`` on the codes)
+        replaces one request/query per municipality. Every series is a dense
+        vector with one slot per epidemiological week of ``ano`` (zero where
+        there were no notifications); names and populations come from the
+        municipality index, without touching the database.
+
+        Args:
+            codigos_ibge: IBGE codes, in the order of the response
+            ano: Epidemiological year
+            doenca_tipo: Disease filter (optional)
+
+        Returns:
+            SeriesTemporaisMunicipios in columnar layout
+        """
+        n_semanas = semanas_no_ano(ano)
+        casos = self._casos_semanais(codigos_ibge, ano, doenca_tipo)
+
+        populacao = [self.municipios.populacao(cod, 0) for cod in codigos_ibge]
+        # Matriz município × semana; população como coluna (broadcast)
+        incidencia = calcular_incidencia(casos, [[pop] for pop in populacao]).round(2).tolist()
+
+        return SeriesTemporaisMunicipios(
+            ano=ano,
+            doenca_tipo=doenca_tipo,
+            semanas=[f"{ano}-W{semana:02d}" for semana in range(1, n_semanas + 1)],
+            codigos_ibge=list(codigos_ibge),
+            nomes=[self.municipios.nome(cod, "Desconhecido") for cod in codigos_ibge],
+            populacao=populacao,
+            casos=casos,
+            incidencia=incidencia
+        )
+
+    def get_series_temporais_arrow(
+        self,
+        codigos_ibge: List[str],
+        ano: int,
+        doenca_tipo: Optional[str] = None
+    ) -> bytes:
+        """
+        Same series as get_series_temporais, as an Arrow IPC stream.
+
+        Long layout, one row per municipality × week: ``municipio_cod_ibge``,
+        ``semana_epi``, ``casos``, ``incidencia`` (year and disease in the
+        schema metadata).
+        """
+        n_semanas = semanas_no_ano(ano)
+        casos = self._casos_semanais(codigos_ibge, ano, doenca_tipo)
+
+        incidencia = calcular_incidencia(
+            casos, [[self.municipios.populacao(cod, 0)] for cod in codigos_ibge]
+        )
+
+        return tabela_ipc(
+            {
+                "municipio_cod_ibge": [cod for cod in codigos_ibge for _ in range(n_semanas)],
+                "semana_epi": list(range(1, n_semanas + 1)) * len(codigos_ibge),
+                "casos": [c for serie in casos for c in serie],
+                "incidencia": incidencia.ravel(),
+            },
+            {"municipio_cod_ibge": "dictionary", "semana_epi": "int16", "casos": "int32", "incidencia": "float64"},
+            metadata={"ano": ano, "doenca_tipo": doenca_tipo}
+        )
+
+    def _casos_semanais(
+        self,
+        codigos_ibge: List[str],
+        ano: int,
+        doenca_tipo: Optional[str]
+    ) -> List[List[int]]:
+        """Dense weekly case vectors (one per code, zero-filled) from one grouped query"""
+        n_semanas = semanas_no_ano(ano)
+        linha = {cod: i for i, cod in enumerate(codigos_ibge)}
+        casos = [[0] * n_semanas for _ in codigos_ibge]
+
+        if codigos_ibge:
+            where_clauses = ["municipio_cod_ibge = ANY(%s)", "ano_epi = %s"]
+            params: List = [list(codigos_ibge), ano]
+
+            if doenca_tipo:
+                where_clauses.append("doenca_tipo = %s")
+                params.append(doenca_tipo)
+
+            query = f"""
+                SELECT
+                    municipio_cod_ibge,
+                    semana_epi,
+                    SUM(casos) as casos
+                FROM indicador_epi_semanal
+                WHERE {' AND '.join(where_clauses)}
+                GROUP BY municipio_cod_ibge, semana_epi
+            """
+
+            conn = get_connection(self.conn_str)
+            try:
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    cur.execute(query, params)
+                    rows = cur.fetchall()
+            finally:
+                conn.close()
+
+            for row in rows:
+                i = linha.get(row['municipio_cod_ibge'])
+                semana = int(row['semana_epi'] or 0)
+                if i is not None and 1 <= semana <= n_semanas:
+                    casos[i][semana - 1] = int(row['casos'] or 0)
+
+        return casos
@@ -0,0 +1,341 @@
+"""
+Índice de referência de municípios em memória
+
+Substitui os dicionários MT_MUNICIPIOS copiados em cada service. Carrega, uma
+única vez por processo e sob demanda, todos os municípios de
+``municipios_ibge`` + ``municipios_geometrias`` (nome, população, centroide e
+geometria simplificada).
+
+O índice é versionado: a cada ``MUNICIPIO_INDEX_CHECK_INTERVAL`` segundos
+(default 300) uma consulta leve compara contagem e ``MAX(updated_at)`` das
+duas tabelas com a versão carregada e recarrega se algo mudou. Nenhuma
+requisição consulta as tabelas de referência diretamente.
+
+Não há amostra embutida: se a primeira carga falha, as consultas ao índice
+levantam ``MunicipioIndexIndisponivel`` (nova tentativa a cada 30 s), de modo
+que nenhuma resposta é montada — nem guardada no cache de respostas — com
+dados de referência incompletos. Uma falha depois de uma carga bem-sucedida
+mantém a versão já carregada.
+
+Os níveis da pirâmide de simplificação (``municipios_geometrias_niveis``,
+gerados pelo import_geometrias_mt.py) são carregados sob demanda, um nível
+por vez, na primeira vez que um zoom da faixa do nível é pedido; sem a
+tabela, ``geometrias(zoom)`` devolve a ``geom_simplificada``.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+from app.db import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+# Intervalo para nova tentativa de carga após uma falha
+_RETRY_SECONDS = 30.0
+
+_VERSION_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM municipios_ibge) AS n_ibge,
+        (SELECT MAX(updated_at) FROM municipios_ibge) AS upd_ibge,
+        (SELECT COUNT(*) FROM municipios_geometrias) AS n_geom,
+        (SELECT MAX(updated_at) FROM municipios_geometrias) AS upd_geom
+"""
+
+_LOAD_QUERY = """
+    SELECT
+        mi.codigo_ibge,
+        mi.nome,
+        mi.populacao_estimada_2025 AS pop,
+        ST_Y(mg.centroide) AS lat,
+        ST_X(mg.centroide) AS lon,
+        ST_AsGeoJSON(mg.geom_simplificada, 6) AS geom
+    FROM municipios_ibge mi
+    LEFT JOIN municipios_geometrias mg ON mg.codigo_ibge = mi.codigo_ibge
+"""
+
+
+_NIVEIS_QUERY = """
+    SELECT nivel, MIN(zoom_min) AS zoom_min, MAX(zoom_max) AS zoom_max
+    FROM municipios_geometrias_niveis
+    GROUP BY nivel
+    ORDER BY nivel
+"""
+
+_NIVEL_GEOM_QUERY = """
+    SELECT codigo_ibge, ST_AsGeoJSON(geom, 6) AS geom
+    FROM municipios_geometrias_niveis
+    WHERE nivel = %s
+"""
+
+
+class MunicipioIndexIndisponivel(RuntimeError):
+    """Índice nunca carregado e banco inacessível: não há dados de referência"""
+
+
+def _version_key(row: Dict[str, Any]) -> str:
+    return "|".join(str(row.get(k)) for k in ('n_ibge', 'upd_ibge', 'n_geom', 'upd_geom'))
+
+
+class MunicipioIndex:
+    """
+    Cache código IBGE → {nome, pop, lat, lon, geom}.
+
+    As entradas mantêm as chaves do antigo MT_MUNICIPIOS (``nome``, ``pop``,
+    ``lat``, ``lon``); ``geom`` é a geometria simplificada em GeoJSON (dict)
+    ou None. ``pop`` é no mínimo 1; ``pop_informada`` diz se a população
+    veio preenchida (> 0) da base, para quem não pode usar esse piso.
+    """
+
+    def __init__(self, conn_str: Optional[str] = None, check_interval: Optional[float] = None):
+        self.conn_str = conn_str
+        self.check_interval = (
+            check_interval if check_interval is not None
+            else float(os.getenv("MUNICIPIO_INDEX_CHECK_INTERVAL", "300"))
+        )
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._versao: Optional[str] = None
+        self._next_check = 0.0
+        self._erro: Optional[Exception] = None
+        self._lock = threading.Lock()
+        # Pirâmide de simplificação da versão carregada: catálogo
+        # [(nivel, zoom_min, zoom_max)] (None = não consultado) e geometrias
+        # dos níveis já pedidos
+        self._niveis: Optional[List[Tuple[int, int, int]]] = None
+        self._geom_niveis: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        self._niveis_lock = threading.Lock()
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Dict[str, Dict[str, Any]],
+        versao: str = "static",
+        niveis: Optional[Dict[int, Tuple[int, int, Dict[str, Dict[str, Any]]]]] = None
+    ) -> "MunicipioIndex":
+        """
+        Cria um índice fixo (sem banco), útil em testes e scripts.
+
+        ``niveis``: nivel → (zoom_min, zoom_max, {código: geometria GeoJSON})
+        """
+        index = cls(check_interval=float("inf"))
+        index._entries = {cod: cls._normalize(info) for cod, info in records.items()}
+        index._versao = versao
+        index._next_check = float("inf")
+        niveis = niveis or {}
+        index._niveis = sorted((n, zmin, zmax) for n, (zmin, zmax, _) in niveis.items())
+        index._geom_niveis = {n: geoms for n, (_, _, geoms) in niveis.items()}
+        return index
+
+    @staticmethod
+    def _normalize(info: Dict[str, Any]) -> Dict[str, Any]:
+        pop = int(info.get('pop') or 0)
+        return {
+            'nome': info.get('nome'),
+            'pop': pop if pop > 0 else 1,
+            'pop_informada': pop > 0,
+            'lat': float(info.get('lat') or 0.0),
+            'lon': float(info.get('lon') or 0.0),
+            'geom': info.get('geom'),
+        }
+
+    # ------------------------------------------------------------------
+    # Carga e versionamento
+    # ------------------------------------------------------------------
+
+    def _ensure_fresh(self) -> Dict[str, Dict[str, Any]]:
+        if time.monotonic() < self._next_check:
+            return self._entradas_carregadas()
+
+        with self._lock:
+            if time.monotonic() < self._next_check:
+                return self._entradas_carregadas()
+            try:
+                self._refresh()
+                self._erro = None
+                self._next_check = time.monotonic() + self.check_interval
+            except Exception as e:
+                if self._versao is None:
+                    logger.error(f"Índice de municípios indisponível: {e}")
+                    self._erro = e
+                else:
+                    logger.warning(f"Falha ao verificar versão do índice de municípios: {e}")
+                self._next_check = time.monotonic() + min(self.check_interval, _RETRY_SECONDS)
+        return self._entradas_carregadas()
+
+    def _entradas_carregadas(self) -> Dict[str, Dict[str, Any]]:
+        if self._versao is None:
+            raise MunicipioIndexIndisponivel(
+                f"Índice de municípios não carregado: {self._erro}"
+            ) from self._erro
+        return self._entries
+
+    def _refresh(self) -> None:
+        """Recarrega o índice se a versão das tabelas mudou"""
+        conn = get_connection(self.conn_str)
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(_VERSION_QUERY)
+                versao = _version_key(cur.fetchone() or {})
+                if versao == self._versao:
+                    return
+
+                cur.execute(_LOAD_QUERY)
+                rows = cur.fetchall()
+        finally:
+            conn.close()
+
+        entries = {}
+        for row in rows:
+            info = dict(row)
+            info['geom'] = json.loads(row['geom']) if row.get('geom') else None
+            entries[row['codigo_ibge']] = self._normalize(info)
+
+        # Troca atômica: leitores concorrentes veem o índice antigo ou o novo
+        with self._niveis_lock:
+            self._niveis = None
+            self._geom_niveis = {}
+        self._entries = entries
+        self._versao = versao
+        logger.info(f"Índice de municípios carregado: {len(entries)} municípios (versão {versao})")
+
+    def invalidate(self) -> None:
+        """Força verificação de versão no próximo acesso"""
+        self._next_check = 0.0
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    @property
+    def versao(self) -> Optional[str]:
+        self._ensure_fresh()
+        return self._versao
+
+    def get(self, codigo_ibge: str) -> Optional[Dict[str, Any]]:
+        return self._ensure_fresh().get(codigo_ibge)
+
+    def __contains__(self, codigo_ibge: str) -> bool:
+        return codigo_ibge in self._ensure_fresh()
+
+    def __len__(self) -> int:
+        return len(self._ensure_fresh())
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        return iter(list(self._ensure_fresh().items()))
+
+    def nome(self, codigo_ibge: str, default: Optional[str] = None) -> Optional[str]:
+        info = self.get(codigo_ibge)
+        return info['nome'] if info else default
+
+    def populacao(self, codigo_ibge: str, default: int = 1) -> int:
+        info = self.get(codigo_ibge)
+        return info['pop'] if info else default
+
+    def centroide(self, codigo_ibge: str) -> Tuple[float, float]:
+        """(lat, lon) do centroide; (0, 0) se desconhecido"""
+        info = self.get(codigo_ibge)
+        return (info['lat'], info['lon']) if info else (0.0, 0.0)
+
+    # ------------------------------------------------------------------
+    # Pirâmide de simplificação
+    # ------------------------------------------------------------------
+
+    def _catalogo_niveis(self) -> List[Tuple[int, int, int]]:
+        if self._niveis is not None:
+            return self._niveis
+        with self._niveis_lock:
+            if self._niveis is None:
+                try:
+                    conn = get_connection(self.conn_str)
+                    try:
+                        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                            cur.execute(_NIVEIS_QUERY)
+                            rows = cur.fetchall()
+                    finally:
+                        conn.close()
+                    self._niveis = [
+                        (int(r['nivel']), int(r['zoom_min']), int(r['zoom_max'])) for r in rows
+                    ]
+                except Exception as e:
+                    logger.warning(f"Pirâmide de geometrias indisponível, usando geom_simplificada: {e}")
+                    self._niveis = []
+            return self._niveis
+
+    def nivel_para_zoom(self, zoom: int) -> Optional[int]:
+        """
+        Nível da pirâmide cuja faixa de zoom contém ``zoom`` (fora das faixas,
+        o nível mais próximo); None se a pirâmide não existe.
+        """
+        self._ensure_fresh()
+        niveis = self._catalogo_niveis()
+        if not niveis:
+            return None
+        for nivel, zoom_min, zoom_max in niveis:
+            if zoom_min <= zoom <= zoom_max:
+                return nivel
+        return min(niveis, key=lambda n: min(abs(zoom - n[1]), abs(zoom - n[2])))[0]
+
+    def geometrias(self, zoom: Optional[int] = None) -> Tuple[Optional[int], Dict[str, Dict[str, Any]]]:
+        """
+        Geometrias GeoJSON para o zoom.
+
+        Returns:
+            (nível, código → geometria); nível None = ``geom_simplificada``
+        """
+        nivel = self.nivel_para_zoom(zoom) if zoom is not None else None
+        if nivel is None:
+            return None, {
+                cod: info['geom'] for cod, info in self._ensure_fresh().items() if info.get('geom')
+            }
+
+        geoms = self._geom_niveis.get(nivel)
+        if geoms is not None:
+            return nivel, geoms
+        with self._niveis_lock:
+            geoms = self._geom_niveis.get(nivel)
+            if geoms is None:
+                try:
+                    conn = get_connection(self.conn_str)
+                    try:
+                        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                            cur.execute(_NIVEL_GEOM_QUERY, (nivel,))
+                            rows = cur.fetchall()
+                    finally:
+                        conn.close()
+                except Exception as e:
+                    logger.warning(f"Falha ao carregar geometrias do nível {nivel}: {e}")
+                    return self.geometrias(None)
+                geoms = {r['codigo_ibge']: json.loads(r['geom']) for r in rows if r.get('geom')}
+                self._geom_niveis[nivel] = geoms
+                logger.info(f"Geometrias do nível {nivel} carregadas: {len(geoms)} municípios")
+        return nivel, geoms
+
+    def populacao_total(self, codigos: Optional[List[str]] = None) -> int:
+        entries = self._ensure_fresh()
+        if codigos is None:
+            return sum(info['pop'] for info in entries.values())
+        return sum(entries[c]['pop'] for c in codigos if c in entries)
+
+
+_index: Optional[MunicipioIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_municipio_index(conn_str: Optional[str] = None) -> MunicipioIndex:
+    """
+    Retorna o índice compartilhado do processo (criado sob demanda).
+
+    Args:
+        conn_str: DSN usado apenas se o pool de conexões ainda não existir
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = MunicipioIndex(conn_str)
+    return _index
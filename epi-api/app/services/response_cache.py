@@ -0,0 +1,494 @@
+"""
+Cache de respostas dos endpoints de mapa
+
+Guarda o JSON já serializado das respostas de ``/mapa/camadas``,
+``/mapa/heatmap``, ``/mapa/estatisticas`` e ``/mapa/series-temporais``,
+chaveado pelo filtro normalizado.
+Um acerto dispensa tanto as queries quanto a serialização Pydantic.
+
+Camadas:
+    memória  LRU + TTL por processo (sempre ativa)
+    Redis    opcional (``REDIS_URL`` + pacote ``redis``), compartilhada entre
+             réplicas da API e visível para os workers Celery
+
+Invalidação por versão de dados: cada competência (YYYYMM) tem um contador de
+versão que entra na chave. Quando um ETL termina, ``invalidar_periodo``
+incrementa o contador dos meses afetados e as entradas antigas simplesmente
+deixam de ser encontradas (expiram por TTL/LRU). Com Redis os contadores
+ficam lá, de modo que um ETL concluído em um worker invalida todas as réplicas;
+sem Redis a invalidação vale só para o processo que rodou o ETL e as demais
+réplicas dependem do TTL.
+
+Períodos fechados (competência final anterior ao mês corrente) praticamente
+não mudam e usam um TTL mais longo.
+
+Os contadores só enxergam ETLs que passaram por ``invalidar_periodo`` neste
+processo (ou no Redis). Para que uma carga feita por outro caminho (scripts,
+outra réplica sem Redis, SQL manual) também mude a versão, ela inclui uma
+marca lida do banco para o período das competências pedidas —
+``MAX(atualizado_em)``/``COUNT(*)`` de ``indicador_epi_semanal`` e de
+``indice_entomologico`` no intervalo —, memorizada por período durante
+``RESPONSE_CACHE_VERSAO_TTL`` segundos. Uma carga só muda a versão dos
+períodos que tocou (como os contadores por competência), e uma mudança fora
+do fluxo de ETL aparece, no máximo, após esse intervalo.
+
+Populações, nomes e geometrias das respostas vêm do índice de municípios;
+a versão carregada do índice também entra na versão de dados, de modo que uma
+recarga das tabelas de referência troca as chaves (inclusive as de períodos
+fechados, com TTL longo). Sem índice carregado o cálculo da versão falha e
+nada é lido nem gravado no cache.
+
+A mesma versão de dados gera os ETags (``etag``) dos GETs condicionais de mapa
+e dashboard: com ``If-None-Match`` igual ao ETag atual os endpoints respondem
+``304 Not Modified`` sem serialização (no máximo a consulta da marca de dados,
+uma vez por período a cada ``RESPONSE_CACHE_VERSAO_TTL``).
+
+Configuração (variáveis de ambiente):
+    RESPONSE_CACHE_ENABLED       0 desliga o cache (default 1)
+    RESPONSE_CACHE_MAX_ENTRIES   entradas na camada em memória (default 256)
+    RESPONSE_CACHE_TTL           TTL (s) de períodos abertos (default 300)
+    RESPONSE_CACHE_TTL_FECHADO   TTL (s) de períodos fechados (default 86400)
+    RESPONSE_CACHE_VERSAO_TTL    validade (s) da marca de dados lida do banco;
+                                 0 desliga a consulta (default 30)
+    REDIS_URL                    habilita a camada Redis (ex: redis://redis:6379/1)
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from prometheus_client import Counter
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - dependência opcional
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+# Prometheus metrics
+RESPONSE_CACHE_HITS = Counter(
+    'response_cache_hits_total',
+    'Map responses served from the response cache',
+    ['endpoint', 'tier']
+)
+
+RESPONSE_CACHE_MISSES = Counter(
+    'response_cache_misses_total',
+    'Map responses computed because they were not cached',
+    ['endpoint']
+)
+
+RESPONSE_CACHE_INVALIDATIONS = Counter(
+    'response_cache_invalidations_total',
+    'Competencias whose cached responses were invalidated'
+)
+
+
+# Marca de dados de um período [inicio, fim): muda quando o refresh do agregado
+# semanal ou o ETL LIRAa gravam semanas/levantamentos dentro dele
+SQL_MARCA_DADOS = """
+    SELECT
+        (SELECT MAX(atualizado_em) FROM indicador_epi_semanal
+         WHERE semana_inicio >= %(inicio)s AND semana_inicio < %(fim)s),
+        (SELECT COUNT(*) FROM indicador_epi_semanal
+         WHERE semana_inicio >= %(inicio)s AND semana_inicio < %(fim)s),
+        (SELECT MAX(atualizado_em) FROM indice_entomologico
+         WHERE data_levantamento >= %(inicio)s AND data_levantamento < %(fim)s),
+        (SELECT COUNT(*) FROM indice_entomologico
+         WHERE data_levantamento >= %(inicio)s AND data_levantamento < %(fim)s)
+"""
+
+
+def marca_dados_banco(inicio: date, fim: date) -> str:
+    """Marca de dados do período [inicio, fim) no banco (ver ``SQL_MARCA_DADOS``)"""
+    from app.db import get_connection
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SQL_MARCA_DADOS, {'inicio': inicio, 'fim': fim})
+            return "|".join(str(v) for v in cur.fetchone())
+    finally:
+        conn.close()
+
+
+def periodo_meses(meses: List[str]) -> Tuple[date, date]:
+    """
+    Intervalo [inicio, fim) de datas coberto pelas competências YYYYMM
+
+    O início recua 6 dias: a semana epi que começa no fim do mês anterior
+    também tem dias na primeira competência.
+    """
+    primeiro, ultimo = min(meses), max(meses)
+    inicio = date(int(primeiro[:4]), int(primeiro[4:]), 1) - timedelta(days=6)
+    ano, mes = int(ultimo[:4]), int(ultimo[4:])
+    fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+    return inicio, fim
+
+
+def versao_indice_municipios() -> Optional[str]:
+    """Versão carregada do índice de municípios compartilhado"""
+    from app.services.municipio_index import get_municipio_index
+
+    return get_municipio_index().versao
+
+
+def meses_periodo(inicio: date, fim: date) -> List[str]:
+    """
+    Competências (YYYYMM) tocadas pelo intervalo semiaberto [inicio, fim)
+
+    Args:
+        inicio: Primeiro dia do período
+        fim: Dia seguinte ao último dia do período
+    """
+    meses = []
+    ano, mes = inicio.year, inicio.month
+    while date(ano, mes, 1) < fim:
+        meses.append(f"{ano:04d}{mes:02d}")
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    return meses
+
+
+def meses_competencia(competencia_inicio: str, competencia_fim: str) -> List[str]:
+    """Competências YYYYMM de competencia_inicio a competencia_fim (inclusivo)"""
+    inicio = date(int(competencia_inicio[:4]), int(competencia_inicio[4:6]), 1)
+    fim = date(int(competencia_fim[:4]), int(competencia_fim[4:6]), 1)
+    fim = date(fim.year + 1, 1, 1) if fim.month == 12 else date(fim.year, fim.month + 1, 1)
+    return meses_periodo(inicio, fim)
+
+
+def normalizar_filtro(filtro: Dict[str, Any]) -> str:
+    """
+    Representação canônica do filtro: chaves ordenadas, sem valores None e
+    listas de códigos ordenadas (a ordem dos municípios não muda a resposta).
+    """
+    normalizado = {}
+    for chave, valor in filtro.items():
+        if valor is None:
+            continue
+        if isinstance(valor, (list, tuple, set)):
+            valor = sorted(valor) if all(isinstance(v, str) for v in valor) else list(valor)
+        elif hasattr(valor, 'value'):
+            valor = valor.value
+        normalizado[chave] = valor
+    return json.dumps(normalizado, sort_keys=True, separators=(',', ':'), default=str)
+
+
+class ResponseCache:
+    """
+    Cache LRU + TTL de payloads JSON, com camada Redis opcional.
+
+    Todos os métodos são síncronos (o cliente Redis é bloqueante); os routers
+    os chamam via ``run_in_db_thread``.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl: float = 300.0,
+        ttl_fechado: float = 86400.0,
+        redis_client: Any = None,
+        namespace: str = "epi-api:resp",
+        marca_dados: Optional[Callable[[date, date], str]] = None,
+        ttl_marca: float = 30.0,
+        versao_referencia: Optional[Callable[[], Optional[str]]] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.ttl_fechado = ttl_fechado
+        self.redis = redis_client
+        self.namespace = namespace
+        self.marca_dados = marca_dados
+        self.ttl_marca = ttl_marca
+        self.versao_referencia = versao_referencia
+
+        # chave -> (expira_em, meses, payload)
+        self._entries: "OrderedDict[str, Tuple[float, Tuple[str, ...], bytes]]" = OrderedDict()
+        self._versoes: Dict[str, int] = {}
+        self._epoca = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        # competências -> (expira_em, marca) da última leitura de marca_dados
+        self._marcas: Dict[Tuple[str, ...], Tuple[float, Optional[str]]] = {}
+
+    # ------------------------------------------------------------------
+    # Versões de dados
+    # ------------------------------------------------------------------
+
+    def _versoes_meses(self, meses: List[str]) -> Tuple[str, List[int]]:
+        """(origem, versões): origem "redis" ou a época deste processo"""
+        if self.redis is not None and meses:
+            try:
+                valores = self.redis.hmget(f"{self.namespace}:versoes", meses)
+                return "redis", [int(v or 0) for v in valores]
+            except Exception as e:
+                logger.warning(f"Redis indisponível ao ler versões do cache: {e}")
+        with self._lock:
+            return self._epoca, [self._versoes.get(m, 0) for m in meses]
+
+    def _marca_atual(self, meses: List[str]) -> Optional[str]:
+        """
+        Marca de dados do banco para o período das competências, memorizada
+        por período durante ``ttl_marca`` segundos.
+
+        Uma falha na leitura também é memorizada (marca None) para que um
+        banco fora do ar não custe uma tentativa de conexão por requisição.
+        """
+        if self.marca_dados is None or self.ttl_marca <= 0 or not meses:
+            return None
+        chave = tuple(meses)
+        expira_em, marca = self._marcas.get(chave, (0.0, None))
+        agora = time.monotonic()
+        if expira_em > agora:
+            return marca
+        try:
+            marca = self.marca_dados(*periodo_meses(meses))
+        except Exception as e:
+            logger.warning(f"Falha ao ler a marca de dados do banco: {e}")
+            marca = None
+        with self._lock:
+            if len(self._marcas) >= self.max_entries:
+                self._marcas.clear()
+            self._marcas[chave] = (agora + self.ttl_marca, marca)
+        return marca
+
+    def versao_dados(self, meses: Iterable[str]) -> str:
+        """
+        Identificador da versão dos dados das competências (muda a cada ETL).
+
+        Sem Redis os contadores vivem no processo e recomeçam do zero num
+        restart; a época do processo entra na versão para que um restart
+        (possivelmente após um ETL em outro processo) nunca reaproveite uma
+        versão antiga. A marca de dados do banco cobre as cargas que não
+        passaram pelos contadores; a versão de ``versao_referencia`` (índice
+        de municípios) cobre as recargas das tabelas de referência e, quando
+        ele não está carregado, propaga a falha em vez de gerar uma versão.
+        """
+        meses = sorted(set(meses))
+        origem, versoes = self._versoes_meses(meses)
+        marca = self._marca_atual(meses) or ""
+        referencia = self.versao_referencia() if self.versao_referencia else ""
+        raw = f"{origem}|{marca}|{referencia}|" + ",".join(
+            f"{m}:{v}" for m, v in zip(meses, versoes)
+        )
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+    def _assinatura(self, endpoint: str, filtro: Dict[str, Any], meses: Iterable[str]) -> str:
+        raw = f"{endpoint}|{normalizar_filtro(filtro)}|{self.versao_dados(meses)}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def etag(self, endpoint: str, filtro: Dict[str, Any], meses: Iterable[str]) -> str:
+        """
+        ETag forte da resposta: filtro normalizado + versão dos dados.
+
+        Calculado sem as queries do endpoint (só a marca de dados, memorizada),
+        permite responder ``304 Not Modified`` antes da serialização.
+        """
+        return f'"{self._assinatura(endpoint, filtro, meses)}"'
+
+    # ------------------------------------------------------------------
+    # Leitura / escrita
+    # ------------------------------------------------------------------
+
+    def _key(self, endpoint: str, filtro: Dict[str, Any], meses: Iterable[str]) -> str:
+        return f"{self.namespace}:{endpoint}:{self._assinatura(endpoint, filtro, meses)}"
+
+    def _ttl_para(self, meses: List[str]) -> float:
+        hoje = date.today()
+        if meses and max(meses) < f"{hoje.year:04d}{hoje.month:02d}":
+            return self.ttl_fechado
+        return self.ttl
+
+    def _get_local(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def _set_local(self, key: str, meses: List[str], payload: bytes, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, tuple(meses), payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, endpoint: str, filtro: Dict[str, Any], meses: List[str]) -> Optional[bytes]:
+        """Payload em cache para o filtro, ou None"""
+        key = self._key(endpoint, filtro, meses)
+
+        payload = self._get_local(key)
+        if payload is not None:
+            RESPONSE_CACHE_HITS.labels(endpoint=endpoint, tier="memoria").inc()
+            return payload
+
+        if self.redis is not None:
+            try:
+                payload = self.redis.get(key)
+            except Exception as e:
+                logger.warning(f"Redis indisponível ao ler cache: {e}")
+                payload = None
+            if payload is not None:
+                RESPONSE_CACHE_HITS.labels(endpoint=endpoint, tier="redis").inc()
+                self._set_local(key, meses, payload, self._ttl_para(meses))
+                return payload
+
+        RESPONSE_CACHE_MISSES.labels(endpoint=endpoint).inc()
+        return None
+
+    def set(self, endpoint: str, filtro: Dict[str, Any], meses: List[str], payload: bytes) -> None:
+        """Armazena o payload nas camadas disponíveis"""
+        key = self._key(endpoint, filtro, meses)
+        ttl = self._ttl_para(meses)
+        self._set_local(key, meses, payload, ttl)
+        if self.redis is not None:
+            try:
+                self.redis.set(key, payload, ex=int(ttl))
+            except Exception as e:
+                logger.warning(f"Redis indisponível ao gravar cache: {e}")
+
+    def get_or_compute(
+        self,
+        endpoint: str,
+        filtro: Dict[str, Any],
+        meses: List[str],
+        compute: Callable[[], bytes]
+    ) -> bytes:
+        """
+        Retorna o payload em cache ou calcula, armazena e retorna.
+
+        Args:
+            endpoint: Nome lógico do endpoint (label das métricas)
+            filtro: Parâmetros que determinam a resposta
+            meses: Competências YYYYMM cobertas (para invalidação)
+            compute: Gera o payload JSON em caso de miss
+        """
+        payload = self.get(endpoint, filtro, meses)
+        if payload is None:
+            payload = compute()
+            self.set(endpoint, filtro, meses, payload)
+        return payload
+
+    # ------------------------------------------------------------------
+    # Invalidação
+    # ------------------------------------------------------------------
+
+    def invalidar(self, meses: Iterable[str]) -> None:
+        """Invalida as respostas que cobrem qualquer uma das competências"""
+        meses = sorted(set(meses))
+        if not meses:
+            return
+
+        with self._lock:
+            for mes in meses:
+                self._versoes[mes] = self._versoes.get(mes, 0) + 1
+            afetados = set(meses)
+            for chave in [c for c in self._marcas if afetados.intersection(c)]:
+                del self._marcas[chave]
+            for key in [k for k, e in self._entries.items() if afetados.intersection(e[1])]:
+                del self._entries[key]
+
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline()
+                for mes in meses:
+                    pipe.hincrby(f"{self.namespace}:versoes", mes, 1)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"Redis indisponível ao invalidar cache: {e}")
+
+        RESPONSE_CACHE_INVALIDATIONS.inc(len(meses))
+        logger.info(f"Cache de respostas invalidado para {meses[0]}..{meses[-1]}")
+
+    def clear(self) -> None:
+        """Esvazia a camada em memória"""
+        with self._lock:
+            self._entries.clear()
+
+
+class _CacheDesativado(ResponseCache):
+    """Cache nulo usado com RESPONSE_CACHE_ENABLED=0"""
+
+    def get(self, endpoint, filtro, meses):
+        return None
+
+    def set(self, endpoint, filtro, meses, payload):
+        return None
+
+
+# =============================================================================
+# CACHE DO PROCESSO
+# =============================================================================
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def _redis_client() -> Any:
+    url = os.getenv("REDIS_URL")
+    if not url:
+        return None
+    if redis is None:
+        logger.warning("REDIS_URL definido mas o pacote redis não está instalado; cache só em memória")
+        return None
+    return redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+
+def get_response_cache() -> ResponseCache:
+    """Retorna o cache de respostas do processo (criado sob demanda)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                cls = ResponseCache
+                if os.getenv("RESPONSE_CACHE_ENABLED", "1") == "0":
+                    cls = _CacheDesativado
+                _cache = cls(
+                    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256")),
+                    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "300")),
+                    ttl_fechado=float(os.getenv("RESPONSE_CACHE_TTL_FECHADO", "86400")),
+                    redis_client=_redis_client(),
+                    marca_dados=marca_dados_banco,
+                    ttl_marca=float(os.getenv("RESPONSE_CACHE_VERSAO_TTL", "30")),
+                    versao_referencia=versao_indice_municipios,
+                )
+    return _cache
+
+
+def etag_corresponde(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Verifica o cabeçalho If-None-Match contra o ETag atual.
+
+    Segue a comparação fraca da RFC 9110 (ignora o prefixo ``W/``, que
+    proxies aplicam ao comprimir) e aceita ``*``.
+    """
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def invalidar_periodo(inicio: date, fim: date) -> None:
+    """
+    Invalida as respostas em cache que cobrem [inicio, fim).
+
+    Chamado ao final dos ETLs; falhas nunca interrompem o ETL.
+    """
+    try:
+        get_response_cache().invalidar(meses_periodo(inicio, fim))
+    except Exception as e:
+        logger.warning(f"Falha ao invalidar cache de respostas: {e}")
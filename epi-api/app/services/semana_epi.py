@@ -0,0 +1,96 @@
+"""
+Semana epidemiológica e filtros de competência indexáveis
+
+Semana epidemiológica (calendário SINAN/MMWR): domingo a sábado; a semana 1
+é a que contém 4 de janeiro, isto é, a primeira semana com pelo menos 4 dias
+no ano. O ano epidemiológico vai do início da semana 1 até o início da
+semana 1 do ano seguinte (52 ou 53 semanas).
+
+Os filtros são gerados como intervalos semiabertos sobre ``competencia``
+(``competencia >= inicio AND competencia < fim``), o que permite usar
+``idx_indicador_epi_competencia`` e a exclusão de chunks do hypertable, ao
+contrário de ``EXTRACT(YEAR/WEEK FROM competencia)``. As colunas filtradas
+são semanais (domingo de início da semana epi, ex.: ``semana_inicio``), de
+modo que os limites são os do ano/semanas epidemiológicos.
+
+Mantenha em sincronia com a função SQL ``calcular_data_semana_epi`` (V016).
+"""
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+
+def inicio_ano_epi(ano: int) -> date:
+    """Domingo que inicia a semana epidemiológica 1 do ano"""
+    jan4 = date(ano, 1, 4)
+    # weekday(): segunda=0 ... domingo=6 → dias desde o domingo anterior
+    return jan4 - timedelta(days=(jan4.weekday() + 1) % 7)
+
+
+def inicio_semana_epi(ano: int, semana: int) -> date:
+    """Data (domingo) de início da semana epidemiológica"""
+    return inicio_ano_epi(ano) + timedelta(weeks=semana - 1)
+
+
+def semanas_no_ano(ano: int) -> int:
+    """Número de semanas epidemiológicas do ano (52 ou 53)"""
+    return (inicio_ano_epi(ano + 1) - inicio_ano_epi(ano)).days // 7
+
+
+def semana_epi(data: date) -> Tuple[int, int]:
+    """
+    Converte uma data em (ano_epi, semana_epi)
+
+    Args:
+        data: Data qualquer
+
+    Returns:
+        Tupla (ano epidemiológico, semana 1-53)
+    """
+    ano = data.year
+    if data >= inicio_ano_epi(ano + 1):
+        ano += 1
+    elif data < inicio_ano_epi(ano):
+        ano -= 1
+    return ano, (data - inicio_ano_epi(ano)).days // 7 + 1
+
+
+def intervalo_semanas_epi(
+    ano: int,
+    semana_inicio: Optional[int] = None,
+    semana_fim: Optional[int] = None
+) -> Tuple[date, date]:
+    """
+    Intervalo semiaberto [inicio, fim) coberto pelo ano/semanas
+
+    Sem semanas, cobre o ano epidemiológico inteiro.
+    """
+    if semana_inicio and semana_fim:
+        return (
+            inicio_semana_epi(ano, semana_inicio),
+            inicio_semana_epi(ano, semana_fim) + timedelta(weeks=1)
+        )
+    return inicio_ano_epi(ano), inicio_ano_epi(ano + 1)
+
+
+def filtro_competencia(
+    ano: Optional[int] = None,
+    semana_inicio: Optional[int] = None,
+    semana_fim: Optional[int] = None,
+    coluna: str = "competencia"
+) -> Tuple[List[str], List[date]]:
+    """
+    Monta cláusulas WHERE indexáveis para ano/semanas epidemiológicas
+
+    Args:
+        ano: Ano epidemiológico (None = sem filtro temporal)
+        semana_inicio: Semana epi inicial (opcional, requer semana_fim)
+        semana_fim: Semana epi final, inclusiva (opcional)
+        coluna: Coluna DATE/TIMESTAMP com o domingo de início da semana epi
+
+    Returns:
+        Tupla (cláusulas, parâmetros) para compor com " AND "
+    """
+    if not ano:
+        return [], []
+    inicio, fim = intervalo_semanas_epi(ano, semana_inicio, semana_fim)
+    return [f"{coluna} >= %s", f"{coluna} < %s"], [inicio, fim]
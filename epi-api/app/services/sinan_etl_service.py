@@ -1,24 +1,141 @@
 """
 Service ETL para importação SINAN
 """
-from typing import List, Dict, Any, Optional
-from datetime import datetime, date
-from decimal import Decimal
-import psycopg2
-from psycopg2.extras import execute_batch
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import os
+import re
+from datetime import datetime, date, timedelta
+import numpy as np
+import pandas as pd
 
+from app.services.csv_stream import LeitorCSV
 from app.services.etl_base_service import ETLBaseService
+from app.services.etl_persistence import refresh_indicador_semanal
+from app.services.response_cache import invalidar_periodo
+from app.services.semana_epi import inicio_semana_epi, intervalo_semanas_epi, semana_epi
 from app.schemas.etl import (
     SINANRecordRaw,
     SINANImportRequest,
     ETLValidationError,
     ETLValidationReport,
     ETLStatus,
-    ETLSource,
-    DoencaTipo,
-    IndicadorEpiCreate
+    DoencaTipo
 )
 
+# Código de município: só dígitos ASCII (str.isdigit aceita '²', que não vira int)
+CODIGO_MUNICIPIO = r"[0-9]+"
+
+
+class AgregadoSINAN:
+    """
+    Contagens por (município, ano epi, semana epi) acumuladas no arquivo inteiro
+    
+    Cada batch entra como vetores (chave empacotada município << 20 |
+    ano << 6 | semana e uma linha de contagens por registro) e é reduzido
+    com group-by NumPy. A cada DOBRA reduções parciais elas são somadas
+    numa só, e ``totais()`` faz o group-by final: memória proporcional às
+    chaves distintas do arquivo, não às linhas nem ao número de batches.
+    """
+    
+    COLUNAS = ('casos_confirmados', 'casos_graves', 'obitos')
+    DOBRA = 32
+    
+    def __init__(self):
+        self._chaves: List[np.ndarray] = []
+        self._contagens: List[np.ndarray] = []
+    
+    @staticmethod
+    def _reduzir(chaves: np.ndarray, contagens: np.ndarray):
+        unicas, grupo = np.unique(chaves, return_inverse=True)
+        somas = np.column_stack([
+            np.bincount(grupo, weights=contagens[:, i], minlength=len(unicas))
+            for i in range(contagens.shape[1])
+        ]).astype(np.int64)
+        return unicas, somas
+    
+    def _dobrar(self) -> None:
+        """Substitui as reduções parciais pela soma delas"""
+        if len(self._chaves) > 1:
+            unicas, somas = self._reduzir(np.concatenate(self._chaves), np.concatenate(self._contagens))
+            self._chaves, self._contagens = [unicas], [somas]
+    
+    def adicionar(self, municipios: Sequence, anos: Sequence, semanas: Sequence, contagens: Sequence) -> None:
+        """Acumula registros de um batch (listas ou arrays alinhados; contagens na ordem de COLUNAS)"""
+        if len(municipios) == 0:
+            return
+        chaves = (
+            np.asarray(municipios, dtype=np.int64) << 20
+            | np.asarray(anos, dtype=np.int64) << 6
+            | np.asarray(semanas, dtype=np.int64)
+        )
+        unicas, somas = self._reduzir(chaves, np.asarray(contagens, dtype=np.int64))
+        self._chaves.append(unicas)
+        self._contagens.append(somas)
+        if len(self._chaves) >= self.DOBRA:
+            self._dobrar()
+    
+    def totais(self) -> Dict[Tuple[str, int, int], Dict[str, int]]:
+        """(município, ano epi, semana epi) → contagens, uma entrada por chave do arquivo"""
+        if not self._chaves:
+            return {}
+        self._dobrar()
+        return {
+            (str(chave >> 20), (chave >> 6) & 0x3FFF, chave & 0x3F): dict(zip(self.COLUNAS, linha))
+            for chave, linha in zip(self._chaves[0].tolist(), self._contagens[0].tolist())
+        }
+
+
+def _datas_vetor(valores: np.ndarray) -> np.ndarray:
+    """
+    Datas DD/MM/YYYY ou YYYY-MM-DD → datetime64[D] (NaT se inválida)
+    
+    Recebe strings ('' para ausente). Lê os dígitos por posição sobre os
+    code points de um array de largura fixa (sem strptime por elemento) e
+    valida o dia pelo mês resultante (31/02 vira NaT). Só cobre a forma
+    exata com zeros à esquerda.
+    """
+    n = len(valores)
+    texto = np.asarray(valores, dtype=str)
+    largura = texto.dtype.itemsize // 4
+    if n == 0 or largura < 10:
+        return np.full(n, np.datetime64('NaT'), dtype='datetime64[D]')
+    
+    c = texto.view(np.uint32).reshape(n, largura).astype(np.int64)
+    # Exatamente 10 caracteres (code point 0 = preenchimento do array)
+    dez = c[:, 9] != 0
+    if largura > 10:
+        dez &= c[:, 10] == 0
+    c = c[:, :10] - ord('0')
+    digitos = (c >= 0) & (c <= 9)
+    
+    def numero(i: int, j: int) -> np.ndarray:
+        return c[:, i:j] @ 10 ** np.arange(j - i - 1, -1, -1)
+    
+    barra = dez & (c[:, 2] == ord('/') - ord('0')) & (c[:, 5] == ord('/') - ord('0')) \
+        & digitos[:, [0, 1, 3, 4, 6, 7, 8, 9]].all(axis=1)
+    iso = dez & (c[:, 4] == ord('-') - ord('0')) & (c[:, 7] == ord('-') - ord('0')) \
+        & digitos[:, [0, 1, 2, 3, 5, 6, 8, 9]].all(axis=1)
+    ano = np.where(barra, numero(6, 10), numero(0, 4))
+    mes = np.where(barra, numero(3, 5), numero(5, 7))
+    dia = np.where(barra, numero(0, 2), numero(8, 10))
+    
+    ok = (barra | iso) & (ano >= 1) & (mes >= 1) & (mes <= 12) & (dia >= 1)
+    meses = np.where(ok, (ano - 1970) * 12 + mes - 1, 0).astype('datetime64[M]')
+    datas = meses.astype('datetime64[D]') + np.where(ok, dia - 1, 0)
+    ok &= datas.astype('datetime64[M]') == meses
+    return np.where(ok, datas, np.datetime64('NaT'))
+
+
+def _semanas_epi(datas: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(ano epi, semana epi) de um array datetime64[D], como ``semana_epi.semana_epi``"""
+    dias = datas.astype('datetime64[D]').astype(np.int64)
+    # Quarta-feira da semana domingo-sábado (1970-01-01 foi quinta): a semana
+    # pertence ao ano da sua quarta (>= 4 dias no ano)
+    quarta = dias - (dias + 4) % 7 + 3
+    anos = quarta.astype('datetime64[D]').astype('datetime64[Y]')
+    semanas = (quarta - anos.astype('datetime64[D]').astype(np.int64)) // 7 + 1
+    return anos.astype(np.int64) + 1970, semanas
+
 
 class SINANETLService(ETLBaseService):
     """Service para importação de dados SINAN"""
@@ -32,6 +149,31 @@ class SINANETLService(ETLBaseService):
     # Mapeamento de evolução
     EVOLUCAO_OBITO = [2, 3]  # Óbito por dengue, óbito por outras causas
     
+    # Série gravada em indicador_epi → colunas de AgregadoSINAN somadas no valor
+    SERIES_INDICADOR = {
+        'CASOS': ('casos_confirmados', 'casos_graves'),
+        'GRAVES': ('casos_graves',),
+        'OBITOS': ('obitos',),
+    }
+    
+    # Colunas gravadas em indicador_epi: séries CASOS_/GRAVES_/OBITOS_<DOENCA>
+    # por (semana epi, município), como aggregate_sinan_to_indicador.py; a
+    # chave é o índice único (competencia, dedup_key) do V7
+    COLUNAS_INDICADOR = [
+        'competencia', 'municipio_cod_ibge', 'indicador', 'valor',
+        'arquivo_origem', 'dt_importacao', 'dedup_key'
+    ]
+    
+    # Campos normalizados por tipo (por linha e por batch)
+    CAMPOS_TEXTO = ['nu_notific', 'nm_pacient', 'sg_uf', 'id_municip',
+                    'nm_bairro', 'tp_diag', 'criterio', 'cs_sexo']
+    CAMPOS_DATA = ['dt_notific', 'dt_sin_pri', 'dt_nasc', 'dt_diag',
+                   'dt_encerra', 'dt_obito']
+    CAMPOS_INTEIRO = ['nu_idade_n', 'classi_fin', 'evolucao']
+    FORMATOS_DATA = ['%d/%m/%Y', '%Y-%m-%d']
+    # Texto lido pelo caminho vetorizado: o que o schema valida ou a agregação lê
+    CAMPOS_LOTE_TEXTO = ['nu_notific', 'nm_pacient', 'sg_uf', 'id_municip', 'cs_sexo']
+    
     # Colunas obrigatórias no CSV SINAN
     REQUIRED_COLUMNS = [
         'nu_notific',
@@ -51,46 +193,31 @@ class SINANETLService(ETLBaseService):
         Returns:
             ETLValidationReport
         """
-        # Validação estrutural
-        report = self.validate_csv_structure(file_path, self.REQUIRED_COLUMNS)
+        # Validação estrutural, contagem e amostra numa única leitura
+        report, amostra = self.scan_csv(file_path, self.REQUIRED_COLUMNS, sample_size=100)
         
         if not report.is_valid:
             return report
         
-        # Validação de dados (sample)
+        # Validação de dados (amostra das primeiras 100 linhas)
         errors = []
         valid_count = 0
         
-        try:
-            # Ler primeiras 100 linhas para validação rápida
-            batches = self.read_csv_file(file_path, batch_size=100)
-            for batch in batches:
-                for idx, row in enumerate(batch, start=1):
-                    try:
-                        # Tentar criar objeto Pydantic
-                        SINANRecordRaw(**self._normalize_sinan_row(row))
-                        valid_count += 1
-                    except Exception as e:
-                        errors.append(ETLValidationError(
-                            row_number=idx,
-                            field="record",
-                            value=str(row),
-                            error_type="validation_error",
-                            error_message=str(e),
-                            severity="ERROR"
-                        ))
-                break  # Apenas primeiro batch para validação
-        except Exception as e:
-            errors.append(ETLValidationError(
-                row_number=0,
-                field="file",
-                value=str(e),
-                error_type="read_error",
-                error_message=f"Erro ao ler arquivo: {str(e)}",
-                severity="ERROR"
-            ))
+        if amostra:
+            _, validas = self._normalize_sinan_batch(amostra)
+            aceitas, reprovadas = self._validar_linhas(amostra, np.flatnonzero(~validas))
+            valid_count = int(validas.sum()) + len(aceitas)
+            for i, e in reprovadas:
+                errors.append(ETLValidationError(
+                    row_number=i + 1,
+                    field="record",
+                    value=str(amostra[i]),
+                    error_type="validation_error",
+                    error_message=str(e),
+                    severity="ERROR"
+                ))
         
-        total_rows = self.count_total_rows(file_path)
+        total_rows = report.total_rows
         
         return ETLValidationReport(
             total_rows=total_rows,
@@ -112,37 +239,28 @@ class SINANETLService(ETLBaseService):
         normalized = {}
         
         # Campos string
-        str_fields = ['nu_notific', 'nm_pacient', 'sg_uf', 'id_municip', 
-                      'nm_bairro', 'tp_diag', 'criterio', 'cs_sexo']
-        for field in str_fields:
+        for field in self.CAMPOS_TEXTO:
             normalized[field] = str(row.get(field, '')).strip() if row.get(field) else None
         
-        # Campos date
-        date_fields = ['dt_notific', 'dt_sin_pri', 'dt_nasc', 'dt_diag', 
-                       'dt_encerra', 'dt_obito']
-        for field in date_fields:
+        # Campos date (DD/MM/YYYY ou YYYY-MM-DD)
+        for field in self.CAMPOS_DATA:
             value = row.get(field)
+            normalized[field] = None
             if value and str(value).strip():
-                try:
-                    # Tentar formato DD/MM/YYYY
-                    normalized[field] = datetime.strptime(str(value).strip(), '%d/%m/%Y').date()
-                except:
+                for formato in self.FORMATOS_DATA:
                     try:
-                        # Tentar formato YYYY-MM-DD
-                        normalized[field] = datetime.strptime(str(value).strip(), '%Y-%m-%d').date()
-                    except:
-                        normalized[field] = None
-            else:
-                normalized[field] = None
+                        normalized[field] = datetime.strptime(str(value).strip(), formato).date()
+                        break
+                    except ValueError:
+                        continue
         
         # Campos int
-        int_fields = ['nu_idade_n', 'classi_fin', 'evolucao']
-        for field in int_fields:
+        for field in self.CAMPOS_INTEIRO:
             value = row.get(field)
             if value and str(value).strip():
                 try:
                     normalized[field] = int(float(str(value).strip()))
-                except:
+                except (ValueError, OverflowError):
                     normalized[field] = None
             else:
                 normalized[field] = None
@@ -156,6 +274,84 @@ class SINANETLService(ETLBaseService):
         
         return normalized
     
+    def _normalize_sinan_batch(self, batch: List[Dict[str, Any]]) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """
+        Normaliza um batch inteiro coluna a coluna (pandas/NumPy)
+        
+        Caminho rápido e estrito sobre os valores crus: ``dt_notific`` nos
+        dois formatos (dígitos de largura fixa, ver ``_datas_vetor``),
+        inteiros via ``pd.to_numeric`` truncados, UF/sexo/município por
+        comparação de arrays. Só entram os campos que ``SINANRecordRaw``
+        valida ou que a agregação lê; os opcionais restantes nunca reprovam
+        a linha (valor inválido vira None).
+        
+        A máscara marca as linhas aceitas aqui: obrigatórios presentes,
+        UF = MT, idade 0-120, sexo M/F/I, município numérico e todo valor
+        presente convertido. O resto (reprovadas de fato ou só fora do
+        formato estrito, ex.: espaços, data sem zero à esquerda) vai para
+        o caminho por linha, que dá a palavra final e a mensagem de erro.
+        
+        Args:
+            batch: Lista de registros raw
+            
+        Returns:
+            (colunas normalizadas, máscara de linhas válidas)
+        """
+        bruto = {
+            campo: np.array([row.get(campo) for row in batch], dtype=object)
+            for campo in self.CAMPOS_LOTE_TEXTO + ['dt_notific'] + self.CAMPOS_INTEIRO
+        }
+        # Mesma regra de _normalize_sinan_row: valor "falsy" ('' ou None) é ausente
+        presente = {campo: coluna.astype(bool) for campo, coluna in bruto.items()}
+        
+        colunas = {campo: bruto[campo] for campo in self.CAMPOS_LOTE_TEXTO}
+        colunas['dt_notific'] = _datas_vetor(np.where(presente['dt_notific'], bruto['dt_notific'], ''))
+        sexo = bruto['cs_sexo']
+        municipio_valido = pd.Series(bruto['id_municip']).str.fullmatch(CODIGO_MUNICIPIO)
+        validas = (
+            presente['nu_notific'] & presente['nm_pacient']
+            & ~np.isnat(colunas['dt_notific'])
+            & ((bruto['sg_uf'] == 'MT') | (bruto['sg_uf'] == 'mt'))
+            & (~presente['cs_sexo'] | (sexo == 'M') | (sexo == 'F') | (sexo == 'I'))
+            & municipio_valido.fillna(False).to_numpy(dtype=bool)
+        )
+        
+        for campo in self.CAMPOS_INTEIRO:
+            numeros = np.asarray(pd.to_numeric(bruto[campo], errors='coerce'), dtype=float)
+            finitos = np.isfinite(numeros)
+            colunas[campo] = np.trunc(np.where(finitos, numeros, np.nan))
+            validas &= finitos | ~presente[campo]
+        
+        idade = colunas['nu_idade_n']
+        validas &= np.isnan(idade) | ((idade >= 0) & (idade <= 120))
+        return colunas, validas
+    
+    def _validar_linhas(
+        self,
+        batch: List[Dict[str, Any]],
+        indices: np.ndarray
+    ) -> Tuple[List[Tuple[int, SINANRecordRaw]], List[Tuple[int, Exception]]]:
+        """
+        Caminho por linha (Pydantic) para as linhas reprovadas no batch
+        
+        Args:
+            batch: Lista de registros raw
+            indices: Posições das linhas reprovadas
+            
+        Returns:
+            (linhas aceitas por linha, linhas com erro)
+        """
+        aceitas, erros = [], []
+        for i in indices.tolist():
+            try:
+                record = SINANRecordRaw(**self._normalize_sinan_row(batch[i]))
+                if not re.fullmatch(CODIGO_MUNICIPIO, record.id_municip):
+                    raise ValueError(f"Código de município inválido: {record.id_municip}")
+                aceitas.append((i, record))
+            except Exception as e:
+                erros.append((i, e))
+        return aceitas, erros
+    
     def process_sinan_import(
         self,
         job_id: str,
@@ -174,34 +370,23 @@ class SINANETLService(ETLBaseService):
         # Atualizar job para PROCESSING
         self.update_job_status(job_id, ETLStatus.PROCESSING)
         
-        # Contar total de linhas
-        total_rows = self.count_total_rows(request.file_path)
-        
         conn = self._get_connection()
+        # Intervalo invalidado no cache: ano pedido + semanas efetivamente gravadas
+        periodo = intervalo_semanas_epi(request.ano_epidemiologico)
         try:
-            # Atualizar total_rows no job
-            with conn.cursor() as cur:
-                cur.execute(
-                    "UPDATE etl_jobs SET total_rows = %s WHERE job_id = %s",
-                    (total_rows, job_id)
-                )
-            conn.commit()
-            
             # Processar em batches
             processed = 0
             success = 0
             errors = []
+            # Contagens do arquivo inteiro: cada chave é gravada uma vez no fim
+            acumulado = AgregadoSINAN()
             
-            batches = self.read_csv_file(request.file_path, request.batch_size)
+            # Leitura única: o total de linhas sai do mesmo percurso
+            leitor = LeitorCSV(request.file_path, request.batch_size)
+            batches = self.read_csv_file(request.file_path, request.batch_size, leitor=leitor)
             
             for batch in batches:
-                batch_result = self._process_sinan_batch(
-                    batch,
-                    request.doenca_tipo,
-                    request.ano_epidemiologico,
-                    request.overwrite,
-                    conn
-                )
+                batch_result = self._process_sinan_batch(batch, acumulado)
                 
                 processed += batch_result['processed']
                 success += batch_result['success']
@@ -216,6 +401,42 @@ class SINANETLService(ETLBaseService):
                     error_rows=len(errors)
                 )
             
+            # Inserir/atualizar agregados no banco (uma linha por chave); cada
+            # notificação fica no ano epi da sua data, mesmo fora do ano pedido
+            gravados = {'inseridos': 0, 'atualizados': 0}
+            aggregated = {
+                chave: {
+                    'municipio_codigo': chave[0],
+                    'ano': chave[1],
+                    'semana_epi': chave[2],
+                    **contagens
+                }
+                for chave, contagens in acumulado.totais().items()
+            }
+            if aggregated:
+                semanas_gravadas = [inicio_semana_epi(ano, semana) for _, ano, semana in aggregated]
+                periodo = (
+                    min(periodo[0], min(semanas_gravadas)),
+                    max(periodo[1], max(semanas_gravadas) + timedelta(weeks=1))
+                )
+                gravados = self._upsert_indicadores(
+                    aggregated, request.doenca_tipo, request.overwrite, conn,
+                    arquivo_origem=os.path.basename(request.file_path)
+                )
+            
+            # Linhas com mais campos que o cabeçalho: fora dos lotes, erro de linha
+            processed += leitor.total_malformadas
+            errors.extend(self.erros_linhas_malformadas(leitor))
+            error_rows = len(errors) + leitor.malformadas_omitidas
+            
+            # Total de linhas conhecido ao fim da mesma leitura
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE etl_jobs SET total_rows = %s WHERE job_id = %s",
+                    (leitor.total_linhas, job_id)
+                )
+            conn.commit()
+            
             # Finalizar
             final_status = ETLStatus.COMPLETED if len(errors) == 0 else ETLStatus.PARTIAL
             
@@ -224,14 +445,16 @@ class SINANETLService(ETLBaseService):
                 final_status,
                 processed_rows=processed,
                 success_rows=success,
-                error_rows=len(errors),
+                error_rows=error_rows,
                 error_details=errors[:100] if errors else None
             )
             
             return {
                 'processed': processed,
                 'success': success,
-                'errors': len(errors),
+                'errors': error_rows,
+                'inserted': gravados['inseridos'],
+                'updated': gravados['atualizados'],
                 'status': final_status.value
             }
             
@@ -244,95 +467,65 @@ class SINANETLService(ETLBaseService):
             raise
         finally:
             conn.close()
+            # O upsert pode ter sido commitado mesmo se o job falhar depois
+            invalidar_periodo(*periodo)
     
     def _process_sinan_batch(
         self,
         batch: List[Dict[str, Any]],
-        doenca_tipo: DoencaTipo,
-        ano: int,
-        overwrite: bool,
-        conn
+        acumulado: AgregadoSINAN
     ) -> Dict[str, Any]:
         """
         Processa um batch de registros SINAN
         
         Args:
             batch: Lista de registros
-            doenca_tipo: Tipo de doença
-            ano: Ano epidemiológico
-            overwrite: Sobrescrever existentes
-            conn: Conexão DB
+            acumulado: Contagens do arquivo (atualizado in-place)
             
         Returns:
             Dict com estatísticas
         """
-        processed = 0
-        success = 0
-        errors = []
+        # Normalização e validação vetorizadas; só as reprovadas vão linha a linha
+        colunas, validas = self._normalize_sinan_batch(batch)
+        aceitas, reprovadas = self._validar_linhas(batch, np.flatnonzero(~validas))
         
-        # Agregar por município + semana epidemiológica
-        aggregated = {}
-        
-        for row in batch:
-            processed += 1
-            
-            try:
-                # Normalizar e validar
-                normalized = self._normalize_sinan_row(row)
-                record = SINANRecordRaw(**normalized)
-                
-                # Calcular semana epidemiológica
-                dt_notific = record.dt_notific
-                semana_epi = self._get_semana_epi(dt_notific)
-                
-                # Chave de agregação
-                key = (record.id_municip, ano, semana_epi)
-                
-                if key not in aggregated:
-                    aggregated[key] = {
-                        'municipio_codigo': record.id_municip,
-                        'ano': ano,
-                        'semana_epi': semana_epi,
-                        'casos_confirmados': 0,
-                        'casos_suspeitos': 0,
-                        'casos_graves': 0,
-                        'obitos': 0
-                    }
-                
-                # Classificar caso
-                classi_fin = record.classi_fin
-                if classi_fin in self.CLASSIFICACAO_CONFIRMADO:
-                    aggregated[key]['casos_confirmados'] += 1
-                elif classi_fin in self.CLASSIFICACAO_SUSPEITO:
-                    aggregated[key]['casos_suspeitos'] += 1
-                
-                if classi_fin in self.CLASSIFICACAO_GRAVE:
-                    aggregated[key]['casos_graves'] += 1
-                
-                if record.evolucao in self.EVOLUCAO_OBITO:
-                    aggregated[key]['obitos'] += 1
-                
-                success += 1
-                
-            except Exception as e:
-                errors.append({
-                    'row': row,
-                    'error': str(e)
-                })
+        # Agregar por município + ano/semana epidemiológica da notificação
+        classi_fin = colunas['classi_fin'][validas]
+        anos, semanas = _semanas_epi(colunas['dt_notific'][validas])
+        acumulado.adicionar(
+            colunas['id_municip'][validas].astype(np.int64),
+            anos,
+            semanas,
+            np.column_stack([
+                np.isin(classi_fin, self.CLASSIFICACAO_CONFIRMADO),
+                np.isin(classi_fin, self.CLASSIFICACAO_GRAVE),
+                np.isin(colunas['evolucao'][validas], self.EVOLUCAO_OBITO)
+            ])
+        )
         
-        # Inserir/atualizar agregados no banco
-        if aggregated:
-            self._upsert_indicadores(aggregated, doenca_tipo, overwrite, conn)
+        # Linhas fora do formato estrito (ex.: data 5/1/2024, ' MT') que o
+        # Pydantic aceita
+        semanas_aceitas = [semana_epi(record.dt_notific) for _, record in aceitas]
+        acumulado.adicionar(
+            [record.id_municip for _, record in aceitas],
+            [ano for ano, _ in semanas_aceitas],
+            [semana for _, semana in semanas_aceitas],
+            [[
+                record.classi_fin in self.CLASSIFICACAO_CONFIRMADO,
+                record.classi_fin in self.CLASSIFICACAO_GRAVE,
+                record.evolucao in self.EVOLUCAO_OBITO
+            ] for _, record in aceitas]
+        )
         
         return {
-            'processed': processed,
-            'success': success,
-            'errors': errors
+            'processed': len(batch),
+            'success': int(validas.sum()) + len(aceitas),
+            'errors': [{'row': batch[i], 'error': str(e)} for i, e in reprovadas]
         }
     
     def _get_semana_epi(self, dt: date) -> int:
         """
-        Calcula semana epidemiológica (ISO week)
+        Calcula semana epidemiológica (domingo a sábado, ver semana_epi)
         
         Args:
             dt: Data
@@ -340,74 +533,65 @@ class SINANETLService(ETLBaseService):
         Returns:
             Semana epidemiológica (1-53)
         """
-        return dt.isocalendar()[1]
+        return semana_epi(dt)[1]
     
     def _upsert_indicadores(
         self,
         aggregated: Dict,
         doenca_tipo: DoencaTipo,
         overwrite: bool,
-        conn
-    ) -> None:
+        conn,
+        arquivo_origem: Optional[str] = None
+    ) -> Dict[str, int]:
         """
-        Insere ou atualiza indicadores no banco
+        Insere ou atualiza as séries SERIES_INDICADOR em indicador_epi (COPY + merge em lote)
+        
+        Uma linha por (série, semana epi, município): competencia = domingo
+        de início da semana; CASOS_<DOENCA> = confirmados (incluindo graves),
+        GRAVES_<DOENCA> = graves, OBITOS_<DOENCA> = óbitos. Na mesma
+        transação recalcula indicador_epi_semanal e o cubo das semanas
+        gravadas.
         
         Args:
             aggregated: Dados agregados
             doenca_tipo: Tipo de doença
             overwrite: Sobrescrever existentes
             conn: Conexão DB
+            arquivo_origem: Nome do arquivo importado (auditoria)
+            
+        Returns:
+            Dict com 'inseridos' e 'atualizados'
         """
-        with conn.cursor() as cur:
-            for data in aggregated.values():
-                if overwrite:
-                    # UPSERT
-                    cur.execute("""
-                        INSERT INTO indicador_epi (
-                            municipio_codigo, ano, semana_epi, doenca_tipo,
-                            casos_confirmados, casos_suspeitos, casos_graves, obitos,
-                            fonte, data_atualizacao
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (municipio_codigo, ano, semana_epi, doenca_tipo)
-                        DO UPDATE SET
-                            casos_confirmados = EXCLUDED.casos_confirmados,
-                            casos_suspeitos = EXCLUDED.casos_suspeitos,
-                            casos_graves = EXCLUDED.casos_graves,
-                            obitos = EXCLUDED.obitos,
-                            fonte = EXCLUDED.fonte,
-                            data_atualizacao = EXCLUDED.data_atualizacao
-                    """, (
-                        data['municipio_codigo'],
-                        data['ano'],
-                        data['semana_epi'],
-                        doenca_tipo.value,
-                        data['casos_confirmados'],
-                        data['casos_suspeitos'],
-                        data['casos_graves'],
-                        data['obitos'],
-                        ETLSource.SINAN.value,
-                        datetime.utcnow()
-                    ))
-                else:
-                    # INSERT apenas se não existir
-                    cur.execute("""
-                        INSERT INTO indicador_epi (
-                            municipio_codigo, ano, semana_epi, doenca_tipo,
-                            casos_confirmados, casos_suspeitos, casos_graves, obitos,
-                            fonte, data_atualizacao
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (municipio_codigo, ano, semana_epi, doenca_tipo) DO NOTHING
-                    """, (
-                        data['municipio_codigo'],
-                        data['ano'],
-                        data['semana_epi'],
-                        doenca_tipo.value,
-                        data['casos_confirmados'],
-                        data['casos_suspeitos'],
-                        data['casos_graves'],
-                        data['obitos'],
-                        ETLSource.SINAN.value,
-                        datetime.utcnow()
-                    ))
+        agora = datetime.utcnow()
+        linhas = [
+            (
+                inicio_semana_epi(data['ano'], data['semana_epi']),
+                data['municipio_codigo'],
+                f"{serie}_{doenca_tipo.value}",
+                sum(data[coluna] for coluna in colunas),
+                arquivo_origem,
+                agora,
+                f"{serie}_{doenca_tipo.value}:{data['municipio_codigo']}"
+            )
+            for data in aggregated.values()
+            for serie, colunas in self.SERIES_INDICADOR.items()
+        ]
+        
+        resultado = self.copy_upsert(
+            conn,
+            'indicador_epi',
+            self.COLUNAS_INDICADOR,
+            linhas,
+            chave=['competencia', 'dedup_key'],
+            predicado_chave='dedup_key IS NOT NULL',
+            # Sem overwrite: INSERT apenas se não existir
+            atualizar=['valor', 'arquivo_origem', 'dt_importacao'] if overwrite else None
+        )
+        
+        if linhas:
+            competencias = [linha[0] for linha in linhas]
+            with conn.cursor() as cur:
+                refresh_indicador_semanal(cur, min(competencias), max(competencias) + timedelta(days=6))
         
         conn.commit()
+        return resultado
@@ -0,0 +1,405 @@
+"""
+Vector tiles (Mapbox Vector Tile 2.1) dos polígonos de município
+
+Os tiles são gerados em Python a partir das geometrias simplificadas que o
+``MunicipioIndex`` já mantém em memória, sem consultar ``municipios_geometrias``
+por tile: o nível da pirâmide de simplificação é escolhido pelo zoom do tile,
+as geometrias do nível são projetadas em Web Mercator normalizado uma vez por
+versão do índice e cada tile só recorta e quantiza os polígonos cujo bbox o
+intercepta. A codificação protobuf é feita à mão (o formato só usa varints,
+zigzag e campos length-delimited), sem dependência nova.
+
+Os tiles prontos ficam em um LRU limitado por bytes (``get_tile_cache``),
+endereçado pelo ETag da resposta — que já incorpora filtro, z/x/y e versão
+dos dados.
+
+Configuração via ambiente:
+    MVT_CACHE_MAX_MB    Orçamento de memória do cache de tiles (default 64)
+"""
+import math
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.services.response_cache import RESPONSE_CACHE_HITS, RESPONSE_CACHE_MISSES
+
+MVT_EXTENT = 4096
+MVT_BUFFER = 64
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+_GEOM_POLYGON = 3
+_CMD_MOVE_TO = 1
+_CMD_LINE_TO = 2
+_CMD_CLOSE_PATH = 7
+
+Ring = List[Tuple[float, float]]
+
+
+def tile_valido(z: int, x: int, y: int) -> bool:
+    """z/x/y dentro do esquema XYZ"""
+    return 0 <= z <= 22 and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+# =============================================================================
+# PROJEÇÃO
+# =============================================================================
+
+def _mercator(lng: float, lat: float) -> Tuple[float, float]:
+    """lng/lat → Web Mercator normalizado [0, 1] (y cresce para o sul)"""
+    sen = min(max(math.sin(math.radians(lat)), -0.9999), 0.9999)
+    y = 0.5 - 0.25 * math.log((1 + sen) / (1 - sen)) / math.pi
+    return lng / 360.0 + 0.5, min(max(y, 0.0), 1.0)
+
+
+class GeometriaMercator:
+    """Polígonos de um município em Mercator normalizado + bbox"""
+
+    __slots__ = ('poligonos', 'bbox')
+
+    def __init__(self, geojson: Dict[str, Any]):
+        tipo = geojson.get('type')
+        coords = geojson.get('coordinates') or []
+        if tipo == 'Polygon':
+            coords = [coords]
+        elif tipo != 'MultiPolygon':
+            coords = []
+
+        self.poligonos: List[List[Ring]] = []
+        min_x = min_y = math.inf
+        max_x = max_y = -math.inf
+        for poligono in coords:
+            aneis = []
+            for anel in poligono:
+                pontos = [_mercator(p[0], p[1]) for p in anel]
+                # GeoJSON repete o primeiro ponto no fim; o MVT fecha com ClosePath
+                if len(pontos) > 1 and pontos[0] == pontos[-1]:
+                    pontos.pop()
+                aneis.append(pontos)
+                for px, py in pontos:
+                    min_x, max_x = min(min_x, px), max(max_x, px)
+                    min_y, max_y = min(min_y, py), max(max_y, py)
+            if aneis:
+                self.poligonos.append(aneis)
+        self.bbox = (min_x, min_y, max_x, max_y)
+
+    def intercepta(self, min_x: float, min_y: float, max_x: float, max_y: float) -> bool:
+        b = self.bbox
+        return b[0] <= max_x and b[2] >= min_x and b[1] <= max_y and b[3] >= min_y
+
+
+def projetar_geometrias(geometrias: Dict[str, Dict[str, Any]]) -> Dict[str, GeometriaMercator]:
+    """código IBGE → GeometriaMercator"""
+    return {cod: GeometriaMercator(geom) for cod, geom in geometrias.items() if geom}
+
+
+_projecoes: Dict[Tuple[int, Optional[str], Optional[int]], Dict[str, GeometriaMercator]] = {}
+_projecoes_lock = threading.Lock()
+
+
+def geometrias_do_indice(indice: Any, zoom: Optional[int] = None) -> Dict[str, GeometriaMercator]:
+    """
+    Geometrias projetadas de um ``MunicipioIndex`` no nível da pirâmide do
+    zoom, refeitas só quando a versão do índice muda.
+    """
+    nivel, geojson = indice.geometrias(zoom)
+    versao = indice.versao
+    chave = (id(indice), versao, nivel)
+    with _projecoes_lock:
+        geometrias = _projecoes.get(chave)
+    if geometrias is None:
+        geometrias = projetar_geometrias(geojson)
+        with _projecoes_lock:
+            # Mantém só a versão atual de cada índice
+            for antiga in [k for k in _projecoes if k[0] == id(indice) and k[1] != versao]:
+                del _projecoes[antiga]
+            _projecoes[chave] = geometrias
+    return geometrias
+
+
+# =============================================================================
+# RECORTE E QUANTIZAÇÃO
+# =============================================================================
+
+def _clip_ring(ring: Ring, lo: float, hi: float) -> Ring:
+    """Sutherland–Hodgman contra o quadrado [lo, hi] x [lo, hi]"""
+    for eixo, limite, dentro_se_maior in ((0, lo, True), (0, hi, False), (1, lo, True), (1, hi, False)):
+        if not ring:
+            break
+        entrada = ring
+        ring = []
+        anterior = entrada[-1]
+        for atual in entrada:
+            a_dentro = (anterior[eixo] >= limite) if dentro_se_maior else (anterior[eixo] <= limite)
+            c_dentro = (atual[eixo] >= limite) if dentro_se_maior else (atual[eixo] <= limite)
+            if c_dentro:
+                if not a_dentro:
+                    ring.append(_intersecao(anterior, atual, eixo, limite))
+                ring.append(atual)
+            elif a_dentro:
+                ring.append(_intersecao(anterior, atual, eixo, limite))
+            anterior = atual
+    return ring
+
+
+def _intersecao(a, b, eixo: int, limite: float) -> Tuple[float, float]:
+    t = (limite - a[eixo]) / (b[eixo] - a[eixo])
+    if eixo == 0:
+        return limite, a[1] + t * (b[1] - a[1])
+    return a[0] + t * (b[0] - a[0]), limite
+
+
+def _area_assinada(ring: Sequence[Tuple[int, int]]) -> int:
+    """Fórmula do agrimensor em coordenadas de tile (positiva = anel externo no MVT)"""
+    soma = 0
+    anterior = ring[-1]
+    for atual in ring:
+        soma += anterior[0] * atual[1] - atual[0] * anterior[1]
+        anterior = atual
+    return soma
+
+
+def _quantizar(ring: Ring) -> List[Tuple[int, int]]:
+    pontos: List[Tuple[int, int]] = []
+    for px, py in ring:
+        p = (int(round(px)), int(round(py)))
+        if not pontos or p != pontos[-1]:
+            pontos.append(p)
+    if len(pontos) > 1 and pontos[0] == pontos[-1]:
+        pontos.pop()
+    return pontos
+
+
+def _aneis_tile(
+    geometria: GeometriaMercator,
+    z: int,
+    x: int,
+    y: int,
+    extent: int,
+    buffer: int
+) -> List[List[Tuple[int, int]]]:
+    """Anéis do município em coordenadas inteiras do tile, já orientados"""
+    escala = (2 ** z) * extent
+    ox, oy = x * extent, y * extent
+    lo, hi = -buffer, extent + buffer
+
+    aneis = []
+    for poligono in geometria.poligonos:
+        for i, anel in enumerate(poligono):
+            local = [(px * escala - ox, py * escala - oy) for px, py in anel]
+            pontos = _quantizar(_clip_ring(local, lo, hi))
+            area = _area_assinada(pontos) if len(pontos) >= 3 else 0
+            if area == 0:
+                if i == 0:
+                    break  # exterior degenerado: descarta os buracos também
+                continue
+            externo = i == 0
+            if (area > 0) != externo:
+                pontos.reverse()
+            aneis.append(pontos)
+    return aneis
+
+
+# =============================================================================
+# CODIFICAÇÃO PROTOBUF
+# =============================================================================
+
+def _varint(valor: int, out: bytearray) -> None:
+    while valor > 0x7F:
+        out.append((valor & 0x7F) | 0x80)
+        valor >>= 7
+    out.append(valor)
+
+
+def _zigzag(valor: int) -> int:
+    return (valor << 1) if valor >= 0 else ((-valor) << 1) - 1
+
+
+def _campo_bytes(numero: int, dados: bytes, out: bytearray) -> None:
+    _varint((numero << 3) | 2, out)
+    _varint(len(dados), out)
+    out += dados
+
+
+def _campo_varint(numero: int, valor: int, out: bytearray) -> None:
+    _varint(numero << 3, out)
+    _varint(valor, out)
+
+
+def _packed(valores: Iterable[int]) -> bytes:
+    out = bytearray()
+    for v in valores:
+        _varint(v, out)
+    return bytes(out)
+
+
+def _geometria_comandos(aneis: List[List[Tuple[int, int]]]) -> List[int]:
+    comandos: List[int] = []
+    cx = cy = 0
+    for anel in aneis:
+        x0, y0 = anel[0]
+        comandos += [(_CMD_MOVE_TO & 7) | (1 << 3), _zigzag(x0 - cx), _zigzag(y0 - cy)]
+        cx, cy = x0, y0
+        comandos.append((_CMD_LINE_TO & 7) | ((len(anel) - 1) << 3))
+        for px, py in anel[1:]:
+            comandos += [_zigzag(px - cx), _zigzag(py - cy)]
+            cx, cy = px, py
+        comandos.append((_CMD_CLOSE_PATH & 7) | (1 << 3))
+    return comandos
+
+
+def _valor(v: Any) -> bytes:
+    out = bytearray()
+    if isinstance(v, bool):
+        _campo_varint(7, int(v), out)
+    elif isinstance(v, int):
+        if v >= 0:
+            _campo_varint(5, v, out)
+        else:
+            _campo_varint(6, _zigzag(v), out)
+    elif isinstance(v, float):
+        _varint((3 << 3) | 1, out)
+        out += struct.pack('<d', v)
+    else:
+        _campo_bytes(1, str(v).encode('utf-8'), out)
+    return bytes(out)
+
+
+def encode_tile(
+    camada: str,
+    features: Iterable[Tuple[Optional[int], GeometriaMercator, Dict[str, Any]]],
+    z: int,
+    x: int,
+    y: int,
+    extent: int = MVT_EXTENT,
+    buffer: int = MVT_BUFFER
+) -> bytes:
+    """
+    Codifica um tile MVT de uma camada de polígonos.
+
+    Args:
+        camada: Nome da camada no tile
+        features: (id, geometria, propriedades); propriedades None são omitidas
+        z, x, y: Tile XYZ
+        extent: Resolução do tile
+        buffer: Margem (em unidades do tile) mantida além da borda
+
+    Returns:
+        Tile codificado; vazio (b"") se nenhum polígono cai no tile
+    """
+    escala = 2 ** z
+    margem = buffer / extent
+    min_x, max_x = (x - margem) / escala, (x + 1 + margem) / escala
+    min_y, max_y = (y - margem) / escala, (y + 1 + margem) / escala
+
+    chaves: Dict[str, int] = {}
+    valores: Dict[Tuple[type, Any], int] = {}
+    corpo_features = bytearray()
+
+    for fid, geometria, propriedades in features:
+        if not geometria.intercepta(min_x, min_y, max_x, max_y):
+            continue
+        aneis = _aneis_tile(geometria, z, x, y, extent, buffer)
+        if not aneis:
+            continue
+
+        tags = []
+        for chave, valor in propriedades.items():
+            if valor is None:
+                continue
+            tags.append(chaves.setdefault(chave, len(chaves)))
+            tags.append(valores.setdefault((type(valor), valor), len(valores)))
+
+        feature = bytearray()
+        if fid is not None:
+            _campo_varint(1, fid, feature)
+        _campo_bytes(2, _packed(tags), feature)
+        _campo_varint(3, _GEOM_POLYGON, feature)
+        _campo_bytes(4, _packed(_geometria_comandos(aneis)), feature)
+        _campo_bytes(2, bytes(feature), corpo_features)
+
+    if not corpo_features:
+        return b""
+
+    layer = bytearray()
+    _campo_varint(15, 2, layer)
+    _campo_bytes(1, camada.encode('utf-8'), layer)
+    layer += corpo_features
+    for chave in chaves:
+        _campo_bytes(3, chave.encode('utf-8'), layer)
+    for (_, valor) in valores:
+        _campo_bytes(4, _valor(valor), layer)
+    _campo_varint(5, extent, layer)
+
+    tile = bytearray()
+    _campo_bytes(3, bytes(layer), tile)
+    return bytes(tile)
+
+
+# =============================================================================
+# CACHE DE TILES
+# =============================================================================
+
+class TileCache:
+    """LRU de tiles codificados limitado pelo total de bytes"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._tiles: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave: str) -> Optional[bytes]:
+        with self._lock:
+            tile = self._tiles.get(chave)
+            if tile is not None:
+                self._tiles.move_to_end(chave)
+            return tile
+
+    def set(self, chave: str, tile: bytes) -> None:
+        if len(tile) > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._tiles.pop(chave, None)
+            if anterior is not None:
+                self.bytes -= len(anterior)
+            self._tiles[chave] = tile
+            self.bytes += len(tile)
+            while self.bytes > self.max_bytes:
+                _, removido = self._tiles.popitem(last=False)
+                self.bytes -= len(removido)
+
+    def get_or_compute(self, chave: str, compute: Callable[[], bytes]) -> bytes:
+        """Tile em cache ou gerado por ``compute`` (e guardado)"""
+        tile = self.get(chave)
+        if tile is not None:
+            RESPONSE_CACHE_HITS.labels(endpoint="mapa_tiles", tier="memoria").inc()
+            return tile
+        RESPONSE_CACHE_MISSES.labels(endpoint="mapa_tiles").inc()
+        tile = compute()
+        self.set(chave, tile)
+        return tile
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tiles.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+
+_tile_cache: Optional[TileCache] = None
+_tile_cache_lock = threading.Lock()
+
+
+def get_tile_cache() -> TileCache:
+    """Cache de tiles do processo (configurado por ``MVT_CACHE_MAX_MB``)"""
+    global _tile_cache
+    if _tile_cache is None:
+        with _tile_cache_lock:
+            if _tile_cache is None:
+                max_mb = float(os.getenv("MVT_CACHE_MAX_MB", "64"))
+                _tile_cache = TileCache(int(max_mb * 1024 * 1024))
+    return _tile_cache
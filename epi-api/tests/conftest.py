@@ -0,0 +1,90 @@
+"""
+Fixtures compartilhadas: banco falso para testar services sem PostgreSQL
+"""
+import pytest
+
+
+class FakeCursor:
+    def __init__(self, db, name=None):
+        self.db = db
+        self.name = name
+        self.itersize = None
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.db.cursores_fechados += 1
+        return False
+
+    def execute(self, sql, params=None):
+        self.db.queries.append((sql, params))
+        if self.name:
+            self.db.cursores_nomeados.append(self.name)
+        self._rows = self.db.respond(sql, params)
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def __iter__(self):
+        self.db.itersizes.append(self.itersize)
+        return iter(self._rows)
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, name=None, cursor_factory=None):
+        return FakeCursor(self.db, name)
+
+    def close(self):
+        self.db.devolvidas += 1
+
+
+class FakeDB:
+    """
+    Banco falso: responde a qualquer consulta com ``rows`` (ou com
+    ``rows(sql, params)``, se for chamável) e registra o que foi executado.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.available = True
+        self.queries = []            # (sql, params) na ordem de execução
+        self.cursores_nomeados = []  # cursores server-side (name=...)
+        self.itersizes = []
+        self.connections = 0
+        self.devolvidas = 0
+        self.cursores_fechados = 0
+
+    @property
+    def sqls(self):
+        return [sql for sql, _ in self.queries]
+
+    def respond(self, sql, params):
+        return self.rows(sql, params) if callable(self.rows) else self.rows
+
+    def connect(self, dsn=None):
+        if not self.available:
+            raise ConnectionError("db down")
+        self.connections += 1
+        return FakeConnection(self)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """
+    Fábrica ``fake_db(rows, *modulos)``: cria um FakeDB e o instala como
+    ``get_connection`` de cada módulo de service informado.
+    """
+    def factory(rows, *modulos):
+        db = FakeDB(rows)
+        for modulo in modulos:
+            monkeypatch.setattr(modulo, "get_connection", db.connect)
+        return db
+    return factory
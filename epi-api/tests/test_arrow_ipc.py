@@ -0,0 +1,142 @@
+"""
+Testes da saída Arrow IPC (app.services.arrow_ipc) sem banco
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import arrow_ipc, dashboard_service, mapa_service, response_cache
+from app.services.arrow_ipc import ARROW_MEDIA_TYPE, pede_arrow, tabela_ipc
+from app.services.mapa_service import MapaService
+from app.services.municipio_index import MunicipioIndex
+from app.services.response_cache import ResponseCache
+
+pa = pytest.importorskip("pyarrow")
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+def municipios():
+    return MunicipioIndex.from_records({
+        "5103403": {"nome": "Cuiabá", "pop": 100000, "lat": -15.6, "lon": -56.1},
+        "5108402": {"nome": "Várzea Grande", "pop": 50000, "lat": -15.6, "lon": -56.4},
+    })
+
+
+def ler(payload: bytes):
+    return pa.ipc.open_stream(payload).read_all()
+
+
+@pytest.fixture
+def db(fake_db, monkeypatch):
+    fake = fake_db([], mapa_service, dashboard_service)
+    monkeypatch.setattr(mapa_service, "get_municipio_index", lambda conn: municipios())
+    monkeypatch.setattr(dashboard_service, "get_municipio_index", lambda conn: municipios())
+    monkeypatch.setattr(response_cache, "_cache", ResponseCache())
+    return fake
+
+
+# ============================================================================
+# SERIALIZAÇÃO
+# ============================================================================
+
+def test_tabela_ipc_roundtrip_with_metadata():
+    tabela = ler(tabela_ipc(
+        {"cod": ["5103403", "5108402"], "casos": [3, 0]},
+        {"cod": "string", "casos": "int32"},
+        metadata={"ano": 2024, "doenca_tipo": None}
+    ))
+
+    assert tabela.schema.field("casos").type == pa.int32()
+    assert tabela.to_pydict() == {"cod": ["5103403", "5108402"], "casos": [3, 0]}
+    assert tabela.schema.metadata == {b"ano": b"2024"}
+
+
+def test_pede_arrow_query_string_wins_over_accept():
+    assert pede_arrow(ARROW_MEDIA_TYPE)
+    assert pede_arrow("application/json", "arrow")
+    assert not pede_arrow(ARROW_MEDIA_TYPE, "json")
+    assert not pede_arrow(None)
+
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+
+def test_series_temporais_arrow_long_layout(db):
+    db.rows = [
+        {"municipio_cod_ibge": "5103403", "semana_epi": 2, "casos": 10},
+        {"municipio_cod_ibge": "5108402", "semana_epi": 1, "casos": 5},
+    ]
+    client = TestClient(app)
+    params = {"codigos": "5103403,5108402", "ano": 2024}
+
+    response = client.get("/api/mapa/series-temporais", params=params,
+                          headers={"Accept": ARROW_MEDIA_TYPE})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == ARROW_MEDIA_TYPE
+    assert "Accept" in response.headers["vary"]
+    tabela = ler(response.content)
+    assert tabela.num_rows == 2 * 52
+    assert tabela.column("casos").to_pylist()[:3] == [0, 10, 0]
+    assert tabela.column("incidencia").to_pylist()[1] == 10.0
+    assert tabela.column("municipio_cod_ibge").to_pylist()[52] == "5108402"
+
+    # Mesmos números do JSON colunar; ETags distintos por representação
+    json_resp = client.get("/api/mapa/series-temporais", params=params)
+    assert json_resp.json()["casos"][1][:2] == tabela.column("casos").to_pylist()[52:54]
+    assert json_resp.headers["etag"] != response.headers["etag"]
+
+
+def test_camada_incidencia_arrow(db):
+    db.rows = [
+        {"municipio_cod_ibge": "5103403", "total_casos": 600, "total_obitos": 3},
+        {"municipio_cod_ibge": "9999999", "total_casos": 1, "total_obitos": 0},
+    ]
+    service = MapaService("postgresql://fake", municipios=municipios())
+
+    tabela = ler(service.get_camada_incidencia_arrow("202401", "202403"))
+    geojson = service.get_camada_incidencia("202401", "202403")
+
+    props = geojson.data.features[0].properties
+    assert tabela.num_rows == 1
+    linha = tabela.to_pylist()[0]
+    assert linha["incidencia"] == pytest.approx(props.incidencia)
+    assert linha["classe_risco"] == props.classe_risco == "muito_alto"
+    assert (linha["longitude"], linha["latitude"]) == (-56.1, -15.6)
+    assert tabela.schema.metadata[b"competencia_fim"] == b"202403"
+
+
+def test_dashboard_top_n_arrow(db):
+    db.rows = [
+        {"codigo_ibge": "5108402", "nome": "Várzea Grande", "populacao": 50000, "casos": 30,
+         "valor": 30.0, "posicao": 1, "percentual": 75.0, "risco": 0, "total": 2},
+        {"codigo_ibge": "5103403", "nome": "Cuiabá", "populacao": 100000, "casos": 10,
+         "valor": 10.0, "posicao": 2, "percentual": 25.0, "risco": 0, "total": 2},
+    ]
+    client = TestClient(app)
+
+    response = client.get("/api/indicadores/top", params={"ano": 2024, "formato": "arrow"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == ARROW_MEDIA_TYPE
+    assert "etag" in response.headers
+    tabela = ler(response.content)
+    assert tabela.column("codigo_ibge").to_pylist() == ["5108402", "5103403"]
+    assert tabela.column("percentual").to_pylist() == [75.0, 25.0]
+    assert tabela.schema.metadata[b"total_items"] == b"2"
+
+
+def test_arrow_without_pyarrow_is_406(db, monkeypatch):
+    monkeypatch.setattr(arrow_ipc, "pa", None)
+    client = TestClient(app)
+
+    response = client.get("/api/mapa/series-temporais",
+                          params={"codigos": "5103403", "ano": 2024, "formato": "arrow"})
+
+    assert response.status_code == 406
+    assert client.get("/api/mapa/series-temporais",
+                      params={"codigos": "5103403", "ano": 2024}).status_code == 200
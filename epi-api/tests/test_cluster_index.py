@@ -0,0 +1,143 @@
+"""
+Testes para o índice hierárquico de clusters (app.services.cluster_index)
+"""
+import random
+import time
+
+import pytest
+
+from app.schemas.mapa import ClusterFeature, GeoJSONFeature, GeoJSONGeometry, MunicipioProperties
+from app.services import cluster_index
+from app.services.cluster_index import ClusterIndex, get_cluster_index
+
+
+def ponto(i, lng, lat, casos=10, obitos=0, pop=10000, classe="baixo"):
+    return GeoJSONFeature(
+        geometry=GeoJSONGeometry(type="Point", coordinates=[lng, lat]),
+        properties=MunicipioProperties(
+            municipio_cod_ibge=f"51{i:05d}",
+            municipio_nome=f"Município {i}",
+            populacao=pop,
+            casos=casos,
+            incidencia=casos / pop * 100000.0,
+            obitos=obitos,
+            letalidade=0.0,
+            classe_risco=classe,
+            cor_hex="#4CAF50"
+        )
+    )
+
+
+@pytest.fixture
+def municipios_mt():
+    """141 pontos espalhados pelo retângulo de MT"""
+    rnd = random.Random(42)
+    return [
+        ponto(i, rnd.uniform(-61.5, -50.2), rnd.uniform(-18.0, -7.4), casos=rnd.randint(0, 500))
+        for i in range(141)
+    ]
+
+
+def _point_count(feature):
+    if isinstance(feature, ClusterFeature):
+        return feature.properties.point_count
+    return 1
+
+
+def _casos(feature):
+    if isinstance(feature, ClusterFeature):
+        return feature.properties.casos_total
+    return feature.properties.casos
+
+
+def test_every_zoom_covers_all_points(municipios_mt):
+    index = ClusterIndex(municipios_mt)
+    total_casos = sum(f.properties.casos for f in municipios_mt)
+
+    for z in range(0, index.max_zoom + 2):
+        features = index.get_clusters(z)
+        assert sum(_point_count(f) for f in features) == 141
+        assert sum(_casos(f) for f in features) == total_casos
+
+
+def test_feature_count_grows_with_zoom(municipios_mt):
+    index = ClusterIndex(municipios_mt)
+    counts = [index.count(z) for z in range(0, index.max_zoom + 2)]
+
+    assert counts == sorted(counts)
+    assert counts[0] < 10
+    assert counts[-1] == 141
+
+
+def test_close_points_merge_with_weighted_centroid():
+    features = [
+        ponto(1, -56.0, -15.0, casos=100, pop=10000, classe="muito_alto"),
+        ponto(2, -56.001, -15.0, casos=300, pop=30000, classe="muito_alto"),
+        ponto(3, -52.0, -10.0, casos=5, classe="baixo"),
+    ]
+    index = ClusterIndex(features)
+
+    clusters = [f for f in index.get_clusters(5) if isinstance(f, ClusterFeature)]
+    assert len(clusters) == 1
+    props = clusters[0].properties
+    assert props.point_count == 2
+    assert props.casos_total == 400
+    assert props.incidencia_media == 1000.0
+    assert props.nivel_risco_predominante == "muito_alto"
+    assert props.cor_hex == "#F44336"
+    assert props.expansion_zoom is not None
+    lng, _ = clusters[0].geometry.coordinates
+    assert -56.001 <= lng <= -56.0
+
+    # No zoom máximo os municípios voltam a ser features de município
+    assert all(isinstance(f, GeoJSONFeature) for f in index.get_clusters(index.max_zoom + 1))
+
+
+def test_bbox_filters_viewport(municipios_mt):
+    index = ClusterIndex(municipios_mt)
+    bbox = [-58.0, -16.0, -54.0, -12.0]
+
+    features = index.get_clusters(index.max_zoom + 1, bbox)
+    esperados = {
+        f.properties.municipio_cod_ibge for f in municipios_mt
+        if bbox[0] <= f.geometry.coordinates[0] <= bbox[2]
+        and bbox[1] <= f.geometry.coordinates[1] <= bbox[3]
+    }
+    assert {f.properties.municipio_cod_ibge for f in features} == esperados
+
+
+def test_zoom_para_limite(municipios_mt):
+    index = ClusterIndex(municipios_mt)
+    z = index.zoom_para_limite(20)
+    assert index.count(z) <= 20
+    assert z == index.max_zoom + 1 or index.count(z + 1) > 20
+
+
+def test_query_is_sub_millisecond(municipios_mt):
+    index = ClusterIndex(municipios_mt)
+    bbox = [-58.0, -16.0, -54.0, -12.0]
+    n = 500
+
+    inicio = time.perf_counter()
+    for i in range(n):
+        index.get_clusters(i % (index.max_zoom + 2), bbox)
+    media_ms = (time.perf_counter() - inicio) * 1000.0 / n
+
+    assert media_ms < 1.0
+
+
+def test_get_cluster_index_builds_once_per_key(monkeypatch, municipios_mt):
+    monkeypatch.setattr(cluster_index, "_indices", cluster_index.OrderedDict())
+    builds = []
+
+    def construir():
+        builds.append(1)
+        return ClusterIndex(municipios_mt)
+
+    a = get_cluster_index(("incidencia", "202401", "v1"), construir)
+    b = get_cluster_index(("incidencia", "202401", "v1"), construir)
+    c = get_cluster_index(("incidencia", "202401", "v2"), construir)
+
+    assert a is b
+    assert c is not a
+    assert len(builds) == 2
@@ -0,0 +1,198 @@
+"""
+Testes do DashboardService sem banco: conexão falsa que registra as consultas
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas.dashboard import NivelDrillDown, TendenciaDirecao
+from app.services import dashboard_service, response_cache
+from app.services.dashboard_service import DashboardService
+from app.services.municipio_index import MunicipioIndex
+from app.services.response_cache import ResponseCache
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def db(fake_db):
+    return fake_db([], dashboard_service)
+
+
+@pytest.fixture
+def service():
+    municipios = MunicipioIndex.from_records({
+        "5103403": {"nome": "Cuiabá", "pop": 100000, "lat": -15.6, "lon": -56.1},
+        "5108402": {"nome": "Várzea Grande", "pop": 50000, "lat": -15.6, "lon": -56.4},
+    })
+    return DashboardService("postgresql://fake", municipios=municipios)
+
+
+def linha(cod, casos, obitos=0, graves=0, casos_ant=None, obitos_ant=None):
+    return {
+        "municipio_codigo": cod,
+        "casos_mun": casos,
+        "total_obitos": obitos,
+        "casos_graves": graves,
+        "casos_mun_anterior": casos_ant,
+        "total_obitos_anterior": obitos_ant,
+    }
+
+
+# ============================================================================
+# KPIs
+# ============================================================================
+
+def test_kpis_both_periods_in_single_query(db, service):
+    db.rows = [
+        linha("5103403", 400, obitos=2, graves=5, casos_ant=200, obitos_ant=2),
+        linha("5108402", 100, casos_ant=100, obitos_ant=0),
+        # Só no ano anterior: entra na comparação, não no período atual
+        linha("9999999", None, None, None, casos_ant=50, obitos_ant=1),
+    ]
+
+    kpis = service.get_kpis(2024, semana_epi_inicio=1, semana_epi_fim=10, doenca_tipo="DENGUE")
+
+    assert len(db.queries) == 1
+    sql, params = db.queries[0]
+    assert "FILTER (WHERE ano_epi = %s)" in sql
+    assert params == [2024, 2024, 2024, 2023, 2023, 2023, 2024, 1, 10, "DENGUE"]
+
+    assert kpis.total_casos.valor == 500
+    assert kpis.total_casos.variacao.valor_anterior == 350
+    assert kpis.total_casos.variacao.tendencia == TendenciaDirecao.ALTA
+    assert kpis.total_obitos.variacao.valor_anterior == 3
+    # Incidência: (400 + 200) / 2 atual vs (200 + 200) / 2 anterior
+    assert kpis.incidencia_media.valor == 300.0
+    assert kpis.incidencia_media.variacao.variacao_percentual == 50.0
+    assert kpis.municipios_risco_alto.valor == 1
+    assert kpis.casos_graves.valor == 5
+
+
+def test_kpis_without_week_range_scans_single_year(db, service):
+    db.rows = [linha("5103403", 10)]
+
+    kpis = service.get_kpis(2024)
+
+    sql, params = db.queries[0]
+    assert params[5:7] == [2024, 2024]
+    assert kpis.total_casos.variacao is None
+    assert kpis.municipios_risco_alto is None
+
+
+# ============================================================================
+# TOP N
+# ============================================================================
+
+def test_top_n_ranked_and_limited_in_sql(db, service):
+    db.rows = [
+        {"codigo_ibge": "5108402", "nome": "Várzea Grande", "populacao": 50000, "casos": 300,
+         "valor": 600.0, "posicao": 1, "percentual": 60.0, "risco": 3, "total": 7},
+        {"codigo_ibge": "5103403", "nome": "Cuiabá", "populacao": 100000, "casos": 200,
+         "valor": 200.0, "posicao": 2, "percentual": 40.0, "risco": 1, "total": 7},
+    ]
+
+    top = service.get_top_n(2024, limite=2, tipo_indicador="incidencia", doenca_tipo="DENGUE")
+
+    sql, params = db.queries[0]
+    assert len(db.queries) == 1
+    assert "RANK() OVER (ORDER BY incidencia DESC)" in sql
+    assert "SUM(casos) OVER ()" in sql
+    assert params == [2024, "DENGUE", [100.0, 300.0, 500.0], 2]
+    assert top.total_items == 7
+    assert [(i.posicao, i.codigo_ibge) for i in top.ranking] == [(1, "5108402"), (2, "5103403")]
+    assert (top.ranking[0].nivel_risco, top.ranking[0].cor_hex) == ("MUITO_ALTO", "#F44336")
+    assert top.ranking[1].percentual == 40.0
+
+
+def test_top_n_without_population_has_no_incidence(db, service):
+    """População NULL/0 não vira 1: sem incidência, sem risco e fora do ranking por incidência"""
+    service.get_top_n(2024, tipo_indicador="incidencia")
+    sql, _ = db.queries[0]
+    assert "NULLIF(mi.populacao_estimada_2025, 0)" in sql
+    assert "COALESCE(mi.populacao_estimada_2025, 1)" not in sql
+    assert "WHERE incidencia IS NOT NULL" in sql
+
+    db.rows = [
+        {"codigo_ibge": "5108402", "nome": "Várzea Grande", "populacao": None, "casos": 300,
+         "valor": 300.0, "posicao": 1, "percentual": 100.0, "risco": None, "total": 1},
+    ]
+    top = service.get_top_n(2024, tipo_indicador="casos")
+
+    assert "WHERE incidencia IS NOT NULL" not in db.queries[1][0]
+    item = top.ranking[0]
+    assert (item.valor, item.valor_secundario, item.nivel_risco, item.cor_hex) == (300.0, None, None, None)
+
+
+def test_top_n_unknown_indicator_orders_by_incidence(db, service):
+    service.get_top_n(2024, tipo_indicador="casos; DROP TABLE x")
+
+    sql, _ = db.queries[0]
+    assert "ORDER BY incidencia DESC, codigo_ibge" in sql
+    assert "DROP" not in sql
+
+
+# ============================================================================
+# DRILL-DOWN
+# ============================================================================
+
+def no_cubo(nivel, chave, nome, semana, casos, obitos=0, pop=100000):
+    return {"nivel": nivel, "chave": chave, "nome": nome, "semana_epi": semana,
+            "casos_confirmados": casos, "obitos": obitos, "casos_graves": 0, "populacao": pop}
+
+
+def test_drill_down_region_children_in_single_lookup(db, service):
+    db.rows = [
+        no_cubo("municipio", "5103403", "Cuiabá", 10, 40, pop=100000),
+        no_cubo("municipio", "5108402", "Várzea Grande", 10, 200, obitos=2, pop=50000),
+        no_cubo("regiao", "Baixada Cuiabana", "Baixada Cuiabana", 0, 900, pop=150000),
+        no_cubo("regiao", "Baixada Cuiabana", "Baixada Cuiabana", 9, 300, pop=150000),
+        no_cubo("regiao", "Baixada Cuiabana", "Baixada Cuiabana", 10, 240, obitos=2, pop=150000),
+    ]
+
+    dados = service.get_drill_down(
+        2024, NivelDrillDown.REGIAO, "Baixada Cuiabana", doenca_tipo="DENGUE", semana_epi=10
+    )
+
+    sql, params = db.queries[0]
+    assert len(db.queries) == 1
+    assert "FROM cubo_epi" in sql
+    assert params == [2024, "DENGUE", "regiao", "Baixada Cuiabana",
+                      "municipio", "Baixada Cuiabana", 10]
+
+    assert (dados.total_casos, dados.incidencia) == (240, 160.0)
+    assert dados.nivel_filhos == NivelDrillDown.MUNICIPIO
+    assert [f.codigo for f in dados.filhos] == ["5108402", "5103403"]
+    assert dados.filhos[0].incidencia == 400.0
+    assert dados.filhos[0].nivel_risco == "ALTO"
+    assert dados.filhos[0].taxa_letalidade == 1.0
+    assert [p.data for p in dados.serie_temporal.dados] == ["2024-W09", "2024-W10"]
+
+
+def test_drill_down_municipality_has_no_children(db, service):
+    db.rows = [no_cubo("municipio", "5103403", "Cuiabá", 0, 12)]
+
+    dados = service.get_drill_down(2024, NivelDrillDown.MUNICIPIO, "5103403", semana_epi=3)
+
+    sql, params = db.queries[0]
+    assert "pai" not in sql
+    assert params == [2024, "TODAS", "municipio", "5103403"]
+    assert dados.filhos == [] and dados.nivel_filhos is None
+    # Semana sem linha no cubo: totais zerados
+    assert dados.total_casos == 0
+
+
+def test_drill_down_router_validates_and_maps_missing_node(db, monkeypatch):
+    monkeypatch.setattr(response_cache, "_cache", ResponseCache())
+    monkeypatch.setattr(dashboard_service, "get_municipio_index", lambda conn: MunicipioIndex.from_records({}))
+    client = TestClient(app)
+
+    assert client.get("/api/indicadores/drill-down", params={"ano": 2024, "nivel": "regiao"}).status_code == 400
+    assert client.get("/api/indicadores/drill-down",
+                      params={"ano": 2024, "nivel": "municipio", "codigo": "Cuiabá"}).status_code == 400
+
+    response = client.get("/api/indicadores/drill-down", params={"ano": 2024})
+    assert response.status_code == 404
+    assert db.queries[0][1][:4] == [2024, "TODAS", "estado", "MT"]
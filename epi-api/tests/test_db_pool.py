@@ -0,0 +1,196 @@
+"""
+Testes para o pool de conexões compartilhado (app.db)
+"""
+import threading
+
+import pytest
+import psycopg2
+import psycopg2.extensions
+
+from app.db import pool as db_pool
+from app.db import DatabasePool, PoolTimeoutError
+
+
+# ============================================================================
+# FAKES
+# ============================================================================
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection")
+        self.conn.executed.append(sql)
+        self.conn.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+
+
+class FakeInfo:
+    transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.executed = []
+        self.rollbacks = 0
+        self.info = FakeInfo()
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def commit(self):
+        self.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeThreadedPool:
+    """Substituto mínimo do ThreadedConnectionPool (sem banco)"""
+
+    created = []
+
+    def __init__(self, minconn, maxconn, dsn):
+        self.idle = []
+        self.dsn = dsn
+
+    def getconn(self):
+        if self.idle:
+            return self.idle.pop()
+        conn = FakeConnection()
+        FakeThreadedPool.created.append(conn)
+        return conn
+
+    def putconn(self, conn, close=False):
+        if close:
+            conn.close()
+        else:
+            self.idle.append(conn)
+
+    def closeall(self):
+        for conn in self.idle:
+            conn.close()
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    FakeThreadedPool.created = []
+    monkeypatch.setattr(db_pool, "ThreadedConnectionPool", FakeThreadedPool)
+    return FakeThreadedPool
+
+
+# ============================================================================
+# TESTES
+# ============================================================================
+
+def test_close_returns_connection_to_pool(fake_pool):
+    """conn.close() devolve a conexão ao pool em vez de fechá-la"""
+    pool = DatabasePool("postgresql+asyncpg://u:p@h/db", min_size=0, max_size=2)
+    assert pool.dsn == "postgresql://u:p@h/db"
+
+    conn = pool.getconn()
+    raw = conn._conn
+    conn.close()
+    conn.close()  # idempotente
+
+    assert raw.closed == 0
+    assert pool.stats()["in_use"] == 0
+
+    again = pool.getconn()
+    assert again._conn is raw
+    assert len(fake_pool.created) == 1
+    again.close()
+
+
+def test_open_transaction_is_rolled_back_on_return(fake_pool):
+    """Transação pendente é desfeita antes de a conexão voltar ao pool"""
+    pool = DatabasePool("postgresql://u:p@h/db", min_size=0, max_size=1)
+    conn = pool.getconn()
+    with conn.cursor() as cur:
+        cur.execute("SELECT * FROM indicador_epi")
+    raw = conn._conn
+    rollbacks = raw.rollbacks
+    conn.close()
+
+    assert raw.rollbacks == rollbacks + 1
+    assert raw.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+def test_broken_connection_is_replaced(fake_pool):
+    """Conexão que falha no health check é descartada e substituída"""
+    pool = DatabasePool("postgresql://u:p@h/db", min_size=0, max_size=2, healthcheck_interval=0)
+    conn = pool.getconn()
+    raw = conn._conn
+    conn.close()
+
+    raw.broken = True
+    fresh = pool.getconn()
+
+    assert fresh._conn is not raw
+    assert raw.closed == 1
+    fresh.close()
+
+
+def test_borrow_timeout_when_exhausted(fake_pool):
+    """Pool esgotado aguarda até o timeout e então levanta PoolTimeoutError"""
+    pool = DatabasePool("postgresql://u:p@h/db", min_size=0, max_size=1, timeout=0.05)
+    before = db_pool.POOL_BORROW_TIMEOUTS._value.get()
+
+    held = pool.getconn()
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+
+    assert db_pool.POOL_BORROW_TIMEOUTS._value.get() == before + 1
+    held.close()
+
+
+def test_waiting_borrower_gets_released_connection(fake_pool):
+    """Um chamador bloqueado recebe a conexão assim que ela é devolvida"""
+    pool = DatabasePool("postgresql://u:p@h/db", min_size=0, max_size=1, timeout=2)
+    held = pool.getconn()
+    result = {}
+
+    def borrow():
+        conn = pool.getconn()
+        result["conn"] = conn._conn
+        conn.close()
+
+    t = threading.Thread(target=borrow)
+    t.start()
+    raw = held._conn
+    held.close()
+    t.join(timeout=2)
+
+    assert result["conn"] is raw
+
+
+def test_invalid_size_rejected(fake_pool):
+    with pytest.raises(ValueError):
+        DatabasePool("postgresql://u:p@h/db", min_size=5, max_size=2)
+
+
+def test_get_connection_initializes_process_pool(fake_pool, monkeypatch):
+    """get_connection cria o pool do processo preguiçosamente"""
+    monkeypatch.setattr(db_pool, "_pool", None)
+    monkeypatch.setenv("DB_POOL_MAX_SIZE", "3")
+
+    conn = db_pool.get_connection("postgresql://u:p@h/db")
+    try:
+        assert db_pool.get_pool().max_size == 3
+    finally:
+        conn.close()
+        db_pool.close_pool()
+    assert db_pool.get_pool() is None
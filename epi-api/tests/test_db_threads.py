@@ -0,0 +1,113 @@
+"""
+Testes de concorrência: chamadas bloqueantes não travam o event loop (app.db.threads)
+"""
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from app.db import run_in_db_thread
+from app.db import threads as db_threads
+from app.main import app
+from app.schemas.mapa import EstatisticasMapa
+from app.services import response_cache
+from app.services.mapa_service import MapaService
+
+
+SLOW_CALL_SECONDS = 0.3
+PARALLEL_REQUESTS = 8
+
+
+@pytest.fixture(autouse=True)
+def reset_limiter(monkeypatch):
+    monkeypatch.setenv("DB_THREAD_LIMIT", str(PARALLEL_REQUESTS))
+    monkeypatch.setattr(db_threads, "_limiter", None)
+    monkeypatch.setenv("RESPONSE_CACHE_ENABLED", "0")
+    monkeypatch.setattr(response_cache, "_cache", None)
+    monkeypatch.setattr(response_cache, "versao_indice_municipios", lambda: "static")
+    yield
+    monkeypatch.setattr(response_cache, "_cache", None)
+    monkeypatch.setattr(db_threads, "_limiter", None)
+
+
+def _slow_estatisticas(self, filtro):
+    time.sleep(SLOW_CALL_SECONDS)
+    return EstatisticasMapa(
+        total_municipios=1,
+        total_casos=10,
+        total_obitos=0,
+        taxa_letalidade=0.0,
+        incidencia_media=1.0,
+        incidencia_maxima=1.0,
+        periodo_inicio=f"{filtro.ano}-01-01",
+        periodo_fim=f"{filtro.ano}-12-31",
+    )
+
+
+def test_run_in_db_thread_returns_value_and_propagates_errors():
+    def boom():
+        raise ValueError("falhou")
+
+    async def scenario():
+        assert await run_in_db_thread(lambda a, b=0: a + b, 1, b=2) == 3
+        with pytest.raises(ValueError):
+            await run_in_db_thread(boom)
+
+    asyncio.run(scenario())
+
+
+def test_run_in_db_thread_keeps_event_loop_responsive():
+    """Enquanto uma chamada lenta roda, o loop continua atendendo outras tarefas"""
+    async def scenario():
+        slow = asyncio.create_task(run_in_db_thread(time.sleep, SLOW_CALL_SECONDS))
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        await slow
+        return elapsed
+
+    assert asyncio.run(scenario()) < SLOW_CALL_SECONDS / 2
+
+
+def test_run_in_db_thread_respects_thread_limit(monkeypatch):
+    monkeypatch.setenv("DB_THREAD_LIMIT", "2")
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def work():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+
+    async def scenario():
+        await asyncio.gather(*(run_in_db_thread(work) for _ in range(6)))
+
+    asyncio.run(scenario())
+    assert peak == 2
+
+
+def test_parallel_slow_map_requests_finish_in_time_of_one(monkeypatch):
+    """N requisições lentas em paralelo levam ~ o tempo de uma, não N vezes"""
+    monkeypatch.setattr(MapaService, "get_estatisticas_agregadas", _slow_estatisticas)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(
+                client.get("/api/mapa/estatisticas", params={"ano": 2024})
+                for _ in range(PARALLEL_REQUESTS)
+            ))
+            return time.perf_counter() - start, responses
+
+    elapsed, responses = asyncio.run(scenario())
+
+    assert all(r.status_code == 200 for r in responses)
+    assert elapsed < SLOW_CALL_SECONDS * 3
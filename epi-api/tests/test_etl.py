@@ -2,6 +2,7 @@
 Testes para ETL (SINAN e LIRAa)
 """
 import pytest
+import numpy as np
 from datetime import datetime, date
 from decimal import Decimal
 import tempfile
@@ -361,6 +362,24 @@ def test_sinan_get_semana_epi(db_config):
     # 01/01/2024 = semana 1 de 2024
     semana = service._get_semana_epi(date(2024, 1, 1))
     assert semana == 1
+    
+    # Domingo: começa a semana epi (na ISO ainda seria a semana anterior)
+    assert service._get_semana_epi(date(2024, 1, 14)) == 3
+
+
+def test_sinan_batch_semana_epi_matches_module_around_year_boundary():
+    """Testa semana/ano epi vetorizados contra semana_epi.semana_epi na virada de ano"""
+    from datetime import timedelta
+    from app.services.semana_epi import semana_epi
+    from app.services.sinan_etl_service import _semanas_epi
+    
+    # Anos de 52 e 53 semanas, com 1º de janeiro em todos os dias da semana
+    datas = [date(ano, 1, 1) + timedelta(days=d) for ano in range(2014, 2030) for d in range(-10, 11)]
+    anos, semanas = _semanas_epi(np.array(datas, dtype='datetime64[D]'))
+    
+    assert list(zip(anos.tolist(), semanas.tolist())) == [semana_epi(d) for d in datas]
+    # 2020 tem 53 semanas: 02/01/2021 ainda é a semana 53 de 2020
+    assert semana_epi(date(2021, 1, 2)) == (2020, 53)
 
 
 def test_sinan_validate_csv(db_config, temp_csv_sinan):
@@ -405,6 +424,21 @@ def test_liraa_normalize_row(db_config):
     assert normalized['iip'] == Decimal('5.0')
 
 
+def test_liraa_aggregate_without_iip_is_unclassified(db_config):
+    """Sem IIP em nenhum estrato a classificação fica indeterminada, não satisfatória"""
+    service = LIRaaETLService(db_config)
+    estrato = {
+        'municipio_codigo': '5103403', 'ano': 2024, 'ciclo': 1, 'data_levantamento': None,
+        'imoveis_pesquisados': 500, 'imoveis_fechados': 0, 'imoveis_recusados': 0,
+        'imoveis_positivos': 0, 'depositos_inspecionados': 800, 'iip': None, 'ib': None,
+        'idc': Decimal('1.5'),
+    }
+
+    assert service._agregar_municipio([estrato])['classificacao'] is None
+    com_iip = dict(estrato, iip=Decimal('4.2'))
+    assert service._agregar_municipio([com_iip])['classificacao'] == 'RISCO'
+
+
 def test_liraa_validate_csv(db_config, temp_csv_liraa):
     """Testa validação de CSV LIRAa"""
     service = LIRaaETLService(db_config)
@@ -440,6 +474,63 @@ def test_count_total_rows(db_config, temp_csv_sinan):
     assert total == 2
 
 
+def test_scan_csv_single_pass_structure_count_and_sample(db_config, tmp_path):
+    """Testa estrutura, contagem e amostra numa única leitura"""
+    arquivo = tmp_path / "sinan.csv"
+    arquivo.write_text(
+        "nu_notific,dt_notific,id_municip\n"
+        "1,15/01/2024,5103403\n"
+        "\n"
+        "2,NA,5103403,extra\n"
+        "3,16/01/2024\n",
+        encoding="utf-8"
+    )
+    service = ETLBaseService(db_config)
+    
+    report, amostra = service.scan_csv(str(arquivo), ['nu_notific', 'sg_uf'], sample_size=2)
+    
+    assert report.total_rows == 3
+    assert [e.error_type for e in report.errors] == ["missing_columns", "malformed_row"]
+    assert report.errors[0].value == ['sg_uf']
+    # Linha física 4 do arquivo (cabeçalho e linha em branco contam)
+    assert report.errors[1].row_number == 4
+    # Linha com campo a mais fica fora da amostra e dos lotes (não é truncada)
+    assert len(amostra) == 2
+    assert amostra[1] == {'nu_notific': '3', 'dt_notific': '16/01/2024', 'id_municip': None}
+    
+    batches = list(service.read_csv_file(str(arquivo), batch_size=2))
+    assert [len(b) for b in batches] == [2]
+
+
+def test_leitor_csv_reports_physical_line_of_quoted_multiline_records(tmp_path):
+    """Registro com quebra de linha entre aspas ocupa duas linhas físicas"""
+    from app.services.csv_stream import LeitorCSV
+    
+    arquivo = tmp_path / "sinan.csv"
+    arquivo.write_text(
+        'nu_notific,nm_pacient\n'
+        '1,"Maria\nda Silva"\n'
+        '2,P,extra\n',
+        encoding="utf-8"
+    )
+    leitor = LeitorCSV(str(arquivo))
+    
+    lotes = list(leitor.lotes())
+    
+    assert lotes == [[{'nu_notific': '1', 'nm_pacient': 'Maria\nda Silva'}]]
+    assert (leitor.total_linhas, leitor.total_malformadas) == (2, 1)
+    assert leitor.linhas_malformadas == [4]
+
+
+def test_read_csv_file_missing_file_raises_value_error(db_config, tmp_path):
+    """Testa erro de leitura encapsulado em ValueError"""
+    service = ETLBaseService(db_config)
+    
+    with pytest.raises(ValueError):
+        list(service.read_csv_file(str(tmp_path / "nao_existe.csv")))
+    assert service.count_total_rows(str(tmp_path / "nao_existe.csv")) == 0
+
+
 # ============================================================================
 # TESTES - EDGE CASES
 # ============================================================================
@@ -546,6 +637,238 @@ def test_etl_validation_report_is_valid():
     assert report_with_warnings.is_valid is True  # Warnings não impedem carga
 
 
+# ============================================================================
+# TESTES - CARGA EM LOTE (COPY + MERGE)
+# ============================================================================
+
+class _CopyCursor:
+    def __init__(self, log, contagens):
+        self.log = log
+        self.contagens = contagens
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def execute(self, sql, params=None):
+        self.log.append(("sql", " ".join(sql.split())))
+    
+    def copy_expert(self, sql, buffer):
+        self.log.append(("copy", sql, buffer.read()))
+    
+    def fetchone(self):
+        return self.contagens
+
+
+class _CopyConn:
+    def __init__(self, contagens=(0, 0)):
+        self.log = []
+        self.contagens = contagens
+        self.commits = 0
+    
+    def cursor(self):
+        return _CopyCursor(self.log, self.contagens)
+    
+    def commit(self):
+        self.commits += 1
+
+
+def test_sinan_upsert_indicadores_copy_merge(db_config):
+    """Testa upsert via COPY em staging + um único INSERT ... ON CONFLICT"""
+    service = SINANETLService(db_config)
+    conn = _CopyConn(contagens=(1, 1))
+    aggregated = {
+        ('5103403', 2024, 3): {
+            'municipio_codigo': '5103403', 'ano': 2024, 'semana_epi': 3,
+            'casos_confirmados': 2, 'casos_graves': 0, 'obitos': 0
+        },
+        ('5108402', 2024, 3): {
+            'municipio_codigo': '5108402', 'ano': 2024, 'semana_epi': 3,
+            'casos_confirmados': 1, 'casos_graves': 0, 'obitos': 1
+        },
+    }
+    
+    resultado = service._upsert_indicadores(aggregated, DoencaTipo.DENGUE, True, conn, "sinan.csv")
+    
+    assert resultado == {'inseridos': 1, 'atualizados': 1}
+    assert conn.commits == 1
+    copias = [e for e in conn.log if e[0] == "copy"]
+    assert len(copias) == 1
+    assert "COPY _stg_indicador_epi (competencia, municipio_cod_ibge, indicador, valor," in copias[0][1]
+    # Séries CASOS_/GRAVES_/OBITOS_DENGUE no domingo da semana 3/2024, cada
+    # uma com sua dedup_key
+    gravadas = [l.split(",") for l in copias[0][2].splitlines()]
+    assert [l[:5] for l in gravadas[:3]] == [
+        ["2024-01-14", "5103403", "CASOS_DENGUE", "2", "sinan.csv"],
+        ["2024-01-14", "5103403", "GRAVES_DENGUE", "0", "sinan.csv"],
+        ["2024-01-14", "5103403", "OBITOS_DENGUE", "0", "sinan.csv"],
+    ]
+    assert [l[-1] for l in gravadas[:3]] == [
+        "CASOS_DENGUE:5103403", "GRAVES_DENGUE:5103403", "OBITOS_DENGUE:5103403"
+    ]
+    assert gravadas[5][2:4] == ["OBITOS_DENGUE", "1"]
+    merges = [e[1] for e in conn.log if e[0] == "sql" and "ON CONFLICT" in e[1]]
+    assert len(merges) == 1
+    assert ("ON CONFLICT (competencia, dedup_key) WHERE dedup_key IS NOT NULL "
+            "DO UPDATE SET valor = EXCLUDED.valor") in merges[0]
+    # Agregado semanal recalculado na mesma transação, antes do commit
+    refresh = [e[1] for e in conn.log if e[0] == "sql" and "refresh_indicador_epi_semanal" in e[1]]
+    assert len(refresh) == 1
+    
+    service._upsert_indicadores(aggregated, DoencaTipo.DENGUE, False, conn)
+    assert "DO NOTHING" in [e[1] for e in conn.log if e[0] == "sql" and "ON CONFLICT" in e[1]][-1]
+
+
+def test_copy_upsert_empty_and_conditional(db_config):
+    """Testa carga vazia (sem SQL) e condição no DO UPDATE"""
+    service = ETLBaseService(db_config)
+    conn = _CopyConn()
+    
+    assert service.copy_upsert(conn, 'indice_entomologico', ['a'], [], ['a']) == \
+        {'inseridos': 0, 'atualizados': 0}
+    assert conn.log == []
+    
+    service.copy_upsert(conn, 'indice_entomologico', ['a', 'b'], [('x', None)], ['a'],
+                        atualizar=['b'], condicao="t.b IS NULL")
+    merge = [e[1] for e in conn.log if e[0] == "sql" and "ON CONFLICT" in e[1]][0]
+    assert "DO UPDATE SET b = EXCLUDED.b WHERE t.b IS NULL" in merge
+    assert [e[2] for e in conn.log if e[0] == "copy"] == ["x,\n"]
+
+
+def test_sinan_import_aggregates_across_batches_and_writes_once(db_config, tmp_path, monkeypatch):
+    """Testa agregação do arquivo inteiro: mesma chave em vários batches, uma gravação"""
+    from app.services import sinan_etl_service
+    
+    arquivo = tmp_path / "sinan.csv"
+    linhas = ["nu_notific,dt_notific,sg_uf,id_municip,nm_pacient,classi_fin,evolucao"]
+    linhas += [f"{i},15/01/2024,MT,5103403,P{i},1,{2 if i < 3 else 1}" for i in range(25)]
+    linhas += ["99,16/01/2024,MT,5108402,Q,4,1", "98,16/01/2024,MT,ABC,R,1,1"]
+    # Domingo 29/12/2024 já é a semana 1 do ano epi 2025
+    linhas += ["97,29/12/2024,MT,5108402,S,1,1"]
+    # Campo a mais (linha física 30): erro de linha, não importada truncada
+    linhas += ["96,15/01/2024,MT,5103403,T,1,1,extra"]
+    arquivo.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+    
+    service = SINANETLService(db_config)
+    conn = _CopyConn(contagens=(2, 0))
+    conn.close = lambda: None
+    monkeypatch.setattr(service, "_get_connection", lambda: conn)
+    monkeypatch.setattr(service, "update_job_status", lambda *a, **k: None)
+    monkeypatch.setattr(sinan_etl_service, "invalidar_periodo", lambda *a: None)
+    
+    request = SINANImportRequest(
+        file_path=str(arquivo), doenca_tipo=DoencaTipo.DENGUE,
+        ano_epidemiologico=2024, overwrite=True, batch_size=10
+    )
+    status = {}
+    monkeypatch.setattr(service, "update_job_status", lambda *a, **k: status.update(k))
+    resultado = service.process_sinan_import("job-1", request)
+    
+    assert resultado['processed'] == 29
+    assert resultado['errors'] == 2  # município não numérico + linha malformada
+    assert status['error_details'][-1] == {
+        'row': {'linha': 30}, 'error': "Linha 30: mais campos que o cabeçalho (7); linha ignorada"
+    }
+    assert (resultado['inserted'], resultado['updated']) == (2, 0)
+    copias = [e[2] for e in conn.log if e[0] == "copy"]
+    assert len(copias) == 1
+    gravadas = sorted(l.split(",")[:4] for l in copias[0].splitlines())
+    assert gravadas == [
+        ["2024-01-14", "5103403", "CASOS_DENGUE", "25"],
+        ["2024-01-14", "5103403", "GRAVES_DENGUE", "0"],
+        ["2024-01-14", "5103403", "OBITOS_DENGUE", "3"],
+        ["2024-01-14", "5108402", "CASOS_DENGUE", "1"],
+        ["2024-01-14", "5108402", "GRAVES_DENGUE", "1"],
+        ["2024-01-14", "5108402", "OBITOS_DENGUE", "0"],
+        ["2024-12-29", "5108402", "CASOS_DENGUE", "1"],
+        ["2024-12-29", "5108402", "GRAVES_DENGUE", "0"],
+        ["2024-12-29", "5108402", "OBITOS_DENGUE", "0"],
+    ]
+
+
+def test_agregado_sinan_keys_by_epi_year_and_folds_partials():
+    """Testa chave (município, ano epi, semana) e soma das reduções parciais a cada DOBRA batches"""
+    from app.services.sinan_etl_service import AgregadoSINAN
+    
+    acumulado = AgregadoSINAN()
+    # Semana 1 de 2024 e semana 1 de 2025: mesma semana, anos distintos
+    for i in range(3 * AgregadoSINAN.DOBRA + 1):
+        acumulado.adicionar(['5103403', '5103403'], [2024, 2025], [1, 1], [[1, 0, 0], [0, 1, i % 2]])
+        assert len(acumulado._chaves) < AgregadoSINAN.DOBRA
+    
+    n = 3 * AgregadoSINAN.DOBRA + 1
+    assert acumulado.totais() == {
+        ('5103403', 2024, 1): {'casos_confirmados': n, 'casos_graves': 0, 'obitos': 0},
+        ('5103403', 2025, 1): {'casos_confirmados': 0, 'casos_graves': n, 'obitos': n // 2},
+    }
+
+
+def test_sinan_batch_normalization_matches_row_path(db_config):
+    """Testa normalização vetorizada: mesmas linhas aceitas/recusadas do caminho por linha"""
+    from app.services.sinan_etl_service import AgregadoSINAN
+    
+    base = {'nu_notific': '1', 'dt_notific': '15/01/2024', 'nm_pacient': 'P',
+            'sg_uf': 'mt', 'id_municip': '5103403', 'classi_fin': '1', 'evolucao': '2'}
+    batch = [
+        base,
+        {**base, 'dt_notific': '2024-01-16', 'classi_fin': '4.0', 'evolucao': None},
+        {**base, 'dt_notific': '01/01/1500'},
+        {**base, 'sg_uf': 'SP'},
+        {**base, 'nu_idade_n': '130'},
+        {**base, 'cs_sexo': 'x'},
+        {**base, 'dt_notific': '31/02/2024'},
+        {**base, 'nm_pacient': None},
+        {**base, 'id_municip': '51O3403'},
+        {**base, 'nu_idade_n': 'abc', 'cs_sexo': 'f', 'classi_fin': 'inf'},
+    ]
+    
+    service = SINANETLService(db_config)
+    colunas, validas = service._normalize_sinan_batch(batch)
+    # Última linha fora do formato estrito (sexo minúsculo, inteiros ilegíveis):
+    # reprovada no batch, aceita no caminho por linha
+    assert validas.tolist() == [True, True, True] + [False] * 7
+    assert colunas['dt_notific'][1] == np.datetime64('2024-01-16')
+    assert colunas['classi_fin'][1] == 4
+    
+    acumulado = AgregadoSINAN()
+    resultado = service._process_sinan_batch(batch, acumulado)
+    
+    assert (resultado['processed'], resultado['success']) == (10, 4)
+    # Data sem zeros à esquerda: reprovada no batch, aceita no caminho por linha
+    assert service._process_sinan_batch([{**base, 'dt_notific': '5/1/2024'}], acumulado)['success'] == 1
+    assert [e['row'] for e in resultado['errors']] == batch[3:9]
+    assert "Apenas dados de MT" in resultado['errors'][0]['error']
+    assert "Código de município inválido" in resultado['errors'][-1]['error']
+    # Chave com o ano epi da notificação: 01/01/1500 não cai na semana 1 de 2024
+    assert acumulado.totais() == {
+        ('5103403', 1500, 1): {'casos_confirmados': 1, 'casos_graves': 0, 'obitos': 1},
+        ('5103403', 2024, 1): {'casos_confirmados': 1, 'casos_graves': 0, 'obitos': 1},
+        ('5103403', 2024, 3): {'casos_confirmados': 1, 'casos_graves': 1, 'obitos': 2},
+    }
+
+
+def test_sinan_batch_rejects_non_ascii_digit_municipality(db_config):
+    """'²' passa em str.isdigit mas não é código: linha recusada, sem derrubar o import"""
+    from app.services.sinan_etl_service import AgregadoSINAN
+
+    base = {'nu_notific': '1', 'dt_notific': '15/01/2024', 'nm_pacient': 'P',
+            'sg_uf': 'MT', 'id_municip': '5103403', 'classi_fin': '1'}
+    batch = [base, {**base, 'id_municip': '510340²'}, {**base, 'id_municip': '５１０３４０３'}]
+
+    service = SINANETLService(db_config)
+    _, validas = service._normalize_sinan_batch(batch)
+    assert validas.tolist() == [True, False, False]
+
+    acumulado = AgregadoSINAN()
+    resultado = service._process_sinan_batch(batch, acumulado)
+
+    assert (resultado['processed'], resultado['success']) == (3, 1)
+    assert [e['row'] for e in resultado['errors']] == batch[1:]
+    assert list(acumulado.totais()) == [('5103403', 2024, 3)]
+
+
 # ============================================================================
 # SUMMARY
 # ============================================================================
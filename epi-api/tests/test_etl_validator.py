@@ -128,3 +128,40 @@ class TestEPIValidator:
         assert relatorio.linhas_validas == 1
         assert relatorio.linhas_com_aviso == 1
         assert any("OBITO" in aviso.aviso for aviso in relatorio.avisos)
+    
+    def test_masks_report_only_failing_cells_in_row_order(self, validator, tmp_path):
+        """Test column-wise validation: per-row errors/warnings, Pydantic only for rejected rows"""
+        header = ";".join(EPIValidator.REQUIRED_COLUMNS)
+        flags = ";".join(["0"] * 15)
+        linhas = [
+            # 2: valid, gestante for male aged 60 (two warnings)
+            f"2024-01-15;2024-01-13;5103403;M;60;1;DENGUE;LABORATORIAL;{flags};CURA;;",
+            # 3: invalid sexo and idade (Pydantic errors, in field order)
+            f"2024-01-15;2024-01-13;5103403;X;130;;DENGUE;LABORATORIAL;{flags};CURA;;",
+            # 4: symptoms after notification (error, row still valid) + dt_obito without OBITO
+            f"2024-01-10;2024-01-15;5108402;F;30;;DESCARTADO;LABORATORIAL;{flags};CURA;2024-01-20;",
+            # 5: non-canonical but accepted by Pydantic (whitespace, leading zero)
+            f"2024-01-15;2024-01-12; 5103403 ;F ;034;;DENGUE;LABORATORIAL;{flags};OBITO;;",
+        ]
+        csv_path = tmp_path / "mixed.csv"
+        csv_path.write_text("\n".join([header, *linhas]) + "\n")
+        
+        relatorio = validator.validate_csv(str(csv_path), "mixed.csv")
+        
+        assert [(e.linha, e.campo) for e in relatorio.erros] == [
+            (3, "sexo"), (3, "idade"), (4, "dt_sintomas")
+        ]
+        assert relatorio.erros[2].valor == "2024-01-15"
+        assert [(a.linha, a.campo) for a in relatorio.avisos] == [
+            (2, "gestante"), (2, "gestante"), (4, "evolucao"), (4, "classificacao_final"), (5, "dt_obito")
+        ]
+        assert relatorio.avisos[2].aviso == "dt_obito informada mas evolucao = CURA"
+        assert (relatorio.linhas_validas, relatorio.linhas_com_erro, relatorio.linhas_com_aviso) == (3, 2, 3)
+        assert relatorio.periodo_inicio == date(2024, 1, 12)
+        assert relatorio.municipios_unicos == 2
+        assert relatorio.total_obitos == 1
+        
+        registros = validator.valid_records
+        assert [r.idade for r in registros] == [60, 30, 34]
+        assert registros[2].municipio_cod_ibge == "5103403" and registros[2].sexo == "F"
+        assert registros[1].dt_obito == date(2024, 1, 20) and registros[0].dt_obito is None
@@ -0,0 +1,146 @@
+"""
+Testes do GeoJSON em streaming (app.services.geojson_stream)
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db import iterate_in_db_thread
+from app.main import app
+from app.services import mapa_service, response_cache
+from app.services.geojson_stream import stream_feature_collection
+from app.services.mapa_service import MapaService
+from app.services.municipio_index import MunicipioIndex
+from app.services.response_cache import ResponseCache
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+def municipios(n):
+    return MunicipioIndex.from_records({
+        f"51{i:05d}": {"nome": f"Município {i}", "pop": 10000, "lat": -15.0, "lon": -56.0}
+        for i in range(n)
+    })
+
+
+def linhas(n):
+    return [
+        {"municipio_cod_ibge": f"51{i:05d}", "total_casos": 10 * i, "total_obitos": i % 3}
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def db(fake_db, monkeypatch):
+    monkeypatch.setattr(response_cache, "_cache", ResponseCache())
+    return fake_db(linhas(50), mapa_service)
+
+
+# ============================================================================
+# SERIALIZAÇÃO
+# ============================================================================
+
+def test_stream_feature_collection_is_valid_json_in_chunks():
+    features = [{"type": "Feature", "properties": {"i": i, "nome": "Cuiabá"}} for i in range(100)]
+
+    chunks = list(stream_feature_collection(
+        {"tipo_camada": "incidencia"}, iter(features), lambda: {"total": 100}, chunk_bytes=512
+    ))
+
+    assert len(chunks) > 1
+    documento = json.loads(b"".join(chunks))
+    assert documento == {
+        "tipo_camada": "incidencia",
+        "data": {"type": "FeatureCollection", "features": features},
+        "total": 100,
+    }
+
+
+def test_stream_feature_collection_empty():
+    documento = json.loads(b"".join(stream_feature_collection({}, iter([]), dict)))
+    assert documento == {"data": {"type": "FeatureCollection", "features": []}}
+
+
+def test_stream_closes_source_when_consumer_stops():
+    fechado = []
+
+    def origem():
+        try:
+            for i in range(10_000):
+                yield {"i": i}
+        finally:
+            fechado.append(True)
+
+    stream = stream_feature_collection({}, origem(), dict, chunk_bytes=64)
+    next(stream)
+    stream.close()
+    assert fechado == [True]
+
+
+def test_iterate_in_db_thread_closes_iterator_early():
+    fechado = []
+
+    def origem():
+        try:
+            yield from range(100)
+        finally:
+            fechado.append(True)
+
+    async def consumir():
+        recebidos = []
+        agen = iterate_in_db_thread(origem())
+        async for item in agen:
+            recebidos.append(item)
+            if len(recebidos) == 3:
+                break
+        await agen.aclose()
+        return recebidos
+
+    assert asyncio.run(consumir()) == [0, 1, 2]
+    assert fechado == [True]
+
+
+# ============================================================================
+# SERVICE / ENDPOINT
+# ============================================================================
+
+def test_service_stream_matches_pydantic_response(db):
+    service = MapaService("postgresql://fake", municipios=municipios(50))
+
+    esperado = json.loads(service.get_camada_incidencia("202401", "202403").model_dump_json())
+    stream = json.loads(b"".join(service.stream_camada_incidencia("202401", "202403", itersize=10)))
+
+    assert stream["data"] == esperado["data"]
+    for campo in ("tipo_camada", "competencia_inicio", "competencia_fim", "total_municipios",
+                  "total_casos", "total_obitos", "incidencia_media"):
+        assert stream[campo] == esperado[campo]
+    assert stream["metadata"] == {"streaming": True}
+    # Cursor nomeado (server-side), lido itersize linhas por vez
+    assert db.cursores_nomeados == ["mapa_camada_incidencia"]
+    assert db.itersizes == [10]
+    assert db.devolvidas == 2
+
+
+def test_camadas_stream_endpoint(db, monkeypatch):
+    monkeypatch.setattr(mapa_service, "get_municipio_index", lambda conn: municipios(50))
+    client = TestClient(app)
+    params = {"tipo_camada": "incidencia", "competencia_inicio": "202401",
+              "competencia_fim": "202401", "stream": True}
+
+    response = client.get("/api/mapa/camadas", params=params)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    data = response.json()
+    assert data["total_municipios"] == 50
+    assert len(data["data"]["features"]) == 50
+    assert db.cursores_fechados == 1 and db.devolvidas == 1
+
+    revalidacao = client.get("/api/mapa/camadas", params=params,
+                             headers={"If-None-Match": response.headers["etag"]})
+    assert revalidacao.status_code == 304
+    assert len(db.queries) == 1
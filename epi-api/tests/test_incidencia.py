@@ -0,0 +1,55 @@
+"""
+Testes do cálculo vetorizado de incidência/letalidade/risco (app.services.incidencia)
+"""
+import numpy as np
+import pytest
+
+from app.services import incidencia
+from app.services.incidencia import (
+    calcular_incidencia,
+    calcular_indicadores,
+    classificar_risco,
+    codigos_risco
+)
+
+
+def test_limiares_inclusive_on_lower_bound():
+    valores = [0.0, 99.9, 100.0, 299.9, 300.0, 499.9, 500.0, 10_000.0]
+    assert codigos_risco(valores).tolist() == [0, 0, 1, 1, 2, 2, 3, 3]
+    assert classificar_risco(300.0) == ("ALTO", "#FF9800")
+    assert codigos_risco([50.0, 150.0], limiares=(10, 20, 100)).tolist() == [2, 3]
+
+
+def test_zero_population_and_zero_cases():
+    ind = calcular_indicadores(casos=[10, 0, 5], populacao=[0, 1000, 100000], obitos=[1, 0, 1])
+
+    assert ind.incidencia.tolist() == [0.0, 0.0, 5.0]
+    assert ind.letalidade.tolist() == [10.0, 0.0, 20.0]
+    assert ind.classes() == ["BAIXO", "BAIXO", "BAIXO"]
+    assert ind.distribuicao() == {"BAIXO": 3, "MEDIO": 0, "ALTO": 0, "MUITO_ALTO": 0}
+
+
+def test_bulk_matches_scalar_rule():
+    rng = np.random.default_rng(7)
+    casos = rng.integers(0, 5000, 5570)
+    populacao = rng.integers(0, 500_000, 5570)
+
+    ind = calcular_indicadores(casos, populacao)
+
+    for c, p, inc, classe, cor in zip(casos[:500], populacao[:500], ind.incidencia, ind.classes(), ind.cores()):
+        esperado = c / p * 100000 if p > 0 else 0.0
+        assert inc == pytest.approx(esperado)
+        assert (classe, cor) == classificar_risco(esperado)
+
+
+def test_broadcast_matrix_by_population_column():
+    matriz = calcular_incidencia([[1, 2], [3, 4]], [[100000], [0]])
+    assert matriz.tolist() == [[1.0, 2.0], [0.0, 0.0]]
+
+
+def test_invalid_thresholds_from_env(monkeypatch):
+    monkeypatch.setenv("LIMIARES_RISCO_INCIDENCIA", "300,100,500")
+    with pytest.raises(ValueError):
+        incidencia._limiares_env()
+    monkeypatch.setenv("LIMIARES_RISCO_INCIDENCIA", "50,150,250")
+    assert incidencia._limiares_env() == (50.0, 150.0, 250.0)
@@ -0,0 +1,267 @@
+"""
+Testes dos índices entomológicos (app.services.liraa_service) sem banco
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas.liraa import ClassificacaoRisco, TipoIndice
+from app.services import liraa_service, mapa_service, response_cache
+from app.services.liraa_etl_service import LIRaaETLService
+from app.services.liraa_service import LiraaService
+from app.services.municipio_index import MunicipioIndex
+from app.services.response_cache import ResponseCache
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+def _classe(valor):
+    if valor is None:
+        return None
+    return "SATISFATORIO" if valor < 1 else "ALERTA" if valor < 4 else "RISCO"
+
+
+def levantamento(cod, ciclo=1, ipo=None, ido=None, ivo=None, imo=None, classificacao=None, **extra):
+    """Linha de indice_entomologico (com as colunas geradas de classe)"""
+    row = {
+        "municipio_cod_ibge": cod,
+        "ano": 2025,
+        "ciclo": ciclo,
+        "data_levantamento": date(2025, 2 * ciclo - 1, 1),
+        "semana_epi": 1 + (ciclo - 1) * 9,
+        "imoveis_inspecionados": 1000,
+        "imoveis_positivos": int((ivo or 0) * 10),
+        "classificacao": classificacao or _classe(ivo) or "SATISFATORIO",
+    }
+    for nome, valor in (("ipo", ipo), ("ido", ido), ("ivo", ivo), ("imo", imo)):
+        row[nome] = Decimal(str(valor)) if valor is not None else None
+        row[f"classe_{nome}"] = _classe(valor)
+    row.update(extra)
+    return row
+
+
+def quadrado(lng, lat, lado):
+    return {"type": "Polygon", "coordinates": [[
+        [lng, lat], [lng + lado, lat], [lng + lado, lat + lado], [lng, lat + lado], [lng, lat]
+    ]]}
+
+
+def municipios():
+    return MunicipioIndex.from_records({
+        "5103403": {"nome": "Cuiabá", "pop": 618124, "lat": -15.6, "lon": -56.1,
+                    "geom": quadrado(-56.3, -15.8, 0.4)},
+        "5105606": {"nome": "Várzea Grande", "pop": 290215, "lat": -15.6, "lon": -56.4},
+        "5107909": {"nome": "Sinop", "pop": 142291, "lat": -11.9, "lon": -55.5},
+    })
+
+
+@pytest.fixture
+def db(fake_db):
+    return fake_db([], liraa_service)
+
+
+# ============================================================================
+# SERVICE
+# ============================================================================
+
+def test_indices_one_item_per_valued_index(db):
+    db.rows = [
+        levantamento("5103403", ipo=2.5, ido=0.5, ivo=4.2),
+        # Só a classificação SES-MT: nenhum índice com valor
+        levantamento("5105606", classificacao="ALERTA"),
+    ]
+    service = LiraaService("postgresql://fake", municipios=municipios())
+
+    todos = service.get_indices(2025)
+    assert todos.total_municipios == 1
+    assert {(i.tipo_indice, i.classificacao) for i in todos.indices} == {
+        (TipoIndice.IPO, ClassificacaoRisco.ALERTA),
+        (TipoIndice.IDO, ClassificacaoRisco.SATISFATORIO),
+        (TipoIndice.IVO, ClassificacaoRisco.RISCO),
+    }
+    assert todos.indices[0].municipio == "Cuiabá"
+
+    service.get_indices(2025, TipoIndice.IVO, "5103403", 1, 20)
+    sql, params = db.queries[-1]
+    assert "FROM indice_entomologico" in sql
+    assert params == [2025, 1, 20, "5103403"]
+    assert len(db.queries) == 2
+
+
+def test_ranking_single_query_with_total(db):
+    db.rows = [
+        dict(levantamento("5107909", ivo=6.0), total=3),
+        dict(levantamento("5103403", ivo=2.0), total=3),
+    ]
+    service = LiraaService("postgresql://fake", municipios=municipios())
+
+    ranking = service.get_ranking(2025, TipoIndice.IVO, limite=2, ordem="desc")
+
+    assert ranking.total_municipios == 3
+    assert [(r.posicao, r.codigo_ibge) for r in ranking.ranking] == [(1, "5107909"), (2, "5103403")]
+    assert ranking.ranking[0].populacao == 142291
+    assert ranking.ranking[0].classificacao == ClassificacaoRisco.RISCO
+    sql, params = db.queries[0]
+    assert len(db.queries) == 1
+    assert "ORDER BY u.ivo DESC" in sql
+    assert params == [2025, 2]
+
+
+def test_comparativo_pairs_periods_and_trend(db):
+    db.rows = [
+        {"periodo": 1, "municipio_cod_ibge": "5103403", "valor": Decimal("5.0"), "classe": "RISCO"},
+        {"periodo": 1, "municipio_cod_ibge": "5107909", "valor": Decimal("0.0"), "classe": "SATISFATORIO"},
+        {"periodo": 1, "municipio_cod_ibge": "5105606", "valor": Decimal("2.0"), "classe": "ALERTA"},
+        {"periodo": 2, "municipio_cod_ibge": "5103403", "valor": Decimal("2.5"), "classe": "ALERTA"},
+        {"periodo": 2, "municipio_cod_ibge": "5107909", "valor": Decimal("1.5"), "classe": "ALERTA"},
+    ]
+    service = LiraaService("postgresql://fake", municipios=municipios())
+
+    resposta = service.get_comparativo(TipoIndice.IVO, 2024, 10, 2025, 10)
+
+    por_municipio = {c.codigo_ibge: c for c in resposta.comparativos}
+    assert set(por_municipio) == {"5103403", "5107909"}
+    cuiaba = por_municipio["5103403"]
+    assert (cuiaba.variacao_absoluta, cuiaba.variacao_percentual, cuiaba.tendencia) == (-2.5, -50.0, "MELHORA")
+    assert por_municipio["5107909"].tendencia == "PIORA"
+    assert por_municipio["5107909"].variacao_percentual == 100.0
+    assert len(db.queries) == 1
+
+
+def test_mapa_polygons_with_point_fallback(db):
+    db.rows = [
+        levantamento("5103403", ivo=4.2),
+        levantamento("5105606", classificacao="ALERTA"),
+    ]
+    service = LiraaService("postgresql://fake", municipios=municipios())
+
+    mapa = service.get_mapa(2025, TipoIndice.IVO).model_dump(mode="json")
+
+    features = {f["id"]: f for f in mapa["features"]}
+    assert features["5103403"]["geometry"]["type"] == "Polygon"
+    assert features["5103403"]["properties"]["classificacao_indice"] == "RISCO"
+    assert features["5103403"]["properties"]["cor_hex"] == "#F44336"
+    # Sem polígono nem valor do índice: centroide e cor da classificação geral
+    assert features["5105606"]["geometry"] == {"type": "Point", "coordinates": [-56.4, -15.6]}
+    assert features["5105606"]["properties"]["valor_indice"] is None
+    assert features["5105606"]["properties"]["cor_hex"] == "#FFC107"
+
+
+def test_mapa_without_any_class_is_indeterminate(db, monkeypatch):
+    """Levantamento sem IIP: classificação NULL vira cinza/indeterminado, não satisfatório"""
+    db.rows = [dict(levantamento("5105606", ido=2.0), classificacao=None)]
+    service = LiraaService("postgresql://fake", municipios=municipios())
+
+    mapa = service.get_mapa(2025, TipoIndice.IVO).model_dump(mode="json")
+    props = mapa["features"][0]["properties"]
+    assert (props["classificacao_geral"], props["cor_hex"]) == (None, "#9E9E9E")
+
+    monkeypatch.setattr(response_cache, "_cache", ResponseCache())
+    monkeypatch.setattr(mapa_service, "get_municipio_index", lambda conn: municipios())
+    data = TestClient(app).get("/api/mapa/camadas", params={
+        "tipo_camada": "ivo", "competencia_inicio": "202501", "competencia_fim": "202502"
+    }).json()
+    props = data["data"]["features"][0]["properties"]
+    assert (props["classe_risco"], props["cor_hex"]) == ("indeterminado", "#9E9E9E")
+    assert sum(data["metadata"]["distribuicao_risco"].values()) == 0
+
+
+def test_estatisticas_from_single_aggregate_row(db):
+    db.rows = [{
+        "total_municipios": 3, "imoveis_inspecionados": 3000,
+        "satisfatorio": 1, "alerta": 1, "risco": 1,
+        "ivo_n": 2, "ivo_media": Decimal("3.1"), "ivo_desvio": Decimal("1.556"),
+        "ivo_min": Decimal("2.0"), "ivo_max": Decimal("4.2"),
+        "ivo_percentis": [2.55, 3.1, 3.65, 4.09],
+        "ivo_satisfatorio": 0, "ivo_alerta": 1, "ivo_risco": 1,
+    }]
+    service = LiraaService("postgresql://fake", municipios=municipios())
+
+    stats = service.get_estatisticas(2025, TipoIndice.IVO)
+
+    assert stats["total_imoveis_inspecionados"] == 3000
+    assert stats["distribuicao_classificacao"] == {"SATISFATORIO": 1, "ALERTA": 1, "RISCO": 1}
+    assert stats["indices"]["IVO"]["mediana"] == 3.1
+    assert stats["indices"]["IVO"]["percentis"]["p95"] == 4.09
+    assert stats["indices"]["IVO"]["desvio_padrao"] == 1.56
+    assert len(db.queries) == 1
+
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+
+def test_liraa_router_serves_ranking(db, monkeypatch):
+    db.rows = [dict(levantamento("5107909", ivo=6.0), total=1)]
+    monkeypatch.setattr(liraa_service, "get_municipio_index", lambda conn: municipios())
+    client = TestClient(app)
+
+    response = client.get("/api/liraa/ranking", params={"ano": 2025, "tipo_indice": "IVO"})
+
+    assert response.status_code == 200
+    assert response.json()["ranking"][0]["municipio"] == "Sinop"
+    assert client.get(
+        "/api/liraa/indices", params={"ano": 2025, "semana_epi_inicio": 10, "semana_epi_fim": 2}
+    ).status_code == 400
+
+
+def test_mapa_entomological_layer(db, monkeypatch):
+    db.rows = [
+        levantamento("5103403", ciclo=1, ipo=2.5, ivo=4.2),
+        levantamento("5105606", ciclo=1, classificacao="ALERTA"),
+    ]
+    monkeypatch.setattr(response_cache, "_cache", ResponseCache())
+    monkeypatch.setattr(mapa_service, "get_municipio_index", lambda conn: municipios())
+    client = TestClient(app)
+    params = {"tipo_camada": "ipo", "competencia_inicio": "202501", "competencia_fim": "202502"}
+
+    response = client.get("/api/mapa/camadas", params=params)
+
+    assert response.status_code == 200
+    data = response.json()
+    props = {f["properties"]["municipio_cod_ibge"]: f["properties"] for f in data["data"]["features"]}
+    assert props["5103403"]["valor"] == 2.5
+    assert props["5103403"]["classe_risco"] == "alerta"
+    assert props["5105606"]["valor"] is None
+    assert props["5105606"]["classe_risco"] == "alerta"
+    assert data["metadata"]["distribuicao_risco"]["ALERTA"] == 2
+    sql, params_sql = db.queries[0]
+    assert params_sql[:2] == [date(2025, 1, 1), date(2025, 3, 1)]
+
+    # Cache por filtro: segunda chamada não consulta o banco
+    assert client.get("/api/mapa/camadas", params=params).status_code == 200
+    assert len(db.queries) == 1
+
+
+# ============================================================================
+# ETL
+# ============================================================================
+
+def test_etl_combines_strata_into_one_row():
+    service = LIRaaETLService.__new__(LIRaaETLService)
+    base = {"municipio_codigo": "5103403", "ano": 2025, "ciclo": 2, "estrato": None,
+            "data_levantamento": None, "depositos_positivos": 0}
+    registros = []
+    for pesquisados, positivos, fechados, dep_insp, dep_pos in ((300, 3, 50, 900, 3), (100, 9, 50, 100, 9)):
+        indices = service.calculate_liraa_indices(pesquisados, positivos, dep_insp, dep_pos)
+        registros.append(dict(
+            base, imoveis_pesquisados=pesquisados, imoveis_positivos=positivos,
+            imoveis_fechados=fechados, imoveis_recusados=0,
+            depositos_inspecionados=dep_insp, **indices
+        ))
+
+    linha = service._agregar_municipio(registros)
+
+    # Mesmos valores das contagens somadas
+    assert linha["ivo"] == 3.0       # 12 / 400
+    assert linha["ido"] == 1.2       # 12 / 1000
+    assert linha["ipo"] == 20.0      # 100 / 500
+    assert linha["imo"] is None
+    assert linha["imoveis_inspecionados"] == 400
+    assert linha["classificacao"] == "ALERTA"
+    assert linha["data_levantamento"] == date(2025, 3, 1)
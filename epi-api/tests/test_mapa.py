@@ -5,6 +5,8 @@ import pytest
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.routers import mapa
+from app.services.municipio_index import MunicipioIndex
 
 client = TestClient(app)
 
@@ -75,22 +77,6 @@ class TestMapaEndpoint:
         assert response.status_code == 400
         assert "ibge" in response.json()["detail"].lower()
     
-    def test_get_camadas_tipo_nao_implementado(self):
-        """Test error for non-implemented layer types"""
-        response = client.get(
-            "/api/mapa/camadas",
-            params={
-                "tipo_camada": "ipo",  # Not yet implemented
-                "competencia_inicio": "202401",
-                "competencia_fim": "202401"
-            }
-        )
-        
-        # Accept either 500 or 501 for not implemented features
-        assert response.status_code in (500, 501)
-        detail = response.json()["detail"].lower()
-        assert "implementado" in detail or "erro" in detail
-    
     def test_get_camadas_with_clustering(self):
         """Test clustering parameter"""
         response = client.get(
@@ -111,8 +97,11 @@ class TestMapaEndpoint:
         if data["total_municipios"] > 5:
             assert data["metadata"].get("clustering_applied") is True
     
-    def test_list_municipios(self):
+    def test_list_municipios(self, monkeypatch):
         """Test listing available municipalities"""
+        monkeypatch.setattr(mapa, "get_municipio_index", lambda dsn: MunicipioIndex.from_records({
+            "5103403": {"nome": "Cuiabá", "pop": 650877, "lat": -15.6014, "lon": -56.0967},
+        }))
         response = client.get("/api/mapa/municipios")
         
         assert response.status_code == 200
@@ -0,0 +1,269 @@
+"""
+Testes do MapaService sem banco: conexão falsa que conta as consultas
+"""
+from datetime import date
+
+import pytest
+
+from app.schemas.mapa import FiltroMapa
+from app.services import mapa_service, response_cache
+from app.services.mapa_service import MapaService
+from app.services.municipio_index import MunicipioIndex
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+def heatmap_rows(n):
+    return [
+        {'municipio_cod_ibge': f"51{i:05d}", 'casos': 10 * (i + 1)}
+        for i in range(n)
+    ]
+
+
+def indice(n=141):
+    """Índice estático com n municípios fictícios + Cuiabá"""
+    records = {
+        f"51{i:05d}": {'nome': f"Município {i}", 'pop': 10000, 'lat': -15.0, 'lon': -56.0}
+        for i in range(n)
+    }
+    records["5103403"] = {'nome': "Cuiabá", 'pop': 100000, 'lat': -15.6, 'lon': -56.1}
+    return MunicipioIndex.from_records(records)
+
+
+# ============================================================================
+# HEATMAP
+# ============================================================================
+
+@pytest.mark.parametrize("n_municipios", [1, 10, 141])
+def test_heatmap_query_count_is_constant(fake_db, n_municipios):
+    """Heatmap usa uma única consulta, independente do número de municípios"""
+    db = fake_db(heatmap_rows(n_municipios), mapa_service)
+    service = MapaService("postgresql://fake", municipios=indice())
+
+    result = service.get_heatmap_data(FiltroMapa(ano=2024))
+
+    assert result.total_points == n_municipios
+    assert len(db.queries) == 1
+    assert db.connections == 1
+
+
+def test_heatmap_intensity_from_joined_population(fake_db):
+    """Intensidade = casos / população * 100k, com lat/lon do centroide"""
+    fake_db([
+        {'municipio_cod_ibge': '5103403', 'casos': 50},
+        {'municipio_cod_ibge': '5108402', 'casos': 5},
+    ], mapa_service)
+    service = MapaService("postgresql://fake", municipios=indice(0))
+
+    result = service.get_heatmap_data(FiltroMapa(ano=2024))
+
+    assert result.points[0].intensity == 50.0
+    assert result.points[0].lat == -15.6
+    assert result.points[0].lng == -56.1
+    # Sem população/centroide: população 1 e coordenadas 0
+    assert result.points[1].intensity == 500000.0
+    assert result.points[1].lat == 0.0
+    assert result.max_intensity == 500000.0
+
+
+def test_heatmap_reads_weekly_aggregate(fake_db):
+    """Heatmap lê indicador_epi_semanal filtrando por semana_inicio e doença"""
+    db = fake_db(heatmap_rows(1), mapa_service)
+    service = MapaService("postgresql://fake", municipios=indice())
+
+    service.get_heatmap_data(FiltroMapa(ano=2024, doenca_tipo="ZIKA"))
+
+    assert "FROM indicador_epi_semanal" in db.sqls[0]
+    assert "semana_inicio >= %s" in db.sqls[0]
+    assert "valor" not in db.sqls[0]
+
+
+# ============================================================================
+# CAMADAS
+# ============================================================================
+
+def test_camadas_obitos_e_letalidade(fake_db):
+    """Óbitos do agregado semanal alimentam letalidade por município"""
+    db = fake_db([{'municipio_cod_ibge': '5103403', 'total_casos': 200, 'total_obitos': 3}],
+                 mapa_service)
+    service = MapaService("postgresql://fake", municipios=indice(0))
+
+    result = service.get_camada_incidencia("202401", "202403")
+
+    assert "FROM indicador_epi_semanal" in db.sqls[0]
+    props = result.data.features[0].properties
+    assert props.obitos == 3
+    assert props.letalidade == 1.5
+    assert result.total_obitos == 3
+
+
+def test_camadas_include_weeks_overlapping_the_months(fake_db):
+    """A semana iniciada no mês anterior (25/02/2024) entra em março"""
+    db = fake_db([], mapa_service)
+    service = MapaService("postgresql://fake", municipios=indice(0))
+
+    service.get_camada_incidencia("202403", "202403")
+
+    assert db.queries[0][1][:2] == [date(2024, 2, 24), date(2024, 4, 1)]
+
+
+# ============================================================================
+# ESTATÍSTICAS
+# ============================================================================
+
+def test_estatisticas_single_query(fake_db):
+    """Estatísticas completas saem de uma única consulta"""
+    db = fake_db([{
+        'total_municipios': 141,
+        'total_casos': 15234,
+        'incidencia_media': 125.456,
+        'incidencia_maxima': 612.0,
+        'municipio_max_casos': '5103403',
+        'risco_baixo': 50,
+        'risco_medio': 60,
+        'risco_alto': 25,
+        'risco_muito_alto': 6,
+    }], mapa_service)
+    service = MapaService("postgresql://fake", municipios=indice())
+
+    result = service.get_estatisticas_agregadas(FiltroMapa(ano=2024))
+
+    assert len(db.queries) == 1
+    assert "municipios_ibge" not in db.sqls[0]
+    assert result.total_municipios == 141
+    assert result.total_casos == 15234
+    assert result.incidencia_media == 125.46
+    assert result.municipio_max_casos == 'Cuiabá'
+    assert result.distribuicao_risco == {"BAIXO": 50, "MEDIO": 60, "ALTO": 25, "MUITO_ALTO": 6}
+    assert result.periodo_inicio == "2024-01-01"
+    assert result.tempo_processamento_ms is not None
+    assert result.tempo_processamento_ms >= 0
+
+
+def test_estatisticas_sem_populacao_sem_incidencia(fake_db):
+    """População ausente/0 vai como 0 e vira incidência NULL, não casos * 100000"""
+    db = fake_db([], mapa_service)
+    municipios = MunicipioIndex.from_records({
+        "5103403": {'nome': "Cuiabá", 'pop': 100000},
+        "5108402": {'nome': "Várzea Grande", 'pop': 0},
+        "5105606": {'nome': "Sem população", 'pop': None},
+    })
+    service = MapaService("postgresql://fake", municipios=municipios)
+
+    service.get_estatisticas_agregadas(FiltroMapa(ano=2024))
+
+    sql, params = db.queries[0]
+    assert "NULLIF(ref.pop, 0)" in sql
+    assert "COALESCE(ref.pop, 1)" not in sql
+    populacao = dict(zip(params[-3], params[-2]))
+    assert populacao == {"5103403": 100000, "5108402": 0, "5105606": 0}
+
+
+def test_estatisticas_sem_dados(fake_db):
+    """Sem registros no período: estatísticas zeradas"""
+    fake_db([{
+        'total_municipios': 0,
+        'total_casos': 0,
+        'incidencia_media': 0,
+        'incidencia_maxima': 0,
+        'municipio_max_casos': None,
+        'risco_baixo': 0,
+        'risco_medio': 0,
+        'risco_alto': 0,
+        'risco_muito_alto': 0,
+    }], mapa_service)
+    service = MapaService("postgresql://fake", municipios=indice())
+
+    result = service.get_estatisticas_agregadas(FiltroMapa(ano=2024))
+
+    assert result.total_municipios == 0
+    assert result.distribuicao_risco == {}
+    assert result.tempo_processamento_ms is not None
+
+
+# ============================================================================
+# CLUSTERING
+# ============================================================================
+
+def test_camadas_cluster_index_reused_across_viewports(fake_db, monkeypatch):
+    """Índice de clusters construído uma vez; zoom/bbox não reconsultam o banco"""
+    from app.services import cluster_index
+
+    monkeypatch.setattr(cluster_index, "_indices", cluster_index.OrderedDict())
+    monkeypatch.setattr(response_cache, "_cache", response_cache.ResponseCache())
+    db = fake_db([
+        {'municipio_cod_ibge': f"51{i:05d}", 'total_casos': 10, 'total_obitos': 0}
+        for i in range(20)
+    ], mapa_service)
+    service = MapaService("postgresql://fake", municipios=indice(20))
+
+    baixo = service.get_camada_incidencia("202401", "202401", cluster=True, zoom=0)
+    alto = service.get_camada_incidencia(
+        "202401", "202401", cluster=True, zoom=15, bbox=[-57.0, -16.0, -55.0, -14.0]
+    )
+
+    assert len(db.queries) == 1
+    assert "LIMIT" not in db.sqls[0]
+    # Todos os municípios no mesmo centroide: um único cluster
+    assert len(baixo.data.features) == 1
+    assert baixo.data.features[0].properties.point_count == 20
+    assert baixo.data.features[0].properties.casos_total == 200
+    assert baixo.total_casos == alto.total_casos == 200
+    assert baixo.metadata["algorithm"] == "supercluster"
+    assert alto.metadata["index_cached"] is True
+
+
+# ============================================================================
+# SÉRIES TEMPORAIS
+# ============================================================================
+
+def test_series_temporais_single_grouped_query_dense_vectors(fake_db):
+    db = fake_db([
+        {'municipio_cod_ibge': "5103403", 'semana_epi': 1, 'casos': 50},
+        {'municipio_cod_ibge': "5103403", 'semana_epi': 3, 'casos': 20},
+        {'municipio_cod_ibge': "5100000", 'semana_epi': 52, 'casos': 5},
+    ], mapa_service)
+    service = MapaService("postgresql://fake", municipios=indice(2))
+
+    # 2020 tem 53 semanas epidemiológicas
+    series = service.get_series_temporais(["5103403", "5100000", "5100001"], 2020)
+
+    assert len(db.queries) == 1 and db.connections == 1
+    assert "ANY(%s)" in db.sqls[0]
+    assert "GROUP BY municipio_cod_ibge, semana_epi" in db.sqls[0]
+    assert len(series.semanas) == 53
+    assert series.semanas[0] == "2020-W01" and series.semanas[-1] == "2020-W53"
+    assert series.codigos_ibge == ["5103403", "5100000", "5100001"]
+    assert series.nomes == ["Cuiabá", "Município 0", "Município 1"]
+    assert all(len(serie) == 53 for serie in series.casos + series.incidencia)
+    assert series.casos[0][:4] == [50, 0, 20, 0]
+    assert series.incidencia[0][:3] == [50.0, 0.0, 20.0]
+    assert series.casos[1][51] == 5 and sum(series.casos[1]) == 5
+    assert series.casos[2] == [0] * 53
+
+
+def test_series_temporais_endpoint(fake_db, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    monkeypatch.setattr(response_cache, "_cache", response_cache.ResponseCache())
+    monkeypatch.setattr(mapa_service, "get_municipio_index", lambda conn: indice(2))
+    db = fake_db([{'municipio_cod_ibge': "5100001", 'semana_epi': 2, 'casos': 3}], mapa_service)
+    client = TestClient(app)
+
+    response = client.get(
+        "/api/mapa/series-temporais",
+        params={"codigos": "5100001,5103403,5100001", "ano": 2024}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["codigos_ibge"] == ["5100001", "5103403"]
+    assert data["casos"][0][:3] == [0, 3, 0]
+    assert db.connections == 1
+    assert client.get(
+        "/api/mapa/series-temporais", params={"codigos": "5103403,51", "ano": 2024}
+    ).status_code == 400
@@ -0,0 +1,173 @@
+"""
+Testes do índice de municípios em memória
+"""
+import pytest
+
+from app.services import municipio_index
+from app.services.municipio_index import MunicipioIndex, MunicipioIndexIndisponivel
+
+
+class FakeReferenceData:
+    """Tabelas de referência servidas pelo banco falso (fake_db)"""
+
+    def __init__(self):
+        self.db = None
+        self.version = {'n_ibge': 2, 'upd_ibge': '2025-01-01', 'n_geom': 2, 'upd_geom': '2025-01-01'}
+        self.rows = [
+            {'codigo_ibge': '5103403', 'nome': 'Cuiabá', 'pop': 650877, 'lat': -15.6, 'lon': -56.1,
+             'geom': '{"type": "MultiPolygon", "coordinates": []}'},
+            {'codigo_ibge': '5108402', 'nome': 'Várzea Grande', 'pop': 300078, 'lat': None, 'lon': None,
+             'geom': None},
+        ]
+        self.niveis = None  # pirâmide ausente (V018 não aplicada)
+        self.geom_niveis = {}
+
+    def respond(self, sql, params):
+        if "MAX(updated_at)" in sql:
+            return [self.version]
+        if "GROUP BY nivel" in sql:
+            if self.niveis is None:
+                raise RuntimeError('relation "municipios_geometrias_niveis" does not exist')
+            return self.niveis
+        if "WHERE nivel" in sql:
+            return self.geom_niveis.get(params[0], [])
+        return self.rows
+
+    def load_count(self):
+        return sum(1 for q in self.db.sqls if "ST_AsGeoJSON" in q)
+
+
+@pytest.fixture
+def ref_db(fake_db):
+    ref = FakeReferenceData()
+    ref.db = fake_db(ref.respond, municipio_index)
+    return ref
+
+
+def test_lazy_load_and_lookup(ref_db):
+    """Carrega sob demanda e expõe nome, população, centroide e geometria"""
+    index = MunicipioIndex("postgresql://fake", check_interval=300)
+    assert ref_db.db.sqls == []
+
+    assert index.nome("5103403") == "Cuiabá"
+    assert index.populacao("5103403") == 650877
+    assert index.centroide("5108402") == (0.0, 0.0)
+    assert index.get("5103403")['geom']['type'] == "MultiPolygon"
+    assert index.populacao_total() == 650877 + 300078
+    assert "9999999" not in index
+    assert len(index) == 2
+
+
+def test_no_queries_between_version_checks(ref_db):
+    """Consultas repetidas não acessam o banco dentro do intervalo de verificação"""
+    index = MunicipioIndex("postgresql://fake", check_interval=300)
+    index.get("5103403")
+    queries = len(ref_db.db.sqls)
+
+    for _ in range(100):
+        index.get("5103403")
+        index.populacao("5108402")
+
+    assert len(ref_db.db.sqls) == queries
+
+
+def test_reload_only_when_version_changes(ref_db):
+    """Recarrega apenas quando contagem/updated_at das tabelas mudam"""
+    index = MunicipioIndex("postgresql://fake", check_interval=0)
+    index.get("5103403")
+    index.get("5103403")
+    assert ref_db.load_count() == 1
+
+    ref_db.version = dict(ref_db.version, upd_ibge='2025-06-01')
+    ref_db.rows[0] = dict(ref_db.rows[0], pop=700000)
+
+    assert index.populacao("5103403") == 700000
+    assert ref_db.load_count() == 2
+
+
+def test_unavailable_without_first_load(ref_db, monkeypatch):
+    """Sem banco na primeira carga não há amostra embutida: consultas falham"""
+    agora = [1000.0]
+    monkeypatch.setattr(municipio_index.time, "monotonic", lambda: agora[0])
+    ref_db.db.available = False
+    index = MunicipioIndex("postgresql://fake", check_interval=300)
+
+    with pytest.raises(MunicipioIndexIndisponivel):
+        index.versao
+    with pytest.raises(MunicipioIndexIndisponivel):
+        index.nome("5103403")
+    # Nova tentativa só após o intervalo de retry
+    ref_db.db.available = True
+    with pytest.raises(MunicipioIndexIndisponivel):
+        index.get("5103403")
+    assert ref_db.db.sqls == []
+
+    agora[0] += 31
+    assert index.nome("5103403") == "Cuiabá"
+
+
+def test_keeps_loaded_version_when_database_fails(ref_db):
+    index = MunicipioIndex("postgresql://fake", check_interval=0)
+    versao = index.versao
+    ref_db.db.available = False
+
+    assert index.versao == versao
+    assert index.nome("5103403") == "Cuiabá"
+
+
+def test_from_records_is_static():
+    index = MunicipioIndex.from_records({"5103403": {"nome": "Cuiabá", "pop": 0}})
+    assert index.populacao("5103403") == 1
+    assert index.get("5103403")['pop_informada'] is False
+    assert index.versao == "static"
+
+
+# ============================================================================
+# PIRÂMIDE DE SIMPLIFICAÇÃO
+# ============================================================================
+
+def test_geometrias_fall_back_to_simplified_without_pyramid(ref_db):
+    index = MunicipioIndex("postgresql://fake", check_interval=300)
+
+    nivel, geoms = index.geometrias(12)
+
+    assert nivel is None
+    assert set(geoms) == {"5103403"}
+
+
+def test_geometrias_pick_level_by_zoom_and_load_lazily(ref_db):
+    ref_db.niveis = [
+        {'nivel': 0, 'zoom_min': 0, 'zoom_max': 6},
+        {'nivel': 1, 'zoom_min': 7, 'zoom_max': 10},
+        {'nivel': 2, 'zoom_min': 11, 'zoom_max': 22},
+    ]
+    ref_db.geom_niveis = {
+        n: [{'codigo_ibge': '5103403', 'geom': f'{{"type": "MultiPolygon", "coordinates": [], "n": {n}}}'}]
+        for n in (0, 1, 2)
+    }
+    index = MunicipioIndex("postgresql://fake", check_interval=300)
+
+    assert [index.nivel_para_zoom(z) for z in (0, 6, 7, 10, 11, 22)] == [0, 0, 1, 1, 2, 2]
+
+    nivel, geoms = index.geometrias(8)
+    assert nivel == 1
+    assert geoms["5103403"]["n"] == 1
+
+    # Cada nível é carregado uma única vez por versão do índice
+    index.geometrias(9)
+    index.geometrias(3)
+    level_queries = [q for q in ref_db.db.sqls if "WHERE nivel" in q]
+    assert len(level_queries) == 2
+
+
+def test_from_records_with_levels():
+    quadrado = {"type": "MultiPolygon", "coordinates": []}
+    index = MunicipioIndex.from_records(
+        {"5103403": {"nome": "Cuiabá", "pop": 1, "geom": quadrado}},
+        niveis={0: (0, 8, {"5103403": {"nivel": 0}}), 1: (9, 14, {"5103403": {"nivel": 1}})}
+    )
+
+    assert index.geometrias(5) == (0, {"5103403": {"nivel": 0}})
+    # Acima da última faixa: nível mais detalhado
+    assert index.geometrias(18)[0] == 1
+    assert index.geometrias() == (None, {"5103403": quadrado})
@@ -0,0 +1,391 @@
+"""
+Testes para o cache de respostas do mapa (app.services.response_cache)
+"""
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas.mapa import HeatmapData
+from app.services import response_cache
+from app.services.mapa_service import MapaService
+from app.services.response_cache import (
+    RESPONSE_CACHE_HITS,
+    RESPONSE_CACHE_MISSES,
+    ResponseCache,
+    etag_corresponde,
+    meses_competencia,
+    meses_periodo,
+    normalizar_filtro,
+)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def hincrby(self, name, key, amount):
+        self.ops.append((name, key, amount))
+
+    def execute(self):
+        for name, key, amount in self.ops:
+            self.redis.hincrby(name, key, amount)
+
+
+class FakeRedis:
+    """Subconjunto do cliente redis-py usado pelo cache (compartilhável entre processos)"""
+
+    def __init__(self):
+        self.kv = {}
+        self.hashes = {}
+
+    def get(self, key):
+        return self.kv.get(key)
+
+    def set(self, key, value, ex=None):
+        self.kv[key] = value
+
+    def hmget(self, name, keys):
+        h = self.hashes.get(name, {})
+        return [h.get(k) for k in keys]
+
+    def hincrby(self, name, key, amount):
+        h = self.hashes.setdefault(name, {})
+        h[key] = int(h.get(key, 0)) + amount
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+def _hits(endpoint, tier):
+    return RESPONSE_CACHE_HITS.labels(endpoint=endpoint, tier=tier)._value.get()
+
+
+def _misses(endpoint):
+    return RESPONSE_CACHE_MISSES.labels(endpoint=endpoint)._value.get()
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def test_meses_periodo_half_open():
+    assert meses_periodo(date(2023, 12, 31), date(2024, 2, 1)) == ["202312", "202401"]
+    assert meses_periodo(date(2024, 1, 1), date(2024, 1, 1)) == []
+
+
+def test_meses_competencia_inclusive():
+    assert meses_competencia("202311", "202402") == ["202311", "202312", "202401", "202402"]
+
+
+def test_normalizar_filtro_ignores_order_and_none():
+    a = normalizar_filtro({"municipios": ["5105606", "5103403"], "cluster": False, "x": None})
+    b = normalizar_filtro({"cluster": False, "municipios": ["5103403", "5105606"]})
+    assert a == b
+    # bbox é posicional: não ordenar listas numéricas
+    assert normalizar_filtro({"bbox": [2.0, 1.0]}) != normalizar_filtro({"bbox": [1.0, 2.0]})
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+def test_get_or_compute_caches_payload():
+    cache = ResponseCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return b'{"ok":true}'
+
+    filtro = {"ano": 2024}
+    misses = _misses("teste")
+    hits = _hits("teste", "memoria")
+    assert cache.get_or_compute("teste", filtro, ["202401"], compute) == b'{"ok":true}'
+    assert cache.get_or_compute("teste", dict(filtro), ["202401"], compute) == b'{"ok":true}'
+    assert len(calls) == 1
+    assert _misses("teste") == misses + 1
+    assert _hits("teste", "memoria") == hits + 1
+
+
+def test_lru_evicts_oldest_entry():
+    cache = ResponseCache(max_entries=2)
+    for ano in (2022, 2023, 2024):
+        cache.set("teste", {"ano": ano}, ["202401"], str(ano).encode())
+
+    assert cache.get("teste", {"ano": 2022}, ["202401"]) is None
+    assert cache.get("teste", {"ano": 2024}, ["202401"]) == b"2024"
+
+
+def test_ttl_expires_entries(monkeypatch):
+    cache = ResponseCache(ttl=10, ttl_fechado=10)
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+
+    cache.set("teste", {"ano": 2024}, ["209912"], b"x")
+    now[0] += 5
+    assert cache.get("teste", {"ano": 2024}, ["209912"]) == b"x"
+    now[0] += 6
+    assert cache.get("teste", {"ano": 2024}, ["209912"]) is None
+
+
+def test_closed_periods_use_longer_ttl():
+    cache = ResponseCache(ttl=300, ttl_fechado=86400)
+    assert cache._ttl_para(["202001"]) == 86400
+    assert cache._ttl_para(["209912"]) == 300
+
+
+def test_invalidation_only_hits_overlapping_competencias():
+    cache = ResponseCache()
+    cache.set("teste", {"c": "jan"}, ["202401"], b"jan")
+    cache.set("teste", {"c": "fev-mar"}, ["202402", "202403"], b"fev-mar")
+
+    cache.invalidar(["202403"])
+
+    assert cache.get("teste", {"c": "jan"}, ["202401"]) == b"jan"
+    assert cache.get("teste", {"c": "fev-mar"}, ["202402", "202403"]) is None
+
+
+def test_data_version_changes_after_invalidation():
+    cache = ResponseCache()
+    antes = cache.versao_dados(["202401", "202402"])
+    cache.invalidar(["202405"])
+    assert cache.versao_dados(["202401", "202402"]) == antes
+    cache.invalidar(["202402"])
+    assert cache.versao_dados(["202401", "202402"]) != antes
+
+
+def test_redis_tier_shared_between_processes():
+    redis = FakeRedis()
+    api_a = ResponseCache(redis_client=redis)
+    api_b = ResponseCache(redis_client=redis)
+    worker = ResponseCache(redis_client=redis)
+
+    api_a.set("teste", {"ano": 2024}, ["202401"], b"payload")
+
+    hits = _hits("teste", "redis")
+    assert api_b.get("teste", {"ano": 2024}, ["202401"]) == b"payload"
+    assert _hits("teste", "redis") == hits + 1
+
+    # ETL concluído em outro processo invalida as réplicas
+    worker.invalidar(["202401"])
+    assert api_a.get("teste", {"ano": 2024}, ["202401"]) is None
+    assert api_b.get("teste", {"ano": 2024}, ["202401"]) is None
+
+
+def test_redis_failure_falls_back_to_memory():
+    class BrokenRedis(FakeRedis):
+        def get(self, key):
+            raise ConnectionError("redis down")
+
+        def set(self, key, value, ex=None):
+            raise ConnectionError("redis down")
+
+        def hmget(self, name, keys):
+            raise ConnectionError("redis down")
+
+    cache = ResponseCache(redis_client=BrokenRedis())
+    cache.set("teste", {"ano": 2024}, ["202401"], b"x")
+    assert cache.get("teste", {"ano": 2024}, ["202401"]) == b"x"
+
+
+# ============================================================================
+# ENDPOINT
+# ============================================================================
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(response_cache, "_cache", cache)
+    return cache
+
+
+def test_heatmap_endpoint_served_from_cache(monkeypatch, fresh_cache):
+    calls = []
+
+    def fake_heatmap(self, filtro, max_points=5000):
+        calls.append(filtro)
+        return HeatmapData(points=[], max_intensity=0.0, total_points=0)
+
+    monkeypatch.setattr(MapaService, "get_heatmap_data", fake_heatmap)
+    client = TestClient(app)
+    params = {"ano": 2024, "semana_epi_inicio": 1, "semana_epi_fim": 4}
+
+    first = client.get("/api/mapa/heatmap", params=params)
+    second = client.get("/api/mapa/heatmap", params=params)
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert len(calls) == 1
+
+    # ETL concluído para janeiro/2024 invalida a resposta
+    response_cache.invalidar_periodo(date(2024, 1, 10), date(2024, 1, 11))
+    client.get("/api/mapa/heatmap", params=params)
+    assert len(calls) == 2
+
+
+# ============================================================================
+# ETAG / GET CONDICIONAL
+# ============================================================================
+
+def test_etag_depends_on_filter_and_data_version():
+    cache = ResponseCache()
+    etag = cache.etag("teste", {"ano": 2024}, ["202401"])
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert cache.etag("teste", {"ano": 2024}, ["202401"]) == etag
+    assert cache.etag("teste", {"ano": 2023}, ["202401"]) != etag
+
+    cache.invalidar(["202401"])
+    assert cache.etag("teste", {"ano": 2024}, ["202401"]) != etag
+
+
+def test_etag_not_reused_after_restart_without_redis():
+    """Contadores locais recomeçam do zero; a época do processo muda o ETag"""
+    antes = ResponseCache().etag("teste", {"ano": 2024}, ["202401"])
+    depois = ResponseCache().etag("teste", {"ano": 2024}, ["202401"])
+    assert antes != depois
+
+    redis = FakeRedis()
+    antes = ResponseCache(redis_client=redis).etag("teste", {"ano": 2024}, ["202401"])
+    assert ResponseCache(redis_client=redis).etag("teste", {"ano": 2024}, ["202401"]) == antes
+
+
+def test_etag_follows_database_mark(monkeypatch):
+    """Uma carga que não passou por invalidar_periodo muda o ETag do seu período após ttl_marca"""
+    agora = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: agora[0])
+    # Marca por período: só janeiro/2024 recebe carga
+    marcas = {date(2023, 12, 26): "2024-03-01 10:00|10", date(2024, 1, 26): "2024-02-01 09:00|8"}
+    leituras = []
+
+    def marca_dados(inicio, fim):
+        leituras.append((inicio, fim))
+        return marcas[inicio]
+
+    cache = ResponseCache(marca_dados=marca_dados, ttl_marca=30)
+    janeiro = cache.etag("teste", {"ano": 2024}, ["202401"])
+    fevereiro = cache.etag("teste", {"ano": 2024}, ["202402"])
+    assert leituras == [(date(2023, 12, 26), date(2024, 2, 1)), (date(2024, 1, 26), date(2024, 3, 1))]
+
+    marcas[date(2023, 12, 26)] = "2024-03-02 08:00|12"
+    assert cache.etag("teste", {"ano": 2024}, ["202401"]) == janeiro
+    assert len(leituras) == 2
+
+    agora[0] += 31
+    assert cache.etag("teste", {"ano": 2024}, ["202401"]) != janeiro
+    assert cache.etag("teste", {"ano": 2024}, ["202402"]) == fevereiro
+    assert len(leituras) == 4
+
+    # Um ETL local relê na hora só a marca dos períodos que tocou
+    cache.invalidar(["202401"])
+    cache.etag("teste", {"ano": 2024}, ["202401"])
+    cache.etag("teste", {"ano": 2024}, ["202402"])
+    assert len(leituras) == 5
+
+
+def test_database_mark_failure_is_memoized(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: agora[0])
+    chamadas = []
+
+    def marca_dados(inicio, fim):
+        chamadas.append(1)
+        raise RuntimeError("banco fora do ar")
+
+    cache = ResponseCache(marca_dados=marca_dados, ttl_marca=30)
+    etag = cache.etag("teste", {"ano": 2024}, ["202401"])
+    assert cache.etag("teste", {"ano": 2024}, ["202401"]) == etag
+    assert len(chamadas) == 1
+
+
+def test_reference_index_version_in_key():
+    """Recarga do índice de municípios troca ETag e chave; sem índice, nada é cacheado"""
+    referencia = ["v1"]
+
+    def versao_referencia():
+        if referencia[0] is None:
+            raise RuntimeError("índice indisponível")
+        return referencia[0]
+
+    cache = ResponseCache(versao_referencia=versao_referencia)
+    etag = cache.etag("teste", {"ano": 2024}, ["202401"])
+    cache.set("teste", {"ano": 2024}, ["202401"], b"v1")
+
+    referencia[0] = "v2"
+    assert cache.etag("teste", {"ano": 2024}, ["202401"]) != etag
+    assert cache.get("teste", {"ano": 2024}, ["202401"]) is None
+
+    referencia[0] = None
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("teste", {"ano": 2024}, ["202401"], lambda: b"parcial")
+    assert all(e[2] != b"parcial" for e in cache._entries.values())
+
+
+def test_etag_corresponde():
+    etag = '"abc"'
+    assert etag_corresponde('"abc"', etag)
+    assert etag_corresponde('"x", W/"abc"', etag)
+    assert etag_corresponde('*', etag)
+    assert not etag_corresponde('"x"', etag)
+    assert not etag_corresponde(None, etag)
+
+
+def test_heatmap_conditional_get_skips_service(monkeypatch, fresh_cache):
+    calls = []
+
+    def fake_heatmap(self, filtro, max_points=5000):
+        calls.append(filtro)
+        return HeatmapData(points=[], max_intensity=0.0, total_points=0)
+
+    monkeypatch.setattr(MapaService, "get_heatmap_data", fake_heatmap)
+    client = TestClient(app)
+    params = {"ano": 2024}
+
+    first = client.get("/api/mapa/heatmap", params=params)
+    etag = first.headers["etag"]
+    fresh_cache.clear()  # 304 não depende do payload em cache
+
+    second = client.get("/api/mapa/heatmap", params=params, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    assert second.content == b""
+    assert len(calls) == 1
+
+    response_cache.invalidar_periodo(date(2024, 3, 1), date(2024, 3, 2))
+    third = client.get("/api/mapa/heatmap", params=params, headers={"If-None-Match": etag})
+    assert third.status_code == 200
+    assert third.headers["etag"] != etag
+    assert len(calls) == 2
+
+
+def test_dashboard_kpis_conditional_get(monkeypatch, fresh_cache):
+    from app.routers import dashboard
+    from app.services.dashboard_service import DashboardService
+
+    calls = []
+
+    def fake_kpis(self, **kwargs):
+        calls.append(kwargs)
+        raise RuntimeError("sem banco")
+
+    monkeypatch.setattr(DashboardService, "get_kpis", fake_kpis)
+    client = TestClient(app)
+
+    etag = fresh_cache.etag(
+        "indicadores_kpis",
+        {"ano": 2024, "comparar_periodo_anterior": True},
+        dashboard._meses(2024) + dashboard._meses(2023),
+    )
+    response = client.get("/api/indicadores/kpis", params={"ano": 2024}, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert calls == []
+
+    # Período anterior também entra na versão: ETL de 2023 muda o ETag
+    response_cache.invalidar_periodo(date(2023, 6, 1), date(2023, 6, 2))
+    response = client.get("/api/indicadores/kpis", params={"ano": 2024}, headers={"If-None-Match": etag})
+    assert response.status_code == 500
+    assert len(calls) == 1
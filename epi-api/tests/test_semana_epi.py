@@ -0,0 +1,77 @@
+"""
+Testes de semana epidemiológica e filtros de competência
+"""
+from datetime import date
+
+import pytest
+
+from app.services.semana_epi import (
+    inicio_ano_epi,
+    inicio_semana_epi,
+    semanas_no_ano,
+    semana_epi,
+    filtro_competencia,
+)
+
+
+@pytest.mark.parametrize("ano,esperado", [
+    (2023, date(2023, 1, 1)),
+    (2024, date(2023, 12, 31)),
+    (2025, date(2024, 12, 29)),
+    (2026, date(2026, 1, 4)),
+    (2027, date(2027, 1, 3)),
+])
+def test_inicio_ano_epi(ano, esperado):
+    """Semana 1 começa no domingo da semana que contém 4 de janeiro"""
+    inicio = inicio_ano_epi(ano)
+    assert inicio == esperado
+    assert inicio.weekday() == 6  # domingo
+
+
+def test_semanas_no_ano():
+    assert semanas_no_ano(2024) == 52
+    assert semanas_no_ano(2025) == 53
+
+
+def test_semana_epi_roundtrip():
+    """Toda data cai na semana cujo intervalo a contém"""
+    d = date(2024, 12, 1)
+    while d < date(2026, 2, 1):
+        ano, semana = semana_epi(d)
+        inicio = inicio_semana_epi(ano, semana)
+        assert inicio <= d < date.fromordinal(inicio.toordinal() + 7)
+        assert 1 <= semana <= semanas_no_ano(ano)
+        d = date.fromordinal(d.toordinal() + 1)
+
+
+def test_semana_epi_virada_de_ano():
+    assert semana_epi(date(2024, 12, 29)) == (2025, 1)
+    assert semana_epi(date(2026, 1, 3)) == (2025, 53)
+    assert semana_epi(date(2026, 1, 4)) == (2026, 1)
+
+
+def test_filtro_competencia_ano():
+    """Ano inteiro vira intervalo semiaberto [início semana 1, início do próximo ano)"""
+    clauses, params = filtro_competencia(2025, coluna="semana_inicio")
+    assert clauses == ["semana_inicio >= %s", "semana_inicio < %s"]
+    assert params == [date(2024, 12, 29), date(2026, 1, 4)]
+    assert not any("EXTRACT" in c for c in clauses)
+
+
+def test_filtro_competencia_semanas():
+    """Semanas inicial e final inclusivas"""
+    _, params = filtro_competencia(2025, 1, 10, coluna="s.semana_inicio")
+    assert params == [date(2024, 12, 29), date(2025, 3, 9)]
+
+
+def test_filtro_competencia_default_weekly_bounds():
+    """A coluna padrão também usa os limites do ano epidemiológico"""
+    clauses, params = filtro_competencia(2026)
+    assert clauses == ["competencia >= %s", "competencia < %s"]
+    assert params == [date(2026, 1, 4), date(2027, 1, 3)]
+    # A semana 53 de 2025 (28/12/2025) não entra em 2026
+    assert not params[0] <= date(2025, 12, 28) < params[1]
+
+
+def test_filtro_competencia_sem_ano():
+    assert filtro_competencia(None) == ([], [])
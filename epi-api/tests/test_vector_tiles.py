@@ -0,0 +1,296 @@
+"""
+Testes para os vector tiles de município (app.services.vector_tiles)
+"""
+import struct
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import mapa_service, response_cache, vector_tiles
+from app.services.mapa_service import MapaService
+from app.services.municipio_index import MunicipioIndex
+from app.services.response_cache import ResponseCache
+from app.services.vector_tiles import (
+    MVT_EXTENT,
+    GeometriaMercator,
+    TileCache,
+    encode_tile,
+)
+
+
+# ============================================================================
+# DECODIFICADOR MÍNIMO (protobuf / MVT)
+# ============================================================================
+
+def _read_varint(buf, pos):
+    result = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _fields(buf):
+    pos = 0
+    while pos < len(buf):
+        key, pos = _read_varint(buf, pos)
+        numero, wire = key >> 3, key & 7
+        if wire == 0:
+            valor, pos = _read_varint(buf, pos)
+        elif wire == 1:
+            valor, pos = buf[pos:pos + 8], pos + 8
+        elif wire == 2:
+            n, pos = _read_varint(buf, pos)
+            valor, pos = buf[pos:pos + n], pos + n
+        else:
+            raise ValueError(wire)
+        yield numero, valor
+
+
+def _packed(buf):
+    pos, out = 0, []
+    while pos < len(buf):
+        v, pos = _read_varint(buf, pos)
+        out.append(v)
+    return out
+
+
+def _unzigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def _rings(comandos):
+    rings, i, x, y = [], 0, 0, 0
+    while i < len(comandos):
+        cmd, count = comandos[i] & 7, comandos[i] >> 3
+        i += 1
+        if cmd == 7:
+            continue
+        for _ in range(count):
+            x += _unzigzag(comandos[i])
+            y += _unzigzag(comandos[i + 1])
+            i += 2
+            if cmd == 1:
+                rings.append([])
+            rings[-1].append((x, y))
+    return rings
+
+
+def _decode_value(buf):
+    for numero, valor in _fields(buf):
+        if numero == 1:
+            return valor.decode("utf-8")
+        if numero == 3:
+            return struct.unpack("<d", valor)[0]
+        return valor
+
+
+def decode(tile):
+    """{camada: {"extent": int, "features": [{"id", "props", "rings"}]}}"""
+    camadas = {}
+    for numero, layer_buf in _fields(tile):
+        assert numero == 3
+        nome, extent, keys, values, raw = None, None, [], [], []
+        for n, v in _fields(layer_buf):
+            if n == 1:
+                nome = v.decode("utf-8")
+            elif n == 2:
+                raw.append(v)
+            elif n == 3:
+                keys.append(v.decode("utf-8"))
+            elif n == 4:
+                values.append(_decode_value(v))
+            elif n == 5:
+                extent = v
+        features = []
+        for f in raw:
+            feature = {"id": None, "props": {}, "rings": []}
+            for n, v in _fields(f):
+                if n == 1:
+                    feature["id"] = v
+                elif n == 2:
+                    tags = _packed(v)
+                    feature["props"] = {keys[k]: values[t] for k, t in zip(tags[::2], tags[1::2])}
+                elif n == 3:
+                    assert v == 3  # POLYGON
+                elif n == 4:
+                    feature["rings"] = _rings(_packed(v))
+            features.append(feature)
+        camadas[nome] = {"extent": extent, "features": features}
+    return camadas
+
+
+def _area(ring):
+    soma = 0
+    anterior = ring[-1]
+    for atual in ring:
+        soma += anterior[0] * atual[1] - atual[0] * anterior[1]
+        anterior = atual
+    return soma
+
+
+def quadrado(lng, lat, lado, buraco=None):
+    anel = [[lng, lat], [lng + lado, lat], [lng + lado, lat + lado], [lng, lat + lado], [lng, lat]]
+    aneis = [anel]
+    if buraco:
+        bl, bt, bs = buraco
+        aneis.append([[bl, bt], [bl, bt + bs], [bl + bs, bt + bs], [bl + bs, bt], [bl, bt]])
+    return {"type": "Polygon", "coordinates": aneis}
+
+
+# ============================================================================
+# CODIFICAÇÃO
+# ============================================================================
+
+def test_encode_tile_roundtrip_properties_and_orientation():
+    geometria = GeometriaMercator(quadrado(-60.0, -15.0, 5.0, buraco=(-58.0, -13.0, 1.0)))
+    tile = encode_tile(
+        "incidencia",
+        [(5103403, geometria, {"nome": "Cuiabá", "casos": 12, "incidencia": 12.5, "vazio": None})],
+        0, 0, 0
+    )
+
+    camada = decode(tile)["incidencia"]
+    assert camada["extent"] == MVT_EXTENT
+    feature, = camada["features"]
+    assert feature["id"] == 5103403
+    assert feature["props"] == {"nome": "Cuiabá", "casos": 12, "incidencia": 12.5}
+
+    externo, buraco = feature["rings"]
+    assert _area(externo) > 0
+    assert _area(buraco) < 0
+    assert all(0 <= x <= MVT_EXTENT and 0 <= y <= MVT_EXTENT for x, y in externo)
+
+
+def test_encode_tile_skips_polygons_outside_tile():
+    # MT fica no quadrante sudoeste: tile z1 (1, 0) é o nordeste
+    geometria = GeometriaMercator(quadrado(-60.0, -15.0, 5.0))
+    assert encode_tile("incidencia", [(1, geometria, {})], 1, 1, 0) == b""
+    assert encode_tile("incidencia", [(1, geometria, {})], 1, 0, 1) != b""
+
+
+def test_encode_tile_clips_to_buffer():
+    """Polígono maior que o tile é recortado na margem"""
+    geometria = GeometriaMercator(quadrado(-62.0, -19.0, 13.0))
+    # tile z8 no interior do polígono
+    tile = encode_tile("incidencia", [(1, geometria, {})], 8, 88, 139, buffer=64)
+
+    ring, = decode(tile)["incidencia"]["features"][0]["rings"]
+    assert len(ring) == 4
+    assert {x for x, _ in ring} == {-64, MVT_EXTENT + 64}
+    assert {y for _, y in ring} == {-64, MVT_EXTENT + 64}
+
+
+def test_tile_cache_evicts_by_bytes():
+    cache = TileCache(max_bytes=10)
+    cache.set("a", b"12345")
+    cache.set("b", b"12345")
+    cache.set("c", b"123")
+
+    assert cache.get("a") is None
+    assert cache.get("b") == b"12345"
+    assert cache.bytes == 8
+
+
+# ============================================================================
+# SERVICE / ENDPOINT
+# ============================================================================
+
+def indice_com_geometrias():
+    return MunicipioIndex.from_records({
+        "5103403": {"nome": "Cuiabá", "pop": 100000, "lat": -15.6, "lon": -56.1,
+                    "geom": quadrado(-56.3, -15.8, 0.4)},
+        "5105606": {"nome": "Várzea Grande", "pop": 50000, "lat": -15.6, "lon": -56.4,
+                    "geom": quadrado(-56.7, -15.8, 0.4)},
+        "5100201": {"nome": "Alta Floresta", "pop": 50000, "lat": -9.9, "lon": -56.1,
+                    "geom": None},
+    })
+
+
+@pytest.fixture
+def isolated(fake_db, monkeypatch):
+    from app.services import cluster_index
+    monkeypatch.setattr(cluster_index, "_indices", cluster_index.OrderedDict())
+    monkeypatch.setattr(response_cache, "_cache", ResponseCache())
+    monkeypatch.setattr(vector_tiles, "_tile_cache", TileCache())
+    return fake_db([{"municipio_cod_ibge": "5103403", "total_casos": 300, "total_obitos": 1}],
+                   mapa_service)
+
+
+def test_service_tile_has_incidence_for_every_polygon(isolated):
+    service = MapaService("postgresql://fake", municipios=indice_com_geometrias())
+
+    tile = service.get_tile_incidencia(4, 5, 8, "202401", "202401")
+    features = {f["id"]: f["props"] for f in decode(tile)["incidencia"]["features"]}
+
+    assert set(features) == {5103403, 5105606}
+    assert features[5103403]["casos"] == 300
+    assert features[5103403]["incidencia"] == 300.0
+    assert features[5103403]["nivel_risco"] == "ALTO"
+    # Sem casos no período: incidência zero, classe baixa
+    assert features[5105606]["casos"] == 0
+    assert features[5105606]["nivel_risco"] == "BAIXO"
+
+    # Outros tiles do mesmo período reaproveitam a incidência já agregada
+    service.get_tile_incidencia(5, 10, 17, "202401", "202401")
+    assert len(isolated.queries) == 1
+
+
+def test_tile_endpoint_caches_and_revalidates(isolated, monkeypatch):
+    monkeypatch.setattr(mapa_service, "get_municipio_index", lambda conn: indice_com_geometrias())
+    chamadas = []
+    original = MapaService.get_tile_incidencia
+
+    def contar(self, *args):
+        chamadas.append(args)
+        return original(self, *args)
+
+    monkeypatch.setattr(MapaService, "get_tile_incidencia", contar)
+    client = TestClient(app)
+    params = {"competencia_inicio": "202401", "competencia_fim": "202401"}
+
+    first = client.get("/api/mapa/tiles/4/5/8.mvt", params=params)
+    assert first.status_code == 200
+    assert first.headers["content-type"] == "application/vnd.mapbox-vector-tile"
+    assert len(first.content) < 2048
+
+    second = client.get("/api/mapa/tiles/4/5/8.mvt", params=params)
+    assert second.content == first.content
+    assert len(chamadas) == 1
+
+    etag = first.headers["etag"]
+    third = client.get("/api/mapa/tiles/4/5/8.mvt", params=params, headers={"If-None-Match": etag})
+    assert third.status_code == 304
+
+    # Tile sem municípios
+    assert client.get("/api/mapa/tiles/4/0/0.mvt", params=params).status_code == 204
+
+
+def test_tile_endpoint_rejects_invalid_tile():
+    client = TestClient(app)
+    params = {"competencia_inicio": "202401", "competencia_fim": "202401"}
+    assert client.get("/api/mapa/tiles/2/4/0.mvt", params=params).status_code == 400
+
+
+def test_service_tile_uses_pyramid_level_for_zoom(isolated):
+    grosso = {"5103403": quadrado(-56.3, -15.8, 0.4)}
+    fino = {
+        "5103403": quadrado(-56.3, -15.8, 0.4),
+        "5105606": quadrado(-56.7, -15.8, 0.4),
+    }
+    base = indice_com_geometrias()
+    municipios = MunicipioIndex.from_records(
+        {cod: info for cod, info in base.items()},
+        niveis={0: (0, 6, grosso), 1: (7, 22, fino)}
+    )
+    service = MapaService("postgresql://fake", municipios=municipios)
+
+    estado = decode(service.get_tile_incidencia(4, 5, 8, "202401", "202401"))
+    cidade = decode(service.get_tile_incidencia(8, 87, 139, "202401", "202401"))
+
+    assert {f["id"] for f in estado["incidencia"]["features"]} == {5103403}
+    assert {f["id"] for f in cidade["incidencia"]["features"]} == {5103403, 5105606}
@@ -29,6 +29,13 @@ DB_CONN_STR = os.getenv(
 # Storage path
 STORAGE_PATH = os.getenv("REPORTS_STORAGE_PATH", "/tmp/relatorios")
 
+# Extensão do arquivo → (formato, media type)
+FORMATOS_ARQUIVO = {
+    ".pdf": ("pdf", "application/pdf"),
+    ".csv": ("csv", "text/csv"),
+    ".arrow": ("arrow", "application/vnd.apache.arrow.stream"),
+}
+
 # In-memory job tracker (produção: usar Redis ou banco)
 relatorios_status: dict = {}
 
@@ -56,7 +63,7 @@ def processar_relatorio_background(relatorio_id: str, request: EPI01Request):
         # Construir metadados de arquivos
         arquivos_metadata = []
         for i, (arquivo, tamanho, hash_sha) in enumerate(zip(arquivos, tamanhos, hashes)):
-            formato = "pdf" if arquivo.endswith('.pdf') else "csv"
+            formato = FORMATOS_ARQUIVO[os.path.splitext(arquivo)[1]][0]
             nome_arquivo = os.path.basename(arquivo)
             
             arquivos_metadata.append(ArquivoRelatorio(
@@ -104,6 +111,9 @@ async def gerar_epi01(
     - `pdf`: Relatório formatado PDF/A-1 com gráficos (padrão)
     - `csv`: Dados tabulares em CSV
     - `both`: Ambos os formatos
+    - `arrow`: Dados semanais por município (município × semana: casos,
+      óbitos, casos graves) em Arrow IPC stream, para análise no cliente
+      (pyarrow, polars, apache-arrow); requer pyarrow no servidor
     
     **Filtros temporais**:
     - `ano`: Obrigatório (2000-2100)
@@ -267,7 +277,7 @@ async def obter_status_epi01(relatorio_id: str):
 @router.get("/download/{relatorio_id}/{formato}")
 async def download_epi01(
     relatorio_id: str,
-    formato: str = Query(..., pattern=r"^(pdf|csv)$", description="pdf ou csv")
+    formato: str = Query(..., pattern=r"^(pdf|csv|arrow)$", description="pdf, csv ou arrow")
 ):
     """
     Download de relatório EPI01 gerado
@@ -291,9 +301,9 @@ async def download_epi01(
     ```
     
     **Response**:
-    - Status 200: Arquivo binário (PDF ou CSV)
+    - Status 200: Arquivo binário (PDF, CSV ou Arrow)
     - Headers:
-      - `Content-Type`: application/pdf ou text/csv
+      - `Content-Type`: application/pdf, text/csv ou application/vnd.apache.arrow.stream
       - `Content-Disposition`: attachment; filename="..."
       - `X-File-Hash`: SHA-256 do arquivo
       - `X-File-Size`: Tamanho em bytes
@@ -340,7 +350,7 @@ async def download_epi01(
         )
     
     # Definir media type
-    media_type = "application/pdf" if formato == "pdf" else "text/csv"
+    media_type = FORMATOS_ARQUIVO[os.path.splitext(filepath)[1]][1]
     
     # Retornar arquivo
     return FileResponse(
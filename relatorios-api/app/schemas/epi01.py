@@ -16,6 +16,7 @@ class FormatoRelatorio(str, Enum):
     PDF = "pdf"
     CSV = "csv"
     BOTH = "both"
+    ARROW = "arrow"  # Dados semanais por município (Arrow IPC stream)
 
 
 class StatusRelatorio(str, Enum):
@@ -104,7 +105,7 @@ class EPI01Response(BaseModel):
 
 class ArquivoRelatorio(BaseModel):
     """Metadados de arquivo gerado"""
-    formato: str = Field(..., description="pdf ou csv")
+    formato: str = Field(..., description="pdf, csv ou arrow")
     tamanho_bytes: int = Field(..., ge=0)
     hash_sha256: str = Field(..., min_length=64, max_length=64, description="Hash SHA-256 do arquivo")
     url_download: str = Field(..., description="URL para download")
@@ -6,7 +6,7 @@ import hashlib
 import csv
 import io
 from typing import List, Dict, Optional, Tuple
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from reportlab.lib.pagesizes import A4
@@ -23,6 +23,11 @@ import matplotlib
 matplotlib.use('Agg')  # Backend non-GUI
 import matplotlib.pyplot as plt
 
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - dependência opcional
+    pa = None
+
 from app.schemas.epi01 import (
     EPI01Request,
     ConteudoRelatorioEPI01,
@@ -32,29 +37,23 @@ from app.schemas.epi01 import (
     FormatoRelatorio,
     ValidacaoRelatorio
 )
-
-
-# MT municipalities reference
-MT_MUNICIPIOS = {
-    "5103403": {"nome": "Cuiabá", "pop": 618124},
-    "5105606": {"nome": "Várzea Grande", "pop": 290215},
-    "5103900": {"nome": "Rondonópolis", "pop": 238400},
-    "5107909": {"nome": "Sinop", "pop": 142291},
-    "5106505": {"nome": "Tangará da Serra", "pop": 103750},
-    "5100201": {"nome": "Alta Floresta", "pop": 55347},
-    "5103379": {"nome": "Cáceres", "pop": 94861},
-    "5101001": {"nome": "Barra do Garças", "pop": 59727},
-    "5107602": {"nome": "Sorriso", "pop": 91382},
-    "5104104": {"nome": "Pontes e Lacerda", "pop": 46822},
-}
+from app.services.incidencia import calcular_incidencia, calcular_indicadores, classificar_risco
+from app.services.municipio_index import MunicipioIndex, get_municipio_index
+from app.services.semana_epi import filtro_competencia, inicio_semana_epi
 
 
 class EPI01Service:
     """Service para geração de relatórios EPI01"""
     
-    def __init__(self, db_connection_string: str, storage_path: str = "/tmp/relatorios"):
+    def __init__(
+        self,
+        db_connection_string: str,
+        storage_path: str = "/tmp/relatorios",
+        municipios: Optional[MunicipioIndex] = None
+    ):
         self.conn_str = db_connection_string
         self.storage_path = storage_path
+        self.municipios = municipios or get_municipio_index(db_connection_string)
         
         # Criar diretório de storage se não existir
         os.makedirs(storage_path, exist_ok=True)
@@ -74,14 +73,22 @@ class EPI01Service:
         Returns:
             Tuple com (arquivos_gerados, tamanhos, hashes)
         """
-        # 1. Coletar dados
-        conteudo = self._coletar_dados(request)
+        # 1. Coletar dados (Arrow tem consulta própria, sem o resumo)
+        conteudo = None
+        if request.formato != FormatoRelatorio.ARROW:
+            conteudo = self._coletar_dados(request)
         
         # 2. Gerar arquivos
         arquivos_gerados = []
         tamanhos = []
         hashes = []
         
+        if request.formato == FormatoRelatorio.ARROW:
+            arrow_path, arrow_size, arrow_hash = self._gerar_arrow(relatorio_id, request)
+            arquivos_gerados.append(arrow_path)
+            tamanhos.append(arrow_size)
+            hashes.append(arrow_hash)
+        
         if request.formato in [FormatoRelatorio.PDF, FormatoRelatorio.BOTH]:
             pdf_path, pdf_size, pdf_hash = self._gerar_pdf(
                 relatorio_id,
@@ -110,49 +117,34 @@ class EPI01Service:
         
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                # Filtros WHERE (indicador_epi: competencia, municipio_cod_ibge, indicador, valor)
-                where_clauses = ["EXTRACT(YEAR FROM competencia) = %s"]
-                params = [request.ano]
-
-                if request.semana_epi_inicio and request.semana_epi_fim:
-                    where_clauses.append("EXTRACT(WEEK FROM competencia) BETWEEN %s AND %s")
-                    params.extend([request.semana_epi_inicio, request.semana_epi_fim])
-
-                if request.codigo_ibge:
-                    where_clauses.append("municipio_cod_ibge = %s")
-                    params.append(request.codigo_ibge)
-
-                # Mapear doenca_tipo para indicador (atualmente só 'CASOS_DENGUE')
-                if request.doenca_tipo.value != "TODAS":
-                    where_clauses.append("indicador = %s")
-                    params.append("CASOS_DENGUE")
-
-                where_sql = " AND ".join(where_clauses)
+                # Filtros WHERE sobre o agregado semanal (indicador_epi_semanal)
+                # Ano/semanas epidemiológicas como intervalo de datas (indexável)
+                where_sql, params = self._where_dados(request)
                 
                 # Query de resumo
                 query_resumo = f"""
                     SELECT 
-                        SUM(valor) as total_casos,
-                        0 as total_obitos,
-                        0 as casos_graves,
+                        SUM(casos) as total_casos,
+                        SUM(obitos) as total_obitos,
+                        SUM(casos_graves) as casos_graves,
                         COUNT(DISTINCT municipio_cod_ibge) as municipios_afetados
-                    FROM indicador_epi
+                    FROM indicador_epi_semanal
                     WHERE {where_sql}
                 """
                 
                 cur.execute(query_resumo, params)
                 row_resumo = cur.fetchone()
                 
-                total_casos = row_resumo['total_casos'] or 0
-                total_obitos = row_resumo['total_obitos'] or 0
-                casos_graves = row_resumo['casos_graves'] or 0
+                total_casos = int(row_resumo['total_casos'] or 0)
+                total_obitos = int(row_resumo['total_obitos'] or 0)
+                casos_graves = int(row_resumo['casos_graves'] or 0)
                 municipios_afetados = row_resumo['municipios_afetados'] or 0
                 
                 taxa_letalidade = (total_obitos / total_casos * 100) if total_casos > 0 else 0.0
                 
                 # Calcular incidência média (aproximada)
-                pop_total = sum(m['pop'] for m in MT_MUNICIPIOS.values())
-                incidencia_media = (total_casos / pop_total * 100000) if pop_total > 0 else 0.0
+                pop_total = self.municipios.populacao_total()
+                incidencia_media = float(calcular_incidencia(total_casos, pop_total))
                 
                 resumo = DadosResumo(
                     total_casos=total_casos,
@@ -167,8 +159,9 @@ class EPI01Service:
                 query_municipios = f"""
                     SELECT 
                         municipio_cod_ibge,
-                        SUM(valor) as casos
-                    FROM indicador_epi
+                        SUM(casos) as casos,
+                        SUM(obitos) as obitos
+                    FROM indicador_epi_semanal
                     WHERE {where_sql}
                     GROUP BY municipio_cod_ibge
                     ORDER BY casos DESC
@@ -178,55 +171,47 @@ class EPI01Service:
                 cur.execute(query_municipios, params)
                 rows_municipios = cur.fetchall()
 
-                # Prefetch nomes e populações reais do IBGE
-                municipios = []
-                if rows_municipios:
-                    cods = [r['municipio_cod_ibge'] for r in rows_municipios]
-                    info_map = {}
-                    cur.execute(
-                        "SELECT codigo_ibge, nome, COALESCE(populacao_estimada_2025,1) AS pop FROM municipios_ibge WHERE codigo_ibge = ANY(%s)",
-                        (cods,)
-                    )
-                    for m in cur.fetchall():
-                        info_map[m['codigo_ibge']] = {
-                            'nome': m['nome'],
-                            'pop': int(m['pop'] or 1)
-                        }
-
-                    for row in rows_municipios:
-                        cod_ibge = row['municipio_cod_ibge']
-                        casos = int(row['casos'] or 0)
-                        obitos = 0
-                        mun_info = info_map.get(cod_ibge)
-                        if not mun_info:
-                            # Fallback: usar dicionário MT_MUNICIPIOS se disponível
-                            mun_info = MT_MUNICIPIOS.get(cod_ibge, {'nome': cod_ibge, 'pop': 1})
-                        pop = mun_info['pop'] or 1
-                        incidencia = (casos / pop * 100000) if pop > 0 else 0
-                        letalidade = 0.0
-
-                        nivel_risco = self._classificar_risco(incidencia)
+                # Nomes e populações do índice de municípios; indicadores em lote
+                infos = [
+                    self.municipios.get(row['municipio_cod_ibge'])
+                    or {'nome': row['municipio_cod_ibge'], 'pop': 1}
+                    for row in rows_municipios
+                ]
+                casos = [int(row['casos'] or 0) for row in rows_municipios]
+                obitos = [int(row['obitos'] or 0) for row in rows_municipios]
+                populacao = [info['pop'] or 1 for info in infos]
+                indicadores = calcular_indicadores(casos, populacao, obitos)
 
-                        municipios.append(DadosMunicipio(
-                            codigo_ibge=cod_ibge,
-                            nome=mun_info['nome'],
-                            populacao=pop,
-                            casos=casos,
-                            obitos=obitos,
-                            incidencia=round(incidencia, 2),
-                            taxa_letalidade=round(letalidade, 2),
-                            nivel_risco=nivel_risco
-                        ))
+                municipios = [
+                    DadosMunicipio(
+                        codigo_ibge=row['municipio_cod_ibge'],
+                        nome=info['nome'],
+                        populacao=pop,
+                        casos=n_casos,
+                        obitos=n_obitos,
+                        incidencia=incidencia,
+                        taxa_letalidade=letalidade,
+                        nivel_risco=nivel_risco
+                    )
+                    for row, info, pop, n_casos, n_obitos, incidencia, letalidade, nivel_risco in zip(
+                        rows_municipios, infos, populacao, casos, obitos,
+                        indicadores.incidencia.round(2).tolist(),
+                        indicadores.letalidade.round(2).tolist(),
+                        indicadores.classes()
+                    )
+                ]
                 
                 # Query de série temporal
                 query_serie = f"""
                     SELECT 
-                        EXTRACT(WEEK FROM competencia) as semana_epi,
-                        SUM(valor) as casos
-                    FROM indicador_epi
+                        semana_epi,
+                        SUM(casos) as casos,
+                        SUM(obitos) as obitos,
+                        SUM(casos_graves) as casos_graves
+                    FROM indicador_epi_semanal
                     WHERE {where_sql}
-                    GROUP BY EXTRACT(WEEK FROM competencia)
-                    ORDER BY EXTRACT(WEEK FROM competencia)
+                    GROUP BY semana_epi
+                    ORDER BY semana_epi
                 """
                 
                 cur.execute(query_serie, params)
@@ -235,14 +220,15 @@ class EPI01Service:
                 serie_temporal = []
                 for row in rows_serie:
                     semana = int(row['semana_epi']) if row['semana_epi'] else 0
+                    inicio_semana = inicio_semana_epi(request.ano, semana)
                     serie_temporal.append(DadosSemana(
                         ano=request.ano,
                         semana_epi=semana,
-                        data_inicio=f"{request.ano}-W{semana:02d}-1",
-                        data_fim=f"{request.ano}-W{semana:02d}-7",
+                        data_inicio=inicio_semana.isoformat(),
+                        data_fim=(inicio_semana + timedelta(days=6)).isoformat(),
                         casos=int(row['casos'] or 0),
-                        obitos=0,
-                        casos_graves=0
+                        obitos=int(row['obitos'] or 0),
+                        casos_graves=int(row['casos_graves'] or 0)
                     ))
                 
                 # Construir título
@@ -267,16 +253,86 @@ class EPI01Service:
         finally:
             conn.close()
     
+    def _where_dados(self, request: EPI01Request) -> Tuple[str, list]:
+        """Filtros do relatório sobre o agregado semanal"""
+        where_clauses, params = filtro_competencia(
+            request.ano, request.semana_epi_inicio, request.semana_epi_fim,
+            coluna="semana_inicio"
+        )
+        
+        if request.codigo_ibge:
+            where_clauses.append("municipio_cod_ibge = %s")
+            params.append(request.codigo_ibge)
+        
+        if request.doenca_tipo.value != "TODAS":
+            where_clauses.append("doenca_tipo = %s")
+            params.append(request.doenca_tipo.value)
+        
+        return " AND ".join(where_clauses), params
+    
+    def coletar_dados_arrow(self, request: EPI01Request) -> "pa.RecordBatch":
+        """
+        Dados do relatório como record batch Arrow: uma linha por
+        município × semana epidemiológica (casos, óbitos, casos graves).
+        
+        As colunas saem direto das tuplas do cursor, sem dicts nem modelos
+        Pydantic; nomes e populações ficam com o cliente (ou com o índice de
+        municípios), que faz as contas sobre os vetores.
+        """
+        if pa is None:
+            raise RuntimeError("Formato Arrow indisponível: pyarrow não instalado")
+        
+        where_sql, params = self._where_dados(request)
+        conn = psycopg2.connect(self.conn_str)
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    SELECT 
+                        municipio_cod_ibge,
+                        semana_epi,
+                        COALESCE(SUM(casos), 0)::bigint as casos,
+                        COALESCE(SUM(obitos), 0)::bigint as obitos,
+                        COALESCE(SUM(casos_graves), 0)::bigint as casos_graves
+                    FROM indicador_epi_semanal
+                    WHERE {where_sql}
+                    GROUP BY municipio_cod_ibge, semana_epi
+                    ORDER BY municipio_cod_ibge, semana_epi
+                """, params)
+                rows = cur.fetchall()
+        finally:
+            conn.close()
+        
+        schema = pa.schema(
+            [
+                ("municipio_cod_ibge", pa.string()),
+                ("semana_epi", pa.int16()),
+                ("casos", pa.int64()),
+                ("obitos", pa.int64()),
+                ("casos_graves", pa.int64()),
+            ],
+            metadata={"ano": str(request.ano), "doenca_tipo": request.doenca_tipo.value}
+        )
+        # Tuplas (linhas) → colunas
+        colunas = list(zip(*rows)) if rows else [()] * len(schema)
+        return pa.RecordBatch.from_arrays(
+            [pa.array(valores, type=campo.type) for valores, campo in zip(colunas, schema)],
+            schema=schema
+        )
+    
+    def _gerar_arrow(self, relatorio_id: str, request: EPI01Request) -> Tuple[str, int, str]:
+        """Gera arquivo Arrow IPC (stream) com os dados semanais por município"""
+        batch = self.coletar_dados_arrow(request)
+        filepath = os.path.join(self.storage_path, f"{relatorio_id}.arrow")
+        
+        with pa.OSFile(filepath, "wb") as sink:
+            with pa.ipc.new_stream(sink, batch.schema) as writer:
+                writer.write_batch(batch)
+        
+        return filepath, os.path.getsize(filepath), self._calcular_hash(filepath)
+    
     def _classificar_risco(self, incidencia: float) -> str:
-        """Classifica risco baseado na incidência"""
-        if incidencia < 100:
-            return "BAIXO"
-        elif incidencia < 300:
-            return "MEDIO"
-        elif incidencia < 500:
-            return "ALTO"
-        else:
-            return "MUITO_ALTO"
+        """Classifica risco baseado na incidência (app.services.incidencia)"""
+        return classificar_risco(incidencia)[0]
     
     def _gerar_pdf(
         self,
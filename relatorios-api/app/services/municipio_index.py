@@ -0,0 +1,223 @@
+"""
+Índice de referência de municípios em memória
+
+Substitui os dicionários MT_MUNICIPIOS dos services de relatório (mesma
+implementação do índice da epi-api). Carrega, uma única vez por processo e
+sob demanda, todos os municípios de
+``municipios_ibge`` + ``municipios_geometrias`` (nome, população, centroide e
+geometria simplificada).
+
+O índice é versionado: a cada ``MUNICIPIO_INDEX_CHECK_INTERVAL`` segundos
+(default 300) uma consulta leve compara contagem e ``MAX(updated_at)`` das
+duas tabelas com a versão carregada e recarrega se algo mudou. Nenhuma
+requisição consulta as tabelas de referência diretamente.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+logger = logging.getLogger(__name__)
+
+
+# Amostra mínima usada apenas enquanto o banco estiver indisponível
+_FALLBACK_MUNICIPIOS = {
+    "5103403": {"nome": "Cuiabá", "lat": -15.6014, "lon": -56.0967, "pop": 618124},
+    "5105606": {"nome": "Várzea Grande", "lat": -15.6467, "lon": -56.1326, "pop": 290215},
+    "5103900": {"nome": "Rondonópolis", "lat": -16.4708, "lon": -54.6351, "pop": 238400},
+    "5107909": {"nome": "Sinop", "lat": -11.8608, "lon": -55.5047, "pop": 142291},
+    "5106505": {"nome": "Tangará da Serra", "lat": -14.6233, "lon": -57.4936, "pop": 103750},
+    "5100201": {"nome": "Alta Floresta", "lat": -9.8757, "lon": -56.0875, "pop": 55347},
+    "5103379": {"nome": "Cáceres", "lat": -16.0728, "lon": -57.6823, "pop": 94861},
+    "5101001": {"nome": "Barra do Garças", "lat": -15.8897, "lon": -52.2564, "pop": 59727},
+    "5107602": {"nome": "Sorriso", "lat": -12.5436, "lon": -55.7147, "pop": 91382},
+    "5104104": {"nome": "Pontes e Lacerda", "lat": -15.2261, "lon": -59.3356, "pop": 46822},
+}
+
+# Intervalo para nova tentativa quando o índice está no fallback
+_FALLBACK_RETRY_SECONDS = 30.0
+
+_VERSION_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM municipios_ibge) AS n_ibge,
+        (SELECT MAX(updated_at) FROM municipios_ibge) AS upd_ibge,
+        (SELECT COUNT(*) FROM municipios_geometrias) AS n_geom,
+        (SELECT MAX(updated_at) FROM municipios_geometrias) AS upd_geom
+"""
+
+_LOAD_QUERY = """
+    SELECT
+        mi.codigo_ibge,
+        mi.nome,
+        COALESCE(mi.populacao_estimada_2025, 1) AS pop,
+        ST_Y(mg.centroide) AS lat,
+        ST_X(mg.centroide) AS lon,
+        ST_AsGeoJSON(mg.geom_simplificada, 6) AS geom
+    FROM municipios_ibge mi
+    LEFT JOIN municipios_geometrias mg ON mg.codigo_ibge = mi.codigo_ibge
+"""
+
+
+def _version_key(row: Dict[str, Any]) -> str:
+    return "|".join(str(row.get(k)) for k in ('n_ibge', 'upd_ibge', 'n_geom', 'upd_geom'))
+
+
+class MunicipioIndex:
+    """
+    Cache código IBGE → {nome, pop, lat, lon, geom}.
+
+    As entradas mantêm as chaves do antigo MT_MUNICIPIOS (``nome``, ``pop``,
+    ``lat``, ``lon``); ``geom`` é a geometria simplificada em GeoJSON (dict)
+    ou None.
+    """
+
+    def __init__(self, conn_str: Optional[str] = None, check_interval: Optional[float] = None):
+        self.conn_str = conn_str
+        self.check_interval = (
+            check_interval if check_interval is not None
+            else float(os.getenv("MUNICIPIO_INDEX_CHECK_INTERVAL", "300"))
+        )
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._versao: Optional[str] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_records(cls, records: Dict[str, Dict[str, Any]], versao: str = "static") -> "MunicipioIndex":
+        """Cria um índice fixo (sem banco), útil em testes e scripts"""
+        index = cls(check_interval=float("inf"))
+        index._entries = {cod: cls._normalize(info) for cod, info in records.items()}
+        index._versao = versao
+        index._next_check = float("inf")
+        return index
+
+    @staticmethod
+    def _normalize(info: Dict[str, Any]) -> Dict[str, Any]:
+        pop = int(info.get('pop') or 1)
+        return {
+            'nome': info.get('nome'),
+            'pop': pop if pop > 0 else 1,
+            'lat': float(info.get('lat') or 0.0),
+            'lon': float(info.get('lon') or 0.0),
+            'geom': info.get('geom'),
+        }
+
+    # ------------------------------------------------------------------
+    # Carga e versionamento
+    # ------------------------------------------------------------------
+
+    def _ensure_fresh(self) -> Dict[str, Dict[str, Any]]:
+        if time.monotonic() < self._next_check:
+            return self._entries
+
+        with self._lock:
+            if time.monotonic() < self._next_check:
+                return self._entries
+            try:
+                self._refresh()
+                self._next_check = time.monotonic() + self.check_interval
+            except Exception as e:
+                if not self._entries or self._versao == "fallback":
+                    logger.warning(f"Índice de municípios indisponível, usando fallback: {e}")
+                    self._entries = {
+                        cod: self._normalize(info) for cod, info in _FALLBACK_MUNICIPIOS.items()
+                    }
+                    self._versao = "fallback"
+                else:
+                    logger.warning(f"Falha ao verificar versão do índice de municípios: {e}")
+                self._next_check = time.monotonic() + min(self.check_interval, _FALLBACK_RETRY_SECONDS)
+        return self._entries
+
+    def _refresh(self) -> None:
+        """Recarrega o índice se a versão das tabelas mudou"""
+        conn = psycopg2.connect(self.conn_str)
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(_VERSION_QUERY)
+                versao = _version_key(cur.fetchone() or {})
+                if versao == self._versao:
+                    return
+
+                cur.execute(_LOAD_QUERY)
+                rows = cur.fetchall()
+        finally:
+            conn.close()
+
+        entries = {}
+        for row in rows:
+            info = dict(row)
+            info['geom'] = json.loads(row['geom']) if row.get('geom') else None
+            entries[row['codigo_ibge']] = self._normalize(info)
+
+        # Troca atômica: leitores concorrentes veem o índice antigo ou o novo
+        self._entries = entries
+        self._versao = versao
+        logger.info(f"Índice de municípios carregado: {len(entries)} municípios (versão {versao})")
+
+    def invalidate(self) -> None:
+        """Força verificação de versão no próximo acesso"""
+        self._next_check = 0.0
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    @property
+    def versao(self) -> Optional[str]:
+        self._ensure_fresh()
+        return self._versao
+
+    def get(self, codigo_ibge: str) -> Optional[Dict[str, Any]]:
+        return self._ensure_fresh().get(codigo_ibge)
+
+    def __contains__(self, codigo_ibge: str) -> bool:
+        return codigo_ibge in self._ensure_fresh()
+
+    def __len__(self) -> int:
+        return len(self._ensure_fresh())
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        return iter(list(self._ensure_fresh().items()))
+
+    def nome(self, codigo_ibge: str, default: Optional[str] = None) -> Optional[str]:
+        info = self.get(codigo_ibge)
+        return info['nome'] if info else default
+
+    def populacao(self, codigo_ibge: str, default: int = 1) -> int:
+        info = self.get(codigo_ibge)
+        return info['pop'] if info else default
+
+    def centroide(self, codigo_ibge: str) -> Tuple[float, float]:
+        """(lat, lon) do centroide; (0, 0) se desconhecido"""
+        info = self.get(codigo_ibge)
+        return (info['lat'], info['lon']) if info else (0.0, 0.0)
+
+    def populacao_total(self, codigos: Optional[List[str]] = None) -> int:
+        entries = self._ensure_fresh()
+        if codigos is None:
+            return sum(info['pop'] for info in entries.values())
+        return sum(entries[c]['pop'] for c in codigos if c in entries)
+
+
+_index: Optional[MunicipioIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_municipio_index(conn_str: Optional[str] = None) -> MunicipioIndex:
+    """
+    Retorna o índice compartilhado do processo (criado sob demanda).
+
+    Args:
+        conn_str: DSN do banco (usado na criação do índice)
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = MunicipioIndex(conn_str)
+    return _index
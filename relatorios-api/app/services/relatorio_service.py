@@ -4,7 +4,7 @@ Relatório Service - Generate epidemiological reports from database data
 import os
 import tempfile
 from typing import List, Optional
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
@@ -15,29 +15,22 @@ from app.schemas.relatorio import (
     FormatoRelatorio
 )
 from app.services.pdf_generator import EPI01PDFGenerator, generate_csv_export
-
-
-# MT municipalities reference data (same as mapa service)
-MT_MUNICIPIOS = {
-    "5103403": {"nome": "Cuiabá", "pop": 618124},
-    "5105606": {"nome": "Várzea Grande", "pop": 290215},
-    "5103900": {"nome": "Rondonópolis", "pop": 238400},
-    "5107909": {"nome": "Sinop", "pop": 142291},
-    "5106505": {"nome": "Tangará da Serra", "pop": 103750},
-    "5100201": {"nome": "Alta Floresta", "pop": 55347},
-    "5103379": {"nome": "Cáceres", "pop": 94861},
-    "5101001": {"nome": "Barra do Garças", "pop": 59727},
-    "5107602": {"nome": "Sorriso", "pop": 91382},
-    "5104104": {"nome": "Pontes e Lacerda", "pop": 46822},
-}
+from app.services.incidencia import calcular_indicadores
+from app.services.municipio_index import MunicipioIndex, get_municipio_index
 
 
 class RelatorioService:
     """Service for generating epidemiological reports"""
     
-    def __init__(self, db_connection_string: str, reports_dir: str = "/tmp/relatorios"):
+    def __init__(
+        self,
+        db_connection_string: str,
+        reports_dir: str = "/tmp/relatorios",
+        municipios: Optional[MunicipioIndex] = None
+    ):
         self.conn_str = db_connection_string
         self.reports_dir = reports_dir
+        self.municipios = municipios or get_municipio_index(db_connection_string)
         os.makedirs(reports_dir, exist_ok=True)
     
     def generate_epi01(
@@ -98,12 +91,16 @@ class RelatorioService:
         """Fetch aggregated indicators by municipality from database"""
         dt_inicio = self._competencia_to_date(competencia_inicio)
         dt_fim = self._competencia_to_date(competencia_fim)
+        # Semanas que se sobrepõem ao período: terminam (semana_inicio + 6) a
+        # partir do 1º dia de competencia_inicio e começam até o fim do mês de
+        # competencia_fim
+        dt_fim = (dt_fim.replace(day=28) + timedelta(days=4)).replace(day=1)
         
         conn = psycopg2.connect(self.conn_str)
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
                 municipio_filter = ""
-                params = [dt_inicio, dt_fim]
+                params = [dt_inicio - timedelta(days=6), dt_fim]
                 
                 if municipios_filter:
                     municipio_filter = "AND municipio_cod_ibge = ANY(%s)"
@@ -112,13 +109,14 @@ class RelatorioService:
                 query = f"""
                     SELECT 
                         municipio_cod_ibge,
-                        COUNT(*) as casos_total,
-                        COUNT(*) FILTER (WHERE classificacao_final LIKE 'DENGUE%%') as casos_confirmados,
-                        COUNT(*) FILTER (WHERE classificacao_final = 'DENGUE_GRAVE') as casos_graves,
-                        COUNT(*) FILTER (WHERE classificacao_final = 'DENGUE_SINAIS_ALARME') as casos_sinais_alarme,
-                        COUNT(*) FILTER (WHERE evolucao = 'OBITO') as obitos
-                    FROM indicador_epi
-                    WHERE competencia >= %s AND competencia <= %s
+                        SUM(casos) as casos_total,
+                        SUM(casos_confirmados) as casos_confirmados,
+                        SUM(casos_graves) as casos_graves,
+                        SUM(casos_sinais_alarme) as casos_sinais_alarme,
+                        SUM(obitos) as obitos
+                    FROM indicador_epi_semanal
+                    WHERE doenca_tipo = 'DENGUE'
+                      AND semana_inicio >= %s AND semana_inicio < %s
                       {municipio_filter}
                     GROUP BY municipio_cod_ibge
                     ORDER BY casos_total DESC
@@ -129,36 +127,37 @@ class RelatorioService:
         finally:
             conn.close()
         
-        # Build IndicadorMunicipio objects
-        municipios = []
+        # Municípios do índice; incidência e letalidade em lote
+        conhecidos = []
         for row in rows:
-            cod_ibge = row['municipio_cod_ibge']
-            mun_info = MT_MUNICIPIOS.get(cod_ibge)
-            
-            if not mun_info:
-                continue
-            
-            pop = mun_info['pop']
-            casos = row['casos_total']
-            obitos = row['obitos']
-            
-            incidencia = (casos / pop * 100000) if pop > 0 else 0.0
-            letalidade = (obitos / casos * 100) if casos > 0 else 0.0
-            
-            municipios.append(IndicadorMunicipio(
-                municipio_cod_ibge=cod_ibge,
-                municipio_nome=mun_info['nome'],
-                populacao=pop,
-                casos_total=casos,
-                casos_confirmados=row['casos_confirmados'],
-                casos_graves=row['casos_graves'],
-                casos_sinais_alarme=row['casos_sinais_alarme'],
-                obitos=obitos,
-                incidencia=round(incidencia, 2),
-                letalidade=round(letalidade, 2)
-            ))
+            mun_info = self.municipios.get(row['municipio_cod_ibge'])
+            if mun_info:
+                conhecidos.append((row, mun_info))
         
-        return municipios
+        casos = [int(row['casos_total'] or 0) for row, _ in conhecidos]
+        obitos = [int(row['obitos'] or 0) for row, _ in conhecidos]
+        indicadores = calcular_indicadores(casos, [info['pop'] for _, info in conhecidos], obitos)
+        
+        # Build IndicadorMunicipio objects
+        return [
+            IndicadorMunicipio(
+                municipio_cod_ibge=row['municipio_cod_ibge'],
+                municipio_nome=mun_info['nome'],
+                populacao=mun_info['pop'],
+                casos_total=n_casos,
+                casos_confirmados=int(row['casos_confirmados'] or 0),
+                casos_graves=int(row['casos_graves'] or 0),
+                casos_sinais_alarme=int(row['casos_sinais_alarme'] or 0),
+                obitos=n_obitos,
+                incidencia=incidencia,
+                letalidade=letalidade
+            )
+            for (row, mun_info), n_casos, n_obitos, incidencia, letalidade in zip(
+                conhecidos, casos, obitos,
+                indicadores.incidencia.round(2).tolist(),
+                indicadores.letalidade.round(2).tolist()
+            )
+        ]
     
     def _generate_pdf(
         self,
@@ -0,0 +1,171 @@
+"""
+Benchmark: JSON vs Arrow IPC nos endpoints analíticos
+
+Sem banco (cursor falso em memória), compara para cada volume:
+
+- séries temporais (N municípios × 52 semanas): JSON colunar de
+  ``get_series_temporais`` vs ``get_series_temporais_arrow``
+- camada de incidência (N municípios): GeoJSON de ``get_camada_incidencia``
+  vs ``get_camada_incidencia_arrow``
+
+Métricas: tamanho do payload, tempo de geração no servidor e tempo de parse
+no cliente até ter as colunas numéricas em vetores (``json.loads`` + listas
+vs ``pyarrow.ipc.open_stream`` + ``to_numpy``), mediana de REPETICOES.
+
+Usage:
+    python tests/performance/bench_arrow_ipc.py
+"""
+import json
+import sys
+import time
+from pathlib import Path
+from statistics import median
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "epi-api"))
+
+import pyarrow as pa  # noqa: E402
+
+from app.services import mapa_service  # noqa: E402
+from app.services.mapa_service import MapaService  # noqa: E402
+from app.services.municipio_index import MunicipioIndex  # noqa: E402
+
+VOLUMES = [141, 1_000, 10_000]
+REPETICOES = 5
+
+
+class _Cursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        return self.rows
+
+
+class _Conn:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self, name=None, cursor_factory=None):
+        return _Cursor(self.rows)
+
+    def close(self):
+        pass
+
+
+def codigos(n: int) -> List[str]:
+    return [f"{i:07d}" for i in range(n)]
+
+
+def preparar(n: int, rows: List[Dict]) -> MapaService:
+    mapa_service.get_connection = lambda dsn=None: _Conn(rows)
+    municipios = MunicipioIndex.from_records({
+        cod: {"nome": f"Município {i}", "pop": 10000 + i, "lat": -15.0, "lon": -56.0}
+        for i, cod in enumerate(codigos(n))
+    })
+    return MapaService("postgresql://bench", municipios=municipios)
+
+
+def cronometrar(func: Callable) -> float:
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        func()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return round(median(tempos), 2)
+
+
+def comparar(gerar_json: Callable[[], bytes], gerar_arrow: Callable[[], bytes],
+             parse_json: Callable[[bytes], object], parse_arrow: Callable[[bytes], object]) -> Dict:
+    payload_json, payload_arrow = gerar_json(), gerar_arrow()
+    return {
+        "json": {
+            "bytes": len(payload_json),
+            "servidor_ms": cronometrar(gerar_json),
+            "parse_ms": cronometrar(lambda: parse_json(payload_json)),
+        },
+        "arrow": {
+            "bytes": len(payload_arrow),
+            "servidor_ms": cronometrar(gerar_arrow),
+            "parse_ms": cronometrar(lambda: parse_arrow(payload_arrow)),
+        },
+    }
+
+
+def colunas_arrow(payload: bytes) -> Dict:
+    tabela = pa.ipc.open_stream(payload).read_all()
+    return {nome: tabela.column(nome).to_numpy() for nome in ("casos", "incidencia")}
+
+
+def series_json(payload: bytes) -> Dict:
+    doc = json.loads(payload)
+    return {"casos": [c for serie in doc["casos"] for c in serie],
+            "incidencia": [v for serie in doc["incidencia"] for v in serie]}
+
+
+def camada_json(payload: bytes) -> Dict:
+    props = [f["properties"] for f in json.loads(payload)["data"]["features"]]
+    return {"casos": [p["casos"] for p in props], "incidencia": [p["incidencia"] for p in props]}
+
+
+def main() -> int:
+    resultados = []
+    print(f"{'endpoint':<10} {'N':>6} | {'JSON: bytes / servidor / parse':<34} | {'Arrow: bytes / servidor / parse':<34}")
+    print("-" * 92)
+
+    for n in VOLUMES:
+        cods = codigos(n)
+        linhas_series = [
+            {"municipio_cod_ibge": cod, "semana_epi": s, "casos": (i * s) % 97}
+            for i, cod in enumerate(cods) for s in range(1, 53) if (i + s) % 3
+        ]
+        service = preparar(n, linhas_series)
+        series = comparar(
+            lambda: service.get_series_temporais(cods, 2024).model_dump_json().encode("utf-8"),
+            lambda: service.get_series_temporais_arrow(cods, 2024),
+            series_json, colunas_arrow,
+        )
+
+        linhas_camada = [
+            {"municipio_cod_ibge": cod, "total_casos": i % 500, "total_obitos": (i % 500) // 100}
+            for i, cod in enumerate(cods)
+        ]
+        service = preparar(n, linhas_camada)
+        camada = comparar(
+            lambda: service.get_camada_incidencia("202401", "202412", max_features=n)
+            .model_dump_json().encode("utf-8"),
+            lambda: service.get_camada_incidencia_arrow("202401", "202412", max_features=n),
+            camada_json, colunas_arrow,
+        )
+
+        for nome, r in (("series", series), ("camada", camada)):
+            resultados.append({"endpoint": nome, "municipios": n, **r})
+            j, a = r["json"], r["arrow"]
+            print(
+                f"{nome:<10} {n:>6} | {j['bytes']:>10} {j['servidor_ms']:>9.2f}ms {j['parse_ms']:>9.2f}ms"
+                f" | {a['bytes']:>10} {a['servidor_ms']:>9.2f}ms {a['parse_ms']:>9.2f}ms"
+            )
+
+    out = Path(__file__).parent / "bench_arrow_ipc.json"
+    out.write_text(json.dumps(resultados, indent=2))
+    print(f"\nResultados salvos em {out}")
+
+    maiores = [r for r in resultados if r["municipios"] == VOLUMES[-1]]
+    if all(r["arrow"]["parse_ms"] < r["json"]["parse_ms"] for r in maiores):
+        print("✅ Arrow com parse no cliente mais rápido que JSON")
+        return 0
+    print("❌ Arrow não reduziu o tempo de parse como esperado")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Benchmark: leitura de CSV do ETL — pandas em memória vs LeitorCSV em streaming
+
+Gera exports SINAN sintéticos de tamanho crescente e, para cada um, roda em
+um subprocesso isolado (pico de RSS é por processo):
+
+- legado: o fluxo anterior do ETL — ``pd.read_csv`` do arquivo inteiro +
+  ``to_dict('records')`` para os batches, mais uma leitura completa para a
+  checagem estrutural e outra para ``count_total_rows``
+- streaming: ``LeitorCSV`` — lotes, contagem e checagem numa única passada
+
+Métricas: pico de RSS (ru_maxrss) e tempo total. O esperado é o pico do
+streaming ficar estável com o tamanho do arquivo.
+
+Usage:
+    python tests/performance/bench_csv_stream.py
+"""
+import csv
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "epi-api"))
+
+VOLUMES = [50_000, 200_000, 800_000]
+BATCH_SIZE = 1000
+COLUNAS = [
+    'nu_notific', 'dt_notific', 'dt_sin_pri', 'nm_pacient', 'dt_nasc', 'nu_idade_n',
+    'cs_sexo', 'sg_uf', 'id_municip', 'nm_bairro', 'classi_fin', 'evolucao',
+]
+
+# Pico do streaming no maior arquivo: até 25% acima do menor
+TOLERANCIA_CRESCIMENTO = 1.25
+
+
+def gerar_csv(caminho: Path, linhas: int) -> None:
+    with open(caminho, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUNAS)
+        for i in range(linhas):
+            writer.writerow([
+                f"2024{i:08d}", f"{i % 28 + 1:02d}/{i % 12 + 1:02d}/2024", "",
+                f"PACIENTE {i}", "01/01/1990", str(i % 90), "MF"[i % 2], "MT",
+                f"51{i % 141:05d}", "CENTRO", str(i % 5 + 1), "1",
+            ])
+
+
+def worker(modo: str, caminho: str) -> None:
+    """Executa um modo e imprime JSON com pico de RSS e tempo"""
+    inicio = time.perf_counter()
+    linhas = 0
+
+    if modo == "legado":
+        import pandas as pd
+
+        opcoes = dict(encoding='utf-8', dtype=str, na_values=['', 'NA', 'N/A', 'null', 'NULL'],
+                      keep_default_na=False)
+        pd.read_csv(caminho, nrows=1)
+        estrutura = len(pd.read_csv(caminho))
+        total = len(pd.read_csv(caminho))
+        records = pd.read_csv(caminho, **opcoes).to_dict('records')
+        for i in range(0, len(records), BATCH_SIZE):
+            linhas += len(records[i:i + BATCH_SIZE])
+        assert estrutura == total == linhas
+    else:
+        from app.services.csv_stream import LeitorCSV
+
+        leitor = LeitorCSV(caminho, BATCH_SIZE)
+        leitor.colunas_faltando(COLUNAS)
+        for lote in leitor.lotes():
+            linhas += len(lote)
+        assert leitor.total_linhas == linhas
+
+    print(json.dumps({
+        "linhas": linhas,
+        "pico_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "tempo_s": round(time.perf_counter() - inicio, 2),
+    }))
+
+
+def medir(modo: str, caminho: Path) -> dict:
+    saida = subprocess.run(
+        [sys.executable, __file__, "--worker", modo, str(caminho)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def main() -> int:
+    resultados = []
+    print(f"{'linhas':>9} {'MB':>7} | {'legado: pico RSS / tempo':<26} | {'streaming: pico RSS / tempo':<26}")
+    print("-" * 76)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in VOLUMES:
+            caminho = Path(tmp) / f"sinan_{n}.csv"
+            gerar_csv(caminho, n)
+            tamanho_mb = caminho.stat().st_size / 1024 / 1024
+            legado, streaming = medir("legado", caminho), medir("streaming", caminho)
+            resultados.append({"linhas": n, "arquivo_mb": round(tamanho_mb, 1),
+                               "legado": legado, "streaming": streaming})
+            print(
+                f"{n:>9} {tamanho_mb:>7.1f} | {legado['pico_rss_mb']:>10.1f} MB {legado['tempo_s']:>9.2f}s"
+                f"   | {streaming['pico_rss_mb']:>10.1f} MB {streaming['tempo_s']:>9.2f}s"
+            )
+
+    out = Path(__file__).parent / "bench_csv_stream.json"
+    out.write_text(json.dumps(resultados, indent=2))
+    print(f"\nResultados salvos em {out}")
+
+    menor, maior = resultados[0]["streaming"], resultados[-1]["streaming"]
+    if maior["pico_rss_mb"] <= menor["pico_rss_mb"] * TOLERANCIA_CRESCIMENTO:
+        print("✅ Pico de RSS do streaming estável com o tamanho do arquivo")
+        return 0
+    print("❌ Pico de RSS do streaming cresceu com o tamanho do arquivo")
+    return 1
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--worker":
+        worker(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+    sys.exit(main())
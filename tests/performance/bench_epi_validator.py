@@ -0,0 +1,145 @@
+"""
+Benchmark: EPIValidator linha a linha vs máscaras por coluna
+
+Gera arquivos CSV-EPI01 sintéticos (~2% das linhas com algum campo inválido,
+~2% com sintomas após a notificação, mais avisos das regras cruzadas) e mede:
+
+- linha_a_linha: o fluxo anterior — ``df.iterrows()`` + ``EPIRecordCSV`` e
+  regras cruzadas por registro
+- mascaras: ``EPIValidator.validate_csv`` atual — regras como máscaras
+  booleanas sobre o DataFrame, Pydantic só nas linhas reprovadas
+
+Confere que os dois produzem os mesmos erros, avisos e linhas válidas.
+Métrica: linhas por segundo (mediana de REPETICOES; leitura do CSV incluída).
+
+Usage:
+    python tests/performance/bench_epi_validator.py
+"""
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from statistics import median
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "epi-api"))
+
+from app.schemas.etl_epi import ValidationError, ValidationWarning  # noqa: E402
+from app.services.etl_validator import EPIValidator  # noqa: E402
+
+VOLUMES = [5_000, 20_000, 50_000]
+REPETICOES = 3
+TAXA_INVALIDAS = 0.02
+
+
+def gerar_csv(caminho: Path, linhas: int) -> None:
+    r = random.Random(linhas)
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write(";".join(EPIValidator.REQUIRED_COLUMNS) + "\n")
+        for i in range(linhas):
+            evolucao = r.choice(["CURA", "CURA", "CURA", "OBITO", "IGNORADO"])
+            mes = r.randint(1, 12)
+            notificacao, sintomas = r.randint(10, 28), r.randint(1, 9)
+            if r.random() < TAXA_INVALIDAS:
+                notificacao, sintomas = sintomas, notificacao
+            campos = [
+                f"2024-{mes:02d}-{notificacao:02d}",
+                f"2024-{mes:02d}-{sintomas:02d}",
+                r.choice(["5103403", "5108402", "5105606", "5107909"]),
+                r.choice("MFI"), str(r.randint(0, 90)), r.choice(["", "", "N", "9", "1", "8"]),
+                r.choice(["DENGUE", "DENGUE_GRAVE", "DESCARTADO", "DENGUE_SINAIS_ALARME"]),
+                r.choice(["LABORATORIAL", "CLINICO_EPIDEMIOLOGICO", "CLINICO_EPIDEMIOLOGICO"]),
+                *[r.choice("01") for _ in EPIValidator.FLAG_COLUMNS],
+                evolucao, "2024-03-01" if evolucao == "OBITO" and r.random() < 0.8 else "", "",
+            ]
+            if r.random() < TAXA_INVALIDAS:
+                campos[r.choice([2, 3, 4, 6])] = r.choice(["3550308", "X", "130", "dengue"])
+            f.write(";".join(campos) + "\n")
+
+
+def linha_a_linha(caminho: Path) -> dict:
+    """Fluxo anterior: iterrows + Pydantic + regras cruzadas por registro"""
+    validador = EPIValidator()
+    df = pd.read_csv(caminho, sep=";", encoding="utf-8", dtype=str)
+    validos = 0
+    for idx, row in df.iterrows():
+        linha = idx + 2
+        record = validador._validate_row(linha, row)
+        if record is None:
+            continue
+        validos += 1
+        if record.dt_sintomas > record.dt_notificacao:
+            validador.erros.append(ValidationError(
+                linha=linha, campo="dt_sintomas", valor=str(record.dt_sintomas),
+                erro="Data de sintomas posterior à data de notificação", severidade="ERRO"))
+        if record.evolucao == "OBITO" and record.dt_obito is None:
+            validador.avisos.append(ValidationWarning(
+                linha=linha, campo="dt_obito", valor="null",
+                aviso="Evolução = OBITO mas dt_obito não informada"))
+        if record.dt_obito is not None and record.evolucao != "OBITO":
+            validador.avisos.append(ValidationWarning(
+                linha=linha, campo="evolucao", valor=record.evolucao,
+                aviso=f"dt_obito informada mas evolucao = {record.evolucao}"))
+        if record.gestante and record.gestante not in ["N", "9"]:
+            if record.sexo != "F":
+                validador.avisos.append(ValidationWarning(
+                    linha=linha, campo="gestante", valor=record.gestante,
+                    aviso="Campo gestante preenchido para sexo != F"))
+            if record.idade < 10 or record.idade > 49:
+                validador.avisos.append(ValidationWarning(
+                    linha=linha, campo="gestante", valor=record.gestante,
+                    aviso="Gestante informada para idade fora da faixa 10-49"))
+        if record.classificacao_final == "DESCARTADO" and record.criterio_confirmacao == "LABORATORIAL":
+            validador.avisos.append(ValidationWarning(
+                linha=linha, campo="classificacao_final", valor=record.classificacao_final,
+                aviso="Caso DESCARTADO com critério LABORATORIAL (incomum)"))
+    return {"validos": validos, "erros": validador.erros, "avisos": validador.avisos}
+
+
+def mascaras(caminho: Path) -> dict:
+    validador = EPIValidator()
+    relatorio = validador.validate_csv(str(caminho), caminho.name)
+    return {"validos": relatorio.linhas_validas, "erros": validador.erros, "avisos": validador.avisos}
+
+
+def medir(modo, caminho: Path, linhas: int) -> dict:
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        resultado = modo(caminho)
+        tempos.append(time.perf_counter() - inicio)
+    return {"linhas_por_s": round(linhas / median(tempos)), "resultado": resultado}
+
+
+def main() -> int:
+    resultados = []
+    print(f"{'linhas':>9} | {'linha a linha/s':>15} | {'máscaras/s':>11} | {'ganho':>6}")
+    print("-" * 52)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in VOLUMES:
+            caminho = Path(tmp) / f"epi_{n}.csv"
+            gerar_csv(caminho, n)
+            legado, novo = medir(linha_a_linha, caminho, n), medir(mascaras, caminho, n)
+            assert legado.pop("resultado") == novo.pop("resultado"), "resultados divergentes"
+            ganho = novo["linhas_por_s"] / legado["linhas_por_s"]
+            resultados.append({"linhas": n, "linha_a_linha": legado, "mascaras": novo,
+                               "ganho": round(ganho, 1)})
+            print(f"{n:>9} | {legado['linhas_por_s']:>15} | {novo['linhas_por_s']:>11} | {ganho:>5.1f}x")
+
+    out = Path(__file__).parent / "bench_epi_validator.json"
+    out.write_text(json.dumps(resultados, indent=2))
+    print(f"\nResultados salvos em {out}")
+
+    if all(r["ganho"] > 1 for r in resultados):
+        print("✅ Validação por máscaras com throughput maior que a linha a linha")
+        return 0
+    print("❌ Validação por máscaras não superou a linha a linha")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Benchmark: camada de incidência montada em Pydantic vs GeoJSON em streaming
+
+Para 1k/10k/50k features compara, sem banco (cursor falso em memória):
+
+- modelo: ``MapaService.get_camada_incidencia`` + ``model_dump_json`` (o
+  documento inteiro é montado antes do primeiro byte)
+- stream: ``MapaService.stream_camada_incidencia`` (dicts + orjson, blocos
+  de GEOJSON_STREAM_CHUNK_KB)
+
+Métricas: pico de memória alocada (tracemalloc), tempo até o primeiro byte e
+tempo total (mediana de REPETICOES).
+
+Resultado esperado: no streaming o pico de memória fica praticamente
+constante e o primeiro byte sai em tempo constante; no modelo ambos crescem
+linearmente com o número de features.
+
+Usage:
+    python tests/performance/bench_geojson_stream.py
+"""
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from statistics import median
+from typing import Callable, Dict, Iterator
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "epi-api"))
+
+from app.services import geojson_stream, mapa_service  # noqa: E402
+from app.services.mapa_service import MapaService  # noqa: E402
+from app.services.municipio_index import MunicipioIndex  # noqa: E402
+
+VOLUMES = [1_000, 10_000, 50_000]
+REPETICOES = 3
+
+
+class _Cursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.itersize = 2000
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class _Conn:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self, name=None, cursor_factory=None):
+        return _Cursor(self.rows)
+
+    def close(self):
+        pass
+
+
+def preparar(n: int) -> MapaService:
+    # Linhas geradas sob demanda, como um cursor no servidor
+    class Linhas:
+        def __iter__(self) -> Iterator[Dict]:
+            for i in range(n):
+                yield {"municipio_cod_ibge": f"{i:07d}", "total_casos": i % 500, "total_obitos": (i % 500) // 100}
+
+    mapa_service.get_connection = lambda dsn=None: _Conn(Linhas())
+    municipios = MunicipioIndex.from_records({
+        f"{i:07d}": {"nome": f"Município {i}", "pop": 10000 + i,
+                     "lat": -15.0 + i * 1e-5, "lon": -56.0 - i * 1e-5}
+        for i in range(n)
+    })
+    return MapaService("postgresql://bench", municipios=municipios)
+
+
+def medir(gerar: Callable[[], Iterator[bytes]]) -> Dict:
+    tempos, primeiros, picos, tamanhos = [], [], [], []
+    for _ in range(REPETICOES):
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        primeiro = None
+        total = 0
+        for chunk in gerar():
+            if primeiro is None:
+                primeiro = time.perf_counter()
+            total += len(chunk)
+        fim = time.perf_counter()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        tempos.append((fim - inicio) * 1000)
+        primeiros.append((primeiro - inicio) * 1000)
+        picos.append(pico / 2**20)
+        tamanhos.append(total)
+    return {
+        "ms": round(median(tempos), 1),
+        "primeiro_byte_ms": round(median(primeiros), 1),
+        "pico_mb": round(median(picos), 1),
+        "bytes": tamanhos[0],
+    }
+
+
+def main() -> int:
+    print(f"orjson: {'sim' if geojson_stream.orjson is not None else 'não (json)'}")
+    print(f"{'features':>9} | {'modelo: total / 1º byte / pico':<32} | {'stream: total / 1º byte / pico':<32}")
+    print("-" * 80)
+
+    resultados = []
+    for n in VOLUMES:
+        service = preparar(n)
+
+        def modelo() -> Iterator[bytes]:
+            yield service.get_camada_incidencia(
+                "202401", "202412", max_features=n
+            ).model_dump_json().encode("utf-8")
+
+        def stream() -> Iterator[bytes]:
+            return service.stream_camada_incidencia("202401", "202412", max_features=n)
+
+        r_modelo, r_stream = medir(modelo), medir(stream)
+        resultados.append({"features": n, "modelo": r_modelo, "stream": r_stream})
+        print(
+            f"{n:>9} | {r_modelo['ms']:>8.1f}ms {r_modelo['primeiro_byte_ms']:>8.1f}ms {r_modelo['pico_mb']:>7.1f}MB"
+            f" | {r_stream['ms']:>8.1f}ms {r_stream['primeiro_byte_ms']:>8.1f}ms {r_stream['pico_mb']:>7.1f}MB"
+        )
+
+    out = Path(__file__).parent / "bench_geojson_stream.json"
+    out.write_text(json.dumps(resultados, indent=2))
+    print(f"\nResultados salvos em {out}")
+
+    maior = resultados[-1]
+    if (
+        maior["stream"]["pico_mb"] < maior["modelo"]["pico_mb"] / 5
+        and maior["stream"]["primeiro_byte_ms"] < maior["modelo"]["primeiro_byte_ms"] / 10
+    ):
+        print("✅ Streaming com memória e primeiro byte independentes do volume")
+        return 0
+    print("❌ Streaming não reduziu memória/primeiro byte como esperado")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
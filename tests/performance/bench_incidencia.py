@@ -0,0 +1,97 @@
+"""
+Micro-benchmark: incidência/letalidade/risco por laço Python vs NumPy
+
+Entrada em escala nacional (5.570 municípios) e 10x isso, com casos,
+óbitos e população sintéticos. Compara:
+
+- laço: uma chamada por município com as regras escalares antigas
+  (if/elif sobre 100/300/500, divisão protegida)
+- lote: ``app.services.incidencia.calcular_indicadores`` + classes/cores
+
+Usage:
+    python tests/performance/bench_incidencia.py
+"""
+import json
+import sys
+import time
+from pathlib import Path
+from statistics import median
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "epi-api"))
+
+from app.services.incidencia import calcular_indicadores  # noqa: E402
+
+VOLUMES = [5_570, 55_700]
+REPETICOES = 20
+
+
+def classificar(incidencia: float) -> Tuple[str, str]:
+    if incidencia < 100:
+        return "BAIXO", "#4CAF50"
+    elif incidencia < 300:
+        return "MEDIO", "#FFC107"
+    elif incidencia < 500:
+        return "ALTO", "#FF9800"
+    return "MUITO_ALTO", "#F44336"
+
+
+def laco(casos: List[int], populacao: List[int], obitos: List[int]):
+    saida = []
+    for c, p, o in zip(casos, populacao, obitos):
+        incidencia = (c / p * 100000) if p > 0 else 0.0
+        letalidade = (o / c * 100) if c > 0 else 0.0
+        classe, cor = classificar(incidencia)
+        saida.append((round(incidencia, 2), round(letalidade, 2), classe, cor))
+    return saida
+
+
+def lote(casos: List[int], populacao: List[int], obitos: List[int]):
+    ind = calcular_indicadores(casos, populacao, obitos)
+    return (ind.incidencia.round(2).tolist(), ind.letalidade.round(2).tolist(),
+            ind.classes(), ind.cores())
+
+
+def cronometrar(func: Callable) -> float:
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        func()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return round(median(tempos), 3)
+
+
+def main() -> int:
+    rng = np.random.default_rng(42)
+    resultados = []
+    print(f"{'municípios':>10} | {'laço (ms)':>10} | {'lote (ms)':>10} | {'speedup':>8}")
+    print("-" * 48)
+    for n in VOLUMES:
+        populacao = rng.integers(800, 12_000_000, n).tolist()
+        casos = rng.integers(0, 20_000, n).tolist()
+        obitos = [c // 500 for c in casos]
+
+        # Mesmo resultado (classes) nos dois caminhos
+        assert [r[2] for r in laco(casos, populacao, obitos)] == lote(casos, populacao, obitos)[2]
+
+        t_laco = cronometrar(lambda: laco(casos, populacao, obitos))
+        t_lote = cronometrar(lambda: lote(casos, populacao, obitos))
+        resultados.append({"municipios": n, "laco_ms": t_laco, "lote_ms": t_lote,
+                           "speedup": round(t_laco / t_lote, 1)})
+        print(f"{n:>10} | {t_laco:>10.3f} | {t_lote:>10.3f} | {t_laco / t_lote:>7.1f}x")
+
+    out = Path(__file__).parent / "bench_incidencia.json"
+    out.write_text(json.dumps(resultados, indent=2))
+    print(f"\nResultados salvos em {out}")
+
+    if all(r["lote_ms"] < r["laco_ms"] for r in resultados):
+        print("✅ Cálculo em lote mais rápido que o laço por município")
+        return 0
+    print("❌ Cálculo em lote não superou o laço")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Benchmark: normalização SINAN por linha vs vetorizada por batch
+
+Gera batches sintéticos no formato entregue pelo ``LeitorCSV`` (dicts de
+strings, ~2% de linhas inválidas e datas nos dois formatos) e mede:
+
+- por_linha: o caminho anterior de ``_process_sinan_batch`` —
+  ``_normalize_sinan_row`` + ``SINANRecordRaw`` + classificação por registro
+- vetorizado: ``_process_sinan_batch`` atual — ``_normalize_sinan_batch``
+  (pandas/NumPy por coluna), Pydantic só nas linhas reprovadas
+
+Confere que os dois caminhos produzem as mesmas contagens agregadas e o
+mesmo número de erros. Métrica: linhas por segundo (mediana de REPETICOES).
+
+Usage:
+    python tests/performance/bench_sinan_normalize.py
+"""
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from statistics import median
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "epi-api"))
+
+from app.schemas.etl import SINANRecordRaw  # noqa: E402
+from app.services.semana_epi import semana_epi  # noqa: E402
+from app.services.sinan_etl_service import (  # noqa: E402
+    CODIGO_MUNICIPIO,
+    AgregadoSINAN,
+    SINANETLService,
+)
+
+VOLUMES = [10_000, 100_000, 500_000]
+BATCH_SIZE = 1000
+REPETICOES = 3
+
+
+def gerar_linhas(n: int) -> List[Dict[str, Any]]:
+    linhas = []
+    for i in range(n):
+        data = (f"{i % 28 + 1:02d}/{i % 12 + 1:02d}/2024" if i % 3
+                else f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}")
+        linhas.append({
+            'nu_notific': f"2024{i:08d}", 'dt_notific': data, 'dt_sin_pri': None,
+            'nm_pacient': f"PACIENTE {i}", 'dt_nasc': "01/01/1990",
+            'nu_idade_n': str(i % 90) if i % 97 else "150",
+            'cs_sexo': "MF"[i % 2], 'sg_uf': "MT" if i % 89 else "GO",
+            'id_municip': f"51{i % 141:05d}", 'nm_bairro': "CENTRO",
+            'classi_fin': str(i % 5 + 1), 'evolucao': str(i % 3 + 1),
+        })
+    return linhas
+
+
+def por_linha(service: SINANETLService, batch: List[Dict[str, Any]], acumulado: AgregadoSINAN) -> int:
+    """Caminho anterior: Pydantic e classificação registro a registro"""
+    erros = 0
+    municipios, anos, semanas, contagens = [], [], [], []
+    for row in batch:
+        try:
+            record = SINANRecordRaw(**service._normalize_sinan_row(row))
+            if not re.fullmatch(CODIGO_MUNICIPIO, record.id_municip):
+                raise ValueError(f"Código de município inválido: {record.id_municip}")
+            municipios.append(record.id_municip)
+            ano, semana = semana_epi(record.dt_notific)
+            anos.append(ano)
+            semanas.append(semana)
+            contagens.append([
+                record.classi_fin in service.CLASSIFICACAO_CONFIRMADO,
+                record.classi_fin in service.CLASSIFICACAO_GRAVE,
+                record.evolucao in service.EVOLUCAO_OBITO,
+            ])
+        except Exception:
+            erros += 1
+    acumulado.adicionar(municipios, anos, semanas, contagens)
+    return erros
+
+
+def vetorizado(service: SINANETLService, batch: List[Dict[str, Any]], acumulado: AgregadoSINAN) -> int:
+    return len(service._process_sinan_batch(batch, acumulado)['errors'])
+
+
+def medir(modo, service: SINANETLService, linhas: List[Dict[str, Any]]) -> dict:
+    tempos = []
+    for _ in range(REPETICOES):
+        acumulado = AgregadoSINAN()
+        erros = 0
+        inicio = time.perf_counter()
+        for i in range(0, len(linhas), BATCH_SIZE):
+            erros += modo(service, linhas[i:i + BATCH_SIZE], acumulado)
+        tempos.append(time.perf_counter() - inicio)
+    return {
+        "linhas_por_s": round(len(linhas) / median(tempos)),
+        "erros": erros,
+        "totais": acumulado.totais(),
+    }
+
+
+def main() -> int:
+    service = SINANETLService({})
+    resultados = []
+    print(f"{'linhas':>9} | {'por linha/s':>12} | {'vetorizado/s':>12} | {'ganho':>6}")
+    print("-" * 50)
+
+    for n in VOLUMES:
+        linhas = gerar_linhas(n)
+        r_linha, r_vetor = medir(por_linha, service, linhas), medir(vetorizado, service, linhas)
+        assert r_linha.pop("totais") == r_vetor.pop("totais"), "contagens divergentes"
+        assert r_linha["erros"] == r_vetor["erros"], "erros divergentes"
+        ganho = r_vetor["linhas_por_s"] / r_linha["linhas_por_s"]
+        resultados.append({"linhas": n, "por_linha": r_linha, "vetorizado": r_vetor,
+                           "ganho": round(ganho, 1)})
+        print(f"{n:>9} | {r_linha['linhas_por_s']:>12} | {r_vetor['linhas_por_s']:>12} | {ganho:>5.1f}x")
+
+    out = Path(__file__).parent / "bench_sinan_normalize.json"
+    out.write_text(json.dumps(resultados, indent=2))
+    print(f"\nResultados salvos em {out}")
+
+    if all(r["ganho"] > 1 for r in resultados):
+        print("✅ Normalização vetorizada com throughput maior que a por linha")
+        return 0
+    print("❌ Normalização vetorizada não superou a por linha")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())